@@ -112,6 +112,9 @@ const App: React.FC = () => {
     consecutiveWins: 0,
   }));
   const [tradeHistory, setTradeHistory] = useState<Trade[]>([]);
+  // Cursor of the next (older) page of trades; null once everything is loaded
+  const [tradeHistoryCursor, setTradeHistoryCursor] = useState<string | null>(null);
+  const [isLoadingMoreTrades, setIsLoadingMoreTrades] = useState(false);
   const [decision, setDecision] = useState<TradeDecision | null>(null);
   const [showCheckin, setShowCheckin] = useState(false);
   const [dailyQuestions, setDailyQuestions] = useState<CheckinQuestion[] | null>(null);
@@ -201,6 +204,27 @@ const App: React.FC = () => {
     }
   }, [stats, tradeHistory, crisisIntervention]);
 
+  // Transform API response to frontend Trade format
+  const toTrade = (trade: any): Trade => ({
+    id: trade.id,
+    timestamp: new Date(trade.entry_time || trade.created_at),
+    asset: trade.symbol || trade.asset,
+    direction: trade.side || trade.direction,
+    entryPrice: trade.entry_price || trade.entryPrice,
+    takeProfit: trade.take_profit || trade.takeProfit,
+    stopLoss: trade.stop_loss || trade.stopLoss,
+    positionSize: trade.quantity ? (trade.quantity * (trade.entry_price || 1)) : trade.positionSize,
+    status: trade.status || 'OPEN',
+    decision: trade.ai_decision || trade.decision || 'ALLOW',
+    pnl: trade.pnl,
+    reasoning: trade.notes || trade.reasoning,
+    decisionReason: trade.ai_reason || trade.decisionReason,
+    mode: simulationMode ? 'SIMULATION' : 'LIVE',
+    userProcessEvaluation: trade.user_process_evaluation,
+    processEvaluation: trade.process_evaluation,
+    processScore: trade.process_score ?? undefined
+  });
+
   // Centralized Rehydration & Sync logic (OPTIMIZED: Parallel API calls)
   const rehydrateUser = React.useCallback(async () => {
     if (!isAuthenticated || !user) return;
@@ -209,7 +233,8 @@ const App: React.FC = () => {
       console.log('[App] Rehydrating data for user:', user.email);
 
       // OPTIMIZATION: Parallelize independent API calls
-      const [rawHistory, summary, me, checkinData, todayCheckin, initialMsg] = await Promise.all([
+      // Only the first page of trades: older ones load on demand (loadMoreTrades)
+      const [historyPage, summary, me, checkinData, todayCheckin, initialMsg] = await Promise.all([
         api.getTradeHistory(),
         api.getProgressSummary(),
         api.getCurrentUser(),
@@ -218,28 +243,12 @@ const App: React.FC = () => {
         api.getInitialMessage().catch(() => "Chào bạn!")
       ]);
 
-      console.log('[App] Loaded trade history from API:', rawHistory?.length || 0, 'trades');
-
-      // Transform API response to frontend Trade format
-      const transformedHistory = (rawHistory || []).map((trade: any) => ({
-        id: trade.id,
-        timestamp: new Date(trade.entry_time || trade.created_at),
-        asset: trade.symbol || trade.asset,
-        direction: trade.side || trade.direction,
-        entryPrice: trade.entry_price || trade.entryPrice,
-        takeProfit: trade.take_profit || trade.takeProfit,
-        stopLoss: trade.stop_loss || trade.stopLoss,
-        positionSize: trade.quantity ? (trade.quantity * (trade.entry_price || 1)) : trade.positionSize,
-        status: trade.status || 'OPEN',
-        decision: trade.ai_decision || trade.decision || 'ALLOW',
-        pnl: trade.pnl,
-        reasoning: trade.notes || trade.reasoning,
-        decisionReason: trade.ai_reason || trade.decisionReason,
-        mode: simulationMode ? 'SIMULATION' : 'LIVE',
-        userProcessEvaluation: trade.user_process_evaluation,
-        processEvaluation: trade.process_evaluation
-      }));
+      console.log('[App] Loaded trade history from API:', historyPage.items.length, 'trades');
+
+      const transformedHistory = historyPage.items.map(toTrade);
       setTradeHistory(transformedHistory);
+      setTradeHistoryCursor(historyPage.nextCursor);
+      // Totals (win rate, PnL, streaks) are server-side summaries, not derived from the loaded page
       setStats(prev => ({ ...prev, ...summary }));
 
       if (me) {
@@ -321,6 +330,7 @@ const App: React.FC = () => {
       // Clear sensitive states on logout
       hasHydratedRef.current = false;
       setTradeHistory([]);
+      setTradeHistoryCursor(null);
       setMessages([]);
       setStats({
         survivalDays: 0,
@@ -437,8 +447,45 @@ const App: React.FC = () => {
     localStorage.setItem('thekey-lastActiveDate', today);
   }, []);
 
+  // Older trades are fetched a page at a time when the history list asks for them
+  const loadMoreTrades = async () => {
+    if (!tradeHistoryCursor || isLoadingMoreTrades) return;
+    setIsLoadingMoreTrades(true);
+    try {
+      const page = await api.getTradeHistory(tradeHistoryCursor);
+      const known = new Set(tradeHistory.map(t => t.id));
+      setTradeHistory(prev => [...prev, ...page.items.map(toTrade).filter((t: Trade) => !known.has(t.id))]);
+      setTradeHistoryCursor(page.nextCursor);
+    } catch (error) {
+      console.error('[App] Failed to load more trades:', error);
+    } finally {
+      setIsLoadingMoreTrades(false);
+    }
+  };
+
+  // History is loaded in the compact view: fetch notes and evaluations when a trade is opened
+  const selectTradeForAnalysis = React.useCallback(async (trade: Trade | null) => {
+    setSelectedTradeForAnalysis(trade);
+    if (!trade) return;
+    try {
+      const full = await api.getTrade(String(trade.id));
+      const details = {
+        takeProfit: full.take_profit,
+        stopLoss: full.stop_loss,
+        reasoning: full.notes,
+        decisionReason: full.ai_reason,
+        userProcessEvaluation: full.user_process_evaluation,
+        processEvaluation: full.process_evaluation
+      };
+      setSelectedTradeForAnalysis(prev => prev?.id === trade.id ? { ...prev, ...details } : prev);
+      setTradeHistory(prev => prev.map(t => t.id === trade.id ? { ...t, ...details } : t));
+    } catch (error) {
+      console.error('[App] Error loading trade details:', error);
+    }
+  }, []);
+
   useEffect(() => {
-    if (selectedTradeForAnalysis && !tradeAnalysis && selectedTradeForAnalysis.status === 'CLOSED') {
+    if (selectedTradeForAnalysis && !tradeAnalysis && !isAnalyzingTrade && selectedTradeForAnalysis.status === 'CLOSED') {
       setIsAnalyzingTrade(true);
       api.getPostTradeAnalysis(selectedTradeForAnalysis)
         .then(setTradeAnalysis)
@@ -981,7 +1028,7 @@ const App: React.FC = () => {
                     onMarketAnalysis={setMarketAnalysis}
                     processStats={processStats}
                     tradeHistory={currentTradeHistory}
-                    onAnalyzeTrade={setSelectedTradeForAnalysis}
+                    onAnalyzeTrade={selectTradeForAnalysis}
                     isAnalyzingTrade={isAnalyzingTrade}
                     selectedTradeForAnalysis={selectedTradeForAnalysis}
                     onCloseTrade={handleCloseTrade}
@@ -1011,12 +1058,15 @@ const App: React.FC = () => {
                     decision={decision}
                     onProceed={() => setDecision(null)}
                     tradeHistory={currentTradeHistory}
-                    onAnalyzeTrade={setSelectedTradeForAnalysis}
+                    onAnalyzeTrade={selectTradeForAnalysis}
                     isAnalyzingTrade={isAnalyzingTrade}
                     selectedTradeForAnalysis={selectedTradeForAnalysis}
                     onCloseTrade={handleCloseTrade}
                     tradeAnalysis={tradeAnalysis}
                     onClearAnalysis={() => { setSelectedTradeForAnalysis(null); setTradeAnalysis(null); }}
+                    hasMoreTrades={tradeHistoryCursor !== null}
+                    isLoadingMoreTrades={isLoadingMoreTrades}
+                    onLoadMoreTrades={loadMoreTrades}
                     messages={messages}
                     onSendMessage={handleNewMessage}
                     isLoadingChat={isChatting}
@@ -30,9 +30,11 @@ target_metadata = Base.metadata
 # Database URL from environment
 DATABASE_URL = os.getenv("SUPABASE_DB_URL") or os.getenv("DATABASE_URL")
 if DATABASE_URL:
-    # Convert postgres:// to postgresql:// if needed
+    # Same normalization as models/base.py: psycopg (v3) driver
     if DATABASE_URL.startswith("postgres://"):
-        DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
+        DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql+psycopg://", 1)
+    elif DATABASE_URL.startswith("postgresql://"):
+        DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+psycopg://", 1)
     config.set_main_option("sqlalchemy.url", DATABASE_URL)
 
 
@@ -64,22 +66,34 @@ def run_migrations_online() -> None:
 
     In this scenario we need to create an Engine
     and associate a connection with the context.
+    scripts/migrate.py passes its own (advisory-locked) connection in
+    config.attributes["connection"].
     """
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run_migrations(connection)
+        return
+
     connectable = create_engine(
         config.get_main_option("sqlalchemy.url"),
         poolclass=pool.NullPool,
     )
 
     with connectable.connect() as connection:
-        context.configure(
-            connection=connection,
-            target_metadata=target_metadata,
-            compare_type=True,  # Detect column type changes
-            compare_server_default=True,  # Detect default value changes
-        )
-
-        with context.begin_transaction():
-            context.run_migrations()
+        _run_migrations(connection)
+
+
+def _run_migrations(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        compare_type=True,  # Detect column type changes
+        compare_server_default=True,  # Detect default value changes
+        transaction_per_migration=True,  # Some migrations commit mid-way (autocommit_block)
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
 
 
 if context.is_offline_mode():
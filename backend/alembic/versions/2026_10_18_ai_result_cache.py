@@ -0,0 +1,39 @@
+"""Add ai_result_cache table for content-addressed report results
+
+Revision ID: 2026_10_18_ai_result_cache
+Revises: 2026_10_18_chat_conversations
+Create Date: 2026-10-18
+
+- ai_result_cache: Weekly goals / weekly report / archetype results keyed by input fingerprint
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_18_ai_result_cache'
+down_revision = '2026_10_18_chat_conversations'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'ai_result_cache',
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('endpoint', sa.String(50), primary_key=True),
+        sa.Column('fingerprint', sa.String(64), primary_key=True),
+        sa.Column('prompt_version', sa.String(20), nullable=False),
+        sa.Column('payload', postgresql.JSONB, nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True)),
+    )
+    op.create_index('idx_ai_result_cache_user', 'ai_result_cache', ['user_id'])
+
+    print("✅ Created ai_result_cache table")
+
+
+def downgrade():
+    op.drop_index('idx_ai_result_cache_user', table_name='ai_result_cache')
+    op.drop_table('ai_result_cache')
+
+    print("❌ Dropped ai_result_cache table")
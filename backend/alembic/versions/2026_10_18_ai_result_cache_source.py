@@ -0,0 +1,28 @@
+"""Add source column to ai_result_cache for nightly batch results
+
+Revision ID: 2026_10_18_ai_result_cache_source
+Revises: 2026_10_18_ai_result_cache
+Create Date: 2026-10-18
+
+- ai_result_cache.source: 'request' (computed on demand) or 'nightly' (precomputed by the batch runner)
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_18_ai_result_cache_source'
+down_revision = '2026_10_18_ai_result_cache'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('ai_result_cache', sa.Column('source', sa.String(20), server_default='request'))
+
+    print("✅ Added ai_result_cache.source")
+
+
+def downgrade():
+    op.drop_column('ai_result_cache', 'source')
+
+    print("❌ Dropped ai_result_cache.source")
@@ -0,0 +1,37 @@
+"""Add ai_snapshots table for shared stale-while-revalidate AI results
+
+Revision ID: 2026_10_18_ai_snapshots
+Revises: 2026_01_14_add_user_ai_columns
+Create Date: 2026-10-18
+
+- ai_snapshots: One row per shared AI snapshot (market analysis),
+  with a regeneration lease so only one worker calls Gemini at a time
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_18_ai_snapshots'
+down_revision = '2026_01_14_add_user_ai_columns'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'ai_snapshots',
+        sa.Column('key', sa.String(50), primary_key=True),
+        sa.Column('payload', postgresql.JSONB),
+        sa.Column('generated_at', sa.DateTime(timezone=True)),
+        sa.Column('lease_owner', sa.String(100)),
+        sa.Column('lease_until', sa.DateTime(timezone=True)),
+    )
+
+    print("✅ Created ai_snapshots table")
+
+
+def downgrade():
+    op.drop_table('ai_snapshots')
+
+    print("❌ Dropped ai_snapshots table")
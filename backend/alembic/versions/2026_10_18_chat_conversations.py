@@ -0,0 +1,36 @@
+"""Add chat_conversations table for server-side coach memory
+
+Revision ID: 2026_10_18_chat_conversations
+Revises: 2026_10_18_ai_snapshots
+Create Date: 2026-10-18
+
+- chat_conversations: Per-user recent chat turns + rolling summary
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_18_chat_conversations'
+down_revision = '2026_10_18_ai_snapshots'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'chat_conversations',
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('summary', sa.Text, server_default=''),
+        sa.Column('summarized_turns', sa.Integer, server_default='0'),
+        sa.Column('recent_turns', postgresql.JSONB, server_default='[]'),
+        sa.Column('updated_at', sa.DateTime(timezone=True)),
+    )
+
+    print("✅ Created chat_conversations table")
+
+
+def downgrade():
+    op.drop_table('chat_conversations')
+
+    print("❌ Dropped chat_conversations table")
@@ -0,0 +1,86 @@
+"""Consolidate the columns main.startup_event used to add on every boot
+
+Revision ID: 2026_10_18_startup_schema
+Revises: 2026_10_18_trade_note_index
+Create Date: 2026-10-18
+
+Until now each worker inspected users / checkins / trades on startup and
+issued ALTER TABLE for missing columns. The same column set is applied here
+once, with IF NOT EXISTS, so databases that already got them from a boot
+are unaffected:
+- users: archetype, shadow score, progression and AI budget columns
+- checkins: answer / insight / prescription columns
+- trades: AI decision, notes, tags and Process Dojo evaluation columns
+- idx_trades_user_time, for databases whose trades table predates the model
+  declaring it (stamped past 2026_10_18_trades_user_time_index by scripts.migrate)
+Column definitions are the ones startup used, unchanged.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_18_startup_schema'
+down_revision = '2026_10_18_trade_note_index'
+branch_labels = None
+depends_on = None
+
+
+STARTUP_COLUMNS = {
+    'users': [
+        ("archetype", "VARCHAR(50) DEFAULT 'UNDEFINED'"),
+        ("shadow_score", "JSONB"),
+        ("timezone", "VARCHAR(50) DEFAULT 'UTC'"),
+        ("survival_score", "INTEGER DEFAULT 0"),
+        ("current_streak", "INTEGER DEFAULT 0"),
+        ("total_trades", "INTEGER DEFAULT 0"),
+        ("xp", "INTEGER DEFAULT 0"),
+        ("level", "VARCHAR(20) DEFAULT 'NOVICE'"),
+        ("trading_persona", "VARCHAR(50) DEFAULT 'THE_OBSERVER'"),
+        ("transformation_stage", "VARCHAR(20) DEFAULT 'AWARENESS'"),
+        ("current_kata", "JSONB"),
+        ("growth_garden", "JSONB"),
+        # AI Usage & Cost Control columns (Phase 4)
+        ("daily_ai_calls", "INTEGER DEFAULT 0"),
+        ("last_ai_reset", "TIMESTAMP WITH TIME ZONE DEFAULT NOW()"),
+        ("monthly_ai_budget_usd", "NUMERIC DEFAULT 5.0"),
+    ],
+    'checkins': [
+        ("user_id", "VARCHAR(100)"),
+        ("answers", "JSONB"),
+        ("insights", "TEXT"),
+        ("action_items", "JSONB"),
+        ("encouragement", "TEXT"),
+        ("emotional_state", "VARCHAR(50)"),
+        ("risk_level", "VARCHAR(50)"),
+        ("created_at", "TIMESTAMP WITH TIME ZONE DEFAULT NOW()"),
+        ("date", "VARCHAR(20)"),
+        ("daily_prescription", "JSONB"),
+        ("progress_marker", "JSONB"),
+    ],
+    'trades': [
+        ("ai_decision", "VARCHAR(20)"),
+        ("ai_reason", "TEXT"),
+        ("notes", "TEXT"),
+        ("tags", "JSONB"),
+        ("user_process_evaluation", "JSONB"),
+        ("process_evaluation", "JSONB"),
+        ("process_score", "NUMERIC"),
+        ("behavioral_insight_card", "JSONB"),
+        ("kata_evaluation", "JSONB"),
+    ],
+}
+
+
+def upgrade():
+    for table, columns in STARTUP_COLUMNS.items():
+        for name, definition in columns:
+            op.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {name} {definition}")
+
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_trades_user_time ON trades (user_id, entry_time DESC)")
+
+    print("✅ Ensured startup-managed columns on users, checkins and trades")
+
+
+def downgrade():
+    # These columns predate the migration chain in most databases; keep them
+    pass
@@ -0,0 +1,53 @@
+"""Add stream_jobs table for the shared SSE job store
+
+Revision ID: 2026_10_18_stream_jobs
+Revises: 2026_10_18_ai_result_cache_source
+Create Date: 2026-10-18
+
+- stream_jobs: job progress shared across workers when JOB_STORE=postgres
+- partial unique index on active (user_id, type, trade_id) jobs for dedupe
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_18_stream_jobs'
+down_revision = '2026_10_18_ai_result_cache_source'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'stream_jobs',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('user_id', sa.String(64), nullable=False),
+        sa.Column('type', sa.String(50), nullable=False),
+        sa.Column('trade_id', sa.String(64)),
+        sa.Column('status', sa.String(20), nullable=False),
+        sa.Column('progress', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('message', sa.Text),
+        sa.Column('result', sa.Text),
+        sa.Column('error', sa.Text),
+        sa.Column('metadata', sa.Text),
+        sa.Column('created_at', sa.Float, nullable=False),
+        sa.Column('updated_at', sa.Float, nullable=False),
+        sa.Column('timeout_at', sa.Float, nullable=False),
+        sa.Column('seq', sa.BigInteger, nullable=False, server_default='0'),
+        sa.Column('writer', sa.String(32)),
+    )
+    op.create_index(
+        'idx_stream_jobs_active', 'stream_jobs', ['user_id', 'type', 'trade_id'], unique=True,
+        postgresql_where=sa.text("status IN ('pending', 'running') AND trade_id IS NOT NULL"),
+    )
+    op.create_index('idx_stream_jobs_created', 'stream_jobs', ['created_at'])
+
+    print("✅ Created stream_jobs table")
+
+
+def downgrade():
+    op.drop_index('idx_stream_jobs_created', table_name='stream_jobs')
+    op.drop_index('idx_stream_jobs_active', table_name='stream_jobs')
+    op.drop_table('stream_jobs')
+
+    print("❌ Dropped stream_jobs table")
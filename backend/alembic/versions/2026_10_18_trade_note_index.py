@@ -0,0 +1,40 @@
+"""Add trade_note_index table for searching encrypted trade notes
+
+Revision ID: 2026_10_18_trade_note_index
+Revises: 2026_10_18_trades_user_time_index
+Create Date: 2026-10-18
+
+- trade_note_index: per-trade array of blind (HMAC) tokens of the note's words,
+  GIN-indexed for `tokens @> ARRAY[...]` search
+- existing notes are encrypted, so rows are filled by
+  `python -m scripts.backfill_note_index` after upgrading, not here
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_18_trade_note_index'
+down_revision = '2026_10_18_trades_user_time_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'trade_note_index',
+        sa.Column('trade_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('trades.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('tokens', postgresql.ARRAY(sa.String), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True)),
+    )
+    op.create_index('idx_trade_note_index_tokens', 'trade_note_index', ['tokens'], postgresql_using='gin')
+
+    print("✅ Created trade_note_index table (run scripts.backfill_note_index to fill it)")
+
+
+def downgrade():
+    op.drop_index('idx_trade_note_index_tokens', table_name='trade_note_index')
+    op.drop_table('trade_note_index')
+
+    print("❌ Dropped trade_note_index table")
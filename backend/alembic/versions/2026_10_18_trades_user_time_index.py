@@ -0,0 +1,29 @@
+"""Ensure the trades (user_id, entry_time DESC) index exists
+
+Revision ID: 2026_10_18_trades_user_time_index
+Revises: 2026_10_18_user_stats
+Create Date: 2026-10-18
+
+- idx_trades_user_time backs keyset pagination of GET /api/trades/; it was only
+  in database/schema.sql, so databases created through create_all lack it
+- built CONCURRENTLY so large trades tables stay writable
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_18_trades_user_time_index'
+down_revision = '2026_10_18_user_stats'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_trades_user_time ON trades (user_id, entry_time DESC)")
+
+    print("✅ Ensured idx_trades_user_time index")
+
+
+def downgrade():
+    # The index predates this migration in schema.sql deployments; keep it
+    pass
@@ -0,0 +1,63 @@
+"""Add user_stats table for the progress summary counters
+
+Revision ID: 2026_10_18_user_stats
+Revises: 2026_10_18_work_items
+Create Date: 2026-10-18
+
+- user_stats: one row per user with trade / check-in counters, maintained on write
+- backfilled from trades and checkins so existing users start consistent
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_18_user_stats'
+down_revision = '2026_10_18_work_items'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'user_stats',
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('total_trades', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('blocked_trades', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('winning_trades', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('last_checkin_at', sa.DateTime(timezone=True)),
+        sa.Column('recent_checkins', sa.JSON),
+        sa.Column('updated_at', sa.DateTime(timezone=True)),
+        sa.Column('reconciled_at', sa.DateTime(timezone=True)),
+    )
+
+    op.execute("""
+        INSERT INTO user_stats (user_id, total_trades, blocked_trades, winning_trades,
+                                last_checkin_at, recent_checkins, updated_at, reconciled_at)
+        SELECT u.id,
+               COALESCE(t.total, 0), COALESCE(t.blocked, 0), COALESCE(t.wins, 0),
+               c.last_checkin_at, COALESCE(c.recent, '[]'::json), NOW(), NOW()
+        FROM users u
+        LEFT JOIN (
+            SELECT user_id,
+                   COUNT(*) AS total,
+                   COUNT(*) FILTER (WHERE ai_decision = 'BLOCK') AS blocked,
+                   COUNT(*) FILTER (WHERE pnl > 0) AS wins
+            FROM trades GROUP BY user_id
+        ) t ON t.user_id = u.id
+        LEFT JOIN (
+            SELECT user_id,
+                   MAX(created_at) AS last_checkin_at,
+                   json_agg(created_at ORDER BY created_at)
+                       FILTER (WHERE created_at >= NOW() - INTERVAL '14 days') AS recent
+            FROM checkins GROUP BY user_id
+        ) c ON c.user_id = u.id
+    """)
+
+    print("✅ Created and backfilled user_stats table")
+
+
+def downgrade():
+    op.drop_table('user_stats')
+
+    print("❌ Dropped user_stats table")
@@ -0,0 +1,48 @@
+"""Add work_items table for the durable background work queue
+
+Revision ID: 2026_10_18_work_items
+Revises: 2026_10_18_stream_jobs
+Create Date: 2026-10-18
+
+- work_items: queued AI work (post-trade analysis, mindset analysis) when WORK_QUEUE=postgres
+- unique (queue, idempotency_key) makes enqueueing the same job twice a no-op
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_18_work_items'
+down_revision = '2026_10_18_stream_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'work_items',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('queue', sa.String(50), nullable=False),
+        sa.Column('idempotency_key', sa.String(100)),
+        sa.Column('payload', sa.Text, nullable=False),
+        sa.Column('status', sa.String(20), nullable=False),
+        sa.Column('attempts', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('max_attempts', sa.Integer, nullable=False),
+        sa.Column('run_at', sa.Float, nullable=False),
+        sa.Column('created_at', sa.Float, nullable=False),
+        sa.Column('locked_by', sa.String(32)),
+        sa.Column('locked_at', sa.Float),
+        sa.Column('finished_at', sa.Float),
+        sa.Column('last_error', sa.Text),
+    )
+    op.create_index('idx_work_items_key', 'work_items', ['queue', 'idempotency_key'], unique=True)
+    op.create_index('idx_work_items_ready', 'work_items', ['status', 'run_at'])
+
+    print("✅ Created work_items table")
+
+
+def downgrade():
+    op.drop_index('idx_work_items_ready', table_name='work_items')
+    op.drop_index('idx_work_items_key', table_name='work_items')
+    op.drop_table('work_items')
+
+    print("❌ Dropped work_items table")
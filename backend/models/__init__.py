@@ -1,5 +1,5 @@
 # backend/models/__init__.py
-from .base import Base, get_db, get_db_connection, engine
+from .base import Base, get_db, get_async_db, get_db_connection, engine, async_engine
 from .user import User
 from .trade import Trade
 from .session import Session
@@ -8,4 +8,10 @@ from .kb_document import KBDocument
 from .ai_call_log import AICallLog
 from .checkin import Checkin
 from .idempotency import IdempotencyKey
-
+from .ai_snapshot import AISnapshot
+from .chat_conversation import ChatConversation
+from .ai_result_cache import AIResultCache
+from .stream_job import StreamJob
+from .work_item import WorkItem
+from .user_stats import UserStats
+from .trade_note_index import TradeNoteIndex
@@ -90,11 +90,12 @@ class AICallLog(Base):
     @staticmethod
     def calculate_cost(model: str, input_tokens: int, output_tokens: int) -> float:
         """Calculate cost in USD based on model and tokens."""
-        # Pricing as of Jan 2026 - Gemini 2.5 Flash is FREE tier
+        # USD per 1K tokens, Gemini paid-tier list prices. Free-tier quota is
+        # shared across all users, so budgets are charged at the paid rate.
         pricing = {
-            "gemini-2.5-flash": {"input": 0, "output": 0},  # FREE tier (stable)
-            "gemini-2.0-flash-exp": {"input": 0, "output": 0},  # FREE tier
-            "gemini-1.5-flash": {"input": 0, "output": 0},  # Legacy FREE tier
+            "gemini-2.5-flash": {"input": 0.0003, "output": 0.0025},
+            "gemini-2.0-flash-exp": {"input": 0.0001, "output": 0.0004},
+            "gemini-1.5-flash": {"input": 0.000075, "output": 0.0003},
             # Legacy pricing for old models (for historical records)
             "gemini-1.5-flash-latest": {"input": 0.00025, "output": 0.0005},
             "gemini-1.5-pro-latest": {"input": 0.0025, "output": 0.005},
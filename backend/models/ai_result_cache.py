@@ -0,0 +1,41 @@
+# backend/models/ai_result_cache.py
+"""
+THEKEY AI Result Cache Model
+Content-addressed store for slow report endpoints (weekly goals, weekly
+report, archetype): one row per (user, endpoint, input fingerprint).
+"""
+
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from datetime import datetime, timezone
+
+from models.base import Base
+
+
+class AIResultCache(Base):
+    """A Gemini result, valid for as long as its inputs and prompt are unchanged."""
+    __tablename__ = "ai_result_cache"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    endpoint = Column(String(50), primary_key=True)  # weekly_goals | weekly_report | archetype
+
+    # sha256 of the normalized inputs + prompt version (see services/ai/result_cache.py)
+    fingerprint = Column(String(64), primary_key=True)
+    prompt_version = Column(String(20), nullable=False)
+
+    payload = Column(JSONB, nullable=False)
+    source = Column(String(20), default="request")  # request | nightly (scripts/nightly_batch.py)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        Index("idx_ai_result_cache_user", "user_id"),
+    )
+
+    def to_dict(self):
+        return {
+            "endpoint": self.endpoint,
+            "fingerprint": self.fingerprint,
+            "prompt_version": self.prompt_version,
+            "source": self.source,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
@@ -0,0 +1,39 @@
+# backend/models/ai_snapshot.py
+"""
+THEKEY Shared AI Snapshot Model
+Stores process-independent AI results (e.g. market analysis) so that
+one worker regenerates and every worker serves the same snapshot.
+"""
+
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.dialects.postgresql import JSONB
+
+from models.base import Base
+
+
+class AISnapshot(Base):
+    """
+    One row per snapshot key (e.g. 'market_analysis').
+
+    The lease columns implement a lightweight leader election:
+    a worker may only regenerate the snapshot while it holds an
+    unexpired lease, so at most one process calls Gemini at a time.
+    """
+    __tablename__ = "ai_snapshots"
+
+    key = Column(String(50), primary_key=True)
+    payload = Column(JSONB)
+    generated_at = Column(DateTime(timezone=True))
+
+    # Regeneration lease (leader election across workers)
+    lease_owner = Column(String(100))
+    lease_until = Column(DateTime(timezone=True))
+
+    def to_dict(self):
+        return {
+            "key": self.key,
+            "payload": self.payload,
+            "generated_at": self.generated_at.isoformat() if self.generated_at else None,
+            "lease_owner": self.lease_owner,
+            "lease_until": self.lease_until.isoformat() if self.lease_until else None,
+        }
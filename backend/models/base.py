@@ -21,13 +21,16 @@ from psycopg.rows import dict_row
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from datetime import datetime, timezone
 
 from sqlalchemy.types import TypeDecorator, String as SQLString
-from utils.encryption import encrypt_data, decrypt_data
+from utils.encryption import encrypt_data, decrypt_data, decrypt_many
 
 class EncryptedString(TypeDecorator):
-    """Custom type for storing encrypted strings in DB."""
+    """Custom type for storing encrypted strings in DB.
+    Encrypts on write; loaded rows keep the stored token, decrypted by
+    `LazyDecrypted` only when the attribute is read."""
     impl = SQLString
     cache_ok = True
 
@@ -36,16 +39,65 @@ class EncryptedString(TypeDecorator):
             return encrypt_data(value)
         return value
 
-    def process_result_value(self, value, dialect):
-        if value is not None:
-            return decrypt_data(value)
-        return value
+class LazyDecrypted:
+    """
+    Plaintext view of an EncryptedString column mapped under `column_key`:
+        _notes = Column("notes", EncryptedString)
+        notes = LazyDecrypted("_notes")
+    Decrypts on first read and remembers the result until the token changes
+    (reload, refresh). Assigned values are plaintext until flush, so they are
+    returned as-is. On the class it is the column, for queries and load_only().
+    """
+
+    def __init__(self, column_key: str):
+        self.column_key = column_key
+
+    def __set_name__(self, owner, name):
+        self.cache_key = f"_{name}_decrypted"
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return getattr(owner, self.column_key)
+        token = getattr(instance, self.column_key)
+        if token is None:
+            return None
+        cached = instance.__dict__.get(self.cache_key)
+        if cached is not None and cached[0] is token:
+            return cached[1]
+        plain = decrypt_data(token)
+        instance.__dict__[self.cache_key] = (token, plain)
+        return plain
+
+    def __set__(self, instance, value):
+        setattr(instance, self.column_key, value)
+        instance.__dict__[self.cache_key] = (value, value)
+
+def prefetch_decrypted(instances, attribute: str):
+    """Bulk-decrypt `attribute` for many loaded instances (thread pool fan-out),
+    so the reads that follow are cache hits. Blocking: use asyncio.to_thread."""
+    instances = list(instances)
+    if not instances:
+        return
+    descriptor = type(instances[0]).__dict__[attribute]
+    pending = [
+        (instance, token) for instance in instances
+        if (token := getattr(instance, descriptor.column_key)) is not None
+        and (instance.__dict__.get(descriptor.cache_key) or (None,))[0] is not token
+    ]
+    for (instance, token), plain in zip(pending, decrypt_many([token for _, token in pending])):
+        instance.__dict__[descriptor.cache_key] = (token, plain)
 
 # SQLAlchemy engine configuration with prepared statements disabled for pooler compatibility
 engine = create_engine(DATABASE_URL, connect_args={"prepare_threshold": None})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Async engine (psycopg async driver) for async route handlers: queries await
+# instead of blocking the event loop. expire_on_commit=False so loaded
+# attributes stay readable after commit without an implicit (sync) reload.
+async_engine = create_async_engine(DATABASE_URL, connect_args={"prepare_threshold": None})
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -53,13 +105,18 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def psycopg_url() -> str:
+    """DATABASE_URL as a plain libpq URL (without the SQLAlchemy `+psycopg` driver tag)."""
+    return DATABASE_URL.replace("+psycopg", "")
+
 def get_db_connection():
-    """Get a raw psycopg connection for direct SQL execution."""
-    # Clean up DATABASE_URL for psycopg (remove +psycopg if present)
-    url = DATABASE_URL
-    if "+psycopg" in url:
-        url = url.replace("+psycopg", "")
-    
+    """Get a raw psycopg connection for direct SQL execution.
+    Opens a new connection per call: request handlers should use the shared
+    pool in services/db_pool.py instead."""
     # Disable prepared statements on raw connection too
-    conn = psycopg.connect(url, prepare_threshold=None)
+    conn = psycopg.connect(psycopg_url(), prepare_threshold=None)
     return conn
@@ -0,0 +1,36 @@
+# backend/models/chat_conversation.py
+"""
+THEKEY Chat Conversation Model
+Server-side coach conversation memory: recent turns verbatim plus a
+rolling summary of everything older.
+"""
+
+from sqlalchemy import Column, Text, Integer, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from datetime import datetime, timezone
+
+from models.base import Base
+
+
+class ChatConversation(Base):
+    """One row per user (single ongoing conversation with Kaito)."""
+    __tablename__ = "chat_conversations"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+
+    # Rolling summary of turns that have scrolled out of the recent window
+    summary = Column(Text, default="")
+    summarized_turns = Column(Integer, default=0)
+
+    # Recent turns verbatim: [{"sender": "user" | "coach", "text": "..."}]
+    recent_turns = Column(JSONB, default=list)
+
+    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    def to_dict(self):
+        return {
+            "summary": self.summary or "",
+            "summarized_turns": self.summarized_turns or 0,
+            "recent_turns": self.recent_turns or [],
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
@@ -0,0 +1,41 @@
+# backend/models/stream_job.py
+"""
+THEKEY Stream Job Model
+SSE job state shared by every worker when JOB_STORE=postgres
+(see services/job_store.py). Timestamps are epoch seconds.
+"""
+
+from sqlalchemy import Column, String, Text, Integer, BigInteger, Float, Index, text
+
+from models.base import Base
+
+
+class StreamJob(Base):
+    """Progress of one async operation streamed over /api/stream/job/{id}."""
+    __tablename__ = "stream_jobs"
+
+    id = Column(String(36), primary_key=True)
+    user_id = Column(String(64), nullable=False)
+    type = Column(String(50), nullable=False)
+    trade_id = Column(String(64))
+
+    status = Column(String(20), nullable=False)  # pending | running | completed | failed
+    progress = Column(Integer, nullable=False, default=0)
+    message = Column(Text)
+    result = Column(Text)  # JSON
+    error = Column(Text)
+    metadata_json = Column("metadata", Text)  # JSON; `metadata` is reserved on declarative models
+
+    created_at = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False)
+    timeout_at = Column(Float, nullable=False)
+    seq = Column(BigInteger, nullable=False, default=0)
+    writer = Column(String(32))  # Instance id of the last writer, skipped by its own listener
+
+    __table_args__ = (
+        Index(
+            "idx_stream_jobs_active", "user_id", "type", "trade_id", unique=True,
+            postgresql_where=text("status IN ('pending', 'running') AND trade_id IS NOT NULL"),
+        ),
+        Index("idx_stream_jobs_created", "created_at"),
+    )
@@ -1,8 +1,8 @@
 # backend/models/trade.py
-from sqlalchemy import Column, String, DateTime, Numeric, ForeignKey, JSON
+from sqlalchemy import Column, String, DateTime, Numeric, ForeignKey, JSON, Index
 from sqlalchemy.dialects.postgresql import UUID, ARRAY
 from sqlalchemy.orm import relationship
-from .base import Base, EncryptedString
+from .base import Base, EncryptedString, LazyDecrypted
 import uuid
 from datetime import datetime
 
@@ -23,7 +23,8 @@ class Trade(Base):
     ai_decision = Column(String)
     ai_reason = Column(String)
     tags = Column(ARRAY(String))
-    notes = Column(EncryptedString)
+    _notes = Column("notes", EncryptedString)
+    notes = LazyDecrypted("_notes")  # Decrypted on first read, not on load
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Process Dojo evaluation data
@@ -32,3 +33,8 @@ class Trade(Base):
     process_score = Column(Numeric)  # Total process score (0-100)
     behavioral_insight_card = Column(JSON) # AI behavioral insight card
     kata_evaluation = Column(JSON) # Detailed Kata assessment
+
+    # Trade listing walks (user_id, entry_time) newest first (keyset pagination)
+    __table_args__ = (
+        Index("idx_trades_user_time", user_id, entry_time.desc()),
+    )
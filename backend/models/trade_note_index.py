@@ -0,0 +1,71 @@
+# backend/models/trade_note_index.py
+"""
+THEKEY Trade Note Index Model
+Blind-token index over encrypted trade notes (utils/blind_index.py), so
+keyword search runs in SQL without decrypting anything.
+
+Kept in step with `Trade.notes` by a flush hook: whenever a flush inserts a
+trade or changes its notes, the trade's tokens are upserted (or the row
+removed when the note is emptied) in the same transaction. Rows for trades
+written before the index existed come from scripts/backfill_note_index.py.
+"""
+
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, String, delete, event, inspect
+from sqlalchemy.dialects.postgresql import ARRAY, UUID, insert
+from sqlalchemy.orm import Session
+
+from models.base import Base
+from models.trade import Trade
+from utils.blind_index import blind_tokens, note_terms
+
+
+class TradeNoteIndex(Base):
+    """One row per trade with a non-empty note."""
+    __tablename__ = "trade_note_index"
+
+    trade_id = Column(UUID(as_uuid=True), ForeignKey("trades.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    tokens = Column(ARRAY(String), nullable=False)  # Blind tokens of the note's distinct words
+    updated_at = Column(DateTime(timezone=True))
+
+    # tokens @> ARRAY[...] lookups
+    __table_args__ = (
+        Index("idx_trade_note_index_tokens", tokens, postgresql_using="gin"),
+    )
+
+
+def write_note_index(connection, trades):
+    """Upsert (or clear) the index rows of `trades`, using their plaintext notes."""
+    now = datetime.now(timezone.utc)
+    rows, cleared = [], []
+    for trade in trades:
+        tokens = blind_tokens(trade.user_id, note_terms(trade.notes))
+        if tokens:
+            rows.append({"trade_id": trade.id, "user_id": trade.user_id, "tokens": tokens, "updated_at": now})
+        else:
+            cleared.append(trade.id)
+
+    table = TradeNoteIndex.__table__
+    if rows:
+        stmt = insert(table).values(rows)
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.trade_id],
+            set_={"tokens": stmt.excluded.tokens, "user_id": stmt.excluded.user_id, "updated_at": stmt.excluded.updated_at},
+        ))
+    if cleared:
+        connection.execute(delete(table).where(table.c.trade_id.in_(cleared)))
+
+
+@event.listens_for(Session, "after_flush")
+def _index_flushed_notes(session, flush_context):
+    # Notes assigned in this flush are still plaintext on the instance, so
+    # tokenizing them decrypts nothing
+    changed = [
+        instance for instance in list(session.new) + list(session.dirty)
+        if isinstance(instance, Trade)
+        and (instance in session.new or inspect(instance).attrs._notes.history.has_changes())
+    ]
+    if changed:
+        write_note_index(session.connection(), changed)
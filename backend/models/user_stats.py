@@ -0,0 +1,28 @@
+# backend/models/user_stats.py
+"""
+THEKEY User Stats Model
+Per-user counters behind /api/progress/summary, maintained incrementally
+when trades are created/closed and check-ins submitted (services/user_stats.py).
+"""
+
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, JSON
+from sqlalchemy.dialects.postgresql import UUID
+
+from models.base import Base
+
+
+class UserStats(Base):
+    """One row per user; `scripts.reconcile_user_stats` repairs drift."""
+    __tablename__ = "user_stats"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+
+    total_trades = Column(Integer, nullable=False, default=0)
+    blocked_trades = Column(Integer, nullable=False, default=0)  # Taken despite an AI BLOCK
+    winning_trades = Column(Integer, nullable=False, default=0)  # pnl > 0
+
+    last_checkin_at = Column(DateTime(timezone=True))
+    recent_checkins = Column(JSON)  # ISO timestamps of the last check-ins, newest last
+
+    updated_at = Column(DateTime(timezone=True))
+    reconciled_at = Column(DateTime(timezone=True))
@@ -0,0 +1,36 @@
+# backend/models/work_item.py
+"""
+THEKEY Work Item Model
+Durable background work when WORK_QUEUE=postgres (see services/work_queue.py).
+Timestamps are epoch seconds.
+"""
+
+from sqlalchemy import Column, String, Text, Integer, Float, Index
+
+from models.base import Base
+
+
+class WorkItem(Base):
+    """One unit of queued work, claimed by a worker with FOR UPDATE SKIP LOCKED."""
+    __tablename__ = "work_items"
+
+    id = Column(String(36), primary_key=True)
+    queue = Column(String(50), nullable=False)  # post_trade_analysis | mindset_analysis
+    idempotency_key = Column(String(100))
+    payload = Column(Text, nullable=False)  # JSON
+
+    status = Column(String(20), nullable=False)  # queued | running | done | dead
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+
+    run_at = Column(Float, nullable=False)  # Not claimed before this (retry backoff)
+    created_at = Column(Float, nullable=False)
+    locked_by = Column(String(32))
+    locked_at = Column(Float)
+    finished_at = Column(Float)
+    last_error = Column(Text)
+
+    __table_args__ = (
+        Index("idx_work_items_key", "queue", "idempotency_key", unique=True),
+        Index("idx_work_items_ready", "status", "run_at"),
+    )
@@ -9,10 +9,12 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import Optional
 from datetime import datetime, timedelta
+import uuid
 
-from models import get_db, AICallLog, User
-from services.auth.dependencies import get_current_user
+from models import get_db, AICallLog
+from services.auth.dependencies import get_current_user_id
 from services.ai.ai_tracking import AITracker
+from services.ai.cost_ledger import cost_ledger
 
 router = APIRouter(prefix="/api/analytics", tags=["analytics"])
 
@@ -20,7 +22,7 @@ router = APIRouter(prefix="/api/analytics", tags=["analytics"])
 @router.get("/ai/user-stats")
 async def get_user_ai_stats(
     days: int = Query(7, ge=1, le=90),
-    user: User = Depends(get_current_user),
+    user_id: uuid.UUID = Depends(get_current_user_id),
     db: Session = Depends(get_db)
 ):
     """
@@ -29,13 +31,14 @@ async def get_user_ai_stats(
     Returns token usage, costs, and breakdown by call type.
     """
     tracker = AITracker(db)
-    stats = tracker.get_accuracy_stats(user.id)
+    stats = tracker.get_accuracy_stats(user_id)
+    await cost_ledger.ensure_loaded(user_id)
     
     # Add cost stats from AICallLog
     since = datetime.utcnow() - timedelta(days=days)
     
     logs = db.query(AICallLog).filter(
-        AICallLog.user_id == user.id,
+        AICallLog.user_id == user_id,
         AICallLog.created_at >= since
     ).all()
     
@@ -59,14 +62,15 @@ async def get_user_ai_stats(
             "total_tokens": total_tokens,
             "total_cost_usd": round(total_cost, 4),
             "by_type": by_type
-        }
+        },
+        "monthly_budget": cost_ledger.get_usage(user_id)
     }
 
 
 @router.get("/ai/global-stats")
 async def get_global_ai_stats(
     days: int = Query(7, ge=1, le=90),
-    user: User = Depends(get_current_user),
+    user_id: uuid.UUID = Depends(get_current_user_id),
     db: Session = Depends(get_db)
 ):
     """
@@ -160,12 +164,12 @@ async def get_global_ai_stats(
 @router.get("/ai/recent-calls")
 async def get_recent_ai_calls(
     limit: int = Query(20, ge=1, le=100),
-    user: User = Depends(get_current_user),
+    user_id: uuid.UUID = Depends(get_current_user_id),
     db: Session = Depends(get_db)
 ):
     """Get recent AI calls for the current user."""
     logs = db.query(AICallLog).filter(
-        AICallLog.user_id == user.id
+        AICallLog.user_id == user_id
     ).order_by(AICallLog.created_at.desc()).limit(limit).all()
     
     return {
@@ -177,14 +181,14 @@ async def get_recent_ai_calls(
 @router.get("/guardian/decisions")
 async def get_guardian_decisions(
     days: int = Query(7, ge=1, le=90),
-    user: User = Depends(get_current_user),
+    user_id: uuid.UUID = Depends(get_current_user_id),
     db: Session = Depends(get_db)
 ):
     """Get Guardian decision statistics for the user."""
     since = datetime.utcnow() - timedelta(days=days)
     
     logs = db.query(AICallLog).filter(
-        AICallLog.user_id == user.id,
+        AICallLog.user_id == user_id,
         AICallLog.call_type == "guardian_decision",
         AICallLog.created_at >= since
     ).all()
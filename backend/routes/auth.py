@@ -6,19 +6,22 @@ Supports: Email/Password + Google OAuth + Email Verification
 
 from fastapi import APIRouter, HTTPException, Depends, Request
 from fastapi.responses import RedirectResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 from datetime import datetime, timedelta
+import asyncio
 import secrets
 import jwt
 import os
 import httpx
 import bcrypt
 
-from models import get_db, User, Session as UserSession, Trade, Checkin
-from models.base import get_db_connection
-from services.auth.dependencies import get_current_user
+from models import get_async_db, User, Session as UserSession, Trade, Checkin
+from models.base import prefetch_decrypted
+from services.auth.dependencies import get_current_user_async
+from services.auth.principal_cache import principal_cache
 from middleware.security import limiter, logger, sanitize_string
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
@@ -138,7 +141,7 @@ def generate_verification_token() -> str:
 
 @router.post("/signup", response_model=AuthResponse)
 @limiter.limit("5/minute")  # Prevent registration spam
-async def signup(request: Request, data: SignupRequest, db: Session = Depends(get_db)):
+async def signup(request: Request, data: SignupRequest, db: AsyncSession = Depends(get_async_db)):
     """User signup with email and password"""
     logger.info("signup_attempt", email=data.email[:3] + "***")
     
@@ -157,7 +160,7 @@ async def signup(request: Request, data: SignupRequest, db: Session = Depends(ge
         )
     
     # Check if user exists
-    existing_user = db.query(User).filter(User.email == data.email).first()
+    existing_user = (await db.execute(select(User.id).where(User.email == data.email))).first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
@@ -170,8 +173,8 @@ async def signup(request: Request, data: SignupRequest, db: Session = Depends(ge
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
 
     # Create tokens
     access_token = create_access_token(new_user.id, new_user.email)
@@ -184,7 +187,7 @@ async def signup(request: Request, data: SignupRequest, db: Session = Depends(ge
         expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
     )
     db.add(session)
-    db.commit()
+    await db.commit()
 
     return {
         "access_token": access_token,
@@ -201,11 +204,11 @@ async def signup(request: Request, data: SignupRequest, db: Session = Depends(ge
 
 @router.post("/login", response_model=AuthResponse)
 @limiter.limit("10/minute")  # Prevent brute force attacks
-async def login(request: Request, data: LoginRequest, db: Session = Depends(get_db)):
+async def login(request: Request, data: LoginRequest, db: AsyncSession = Depends(get_async_db)):
     """User login with email and password"""
     logger.info("login_attempt", email=data.email[:3] + "***")
     
-    user = db.query(User).filter(User.email == data.email).first()
+    user = (await db.execute(select(User).where(User.email == data.email))).scalars().first()
     
     if not user or not user.password_hash or not verify_password(data.password, user.password_hash):
         logger.warning("login_failed", email=data.email[:3] + "***")
@@ -225,7 +228,7 @@ async def login(request: Request, data: LoginRequest, db: Session = Depends(get_
         expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
     )
     db.add(session)
-    db.commit()
+    await db.commit()
 
     return {
         "access_token": access_token,
@@ -261,7 +264,7 @@ async def google_login():
 
 
 @router.post("/google/callback")
-async def google_callback(code: str, db: Session = Depends(get_db)):
+async def google_callback(code: str, db: AsyncSession = Depends(get_async_db)):
     """Handle Google OAuth callback"""
     if not GOOGLE_CLIENT_ID or not GOOGLE_CLIENT_SECRET:
         raise HTTPException(status_code=500, detail="Google OAuth not configured")
@@ -311,7 +314,7 @@ async def google_callback(code: str, db: Session = Depends(get_db)):
     email = google_user.get("email")
     google_id = google_user.get("id")
     
-    user = db.query(User).filter(User.email == email).first()
+    user = (await db.execute(select(User).where(User.email == email))).scalars().first()
     if not user:
         user = User(
             email=email,
@@ -319,11 +322,11 @@ async def google_callback(code: str, db: Session = Depends(get_db)):
             email_verified=True
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
     elif not user.google_id:
         user.google_id = google_id
-        db.commit()
+        await db.commit()
 
     # Create tokens
     access_token = create_access_token(user.id, user.email)
@@ -336,7 +339,7 @@ async def google_callback(code: str, db: Session = Depends(get_db)):
         expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
     )
     db.add(session)
-    db.commit()
+    await db.commit()
 
     return {
         "access_token": access_token,
@@ -352,46 +355,39 @@ async def google_callback(code: str, db: Session = Depends(get_db)):
     }
 
 @router.post("/verify-email")
-async def verify_email(token: str, db: Session = Depends(get_db)):
+async def verify_email(token: str, db: AsyncSession = Depends(get_async_db)):
     """Verify email with token"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     try:
-        cursor.execute("""
+        user_row = (await db.execute(text("""
             SELECT id, email FROM users 
-            WHERE email_verification_token = %s 
+            WHERE email_verification_token = :token 
             AND email_verification_expires > NOW()
-        """, (token,))
-        
-        user_row = cursor.fetchone()
+        """), {"token": token})).first()
         
         if not user_row:
             raise HTTPException(status_code=400, detail="Invalid or expired verification token")
         
-        cursor.execute("""
+        await db.execute(text("""
             UPDATE users SET 
                 email_verified = TRUE, 
                 email_verification_token = NULL, 
                 email_verification_expires = NULL
-            WHERE id = %s
-        """, (user_row[0],))
+            WHERE id = :user_id
+        """), {"user_id": user_row[0]})
         
-        conn.commit()
+        await db.commit()
+        principal_cache.invalidate(user_row[0])  # Raw SQL: not seen by the flush hook
         
         return {"message": "Email verified successfully", "email": user_row[1]}
     except HTTPException:
         raise
     except Exception as e:
-        conn.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        conn.close()
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_me(request: Request, db: Session = Depends(get_db)):
+async def get_me(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Get current user info from JWT token"""
     auth_header = request.headers.get("Authorization")
     if not auth_header or not auth_header.startswith("Bearer "):
@@ -404,7 +400,7 @@ async def get_me(request: Request, db: Session = Depends(get_db)):
         raise HTTPException(status_code=401, detail="Invalid token")
     
     user_id = payload.get("sub")
-    user = db.query(User).filter(User.id == user_id).first()
+    user = (await db.execute(select(User).where(User.id == user_id))).scalars().first()
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -428,7 +424,7 @@ async def get_me(request: Request, db: Session = Depends(get_db)):
     }
 
 @router.put("/settings")
-async def update_settings(request: Request, db: Session = Depends(get_db)):
+async def update_settings(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Update user protection settings"""
     try:
         body = await request.json()
@@ -438,8 +434,7 @@ async def update_settings(request: Request, db: Session = Depends(get_db)):
         logger.error("update_settings_validation_error", error=str(e), body=await request.json())
         raise HTTPException(status_code=422, detail=f"Validation error: {str(e)}")
     
-    from services.auth.dependencies import get_current_user
-    user = await get_current_user(request, db)
+    user = await get_current_user_async(request, db)
     
     if data.protection_level is not None:
         user.protection_level = data.protection_level
@@ -459,13 +454,20 @@ async def update_settings(request: Request, db: Session = Depends(get_db)):
         user.risk_per_trade_pct = data.risk_per_trade_pct
     if data.xp is not None:
         user.xp = data.xp
+    previous_level = user.level
     if data.level is not None:
         user.level = data.level
     if data.archetype is not None:
         user.archetype = data.archetype
         
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+
+    if data.level is not None and data.level != previous_level:
+        from services.user_events import user_events
+        user_events.publish(user.id, "achievement", {
+            "kind": "level_up", "level": user.level, "previous_level": previous_level, "xp": user.xp,
+        })
     
     return {"message": "Settings updated successfully", "settings": {
         "protection_level": user.protection_level,
@@ -481,37 +483,28 @@ async def update_settings(request: Request, db: Session = Depends(get_db)):
     }}
 
 @router.post("/refresh")
-async def refresh_token(refresh_token: str):
+async def refresh_token(refresh_token: str, db: AsyncSession = Depends(get_async_db)):
     """Refresh access token"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    row = (await db.execute(text("""
+        SELECT s.user_id, u.email FROM sessions s
+        JOIN users u ON s.user_id = u.id
+        WHERE s.refresh_token = :refresh_token AND s.expires_at > NOW()
+    """), {"refresh_token": refresh_token})).first()
     
-    try:
-        cursor.execute("""
-            SELECT s.user_id, u.email FROM sessions s
-            JOIN users u ON s.user_id = u.id
-            WHERE s.refresh_token = %s AND s.expires_at > NOW()
-        """, (refresh_token,))
-        
-        row = cursor.fetchone()
-        
-        if not row:
-            raise HTTPException(status_code=401, detail="Invalid refresh token")
-        
-        user_id = str(row[0])
-        email = row[1]
-        
-        # Create new access token
-        new_access_token = create_access_token(user_id, email)
-        
-        return {"access_token": new_access_token, "token_type": "bearer"}
-    finally:
-        cursor.close()
-        conn.close()
+    if not row:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    
+    user_id = str(row[0])
+    email = row[1]
+    
+    # Create new access token
+    new_access_token = create_access_token(user_id, email)
+    
+    return {"access_token": new_access_token, "token_type": "bearer"}
 
 
 @router.post("/logout")
-async def logout(request: Request):
+async def logout(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Logout and invalidate refresh token."""
     auth_header = request.headers.get("Authorization")
     
@@ -522,22 +515,18 @@ async def logout(request: Request):
     payload = verify_token(token)
     
     if payload:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        try:
-            cursor.execute("DELETE FROM sessions WHERE user_id = %s", (payload["sub"],))
-            conn.commit()
-        finally:
-            cursor.close()
-            conn.close()
+        await db.execute(delete(UserSession).where(UserSession.user_id == payload["sub"]))
+        await db.commit()
     
     return {"message": "Logged out successfully"}
 @router.get("/export-data")
-async def export_data(user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def export_data(user: User = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
     """Export all user data (GDPR Compliance)"""
     # Fetch all data
-    trades = db.query(Trade).filter(Trade.user_id == user.id).all()
-    checkins = db.query(Checkin).filter(Checkin.user_id == user.id).all()
+    trades = (await db.execute(select(Trade).where(Trade.user_id == user.id))).scalars().all()
+    checkins = (await db.execute(select(Checkin).where(Checkin.user_id == user.id))).scalars().all()
+    # Decrypt every trade's notes in one batch off the event loop
+    await asyncio.to_thread(prefetch_decrypted, trades, "notes")
     
     export_payload = {
         "user_profile": {
@@ -559,7 +548,8 @@ async def export_data(user: User = Depends(get_current_user), db: Session = Depe
                 "exit_price": float(t.exit_price) if t.exit_price else 0,
                 "pnl": float(t.pnl) if t.pnl else 0,
                 "status": t.status,
-                "entry_time": t.entry_time.isoformat() if t.entry_time else None
+                "entry_time": t.entry_time.isoformat() if t.entry_time else None,
+                "notes": t.notes
             } for t in trades
         ],
         "checkins": [
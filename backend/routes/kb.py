@@ -7,11 +7,11 @@ Admin endpoints for searching and managing KB documents.
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import Optional, List
+import uuid
 
 from models import get_db, KBDocument
-from services.auth.dependencies import get_current_user
+from services.auth.dependencies import get_current_user_id
 from services.rag_retriever import get_rag_retriever
-from models import User
 
 router = APIRouter(prefix="/api/kb", tags=["knowledge_base"])
 
@@ -22,7 +22,7 @@ async def search_kb(
     context: str = Query("all", description="Context: pre_trade, post_trade, crisis, daily_checkin, all"),
     category: Optional[str] = Query(None, description="Filter by category"),
     limit: int = Query(5, ge=1, le=20),
-    user: User = Depends(get_current_user),
+    user_id: uuid.UUID = Depends(get_current_user_id),
     db: Session = Depends(get_db)
 ):
     """
@@ -53,7 +53,7 @@ async def list_documents(
     category: Optional[str] = Query(None),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    user: User = Depends(get_current_user),
+    user_id: uuid.UUID = Depends(get_current_user_id),
     db: Session = Depends(get_db)
 ):
     """List all KB documents with optional category filter."""
@@ -76,7 +76,7 @@ async def list_documents(
 @router.get("/documents/{doc_id}")
 async def get_document(
     doc_id: str,
-    user: User = Depends(get_current_user),
+    user_id: uuid.UUID = Depends(get_current_user_id),
     db: Session = Depends(get_db)
 ):
     """Get a specific KB document by ID."""
@@ -90,7 +90,7 @@ async def get_document(
 
 @router.get("/categories")
 async def list_categories(
-    user: User = Depends(get_current_user),
+    user_id: uuid.UUID = Depends(get_current_user_id),
     db: Session = Depends(get_db)
 ):
     """List all unique categories with document counts."""
@@ -113,7 +113,7 @@ async def list_categories(
 async def get_context_documents(
     context_name: str,
     limit: int = Query(10, ge=1, le=50),
-    user: User = Depends(get_current_user),
+    user_id: uuid.UUID = Depends(get_current_user_id),
     db: Session = Depends(get_db)
 ):
     """Get documents for a specific context (pre_trade, post_trade, crisis, etc.)."""
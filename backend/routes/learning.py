@@ -4,10 +4,16 @@ from pydantic import BaseModel
 from typing import Optional, List, Dict
 from datetime import datetime
 import json
+import uuid
 
-from models import get_db, User, get_db_connection
-from services.auth.dependencies import get_current_user
-from services.ai.gemini_client import gemini_client
+from psycopg import AsyncConnection
+
+from models import get_db
+from services.auth.dependencies import get_current_user_id
+from services.db_pool import db_pool, get_pool_connection
+from services.ai.gemini_client import gemini_client, REPORT_HISTORY_LIMIT
+from services.ai.result_cache import result_cache
+from services.ai.nightly_batch import learning_insight_inputs
 
 router = APIRouter(prefix="/api/learning", tags=["Learning Engine"])
 
@@ -56,10 +62,9 @@ class LearningInsight(BaseModel):
 # ============================================
 
 @router.post("/correlations/record")
-async def record_correlation(data: TradeOutcomeCorrelation, user: User = Depends(get_current_user)):
+async def record_correlation(data: TradeOutcomeCorrelation, user_id: uuid.UUID = Depends(get_current_user_id), conn: AsyncConnection = Depends(get_pool_connection)):
     """Record a trade outcome correlation for learning"""
     try:
-        conn = get_db_connection()
         cursor = conn.cursor()
         
         # Determine bucket (e.g. 75 -> 70 bucket)
@@ -67,7 +72,7 @@ async def record_correlation(data: TradeOutcomeCorrelation, user: User = Depends
         pattern = data.pattern_type or 'NONE'
         
         # Simple INSERT - if fails due to duplicate, just ignore
-        cursor.execute("""
+        await cursor.execute("""
             INSERT INTO trade_outcome_correlations 
                 (process_score_bucket, profitability, emotion_at_entry, pattern_type, trade_count, total_pnl, avg_pnl)
             VALUES (%s, %s, %s, %s, 1, %s, %s)
@@ -75,7 +80,7 @@ async def record_correlation(data: TradeOutcomeCorrelation, user: User = Depends
         """, (bucket, data.profitability, data.emotion_at_entry, pattern, data.pnl, data.pnl))
         
         # If insert succeeded or not, also try to update existing record
-        cursor.execute("""
+        await cursor.execute("""
             UPDATE trade_outcome_correlations 
             SET trade_count = trade_count + 1,
                 total_pnl = total_pnl + %s,
@@ -87,34 +92,32 @@ async def record_correlation(data: TradeOutcomeCorrelation, user: User = Depends
               AND pattern_type = %s
         """, (data.pnl, data.pnl, bucket, data.profitability, data.emotion_at_entry, pattern))
         
-        conn.commit()
-        cursor.close()
-        conn.close()
+        await conn.commit()
+        await cursor.close()
         return {"status": "recorded"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/archetype")
-async def get_archetype(data: Dict, user: User = Depends(get_current_user)):
+async def get_archetype(data: Dict, user_id: uuid.UUID = Depends(get_current_user_id)):
     """Analyze and discover the user's trader archetype using AI."""
-    trade_history = data.get("trade_history", [])
+    trade_history = data.get("trade_history", [])[:REPORT_HISTORY_LIMIT]
     checkin_history = data.get("checkin_history", [])
     
     analysis = await gemini_client.analyze_trader_archetype(trade_history, checkin_history)
     return analysis
 
 @router.post("/shadow-patterns/record")
-async def record_shadow_pattern(data: ShadowScorePattern, user: User = Depends(get_current_user)):
+async def record_shadow_pattern(data: ShadowScorePattern, user_id: uuid.UUID = Depends(get_current_user_id), conn: AsyncConnection = Depends(get_pool_connection)):
     """Record a shadow score pattern for learning"""
     try:
-        conn = get_db_connection()
         cursor = conn.cursor()
         
         # Convert outcome to numeric value
         outcome_value = 1.0 if data.outcome == 'WIN' else (-1.0 if data.outcome == 'LOSS' else 0.0)
         
         # Try insert first
-        cursor.execute("""
+        await cursor.execute("""
             INSERT INTO shadow_score_patterns 
                 (trust_level, average_honesty_score, outcome_correlation, sample_size)
             VALUES (%s, %s, %s, 1)
@@ -126,44 +129,40 @@ async def record_shadow_pattern(data: ShadowScorePattern, user: User = Depends(g
                 updated_at = NOW()
         """, (data.trust_level, data.honesty_score, outcome_value))
         
-        conn.commit()
-        cursor.close()
-        conn.close()
+        await conn.commit()
+        await cursor.close()
         return {"status": "recorded"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/crisis-recovery/record")
-async def record_crisis_recovery(data: CrisisRecoveryData, user: User = Depends(get_current_user)):
+async def record_crisis_recovery(data: CrisisRecoveryData, user_id: uuid.UUID = Depends(get_current_user_id), conn: AsyncConnection = Depends(get_pool_connection)):
     """Record a crisis recovery event for learning"""
     try:
-        conn = get_db_connection()
         cursor = conn.cursor()
         
-        cursor.execute("""
+        await cursor.execute("""
             INSERT INTO crisis_recovery_data 
                 (user_id, action_taken, recovery_time_hours, was_successful, crisis_triggered_at)
             VALUES (%s, %s, %s, %s, NOW())
-        """, (user.id, data.action_taken, data.recovery_time_hours, data.was_successful))
+        """, (user_id, data.action_taken, data.recovery_time_hours, data.was_successful))
         
-        conn.commit()
-        cursor.close()
-        conn.close()
+        await conn.commit()
+        await cursor.close()
         return {"status": "recorded"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/crowd-metrics/snapshot")
-async def record_crowd_snapshot(data: CrowdMetricsSnapshot):
+async def record_crowd_snapshot(data: CrowdMetricsSnapshot, conn: AsyncConnection = Depends(get_pool_connection)):
     """Record a snapshot of community metrics"""
     try:
-        conn = get_db_connection()
         cursor = conn.cursor()
         
         percent_crisis = (data.users_in_crisis_mode / data.total_active_users * 100) if data.total_active_users > 0 else 0
         
-        cursor.execute("""
+        await cursor.execute("""
             INSERT INTO crowd_metrics 
                 (total_active_users, users_in_crisis_mode, percent_in_crisis, 
                  average_shadow_score, average_discipline_score, average_process_score,
@@ -183,9 +182,8 @@ async def record_crowd_snapshot(data: CrowdMetricsSnapshot):
             data.market_sentiment
         ))
         
-        conn.commit()
-        cursor.close()
-        conn.close()
+        await conn.commit()
+        await cursor.close()
         
         return {"status": "recorded"}
     except Exception as e:
@@ -193,13 +191,12 @@ async def record_crowd_snapshot(data: CrowdMetricsSnapshot):
 
 
 @router.get("/correlations")
-async def get_correlations():
+async def get_correlations(conn: AsyncConnection = Depends(get_pool_connection)):
     """Get all trade outcome correlations"""
     try:
-        conn = get_db_connection()
         cursor = conn.cursor()
         
-        cursor.execute("""
+        await cursor.execute("""
             SELECT process_score_bucket, profitability, emotion_at_entry, pattern_type, 
                    trade_count, avg_pnl
             FROM trade_outcome_correlations
@@ -207,9 +204,8 @@ async def get_correlations():
             LIMIT 50
         """)
         
-        rows = cursor.fetchall()
-        cursor.close()
-        conn.close()
+        rows = await cursor.fetchall()
+        await cursor.close()
         
         return [
             {
@@ -227,23 +223,20 @@ async def get_correlations():
 
 
 @router.get("/insights")
-async def get_active_insights(user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_active_insights(user_id: uuid.UUID = Depends(get_current_user_id), db: Session = Depends(get_db)):
     """Get all active learning insights. If none exist, try to generate some dynamically."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT id, insight_type, confidence, description, is_actionable, recommendation
-            FROM learning_insights
-            WHERE is_active = TRUE
-            ORDER BY confidence DESC, created_at DESC
-            LIMIT 10
-        """)
-        
-        rows = cursor.fetchall()
-        cursor.close()
-        conn.close()
+        # Not a request-scoped dependency: the connection goes back to the
+        # pool before the (slow) Gemini fallback below
+        async with db_pool.async_connection() as conn:
+            cursor = await conn.execute("""
+                SELECT id, insight_type, confidence, description, is_actionable, recommendation
+                FROM learning_insights
+                WHERE is_active = TRUE
+                ORDER BY confidence DESC, created_at DESC
+                LIMIT 10
+            """)
+            rows = await cursor.fetchall()
         
         if rows:
             return [
@@ -261,73 +254,30 @@ async def get_active_insights(user: User = Depends(get_current_user), db: Sessio
         # If no insights in DB, generate some dynamically using Gemini
         # Fetch user's recent data for context
         from models import Trade, Checkin
-        recent_trades = db.query(Trade).filter(Trade.user_id == user.id).order_by(Trade.entry_time.desc()).limit(15).all()
-        recent_checkins = db.query(Checkin).filter(Checkin.user_id == user.id).order_by(Checkin.created_at.desc()).limit(5).all()
+        recent_trades = db.query(Trade).filter(Trade.user_id == user_id).order_by(Trade.entry_time.desc()).limit(15).all()
+        recent_checkins = db.query(Checkin).filter(Checkin.user_id == user_id).order_by(Checkin.created_at.desc()).limit(5).all()
         
         if len(recent_trades) < 3:
             return [] # Still too little data for even dynamic analysis
             
-        # Prepare context for Gemini
-        trade_data = [
-            {
-                "symbol": t.symbol,
-                "side": t.side,
-                "pnl": float(t.pnl) if t.pnl else 0,
-                "score": t.process_score,
-                "eval": t.user_process_evaluation
-            }
-            for t in recent_trades
-        ]
-        
-        checkin_data = [
-            {"emotional_state": c.emotional_state, "insights": c.insights}
-            for c in recent_checkins
-        ]
-        
-        # Call Gemini to discover patterns
-        prompt = f"""
-        Bạn là Hệ thống Tự Học (Self-Learning Engine) của THEKEY AI. 
-        Dựa trên 15 lệnh gần nhất và 5 lần check-in của trader này, hãy tìm ra 2-3 'Insight' (Sự thấu thị) sâu sắc về hành vi và kết quả của họ.
-        
-        DỮ LIỆU:
-        - Trades: {json.dumps(trade_data, ensure_ascii=False)}
-        - Check-ins: {json.dumps(checkin_data, ensure_ascii=False)}
-        
-        YÊU CẦU:
-        Trả về JSON list các đối tượng:
-        {{
-          "id": "chuỗi ngẫu nhiên",
-          "insight_type": "CORRELATION" | "PATTERN" | "ANOMALY" | "TREND",
-          "confidence": 0.0-1.0,
-          "description": "Mô tả ngắn gọn, sắc bén bằng tiếng Việt",
-          "is_actionable": true,
-          "recommendation": "Lời khuyên hành động cụ thể"
-        }}
-        
-        Tập trung vào mối liên hệ giữa tâm lý (check-in) và kết quả (PnL/Score).
-        """
-        
-        try:
-            dynamic_insights = await gemini_client.generate_json_response(prompt, system_prompt="Bạn là chuyên gia phân tích dữ liệu trading.")
-            if isinstance(dynamic_insights, list):
-                return dynamic_insights
-        except Exception as ai_err:
-            print(f"[Learning] Dynamic insight generation failed: {ai_err}")
-            
-        return []
+        # Same inputs as the nightly batch, so its precomputed result is a cache hit
+        trade_data, checkin_data = learning_insight_inputs(recent_trades, recent_checkins)
+        return await result_cache.get_or_compute(
+            user_id, "learning_insights", (trade_data, checkin_data),
+            lambda: gemini_client.generate_learning_insights(trade_data, checkin_data),
+        )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/insights")
-async def save_insight(data: LearningInsight):
+async def save_insight(data: LearningInsight, conn: AsyncConnection = Depends(get_pool_connection)):
     """Save a new learning insight"""
     try:
-        conn = get_db_connection()
         cursor = conn.cursor()
         
-        cursor.execute("""
+        await cursor.execute("""
             INSERT INTO learning_insights 
                 (insight_type, confidence, description, is_actionable, recommendation, sample_size)
             VALUES (%s, %s, %s, %s, %s, %s)
@@ -341,10 +291,9 @@ async def save_insight(data: LearningInsight):
             data.sample_size
         ))
         
-        result = cursor.fetchone()
-        conn.commit()
-        cursor.close()
-        conn.close()
+        result = await cursor.fetchone()
+        await conn.commit()
+        await cursor.close()
         
         return {"id": str(result[0]), "status": "created"}
     except Exception as e:
@@ -352,38 +301,36 @@ async def save_insight(data: LearningInsight):
 
 
 @router.get("/stats")
-async def get_learning_stats():
+async def get_learning_stats(conn: AsyncConnection = Depends(get_pool_connection)):
     """Get overall learning engine statistics"""
     try:
-        conn = get_db_connection()
         cursor = conn.cursor()
         
         stats = {}
         
         # Get correlation count
-        cursor.execute("SELECT COUNT(*), SUM(trade_count) FROM trade_outcome_correlations")
-        row = cursor.fetchone()
+        await cursor.execute("SELECT COUNT(*), SUM(trade_count) FROM trade_outcome_correlations")
+        row = await cursor.fetchone()
         stats["correlation_buckets"] = row[0]
         stats["total_trades_learned"] = row[1] or 0
         
         # Get shadow pattern count
-        cursor.execute("SELECT COUNT(*), SUM(sample_size) FROM shadow_score_patterns")
-        row = cursor.fetchone()
+        await cursor.execute("SELECT COUNT(*), SUM(sample_size) FROM shadow_score_patterns")
+        row = await cursor.fetchone()
         stats["shadow_patterns"] = row[0]
         stats["shadow_samples"] = row[1] or 0
         
         # Get crisis recovery count
-        cursor.execute("SELECT COUNT(*), AVG(recovery_time_hours) FROM crisis_recovery_data WHERE was_successful = TRUE")
-        row = cursor.fetchone()
+        await cursor.execute("SELECT COUNT(*), AVG(recovery_time_hours) FROM crisis_recovery_data WHERE was_successful = TRUE")
+        row = await cursor.fetchone()
         stats["successful_recoveries"] = row[0]
         stats["avg_recovery_hours"] = float(row[1]) if row[1] else 0
         
         # Get active insights count
-        cursor.execute("SELECT COUNT(*) FROM learning_insights WHERE is_active = TRUE")
-        stats["active_insights"] = cursor.fetchone()[0]
+        await cursor.execute("SELECT COUNT(*) FROM learning_insights WHERE is_active = TRUE")
+        stats["active_insights"] = (await cursor.fetchone())[0]
         
-        cursor.close()
-        conn.close()
+        await cursor.close()
         
         return stats
     except Exception as e:
@@ -17,11 +17,45 @@ async def get_metrics() -> Dict[str, Any]:
     """Get current system metrics."""
     from services.observability import metrics, ai_metrics
     from services.ai import ai_orchestrator
+    from services.ai.market_snapshot import market_snapshot
+    from services.reflection.checkin_pool import checkin_pool
+    from services.protection.trade_classifier import trade_classifier
+    from services.ai.call_log_writer import call_log_writer
+    from services.ai.cost_ledger import cost_ledger
+    from services.reflection.chat_coalescer import chat_coalescer
+    from services.reflection.conversation_store import conversation_store
+    from services.ai.scheduler import ai_scheduler
+    from services.ai.result_cache import result_cache
+    from services.ai.insight_cards import insight_cards
+    from services.job_broadcaster import job_broadcaster
+    from services.job_store import job_store
+    from services.work_queue import work_queue
+    from services.user_events import user_events
+    from services.db_pool import db_pool
+    from services.auth.principal_cache import principal_cache
+    from utils.encryption import decryption_metrics
     
     return {
         "system": metrics.get_snapshot(),
         "ai_orchestrator": ai_orchestrator.get_metrics(),
         "cache_stats": ai_orchestrator.cache.get_stats(),
+        "market_snapshot": market_snapshot.get_stats(),
+        "checkin_pool": checkin_pool.get_stats(),
+        "trade_classifier": trade_classifier.get_stats(),
+        "ai_call_log": call_log_writer.get_stats(),
+        "ai_cost_ledger": cost_ledger.get_stats(),
+        "chat_coalescer": chat_coalescer.get_stats(),
+        "conversation_store": conversation_store.get_stats(),
+        "ai_scheduler": ai_scheduler.get_stats(),
+        "ai_result_cache": result_cache.get_stats(),
+        "insight_cards": insight_cards.get_stats(),
+        "job_broadcaster": job_broadcaster.get_stats(),
+        "job_store": job_store.get_stats(),
+        "work_queue": work_queue.get_stats(),
+        "user_events": user_events.get_stats(),
+        "db_pool": db_pool.get_stats(),
+        "auth_principal_cache": principal_cache.get_stats(),
+        "decryption": decryption_metrics.get_stats(),
         "circuit_breaker": {
             "state": ai_orchestrator.circuit_breaker.state.value,
             "failure_count": ai_orchestrator.circuit_breaker.failure_count,
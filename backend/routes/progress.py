@@ -1,104 +1,60 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from models import get_db, Trade, User, Checkin
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import get_async_db, User, UserStats
 import uuid
-from services.ai.gemini_client import gemini_client
+from services.ai.gemini_client import gemini_client, REPORT_HISTORY_LIMIT
 from services.ai.ai_tracking import AITracker
-from services.auth.dependencies import get_current_user
+from services.ai.result_cache import result_cache
+from services.auth.dependencies import get_current_user_async
+from services.user_stats import compute_stats, progress_summary, stats_dict
 from typing import Dict
-from datetime import datetime, timedelta, timezone
 
 router = APIRouter(prefix="/api/progress", tags=["progress"])
 
 @router.get("/summary")
-async def get_progress_summary(user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_progress_summary(user: User = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
     """Get dynamic survival score and trade statistics."""
-    # 1. Trade Discipline Score (Base: 50)
-    # Penalize for taking trades with ai_decision == "BLOCK"
-    total_trades = db.query(Trade).filter(Trade.user_id == user.id).count()
-    blocked_trades_taken = db.query(Trade).filter(
-        Trade.user_id == user.id, 
-        Trade.ai_decision == "BLOCK"
-    ).count()
-    
-    discipline_score = max(0, 100 - (blocked_trades_taken * 15)) if total_trades > 0 else 100
-    
-    # 2. Consistency Score (Check-ins in last 7 days)
-    checkin_count = db.query(Checkin).filter(
-        Checkin.user_id == user.id,
-        Checkin.created_at >= datetime.utcnow() - timedelta(days=7)
-    ).count()
-    consistency_score = (checkin_count / 7) * 100
-    
-    # 3. Behavioral Integrity (Shadow Score) with Trust Decay
-    shadow_data = user.shadow_score if isinstance(user.shadow_score, dict) else {}
-    trust_score = shadow_data.get("trust_score", 100)
-    
-    # Trust Decay: Penalize for missed check-ins
-    last_checkin = db.query(Checkin).filter(Checkin.user_id == user.id).order_by(Checkin.created_at.desc()).first()
-    if last_checkin and last_checkin.created_at:
-        # Standardize to aware UTC for subtraction
-        now_utc = datetime.now(timezone.utc)
-        checkin_time = last_checkin.created_at
-        if checkin_time.tzinfo is None:
-            checkin_time = checkin_time.replace(tzinfo=timezone.utc)
-        
-        days_since_checkin = (now_utc - checkin_time).days
-        if days_since_checkin > 1:
-            decay_penalty = min(30, (days_since_checkin - 1) * 5) # 5 points per missed day after the first
-            trust_score = max(20, trust_score - decay_penalty)
-            # Update user.shadow_score object
-            shadow_data["trust_score"] = trust_score
-            user.shadow_score = shadow_data
-    
-    # 4. Overall Survival Score (Weighted average with Shadow Score Influence)
-    base_score = (discipline_score * 0.55) + (consistency_score * 0.25) + (trust_score * 0.20)
-    
-    # Dampening factor: If trust is low, it heavily penalizes the final result
-    trust_factor = 0.5 + (trust_score / 200) 
-    survival_score = int(base_score * trust_factor)
-    
-    # Update user's survival score in DB
-    user.survival_score = survival_score
-    db.commit()
-    
-    winning_trades = db.query(Trade).filter(Trade.user_id == user.id, Trade.pnl > 0).count()
-    win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0
-    
-    return {
-        "survival_score": survival_score,
-        "total_trades": total_trades,
-        "win_rate": round(win_rate, 2),
-        "status": "SURVIVAL" if survival_score < 40 else ("DISCIPLINE" if survival_score < 80 else "MASTER"),
-        "discipline_score": discipline_score,
-        "consistency_score": int(consistency_score),
-        "trust_score": trust_score
-    }
+    # One primary-key read: counters are maintained on write (services/user_stats.py)
+    stats = await db.get(UserStats, user.id)
+    if stats is None:
+        # Not reconciled yet (table created by create_all): count once, read-only
+        stats = (await db.run_sync(compute_stats, [user.id]))[str(user.id)]
+    else:
+        stats = stats_dict(stats)
+    return progress_summary(stats, user.shadow_score)
 
 @router.post("/weekly-goals")
-async def get_weekly_goals(data: Dict, user: User = Depends(get_current_user)):
-    history = data.get("history", [])
+async def get_weekly_goals(data: Dict, user: User = Depends(get_current_user_async)):
+    history = data.get("history", [])[:REPORT_HISTORY_LIMIT]
     stats = data.get("stats", {})
     checkin_history = data.get("checkinHistory", [])
-    result = await gemini_client.generate_weekly_goals(history, stats, checkin_history)
-    return result
+    return await result_cache.get_or_compute(
+        user.id, "weekly_goals", (history, stats, checkin_history),
+        lambda: gemini_client.generate_weekly_goals(history, stats, checkin_history),
+        fan_out=gemini_client.report_fan_out, accept_snapshot=True,
+    )
 
 @router.post("/weekly-report")
-async def get_weekly_report(data: Dict, user: User = Depends(get_current_user)):
-    history = data.get("history", [])
-    result = await gemini_client.generate_weekly_report(history)
-    return result
+async def get_weekly_report(data: Dict, user: User = Depends(get_current_user_async)):
+    history = data.get("history", [])[:REPORT_HISTORY_LIMIT]
+    return await result_cache.get_or_compute(
+        user.id, "weekly_report", (history,),
+        lambda: gemini_client.generate_weekly_report(history),
+        fan_out=gemini_client.report_fan_out, accept_snapshot=True,
+    )
 
 @router.post("/archetype")
-async def get_archetype(data: Dict, user: User = Depends(get_current_user)):
-    history = data.get("history", [])
+async def get_archetype(data: Dict, user: User = Depends(get_current_user_async)):
+    history = data.get("history", [])[:REPORT_HISTORY_LIMIT]
     checkin_history = data.get("checkinHistory", [])
-    result = await gemini_client.analyze_trader_archetype(history, checkin_history)
-    return result
+    return await result_cache.get_or_compute(
+        user.id, "archetype", (history, checkin_history),
+        lambda: gemini_client.analyze_trader_archetype(history, checkin_history),
+        fan_out=gemini_client.report_fan_out, accept_snapshot=True,
+    )
 
 @router.get("/ai-accuracy")
-async def get_ai_accuracy(user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_ai_accuracy(user: User = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
     """
     Get AI decision accuracy statistics.
     
@@ -108,6 +64,5 @@ async def get_ai_accuracy(user: User = Depends(get_current_user), db: Session =
         - override_analysis: Stats on user overrides
         - insights: List of auto-generated insight messages
     """
-    tracker = AITracker(db)
-    stats = tracker.get_accuracy_stats(user.id)
+    stats = await db.run_sync(lambda session: AITracker(session).get_accuracy_stats(user.id))
     return stats
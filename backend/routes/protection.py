@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
 from pydantic import BaseModel
 from typing import Optional, Dict
 from datetime import datetime, timezone, timedelta
@@ -8,11 +8,19 @@ from services.rule_engine import rule_engine, EngineResult
 from services.protection.revenge_blocker import RevengeTradePrevention
 from services.protection.size_guardian import PositionSizeGuardian
 from services.protection.fast_check import FastTradeCheck
-from services.ai.gemini_client import gemini_client
+from services.protection.trade_classifier import trade_classifier, extract_features
+from services.ai.gemini_client import gemini_client, get_market_fallback
+from services.ai.market_snapshot import market_snapshot
+from services.ai.cost_ledger import cost_ledger
+from services.ai.scheduler import ai_priority, INTERACTIVE
 from services.ai.ai_tracking import AITracker
-from services.auth.dependencies import get_current_user
-from models import get_db, User, Trade
+from services.ai.insight_cards import insight_cards
+from services.user_events import user_events
+from services.auth.dependencies import get_current_user_async
+from models import get_async_db, User, Trade
 import time
+import asyncio
+import uuid
 
 router = APIRouter(prefix="/api/protection", tags=["protection"])
 
@@ -23,8 +31,21 @@ class TradeIntent(BaseModel):
     entry_price: float
     account_balance: float
 
+def _announce_cooldown(user_id, engine_result: EngineResult):
+    """Push cooldown start (once) and expiry to the user's /api/stream/me channel."""
+    if engine_result.cooldown <= 0:
+        return
+    expired = {"status": "expired", "reason": engine_result.reason}
+    if user_events.schedule(user_id, "cooldown", expired, delay_seconds=engine_result.cooldown):
+        user_events.publish(user_id, "cooldown", {
+            "status": "active",
+            "reason": engine_result.reason,
+            "cooldown_seconds": engine_result.cooldown,
+            "triggered_rules": engine_result.triggered_rules,
+        })
+
 @router.post("/check-trade")
-async def check_trade(data: Dict, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def check_trade(data: Dict, user: User = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
     """
     Check if a proposed trade violates any protection rules.
     
@@ -70,19 +91,19 @@ async def check_trade(data: Dict, user: User = Depends(get_current_user), db: Se
     
     rule_latency = (time.time() - start_time) * 1000
     print(f"[Protection] Rule Engine completed in {rule_latency:.0f}ms - Decision: {engine_result.decision}")
+    _announce_cooldown(user.id, engine_result)
     
     # If Rule Engine gives a clear decision (not GRAY_ZONE), return immediately
     if engine_result.decision in ["BLOCK", "WARN", "ALLOW"] and not engine_result.needs_ai:
         # Track for AI accuracy dashboard (rule-based decision)
-        tracker = AITracker(db)
-        tracker.log_decision(
+        await db.run_sync(lambda session: AITracker(session).log_decision(
             user_id=user.id,
             decision=engine_result.decision if engine_result.decision != "ALLOW" else "ALLOW",
             reason=engine_result.reason,
             rule="RULE_ENGINE",
             trade_intent=trade,
             confidence=1.0  # Deterministic rules have high confidence
-        )
+        ))
         
         return {
             "decision": engine_result.decision,
@@ -94,11 +115,49 @@ async def check_trade(data: Dict, user: User = Depends(get_current_user), db: Se
             "triggered_rules": engine_result.triggered_rules
         }
 
+    market_danger = market_analysis.get("danger_level") if market_analysis else "Unknown"
+    features = extract_features(
+        trade=trade,
+        stats=stats,
+        trade_history=trade_history,
+        user_settings=user_settings,
+        triggered_rules=engine_result.triggered_rules,
+        market_danger=market_danger,
+        active_pattern=active_pattern,
+    )
+
     # =============================================
-    # PHASE 2: AI Evaluation (Conditional on Budget)
+    # PHASE 2: Local Classifier (distilled from past AI decisions)
+    # =============================================
+    local = trade_classifier.decide(features)
+    if local:
+        decision, confidence = local
+        await db.run_sync(lambda session: AITracker(session).log_decision(
+            user_id=user.id,
+            decision=decision,
+            reason=engine_result.reason,
+            rule="LOCAL_MODEL",
+            trade_intent={**trade, "_features": features},
+            confidence=round(confidence, 3)
+        ))
+        return {
+            "decision": decision,
+            "reason": engine_result.reason,
+            "cooldown": engine_result.cooldown,
+            "recommended_size": engine_result.recommended_size,
+            "rule": "LOCAL_MODEL",
+            "confidence": confidence,
+            "latency_ms": (time.time() - start_time) * 1000,
+            "triggered_rules": engine_result.triggered_rules
+        }
+
+    # =============================================
+    # PHASE 3: AI Evaluation (Conditional on Budget)
     # =============================================
     
     # 1. Check AI Budget and Reset if new day
+    # (the user may come from the principal cache: re-read the counters it increments)
+    await db.refresh(user, ["daily_ai_calls", "last_ai_reset"])
     now = datetime.now(timezone.utc)
     user_reset = user.last_ai_reset
     if user_reset.tzinfo is None:
@@ -107,14 +166,17 @@ async def check_trade(data: Dict, user: User = Depends(get_current_user), db: Se
     if (now - user_reset).days >= 1:
         user.daily_ai_calls = 0
         user.last_ai_reset = now
-        db.commit()
+        await db.commit()
     
     # 2. Strict Rate Limiting / Budget Fallback
     # Free tier users get max 20 AI evaluations per day
     MAX_DAILY_AI = 20 if not user.is_pro else 100
     
-    if user.daily_ai_calls >= MAX_DAILY_AI:
-        print(f"[Protection] AI Budget EXCEEDED ({user.daily_ai_calls}/{MAX_DAILY_AI}). Forcing Rule Engine fallback.")
+    # Monthly cost budget (monthly_ai_budget_usd) on top of the daily call count
+    over_cost_budget = not await cost_ledger.has_headroom(user.id)
+    
+    if user.daily_ai_calls >= MAX_DAILY_AI or over_cost_budget:
+        print(f"[Protection] AI Budget EXCEEDED ({user.daily_ai_calls}/{MAX_DAILY_AI}, cost_over={over_cost_budget}). Forcing Rule Engine fallback.")
         return {
             "decision": engine_result.decision if engine_result.decision != "GRAY_ZONE" else "WARN",
             "reason": f"{engine_result.reason} (AI budget exceeded, using safety fallback)",
@@ -134,24 +196,25 @@ async def check_trade(data: Dict, user: User = Depends(get_current_user), db: Se
         "trade_history": trade_history,
         "settings": settings,
         "active_pattern": active_pattern,
-        "market_danger": market_analysis.get("danger_level") if market_analysis else "Unknown",
+        "market_danger": market_danger,
         "rule_engine_hints": engine_result.triggered_rules  # Help AI focus
     }
     
-    ai_feedback = await gemini_client.get_trade_evaluation(ai_context)
+    await db.commit()  # End the transaction: don't hold a pooled connection while waiting on Gemini
+    with ai_priority(INTERACTIVE):  # User is waiting to place this trade
+        ai_feedback = await gemini_client.get_trade_evaluation(ai_context)
     
     # 3. Track AI Usage and increment count
     user.daily_ai_calls += 1
-    tracker = AITracker(db)
-    tracker.log_decision(
+    await db.run_sync(lambda session: AITracker(session).log_decision(
         user_id=user.id,
         decision=ai_feedback.get("decision", "ALLOW"),
         reason=ai_feedback.get("reason", ""),
         rule="AI_EVALUATION",
-        trade_intent=trade,
+        trade_intent={**trade, "_features": features},  # Training data for the local classifier
         confidence=0.8
-    )
-    db.commit()
+    ))
+    await db.commit()
     
     total_latency = (time.time() - start_time) * 1000
     ai_feedback["latency_ms"] = total_latency
@@ -162,56 +225,60 @@ async def check_trade(data: Dict, user: User = Depends(get_current_user), db: Se
 
 
 @router.get("/market-context")
-async def get_market_context(user: User = Depends(get_current_user)):
-    """Get AI-generated market danger analysis with fallback."""
-    try:
-        analysis = await gemini_client.generate_market_analysis()
-        if analysis:
-            return analysis
-    except Exception as e:
-        print(f"[MarketContext] Gemini API failed: {e}")
-    
-    # Fallback response when AI is unavailable
-    return {
-        "danger_level": "CAUTION",
-        "danger_score": 50,
-        "color_code": "🟡",
-        "headline": "Hệ thống AI tạm thời không khả dụng. Hãy giao dịch thận trọng.",
-        "risk_factors": [
-            {
-                "factor": "AI Timeout",
-                "severity": "HIGH",
-                "description": "Không thể phân tích thị trường. Giảm khối lượng giao dịch.",
-                "impact": "HIGH"
-            }
-        ],
-        "factors": {
-            "volatility": 50,
-            "liquidity": 50,
-            "leverage": 50,
-            "sentiment": 50,
-            "events": 10
-        },
-        "recommendation": {
-            "action": "REDUCE_SIZE",
-            "position_adjustment": "Giảm 50% khối lượng giao dịch cho đến khi AI khả dụng.",
-            "stop_adjustment": "Thắt chặt stop-loss thêm 20%.",
-            "rationale": "Khi không có phân tích AI, hãy giao dịch với kỷ luật cao nhất và khối lượng nhỏ nhất."
-        }
-    }
+async def get_market_context(user: User = Depends(get_current_user_async)):
+    """
+    Get AI-generated market danger analysis.
+
+    Always served from memory: the background refresher renews the snapshot
+    before it expires, so this endpoint never waits on Gemini.
+    The response includes `staleness_seconds` (age of the snapshot).
+    """
+    snapshot = market_snapshot.get()
+    if snapshot:
+        return snapshot
+
+    # Not warmed up yet (cold start) - return fallback without blocking
+    fallback = get_market_fallback()
+    fallback["staleness_seconds"] = None
+    fallback["is_stale"] = True
+    return fallback
 
 @router.post("/analyze-trade")
-async def analyze_trade(trade_data: Dict, user: User = Depends(get_current_user)):
-    """Analyze a specific trade."""
+async def analyze_trade(trade_data: Dict, user: User = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
+    """Analyze a specific trade (insight card precomputed on close when possible)."""
+    trade_id = trade_data.get("id")
+    db_trade = None
+    try:
+        trade_uuid = uuid.UUID(str(trade_id)) if trade_id else None
+    except ValueError:
+        trade_uuid = None  # Client-side ids (not UUIDs) never match a stored trade
+    if trade_uuid:
+        db_trade = (await db.execute(
+            select(Trade).where(Trade.id == trade_uuid, Trade.user_id == user.id)
+        )).scalars().first()
+    if db_trade and db_trade.behavioral_insight_card:
+        return db_trade.behavioral_insight_card
+
+    # Still being generated in the background: wait for that instead of a second call
+    pending = insight_cards.pending(trade_id) if db_trade else None
+    if pending:
+        card = await asyncio.shield(pending)
+        if card:
+            return card
+
     user_stats = {
         "survival_days": user.survival_score, # Using survival_score as proxy
         "discipline_score": user.survival_score # Placeholder
     }
-    analysis = await gemini_client.analyze_trade(trade_data, user_stats)
+    await db.commit()  # Release the connection before the Gemini call
+    with ai_priority(INTERACTIVE):
+        analysis = await gemini_client.analyze_trade(trade_data, user_stats)
+    if db_trade:
+        await insight_cards.store(db_trade.id, analysis)
     return analysis
 
 @router.post("/emotional-tilt")
-async def emotional_tilt(data: Dict, user: User = Depends(get_current_user)):
+async def emotional_tilt(data: Dict, user: User = Depends(get_current_user_async)):
     """Detect emotional tilt and intervention message."""
     stats = data.get("stats", {})
     history = data.get("history", [])
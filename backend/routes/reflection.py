@@ -2,13 +2,19 @@ from fastapi import APIRouter, Depends, Request, HTTPException
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import Dict, Any, List
-from services.ai.gemini_client import gemini_client
-from services.auth.dependencies import get_current_user
-from models import get_db, User, Trade, Checkin
-from sqlalchemy.orm import Session
+from services.ai.gemini_client import gemini_client, FALLBACK_CHECKIN_QUESTIONS
+from services.reflection.checkin_pool import checkin_pool
+from services.reflection.chat_coalescer import chat_coalescer
+from services.reflection.conversation_store import conversation_store
+from services.ai.scheduler import ai_priority, INTERACTIVE
+from services.auth.dependencies import get_current_user_async
+from models import get_async_db, User, Trade, Checkin
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, date
 import pytz
 from utils.idempotency import get_idempotency_key, check_idempotency, save_idempotency_response
+from services.user_stats import record_checkin
 
 router = APIRouter(prefix="/api/reflection", tags=["reflection"])
 
@@ -17,23 +23,37 @@ class CheckinAnswers(BaseModel):
     answers: List[Any]
 
 @router.get("/checkin/questions")
-async def get_questions(user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Get personalized check-in questions."""
+async def get_questions(user: User = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
+    """
+    Get personalized check-in questions.
+
+    Served from the pre-generated pool for the user's cohort
+    (trade-count bucket + last emotional state); never waits on Gemini.
+    """
     try:
-        recent_trades_count = db.query(Trade).filter(Trade.user_id == user.id).count()
+        recent_trades_count = (await db.execute(
+            select(func.count(Trade.id)).where(Trade.user_id == user.id)
+        )).scalar()
+        last_state = (await db.execute(
+            select(Checkin.emotional_state).where(Checkin.user_id == user.id)
+            .order_by(Checkin.created_at.desc()).limit(1)
+        )).scalar()
     except Exception:
-        recent_trades_count = 0
-    context = {"recent_trades_count": recent_trades_count}
-    questions = await gemini_client.generate_checkin_questions(context)
+        recent_trades_count, last_state = 0, None
+
+    questions = checkin_pool.get(recent_trades_count, last_state)
+    if questions is None:
+        # Cohort still cold - the refill job prioritizes it on its next cycle
+        questions = [dict(q) for q in FALLBACK_CHECKIN_QUESTIONS]
     return {"questions": questions}
 
 @router.post("/checkin/submit")
-async def submit_checkin(request: Request, data: CheckinAnswers, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def submit_checkin(request: Request, data: CheckinAnswers, user: User = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
     """Submit answers and save to database with AI analysis."""
     # 1. Idempotency Check
     i_key = await get_idempotency_key(request)
     if i_key:
-        cached = check_idempotency(db, user.id, i_key)
+        cached = await db.run_sync(check_idempotency, user.id, i_key)
         if cached:
             return JSONResponse(content=cached[0], status_code=int(cached[1] or 200))
 
@@ -43,10 +63,9 @@ async def submit_checkin(request: Request, data: CheckinAnswers, user: User = De
     
     try:
         # Check if already checked in today - use date object for DATE column
-        existing = db.query(Checkin).filter(
-            Checkin.user_id == user.id,
-            Checkin.date == today
-        ).first()
+        existing = (await db.execute(
+            select(Checkin).where(Checkin.user_id == user.id, Checkin.date == today)
+        )).scalars().first()
         
         if existing:
             return {
@@ -58,7 +77,10 @@ async def submit_checkin(request: Request, data: CheckinAnswers, user: User = De
         
         # Get AI analysis of answers
         try:
-            trade_count = db.query(Trade).filter(Trade.user_id == user.id).count()
+            trade_count = (await db.execute(
+                select(func.count(Trade.id)).where(Trade.user_id == user.id)
+            )).scalar()
+            await db.commit()  # Don't hold a pooled connection while waiting on Gemini
             analysis = await gemini_client.analyze_checkin(data.answers, {"trade_count": trade_count})
         except Exception as ai_e:
             print(f"⚠️ AI Analysis fail: {ai_e}")
@@ -85,19 +107,25 @@ async def submit_checkin(request: Request, data: CheckinAnswers, user: User = De
         )
         
         db.add(checkin)
-        db.flush()
-        db.commit()
-        db.refresh(checkin)
+        await db.flush()
+        await db.run_sync(record_checkin, user.id)
+
+        # New check-in feeds the goals / archetype prompts
+        from services.ai.result_cache import result_cache
+        await db.run_sync(result_cache.invalidate_user, user.id)
+
+        await db.commit()
+        await db.refresh(checkin)
         
         # Verify persistence (Double Truth Check)
-        verify = db.query(Checkin).filter(Checkin.id == checkin.id).first()
+        verify = (await db.execute(select(Checkin.id).where(Checkin.id == checkin.id))).scalar()
         if not verify:
             print(f"🚨 CRITICAL: Checkin ID {checkin.id} NOT FOUND in DB immediately after commit!")
         else:
             print(f"✅ [Checkin] Persistence Verified: ID {checkin.id} found in DB.")
         
         if i_key:
-            save_idempotency_response(db, user.id, i_key, {
+            await db.run_sync(save_idempotency_response, user.id, i_key, {
                 "id": str(checkin.id),
                 "emotional_state": checkin.emotional_state,
                 "already_done": False
@@ -114,16 +142,17 @@ async def submit_checkin(request: Request, data: CheckinAnswers, user: User = De
         }
     except Exception as e:
         print(f"⚠️ [Checkin] Submit error: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database persistence error: {str(e)}")
 
 @router.get("/checkin/history")
-async def get_checkin_history(user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_checkin_history(user: User = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
     """Get last 30 days of check-in history."""
     try:
-        checkins = db.query(Checkin).filter(
-            Checkin.user_id == user.id
-        ).order_by(Checkin.created_at.desc()).limit(30).all()
+        checkins = (await db.execute(
+            select(Checkin).where(Checkin.user_id == user.id)
+            .order_by(Checkin.created_at.desc()).limit(30)
+        )).scalars().all()
         
         return {
             "checkins": [
@@ -146,16 +175,15 @@ async def get_checkin_history(user: User = Depends(get_current_user), db: Sessio
         return {"checkins": [], "total_count": 0}
 
 @router.get("/checkin/today")
-async def get_today_checkin(user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_today_checkin(user: User = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
     """Check if user has already done check-in today (timezone-aware)."""
     user_tz = pytz.timezone(user.timezone or "UTC")
     today = datetime.now(user_tz).date()
     
     try:
-        existing = db.query(Checkin).filter(
-            Checkin.user_id == user.id,
-            Checkin.date == today
-        ).first()
+        existing = (await db.execute(
+            select(Checkin).where(Checkin.user_id == user.id, Checkin.date == today)
+        )).scalars().first()
         
         if existing:
             return {"done_today": True, "checkin": {
@@ -170,16 +198,45 @@ async def get_today_checkin(user: User = Depends(get_current_user), db: Session
         return {"done_today": False, "checkin": None}
 
 @router.get("/initial-message")
-async def get_initial_message(user: User = Depends(get_current_user)):
+async def get_initial_message(user: User = Depends(get_current_user_async)):
     return {"text": f"Chào bạn! Tôi là Coach của THEKEY. Hôm nay kỷ luật của bạn thế nào?"}
 
 @router.post("/chat")
-async def chat(data: Dict[str, Any], user: User = Depends(get_current_user)):
-    """AI Coach chat endpoint."""
+async def chat(data: Dict[str, Any], user: User = Depends(get_current_user_async)):
+    """
+    AI Coach chat endpoint.
+
+    Rapid-fire messages from the same user are merged into one model call
+    (see chat_coalescer); every request in the window gets the combined answer.
+
+    History is kept server-side (recent turns + rolling summary); a `history`
+    sent by older clients is only used to seed an empty conversation.
+    """
     message = data.get("message", "")
-    history = data.get("history", [])
     mode = data.get("mode", "COACH")
-    
-    result = await gemini_client.generate_chat_response(message, history, mode)
+    await conversation_store.get(user.id, client_history=data.get("history"))
+
+    async def respond(combined_message: str, _history, chat_mode: str) -> Dict:
+        conversation = await conversation_store.get(user.id)
+        result = await gemini_client.generate_chat_response(
+            combined_message, conversation.turns, chat_mode, summary=conversation.summary
+        )
+        await conversation_store.append_exchange(user.id, combined_message, result.get("display_text", ""))
+        return result
+
+    with ai_priority(INTERACTIVE):
+        result = await chat_coalescer.submit(user.id, message, [], mode, respond)
     return result
 
+@router.get("/chat/conversation")
+async def get_conversation(user: User = Depends(get_current_user_async)):
+    """Server-side chat memory: rolling summary + recent turns."""
+    conversation = await conversation_store.get(user.id)
+    return conversation.to_dict()
+
+@router.delete("/chat/conversation")
+async def reset_conversation(user: User = Depends(get_current_user_async)):
+    """Start a fresh conversation with the coach."""
+    await conversation_store.reset(user.id)
+    return {"status": "reset"}
+
@@ -2,98 +2,124 @@
 """
 THEKEY SSE Streaming Endpoints
 Provides real-time progress updates for async operations.
+
+- /api/stream/jobs/{job_id}: one job
+- /api/stream/me: every push event of the current user on one connection
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
 from fastapi.responses import StreamingResponse
-from typing import Dict, AsyncGenerator
+from typing import AsyncGenerator, Optional
 import asyncio
 import json
+import os
+import time
 import uuid
-from datetime import datetime, timedelta
-from services.auth.dependencies import get_current_user
-from models import User
+from services.auth.dependencies import get_current_user_id
+from services.job_broadcaster import job_broadcaster
+from services.job_store import job_store
+from services.user_events import user_events
 
 router = APIRouter(prefix="/api/stream", tags=["stream"])
 
-# In-memory job storage (for MVP - consider Redis for production scaling)
-_jobs: Dict[str, dict] = {}
+# Idle SSE connections only wake up for a keep-alive comment this often
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+
+# /api/stream/me connections are recycled after this long; the browser reconnects
+# with Last-Event-ID and resumes from the replay buffer
+SSE_USER_STREAM_SECONDS = float(os.getenv("SSE_USER_STREAM_SECONDS", "1800"))
+
+
+def _job_event_data(job: dict) -> dict:
+    data = {
+        "id": job["id"],
+        "type": job["type"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "message": job["message"],
+        "trade_id": (job.get("metadata") or {}).get("trade_id"),
+    }
+    if job["status"] == "completed":
+        data["result"] = job["result"]
+    elif job["status"] == "failed":
+        data["error"] = job["error"]
+    return data
+
+
+def _publish_job(job: dict):
+    """Push a job snapshot to its own streams and to the owner's /me channel."""
+    job_broadcaster.publish(job["id"], job)
+    # Every worker sees job updates through the store, so the event isn't relayed
+    user_events.publish(job["user_id"], "job", _job_event_data(job), relay=False)
+
+
+_relay_tasks = set()
+
+
+def _relay_user_event(user_id: str, event_type: str, data: dict):
+    """Hand an event published on this worker to the others through the job store."""
+    if not job_store.blocking:
+        job_store.publish_event(user_id, event_type, data)
+        return
+    task = asyncio.get_running_loop().create_task(
+        asyncio.to_thread(job_store.publish_event, user_id, event_type, data)
+    )
+    _relay_tasks.add(task)  # Keep a reference until the write is done
+    task.add_done_callback(_relay_done)
 
 
-def create_job(user_id: str, job_type: str, metadata: dict = None) -> str:
+def _relay_done(task: asyncio.Task):
+    _relay_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        user_events.relay_errors += 1
+        print(f"⚠️ [UserEvents] Relay to other workers failed: {task.exception()}")
+
+
+def _publish_remote_event(user_id: str, event_type: str, data: dict):
+    user_events.publish(user_id, event_type, data, relay=False)
+
+
+# Job storage: memory, SQLite or Postgres per JOB_STORE (see services/job_store.py).
+# Job updates and user events written by other workers are re-published to this
+# worker's streams; user events published here are relayed to the others.
+job_store.listen(_publish_job)
+job_store.listen_events(_publish_remote_event)
+user_events.relay(_relay_user_event)
+
+
+async def _store_call(method, *args, **kwargs):
+    """SQL stores block on I/O, so they run in a thread; the memory registry stays on the loop."""
+    if job_store.blocking:
+        return await asyncio.to_thread(method, *args, **kwargs)
+    return method(*args, **kwargs)
+
+
+async def create_job(user_id: str, job_type: str, metadata: dict = None) -> str:
     """
     Create a new job and return its ID.
     Includes simple deduplication: if an active job of same type/metadata exists, 
     returns that instead of creating a new one.
     """
-    # 1. Deduplication Check
-    if metadata and "trade_id" in metadata:
-        trade_id = metadata["trade_id"]
-        for existing_id, existing_job in _jobs.items():
-            if (existing_job["user_id"] == user_id and 
-                existing_job["type"] == job_type and 
-                existing_job["metadata"].get("trade_id") == trade_id and
-                existing_job["status"] in ["pending", "running"]):
-                print(f"ℹ️ Returning existing job {existing_id} for trade {trade_id}")
-                return existing_id
-
-    # 2. Create New Job
-    job_id = str(uuid.uuid4())
-    now = datetime.utcnow()
-    _jobs[job_id] = {
-        "id": job_id,
-        "user_id": user_id,
-        "type": job_type,
-        "status": "pending",
-        "progress": 0,
-        "message": "Đang khởi tạo...",
-        "result": None,
-        "error": None,
-        "created_at": now.isoformat(),
-        "updated_at": now.isoformat(),
-        "timeout_at": (now + timedelta(seconds=120)).isoformat(), # 2 min max
-        "metadata": metadata or {}
-    }
-    return job_id
+    return await _store_call(job_store.create, user_id, job_type, metadata)
 
 
-def update_job(job_id: str, progress: int = None, status: str = None, 
-               message: str = None, result: dict = None, error: str = None):
+async def update_job(job_id: str, progress: int = None, status: str = None, 
+                     message: str = None, result: dict = None, error: str = None):
     """Update job progress."""
-    if job_id not in _jobs:
-        return
-    
-    job = _jobs[job_id]
-    if progress is not None:
-        job["progress"] = min(max(progress, 0), 100)
-    if status is not None:
-        job["status"] = status
-    if message is not None:
-        job["message"] = message
-    if result is not None:
-        job["result"] = result
-    if error is not None:
-        job["error"] = error
-        job["status"] = "failed"
-    
-    job["updated_at"] = datetime.utcnow().isoformat()
+    job = await _store_call(job_store.update, job_id, progress=progress, status=status,
+                            message=message, result=result, error=error)
+    if job is not None:
+        _publish_job(dict(job))
 
 
-def get_job(job_id: str) -> dict:
+async def get_job(job_id: str) -> dict:
     """Get job by ID."""
-    return _jobs.get(job_id)
+    return await _store_call(job_store.get, job_id)
 
 
-def cleanup_old_jobs(max_age_seconds: int = 3600):
+async def cleanup_old_jobs(max_age_seconds: int = 3600):
     """Remove jobs older than max_age_seconds."""
-    now = datetime.utcnow()
-    to_remove = []
-    for job_id, job in _jobs.items():
-        created = datetime.fromisoformat(job["created_at"])
-        if (now - created).total_seconds() > max_age_seconds:
-            to_remove.append(job_id)
-    for job_id in to_remove:
-        del _jobs[job_id]
+    await _store_call(job_store.reap, max_age_seconds)
 
 
 def _format_sse(data: dict, event: str = None) -> str:
@@ -106,8 +132,128 @@ def _format_sse(data: dict, event: str = None) -> str:
     return "\n".join(lines) + "\n"
 
 
+SSE_HEARTBEAT = ": heartbeat\n\n"
+
+
+def _progress_event(job: dict) -> str:
+    return _format_sse({
+        "progress": job["progress"],
+        "status": job["status"],
+        "message": job["message"]
+    }, event="progress")
+
+
+def _final_event(job: dict) -> str:
+    if job["status"] == "completed":
+        return _format_sse({
+            "progress": 100,
+            "status": "completed",
+            "message": "Hoàn thành!",
+            "result": job["result"]
+        }, event="complete")
+    return _format_sse({
+        "progress": job["progress"],
+        "status": "failed",
+        "message": job["message"],
+        "error": job["error"]
+    }, event="error")
+
+
+async def job_event_stream(job_id: str, max_wait: float = 60,
+                           heartbeat_seconds: float = None) -> AsyncGenerator[str, None]:
+    """
+    SSE events for one job. Sleeps until `update_job` publishes a change;
+    otherwise only emits a heartbeat comment every `heartbeat_seconds`.
+    """
+    heartbeat_seconds = SSE_HEARTBEAT_SECONDS if heartbeat_seconds is None else heartbeat_seconds
+    # Subscribe before reading the initial state so no update slips in between
+    subscription = job_broadcaster.subscribe(job_id)
+    try:
+        current_job = await get_job(job_id)
+        if not current_job:
+            yield _format_sse({"error": "Job not found"}, event="error")
+            return
+
+        yield _progress_event(current_job)
+        if current_job["status"] in ["completed", "failed"]:
+            yield _final_event(current_job)
+            return
+
+        # Job timeout (created_at + 2 min) and stream limit, both as monotonic deadlines;
+        # shared stores keep wall-clock timestamps, so convert via the store's clock
+        stream_deadline = time.monotonic() + max_wait
+        job_deadline = None
+        if current_job.get("timeout_at") is not None:
+            job_deadline = time.monotonic() + (current_job["timeout_at"] - job_store.clock())
+
+        quiet = False
+        while True:
+            now = time.monotonic()
+            if job_deadline is not None and now >= job_deadline:
+                yield _format_sse({
+                    "status": "timeout",
+                    "message": "Phân tích quá lâu. Vui lòng kiểm tra lại sau."
+                }, event="timeout")
+                return
+            if now >= stream_deadline:
+                yield _format_sse({
+                    "status": "timeout",
+                    "message": "Connection timeout. Please refresh."
+                }, event="timeout")
+                return
+            if quiet:
+                yield SSE_HEARTBEAT  # Keeps proxies from closing an idle connection
+
+            wake_at = min(d for d in (stream_deadline, job_deadline, now + heartbeat_seconds) if d is not None)
+            snapshot = await subscription.next(timeout=max(wake_at - now, 0))
+            quiet = snapshot is None
+            if quiet:
+                continue
+
+            yield _progress_event(snapshot)
+            if snapshot["status"] in ["completed", "failed"]:
+                yield _final_event(snapshot)
+                return
+    finally:
+        job_broadcaster.unsubscribe(subscription)
+
+
+def _format_event(event: dict) -> str:
+    """SSE message with an id, so the browser sends it back as Last-Event-ID."""
+    return f"id: {event['id']}\n" + _format_sse(event["data"], event=event["type"])
+
+
+async def user_event_stream(user_id: str, last_event_id: str = None, max_wait: float = None,
+                            heartbeat_seconds: float = None) -> AsyncGenerator[str, None]:
+    """
+    Typed events (job, ai_augmentation, cooldown, achievement) of one user.
+    Replays what a reconnecting client missed; sends `resync` when it can't.
+    """
+    max_wait = SSE_USER_STREAM_SECONDS if max_wait is None else max_wait
+    heartbeat_seconds = SSE_HEARTBEAT_SECONDS if heartbeat_seconds is None else heartbeat_seconds
+    subscription, resync = user_events.subscribe(user_id, last_event_id)
+    try:
+        yield "retry: 3000\n\n"
+        if resync:
+            yield _format_sse({"reason": "missed_events"}, event="resync")
+        deadline = time.monotonic() + max_wait
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return  # Client reconnects and resumes via Last-Event-ID
+            events, gap = await subscription.next(timeout=min(heartbeat_seconds, remaining))
+            if gap:
+                yield _format_sse({"reason": "missed_events"}, event="resync")
+            if not events and not gap:
+                yield SSE_HEARTBEAT
+            for event in events:
+                yield _format_event(event)
+    finally:
+        user_events.unsubscribe(subscription)
+
+
 @router.get("/jobs/{job_id}")
-async def stream_job_progress(job_id: str, user: User = Depends(get_current_user)):
+async def stream_job_progress(job_id: str, user_id: uuid.UUID = Depends(get_current_user_id)):
     """
     Stream job progress via Server-Sent Events (SSE).
     
@@ -122,85 +268,19 @@ async def stream_job_progress(job_id: str, user: User = Depends(get_current_user
         }
     };
     ```
+    Updates are pushed as they happen; idle periods carry heartbeat comments only.
     """
-    job = get_job(job_id)
+    job = await get_job(job_id)
     
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
     # Security: verify job belongs to user
-    if job["user_id"] != str(user.id):
+    if job["user_id"] != str(user_id):
         raise HTTPException(status_code=403, detail="Access denied")
     
-    async def event_generator() -> AsyncGenerator[str, None]:
-        """Generate SSE events for job progress."""
-        max_wait = 60  # Maximum 60 seconds streaming
-        elapsed = 0
-        interval = 0.5  # Check every 500ms
-        
-        # Send initial state
-        current_job = get_job(job_id)
-        if current_job:
-            yield _format_sse({
-                "progress": current_job["progress"],
-                "status": current_job["status"],
-                "message": current_job["message"]
-            }, event="progress")
-        
-        while elapsed < max_wait:
-            await asyncio.sleep(interval)
-            elapsed += interval
-            
-            current_job = get_job(job_id)
-            if not current_job:
-                yield _format_sse({"error": "Job not found"}, event="error")
-                break
-            
-            # Check for timeout in DB (not just loop time)
-            if current_job.get("timeout_at"):
-                timeout_at = datetime.fromisoformat(current_job["timeout_at"])
-                if datetime.utcnow() > timeout_at:
-                    yield _format_sse({
-                        "status": "timeout",
-                        "message": "Phân tích quá lâu. Vui lòng kiểm tra lại sau."
-                    }, event="timeout")
-                    break
-            
-            # Send progress update
-            yield _format_sse({
-                "progress": current_job["progress"],
-                "status": current_job["status"],
-                "message": current_job["message"]
-            }, event="progress")
-            
-            # Check if job is complete
-            if current_job["status"] in ["completed", "failed"]:
-                # Send final result
-                if current_job["status"] == "completed":
-                    yield _format_sse({
-                        "progress": 100,
-                        "status": "completed",
-                        "message": "Hoàn thành!",
-                        "result": current_job["result"]
-                    }, event="complete")
-                else:
-                    yield _format_sse({
-                        "progress": current_job["progress"],
-                        "status": "failed",
-                        "message": current_job["message"],
-                        "error": current_job["error"]
-                    }, event="error")
-                break
-        
-        # Timeout - send final state
-        if elapsed >= max_wait:
-            yield _format_sse({
-                "status": "timeout",
-                "message": "Connection timeout. Please refresh."
-            }, event="timeout")
-    
     return StreamingResponse(
-        event_generator(),
+        job_event_stream(job_id),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -211,14 +291,14 @@ async def stream_job_progress(job_id: str, user: User = Depends(get_current_user
 
 
 @router.get("/jobs/{job_id}/status")
-async def get_job_status(job_id: str, user: User = Depends(get_current_user)):
+async def get_job_status(job_id: str, user_id: uuid.UUID = Depends(get_current_user_id)):
     """Get current job status (non-streaming, for polling fallback)."""
-    job = get_job(job_id)
+    job = await get_job(job_id)
     
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    if job["user_id"] != str(user.id):
+    if job["user_id"] != str(user_id):
         raise HTTPException(status_code=403, detail="Access denied")
     
     return {
@@ -231,6 +311,36 @@ async def get_job_status(job_id: str, user: User = Depends(get_current_user)):
         "error": job["error"] if job["status"] == "failed" else None
     }
 
+@router.get("/me")
+async def stream_user_events(
+    last_event_id: Optional[str] = None,
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+    user_id: uuid.UUID = Depends(get_current_user_id),
+):
+    """
+    One long-lived SSE channel per user, multiplexing typed events:
+    - `job`: progress of any of the user's jobs (final events carry result/error)
+    - `ai_augmentation`: AI results that arrive after the fast response (e.g. insight cards)
+    - `cooldown`: a protection cooldown started or expired
+    - `achievement`: level ups
+    - `resync`: events were missed; refetch state over REST
+
+    Events raised on any worker arrive here (relayed through the job store).
+    Clients resume with the `Last-Event-ID` header; `?last_event_id=` does the
+    same for clients that can't set headers. Auth is the Bearer header, so this
+    is for fetch-based API clients: the web app's EventSource does not subscribe.
+    """
+    return StreamingResponse(
+        user_event_stream(str(user_id), last_event_id_header or last_event_id),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"  # Disable nginx buffering
+        }
+    )
+
+
 
 # Export for use in other modules
-__all__ = ["router", "create_job", "update_job", "get_job", "cleanup_old_jobs"]
+__all__ = ["router", "create_job", "update_job", "get_job", "cleanup_old_jobs", "job_event_stream", "user_event_stream"]
@@ -1,16 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
-from models import get_db, Trade, User
-from services.auth.dependencies import get_current_user
+from sqlalchemy import or_, select
+from sqlalchemy.orm import load_only
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import get_async_db, Trade, TradeNoteIndex
+from models.base import prefetch_decrypted
+from services.auth.dependencies import get_current_user_id
 from pydantic import BaseModel
 from typing import List, Optional, Any
 from datetime import datetime, timezone
 from utils.idempotency import get_idempotency_key, check_idempotency, save_idempotency_response
+from utils.pagination import decode_cursor, encode_cursor
+from utils.blind_index import blind_tokens, matches_phrase, note_terms
+from services.user_stats import record_trade_created, record_trade_closed
+import asyncio
 import uuid
 
 router = APIRouter(prefix="/api/trades", tags=["trades"])
 
+
+async def _get_user_trade(db: AsyncSession, trade_id: str, user_id) -> Optional[Trade]:
+    return (await db.execute(
+        select(Trade).where(Trade.id == trade_id, Trade.user_id == user_id)
+    )).scalars().first()
+
 class TradeBase(BaseModel):
     symbol: str
     side: str
@@ -50,13 +63,37 @@ class TradeResponse(BaseModel):
     
     class Config:
         from_attributes = True
-    
+
+
+class TradeListItem(BaseModel):
+    """Compact list row: no JSON evaluation blobs, no (encrypted) notes."""
+    id: Any
+    symbol: str
+    side: str
+    entry_price: float
+    exit_price: Optional[float] = None
+    quantity: float
+    pnl: Optional[float] = None
+    pnl_pct: Optional[float] = None
+    entry_time: datetime
+    exit_time: Optional[datetime] = None
+    status: Optional[str] = None
+    ai_decision: Optional[str] = None
+    process_score: Optional[float] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+TRADE_LIST_COLUMNS = [getattr(Trade, name) for name in TradeListItem.model_fields]
+
 @router.post("/", response_model=TradeResponse)
-async def create_trade(request: Request, trade: TradeCreate, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def create_trade(request: Request, trade: TradeCreate, user_id: uuid.UUID = Depends(get_current_user_id), db: AsyncSession = Depends(get_async_db)):
     # 1. Idempotency Check
     i_key = await get_idempotency_key(request)
     if i_key:
-        cached = check_idempotency(db, user.id, i_key)
+        cached = await db.run_sync(check_idempotency, user_id, i_key)
         if cached:
             # Return JSONResponse directly to bypass Response Model validation for cached hits
             return JSONResponse(content=cached[0], status_code=int(cached[1] or 200))
@@ -70,33 +107,109 @@ async def create_trade(request: Request, trade: TradeCreate, user: User = Depend
 
     db_trade = Trade(
         **trade.dict(exclude={"entry_time"}),
-        user_id=user.id,
+        user_id=user_id,
         entry_time=entry_time
     )
     db.add(db_trade)
-    db.commit()
-    db.refresh(db_trade)
+    await db.run_sync(record_trade_created, db_trade)  # Same transaction as the trade
+    await db.commit()
+    await db.refresh(db_trade)
 
     # 2. Save Idempotency
     if i_key:
-        save_idempotency_response(db, user.id, i_key, {"id": str(db_trade.id), "symbol": db_trade.symbol})
+        await db.run_sync(save_idempotency_response, user_id, i_key, {"id": str(db_trade.id), "symbol": db_trade.symbol})
 
     return db_trade
 
-@router.get("/", response_model=List[TradeResponse])
-async def get_user_trades(limit: int = 50, offset: int = 0, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    print(f"[DEBUG] /api/trades/ called for user_id: {user.id}, email: {user.email} (Limit: {limit}, Offset: {offset})")
-    trades = db.query(Trade).filter(Trade.user_id == user.id)\
-        .order_by(Trade.entry_time.desc())\
-        .limit(limit).offset(offset).all()
-    return trades
+@router.get("/", response_model=None)
+async def get_user_trades(
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    view: str = Query("full", pattern="^(full|compact)$"),
+    user_id: uuid.UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Trades newest first, paginated by keyset on (entry_time, id): pass the
+    `X-Next-Cursor` response header back as `cursor` for the next page (no
+    header on the last page). `view=compact` skips the evaluation blobs and
+    notes; fetch one trade in full with GET /api/trades/{trade_id}.
+    `offset` still works without a cursor but scans every skipped row.
+    """
+    stmt = select(Trade).where(Trade.user_id == user_id)
+    if view == "compact":
+        stmt = stmt.options(load_only(*TRADE_LIST_COLUMNS, raiseload=True))
+    if cursor:
+        entry_time, trade_id = decode_cursor(cursor)
+        # Row-value "(entry_time, id) < cursor", spelled so idx_trades_user_time bounds the scan
+        stmt = stmt.where(Trade.entry_time <= entry_time, or_(Trade.entry_time < entry_time, Trade.id < trade_id))
+    elif offset:
+        stmt = stmt.offset(offset)
+
+    trades = (await db.execute(
+        stmt.order_by(Trade.entry_time.desc(), Trade.id.desc()).limit(limit + 1)
+    )).scalars().all()
+    page = trades[:limit]
+    if len(trades) > limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(page[-1].entry_time, page[-1].id)
+
+    model = TradeListItem if view == "compact" else TradeResponse
+    return [model.model_validate(trade) for trade in page]
+
+SEARCH_MAX_TERMS = 8
+SEARCH_MAX_CANDIDATES = 200
+
+@router.get("/search", response_model=List[TradeResponse])
+async def search_trade_notes(
+    q: str = Query(..., min_length=2, max_length=200),
+    limit: int = Query(20, ge=1, le=50),
+    user_id: uuid.UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Trades whose notes contain every word of `q` (case and accents ignored),
+    newest first. Matching runs on the blind-token index; only candidate
+    rows are decrypted, to show them and to check multi-word queries
+    appear as a phrase. Whole words only (no prefixes).
+    """
+    terms = note_terms(q)[:SEARCH_MAX_TERMS]
+    if not terms:
+        return []
+
+    candidates = (await db.execute(
+        select(Trade)
+        .join(TradeNoteIndex, TradeNoteIndex.trade_id == Trade.id)
+        .where(
+            Trade.user_id == user_id,
+            TradeNoteIndex.user_id == user_id,
+            TradeNoteIndex.tokens.contains(blind_tokens(user_id, terms)),
+        )
+        .order_by(Trade.entry_time.desc(), Trade.id.desc())
+        .limit(SEARCH_MAX_CANDIDATES)
+    )).scalars().all()
+
+    await asyncio.to_thread(prefetch_decrypted, candidates, "notes")
+    if len(terms) > 1:
+        candidates = [trade for trade in candidates if matches_phrase(trade.notes, q)]
+    return candidates[:limit]
+
+@router.get("/{trade_id}", response_model=TradeResponse)
+async def get_trade(trade_id: uuid.UUID, user_id: uuid.UUID = Depends(get_current_user_id), db: AsyncSession = Depends(get_async_db)):
+    """One trade with every field (evaluations, insight card, notes)."""
+    db_trade = await _get_user_trade(db, trade_id, user_id)
+    if not db_trade:
+        raise HTTPException(status_code=404, detail="Trade not found or unauthorized")
+    return db_trade
 
 @router.put("/{trade_id}/close", response_model=TradeResponse)
-async def close_trade(trade_id: str, pnl: float, exit_price: float, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    db_trade = db.query(Trade).filter(Trade.id == trade_id, Trade.user_id == user.id).first()
+async def close_trade(trade_id: str, pnl: float, exit_price: float, user_id: uuid.UUID = Depends(get_current_user_id), db: AsyncSession = Depends(get_async_db)):
+    db_trade = await _get_user_trade(db, trade_id, user_id)
     if not db_trade:
         raise HTTPException(status_code=404, detail="Trade not found or unauthorized")
     
+    previous_pnl = db_trade.pnl
     db_trade.pnl = pnl
     db_trade.exit_price = exit_price
     # Ensure exit_time is aware if entry_time is aware, or just use UTC now
@@ -106,11 +219,20 @@ async def close_trade(trade_id: str, pnl: float, exit_price: float, user: User =
     
     # Update AI Tracker outcome
     from services.ai.ai_tracking import AITracker
-    tracker = AITracker(db)
-    tracker.update_outcome(db_trade.id, pnl)
+    await db.run_sync(lambda session: AITracker(session).update_outcome(db_trade.id, pnl))
+
+    await db.run_sync(record_trade_closed, db_trade, previous_pnl)
+
+    # New closed trade: cached weekly goals / report / archetype are stale
+    from services.ai.result_cache import result_cache
+    await db.run_sync(result_cache.invalidate_user, user_id)
     
-    db.commit()
-    db.refresh(db_trade)
+    await db.commit()
+    await db.refresh(db_trade)
+
+    # Precompute the insight card so opening the analysis is a DB read
+    from services.ai.insight_cards import insight_cards
+    insight_cards.enqueue(db_trade.id, user_id)
     return db_trade
 
 
@@ -121,9 +243,9 @@ class TradeEvaluationUpdate(BaseModel):
 
 
 @router.put("/{trade_id}/evaluation")
-async def update_trade_evaluation(trade_id: str, data: TradeEvaluationUpdate, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def update_trade_evaluation(trade_id: str, data: TradeEvaluationUpdate, user_id: uuid.UUID = Depends(get_current_user_id), db: AsyncSession = Depends(get_async_db)):
     """Update a trade with process evaluation data from Dojo"""
-    db_trade = db.query(Trade).filter(Trade.id == trade_id, Trade.user_id == user.id).first()
+    db_trade = await _get_user_trade(db, trade_id, user_id)
     if not db_trade:
         raise HTTPException(status_code=404, detail="Trade not found or unauthorized")
     
@@ -134,17 +256,14 @@ async def update_trade_evaluation(trade_id: str, data: TradeEvaluationUpdate, us
     if data.process_score is not None:
         db_trade.process_score = data.process_score
     
-    db.commit()
-    db.refresh(db_trade)
+    await db.commit()
+    await db.refresh(db_trade)
     return db_trade
 
 
 # ============================================
 # POST-TRADE EVALUATE WITH ASYNC AI ANALYSIS
 # ============================================
-from fastapi import BackgroundTasks
-import json
-
 # Note: routes.stream imports are done inside functions to avoid circular import
 
 
@@ -158,9 +277,8 @@ class PostTradeEvaluateRequest(BaseModel):
 async def evaluate_post_trade(
     trade_id: str,
     body: PostTradeEvaluateRequest,
-    background_tasks: BackgroundTasks,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user_id: uuid.UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Submit Dojo 7-step evaluation and trigger async AI analysis.
@@ -168,7 +286,7 @@ async def evaluate_post_trade(
     Flow:
     1. Save user's 7-step Dojo evaluation to DB
     2. Create job for SSE tracking
-    3. Enqueue background task for AI analysis
+    3. Enqueue AI analysis on the durable work queue
     4. Return job_id for SSE subscription
     
     Frontend should:
@@ -177,34 +295,31 @@ async def evaluate_post_trade(
     3. Receive progress updates until complete
     """
     # Step 1: Verify trade exists and belongs to user
-    db_trade = db.query(Trade).filter(
-        Trade.id == trade_id, 
-        Trade.user_id == user.id
-    ).first()
+    db_trade = await _get_user_trade(db, trade_id, user_id)
     
     if not db_trade:
         raise HTTPException(status_code=404, detail="Trade not found or unauthorized")
     
     # Step 2: Save user's Dojo evaluation immediately
     db_trade.user_process_evaluation = body.user_process_evaluation
-    db.commit()
+    await db.commit()
     
     # Step 3: Create job for SSE tracking (local import to avoid circular import)
     from routes.stream import create_job
-    job_id = create_job(
-        user_id=str(user.id),
+    job_id = await create_job(
+        user_id=str(user_id),
         job_type="post_trade_analysis",
         metadata={"trade_id": str(trade_id)}
     )
 
     
-    # Step 4: Enqueue background task for AI analysis
+    # Step 4: Enqueue AI analysis (the job id doubles as the idempotency key)
     if body.run_async:
-        background_tasks.add_task(
-            run_post_trade_ai_analysis,
+        from services.background_tasks import async_task_runner
+        async_task_runner.enqueue_post_trade_analysis(
             job_id=job_id,
             trade_id=str(trade_id),
-            user_id=str(user.id),
+            user_id=str(user_id),
             user_eval=body.user_process_evaluation,
             trade_data={
                 "symbol": db_trade.symbol,
@@ -222,103 +337,3 @@ async def evaluate_post_trade(
         "sse_url": f"/api/stream/jobs/{job_id}",
         "message": "AI analysis started. Subscribe to SSE for progress."
     }
-
-
-async def run_post_trade_ai_analysis(
-    job_id: str,
-    trade_id: str,
-    user_id: str,
-    user_eval: dict,
-    trade_data: dict
-):
-    """
-    Background task to run post-trade AI analysis.
-    Updates job progress via SSE.
-    """
-    # Local imports to avoid circular import
-    from routes.stream import update_job
-    from services.ai.gemini_client import gemini_client
-    
-    try:
-        # Progress: 10% - Started
-        update_job(job_id, progress=10, status="running",
-                  message="Đang phân tích dữ liệu giao dịch...")
-        
-        # Progress: 30% - Preparing context
-        update_job(job_id, progress=30,
-                  message="Đang chuẩn bị ngữ cảnh cho AI...")
-        
-        # Prepare prompt for Gemini
-        system_prompt = """Bạn là THEKEY Post-Trade Analyst. Phân tích đánh giá 7 bước Dojo của trader.
-        
-Trả về JSON với cấu trúc:
-{
-  "summary": "Tóm tắt ngắn về lệnh này",
-  "root_cause": "Nguyên nhân gốc rễ của kết quả (tốt hoặc xấu)",
-  "rule_violations": ["Danh sách các quy tắc đã vi phạm nếu có"],
-  "lessons": ["2-4 bài học rút ra"],
-  "next_time_checklist": ["3 điều cần làm lần sau"],
-  "micro_habit": "Một thói quen nhỏ để cải thiện",
-  "process_score": 0-100
-}
-
-KHÔNG đưa ra tín hiệu giao dịch. Chỉ tập trung vào quy trình và tâm lý."""
-        
-        context = {
-            "trade": trade_data,
-            "user_evaluation": user_eval
-        }
-        
-        # Progress: 50% - Calling AI
-        update_job(job_id, progress=50,
-                  message="Đang gọi AI phân tích...")
-        
-        try:
-            # Call Gemini for analysis
-            analysis = await gemini_client.generate_json_response(
-                prompt=f"Phân tích lệnh sau:\n{json.dumps(context, ensure_ascii=False)}",
-                system_prompt=system_prompt
-            )
-        except Exception as ai_error:
-            print(f"[PostTradeAI] Gemini error: {ai_error}")
-            # Fallback analysis
-            analysis = {
-                "summary": "Không thể phân tích chi tiết do lỗi AI",
-                "root_cause": "Cần xem lại sau",
-                "rule_violations": [],
-                "lessons": [
-                    "Luôn tuân thủ stop-loss",
-                    "Ghi chép lại quy trình"
-                ],
-                "next_time_checklist": [
-                    "Kiểm tra R:R trước khi vào",
-                    "Không dời SL",
-                    "Đợi nến đóng"
-                ],
-                "micro_habit": "Journaling 3 câu sau mỗi lệnh",
-                "process_score": 50
-            }
-        
-        # Progress: 80% - Saving to DB
-        update_job(job_id, progress=80,
-                  message="Đang lưu kết quả...")
-        
-        # Save analysis to DB
-        from models import get_db
-        db = next(get_db())
-        try:
-            db_trade = db.query(Trade).filter(Trade.id == trade_id).first()
-            if db_trade:
-                db_trade.process_evaluation = analysis
-                db_trade.process_score = analysis.get("process_score", 50)
-                db.commit()
-        finally:
-            db.close()
-        
-        # Progress: 100% - Complete
-        update_job(job_id, progress=100, status="completed",
-                  message="Hoàn thành!", result=analysis)
-        
-    except Exception as e:
-        print(f"[PostTradeAI] Error: {e}")
-        update_job(job_id, error=f"Lỗi: {str(e)}")
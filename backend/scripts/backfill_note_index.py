@@ -0,0 +1,73 @@
+# backend/scripts/backfill_note_index.py
+"""
+THEKEY Trade Note Index Backfill
+Builds `trade_note_index` rows for trades whose notes were written before
+the index existed (new and edited notes are indexed on flush, see
+models/trade_note_index.py). Each chunk is bulk-decrypted once.
+
+Usage:
+    python -m scripts.backfill_note_index [--chunk-size 1000] [--all]
+
+--all rebuilds every row, e.g. after changing NOTES_BLIND_INDEX_KEY.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fill the blind-token index over trade notes")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Trades per transaction")
+    parser.add_argument("--all", action="store_true", help="Re-index trades that already have a row")
+    return parser.parse_args()
+
+
+def main(args) -> dict:
+    from sqlalchemy import select
+    from sqlalchemy.orm import load_only
+    from models.base import SessionLocal, prefetch_decrypted
+    from models import Trade, TradeNoteIndex
+    from models.trade_note_index import write_note_index
+
+    totals = {"indexed": 0, "chunks": 0}
+    start = time.time()
+    db = SessionLocal()
+    last_id = None
+    try:
+        while True:
+            stmt = (
+                select(Trade).options(load_only(Trade.id, Trade.user_id, Trade.notes))
+                .where(Trade.notes.isnot(None))
+                .order_by(Trade.id).limit(args.chunk_size)
+            )
+            if not args.all:
+                stmt = stmt.where(~select(TradeNoteIndex.trade_id).where(TradeNoteIndex.trade_id == Trade.id).exists())
+            if last_id is not None:
+                stmt = stmt.where(Trade.id > last_id)
+            trades = db.execute(stmt).scalars().all()
+            if not trades:
+                break
+
+            last_id = trades[-1].id
+            prefetch_decrypted(trades, "notes")
+            write_note_index(db.connection(), trades)
+            db.commit()
+            db.expunge_all()
+
+            totals["indexed"] += len(trades)
+            totals["chunks"] += 1
+    finally:
+        db.close()
+
+    totals["duration_seconds"] = round(time.time() - start, 2)
+    print(f"✅ [NoteIndex] Indexed {totals['indexed']} trades in {totals['chunks']} chunks")
+    return totals
+
+
+if __name__ == "__main__":
+    print(json.dumps(main(parse_args()), indent=2))
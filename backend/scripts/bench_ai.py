@@ -0,0 +1,121 @@
+# backend/scripts/bench_ai.py
+"""
+THEKEY AI Orchestrator Benchmark
+Drives the orchestrator against the replay/simulate Gemini backend, so cache,
+deduplication, circuit breaker and fallback behaviour can be measured offline
+and deterministically (no network, no API key).
+
+Usage:
+    python -m scripts.bench_ai [--requests 500] [--concurrency 50] [--unique 100]
+        [--latency lognormal:800:0.5] [--error-rate 0.05] [--timeout-rate 0.0]
+        [--timeout-seconds 5] [--seed 42] [--mode simulate]
+
+Record a cassette first for realistic responses/latencies:
+    GEMINI_BACKEND=record python -m uvicorn main:app   # exercise the app
+    python -m scripts.bench_ai --mode replay --latency recorded
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the AI orchestrator offline")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--unique", type=int, default=100, help="Distinct request payloads (controls cache hit rate)")
+    parser.add_argument("--mode", choices=["replay", "simulate"], default="simulate")
+    parser.add_argument("--latency", default="lognormal:800:0.5")
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-seconds", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+def configure_backend(args):
+    """Backend is chosen from the environment when gemini_client is first imported."""
+    os.environ["GEMINI_BACKEND"] = args.mode
+    os.environ["GEMINI_SIM_LATENCY"] = args.latency
+    os.environ["GEMINI_SIM_ERROR_RATE"] = str(args.error_rate)
+    os.environ["GEMINI_SIM_TIMEOUT_RATE"] = str(args.timeout_rate)
+    os.environ["GEMINI_SIM_TIMEOUT_SECONDS"] = str(args.timeout_seconds)
+    os.environ["GEMINI_SIM_SEED"] = str(args.seed)
+
+
+def build_workload(args):
+    rng = random.Random(args.seed)
+    workload = []
+    for i in range(args.requests):
+        variant = rng.randrange(args.unique)
+        if i % 2 == 0:
+            workload.append(("chat", f"user-{variant % 20}", {
+                "message": f"Tôi vừa thua lệnh thứ {variant}, có nên vào lại không?",
+                "history": [],
+                "mode": "COACH",
+            }))
+        else:
+            workload.append(("trade_eval", f"user-{variant % 20}", {
+                "trade": {"symbol": "BTCUSDT", "positionSize": 50 + variant, "direction": "BUY"},
+                "stats": {"consecutiveLosses": variant % 2},
+            }))
+    return workload
+
+
+async def run(args):
+    from services.ai.ai_orchestrator import AIOrchestrator
+    from services.ai.gemini_client import gemini_client
+
+    orchestrator = AIOrchestrator()
+    workload = build_workload(args)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+    sources = Counter()
+
+    async def one(request_type, user_id, params):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await orchestrator.process_request(request_type, user_id, params)
+            latencies.append((time.perf_counter() - start) * 1000)
+            sources[response.source] += 1
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one(*item) for item in workload))
+    wall_seconds = time.perf_counter() - wall_start
+
+    latencies.sort()
+    n = len(latencies)
+
+    def percentile(p):
+        return round(latencies[min(int(p * n), n - 1)], 1)
+
+    return {
+        "requests": n,
+        "concurrency": args.concurrency,
+        "wall_seconds": round(wall_seconds, 2),
+        "throughput_rps": round(n / wall_seconds, 1) if wall_seconds else 0.0,
+        "latency_ms": {"p50": percentile(0.50), "p95": percentile(0.95), "p99": percentile(0.99), "max": round(latencies[-1], 1)},
+        "sources": dict(sources),
+        "orchestrator": orchestrator.get_metrics(),
+        "backend": gemini_client.backend.get_stats(),
+    }
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    configure_backend(args)
+
+    print("=" * 50)
+    print("THEKEY AI Orchestrator Benchmark")
+    print("=" * 50)
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2, ensure_ascii=False))
@@ -0,0 +1,140 @@
+# backend/scripts/bench_async_db.py
+"""
+THEKEY Sync vs Async DB Benchmark
+Runs a mixed workload of concurrent "requests" inside one event loop, the way
+uvicorn runs the async route handlers, against the configured DATABASE_URL:
+- every request loads the user and its recent trades (like /api/trades/)
+- --ai-ratio of requests also count trades and await a simulated Gemini call
+  (like /api/protection/check-trade in the gray zone)
+
+`sync` uses the blocking SessionLocal (previous route code), `async` uses
+AsyncSessionLocal. Reports throughput, latency and event-loop lag, i.e. how
+long SSE streams and in-flight awaits are stalled by blocking queries.
+
+Usage:
+    python -m scripts.bench_async_db [--requests 2000] [--concurrency 100]
+        [--ai-ratio 0.2] [--ai-latency 0.3] [--mode sync|async|both]
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark sync vs async DB access from async handlers")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--ai-ratio", type=float, default=0.2, help="Share of requests that also await Gemini")
+    parser.add_argument("--ai-latency", type=float, default=0.3, help="Simulated Gemini latency (seconds)")
+    parser.add_argument("--mode", choices=["sync", "async", "both"], default="both")
+    return parser.parse_args()
+
+
+def sample_user_ids(limit: int = 200) -> list:
+    from sqlalchemy import select
+    from models.base import SessionLocal
+    from models import User
+
+    db = SessionLocal()
+    try:
+        return [row[0] for row in db.execute(select(User.id).limit(limit)).all()]
+    finally:
+        db.close()
+
+
+async def sync_request(user_id, with_ai: bool, ai_latency: float):
+    from sqlalchemy import select, func
+    from models.base import SessionLocal
+    from models import User, Trade
+
+    db = SessionLocal()
+    try:
+        db.get(User, user_id)
+        db.execute(select(Trade).where(Trade.user_id == user_id).order_by(Trade.entry_time.desc()).limit(50)).all()
+        if with_ai:
+            db.execute(select(func.count(Trade.id)).where(Trade.user_id == user_id)).scalar()
+            await asyncio.sleep(ai_latency)
+    finally:
+        db.close()
+
+
+async def async_request(user_id, with_ai: bool, ai_latency: float):
+    from sqlalchemy import select, func
+    from models.base import AsyncSessionLocal
+    from models import User, Trade
+
+    async with AsyncSessionLocal() as db:
+        await db.get(User, user_id)
+        (await db.execute(
+            select(Trade).where(Trade.user_id == user_id).order_by(Trade.entry_time.desc()).limit(50)
+        )).all()
+        if with_ai:
+            (await db.execute(select(func.count(Trade.id)).where(Trade.user_id == user_id))).scalar()
+            await db.commit()  # As in the routes: release the connection before awaiting Gemini
+            await asyncio.sleep(ai_latency)
+
+
+async def loop_lag_probe(samples: list, interval: float = 0.01):
+    """Stand-in for an SSE stream: how late does a 10 ms timer fire?"""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append((time.perf_counter() - start - interval) * 1000)
+
+
+async def run(mode: str, user_ids: list, args) -> dict:
+    handler = sync_request if mode == "sync" else async_request
+    rng = random.Random(42)
+    plan = [(rng.choice(user_ids), rng.random() < args.ai_ratio) for _ in range(args.requests)]
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, lag = [], []
+
+    async def one(user_id, with_ai):
+        async with semaphore:
+            start = time.perf_counter()
+            await handler(user_id, with_ai, args.ai_latency)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    probe = asyncio.create_task(loop_lag_probe(lag))
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one(user_id, with_ai) for user_id, with_ai in plan))
+    wall = time.perf_counter() - wall_start
+    probe.cancel()
+
+    latencies.sort()
+    lag.sort()
+    return {
+        "mode": mode,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "throughput_rps": round(args.requests / wall, 1),
+        "latency_ms_p50": round(statistics.median(latencies), 1),
+        "latency_ms_p99": round(latencies[int(len(latencies) * 0.99) - 1], 1),
+        "loop_lag_ms_p50": round(statistics.median(lag), 1) if lag else None,
+        "loop_lag_ms_max": round(lag[-1], 1) if lag else None,
+    }
+
+
+async def main(args):
+    from models.base import async_engine
+
+    user_ids = await asyncio.to_thread(sample_user_ids)
+    if not user_ids:
+        raise SystemExit("No users in the database to benchmark with")
+    modes = ["sync", "async"] if args.mode == "both" else [args.mode]
+    try:
+        return [await run(mode, user_ids, args) for mode in modes]
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    print(json.dumps(asyncio.run(main(parse_args())), indent=2))
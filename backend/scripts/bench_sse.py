@@ -0,0 +1,110 @@
+# backend/scripts/bench_sse.py
+"""
+THEKEY SSE Fan-out Benchmark
+Runs N concurrent job SSE streams in-process (no HTTP layer) and measures:
+- CPU burned while every stream is idle (the cost of open dashboards)
+- publish -> client delivery latency during progress updates
+
+Compares the event-driven `job_event_stream` against the previous 500 ms
+polling loop.
+
+Usage:
+    python -m scripts.bench_sse [--clients 5000] [--jobs 500] [--updates 10]
+        [--idle-seconds 5] [--mode push|poll|both]
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark SSE job progress fan-out")
+    parser.add_argument("--clients", type=int, default=5000)
+    parser.add_argument("--jobs", type=int, default=500, help="Clients are spread evenly over this many jobs")
+    parser.add_argument("--updates", type=int, default=10, help="Progress updates per job")
+    parser.add_argument("--idle-seconds", type=float, default=5.0)
+    parser.add_argument("--mode", choices=["push", "poll", "both"], default="both")
+    return parser.parse_args()
+
+
+async def legacy_poll_stream(job_id: str, max_wait: float = 60):
+    """The previous implementation: wake every 500 ms, re-read and re-serialize."""
+    from routes.stream import get_job, _progress_event, _final_event
+    elapsed, interval = 0.0, 0.5
+    while elapsed < max_wait:
+        await asyncio.sleep(interval)
+        elapsed += interval
+        job = await get_job(job_id)
+        yield _progress_event(job)
+        if job["status"] in ["completed", "failed"]:
+            yield _final_event(job)
+            return
+
+
+async def run(mode: str, args) -> dict:
+    from routes.stream import create_job, update_job, job_event_stream
+    from services.job_store import job_store
+
+    job_store.clear()
+    job_ids = [await create_job(f"user-{i}", "bench") for i in range(args.jobs)]
+    published_at = {}
+    latencies = []
+
+    async def client(job_id: str):
+        stream = job_event_stream(job_id, max_wait=600) if mode == "push" else legacy_poll_stream(job_id, max_wait=600)
+        async for chunk in stream:
+            if chunk.startswith("event: progress"):
+                progress = json.loads(chunk.split("data: ", 1)[1])["progress"]
+                sent = published_at.get((job_id, progress))
+                if sent is not None:
+                    latencies.append((time.perf_counter() - sent) * 1000)
+
+    tasks = [asyncio.create_task(client(job_ids[i % args.jobs])) for i in range(args.clients)]
+    await asyncio.sleep(0.5)  # Let every client connect and send its initial state
+
+    # Phase 1: all streams idle
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    await asyncio.sleep(args.idle_seconds)
+    idle_cpu = time.process_time() - cpu_start
+    idle_wall = time.perf_counter() - wall_start
+
+    # Phase 2: progress updates
+    cpu_start = time.process_time()
+    for step in range(1, args.updates + 1):
+        progress = min(step * 100 // args.updates, 99)
+        for job_id in job_ids:
+            published_at[(job_id, progress)] = time.perf_counter()
+            await update_job(job_id, progress=progress, status="running")
+        await asyncio.sleep(0.6)
+    for job_id in job_ids:
+        await update_job(job_id, progress=100, status="completed", result={"ok": True})
+    await asyncio.wait_for(asyncio.gather(*tasks), timeout=30)
+    update_cpu = time.process_time() - cpu_start
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "clients": args.clients,
+        "jobs": args.jobs,
+        "idle_cpu_pct": round(idle_cpu / idle_wall * 100, 1),
+        "update_phase_cpu_seconds": round(update_cpu, 2),
+        "deliveries": len(latencies),
+        "latency_ms_p50": round(statistics.median(latencies), 1) if latencies else None,
+        "latency_ms_p99": round(latencies[int(len(latencies) * 0.99) - 1], 1) if latencies else None,
+    }
+
+
+async def main(args):
+    modes = ["push", "poll"] if args.mode == "both" else [args.mode]
+    return [await run(mode, args) for mode in modes]
+
+
+if __name__ == "__main__":
+    print(json.dumps(asyncio.run(main(parse_args())), indent=2))
@@ -0,0 +1,141 @@
+# backend/scripts/bench_trade_listing.py
+"""
+THEKEY Trade Listing Benchmark
+Seeds one user with many trades (default 50k, with notes and evaluation
+blobs like real Dojo trades) and times GET /api/trades/ page queries:
+- OFFSET pagination (previous implementation) vs keyset cursor, at the
+  first page and deep in the history
+- full rows (decrypts notes, loads five JSON blobs) vs the compact projection
+
+Runs the same SQLAlchemy statements as routes/trades.py against DATABASE_URL.
+
+Usage:
+    python -m scripts.bench_trade_listing [--trades 50000] [--page-size 50]
+        [--repeat 5] [--keep]
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark OFFSET vs keyset trade listing")
+    parser.add_argument("--trades", type=int, default=50000)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded user and trades")
+    return parser.parse_args()
+
+
+EVALUATION = {"scores": {"setup": 7, "risk": 6, "emotion": 8, "execution": 7},
+              "totalProcessScore": 70, "weakestArea": "risk",
+              "feedback": "Giữ kỷ luật stop-loss và ghi chép đầy đủ. " * 10}
+
+
+def seed(db, trades: int) -> uuid.UUID:
+    from sqlalchemy import insert, text
+    from models import Trade, User
+
+    user_id = uuid.uuid4()
+    db.add(User(id=user_id, email=f"bench-{user_id.hex[:8]}@thekey.local"))
+    db.commit()
+
+    start = datetime(2020, 1, 1)
+    batch = []
+    for i in range(trades):
+        batch.append({
+            "id": uuid.uuid4(), "user_id": user_id, "symbol": "BTCUSDT", "side": "LONG",
+            "entry_price": 60000 + i % 500, "quantity": 0.01, "pnl": (i % 7) - 3,
+            "entry_time": start + timedelta(minutes=37 * i), "status": "CLOSED",
+            "ai_decision": "ALLOW", "_notes": f"Trade {i}: theo kế hoạch, vào lệnh ở vùng hỗ trợ.",
+            "user_process_evaluation": EVALUATION, "process_evaluation": EVALUATION,
+            "behavioral_insight_card": EVALUATION, "kata_evaluation": EVALUATION, "process_score": 70,
+        })
+        if len(batch) == 2000:
+            db.execute(insert(Trade), batch)
+            db.commit()
+            batch = []
+    if batch:
+        db.execute(insert(Trade), batch)
+        db.commit()
+    db.execute(text("ANALYZE trades"))
+    db.commit()
+    return user_id
+
+
+def page_query(user_id, page_size: int, compact: bool, offset: int = 0, after=None):
+    from sqlalchemy import or_, select
+    from sqlalchemy.orm import load_only
+    from models import Trade
+    from routes.trades import TRADE_LIST_COLUMNS
+
+    stmt = select(Trade).where(Trade.user_id == user_id)
+    if compact:
+        stmt = stmt.options(load_only(*TRADE_LIST_COLUMNS, raiseload=True))
+    if after is not None:
+        entry_time, trade_id = after
+        stmt = stmt.where(Trade.entry_time <= entry_time, or_(Trade.entry_time < entry_time, Trade.id < trade_id))
+    elif offset:
+        stmt = stmt.offset(offset)
+    return stmt.order_by(Trade.entry_time.desc(), Trade.id.desc()).limit(page_size + 1)
+
+
+def timed(db, stmt, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        db.expunge_all()
+        start = time.perf_counter()
+        rows = db.execute(stmt).scalars().all()
+        for row in rows:
+            row.entry_time  # Materialize like the response serializer does
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 2)
+
+
+def main(args) -> dict:
+    from sqlalchemy import delete, select
+    from models.base import SessionLocal
+    from models import Trade, User
+
+    db = SessionLocal()
+    user_id = None
+    try:
+        seed_start = time.perf_counter()
+        user_id = seed(db, args.trades)
+        seed_seconds = round(time.perf_counter() - seed_start, 1)
+
+        deep_offset = max(0, args.trades - 2 * args.page_size)
+        # The cursor a client would hold after walking to the same position
+        anchor = db.execute(
+            select(Trade.entry_time, Trade.id).where(Trade.user_id == user_id)
+            .order_by(Trade.entry_time.desc(), Trade.id.desc()).offset(deep_offset - 1).limit(1)
+        ).one()
+
+        results = {}
+        for view, compact in (("full", False), ("compact", True)):
+            results[view] = {
+                "first_page_ms": timed(db, page_query(user_id, args.page_size, compact), args.repeat),
+                "deep_offset_ms": timed(db, page_query(user_id, args.page_size, compact, offset=deep_offset), args.repeat),
+                "deep_keyset_ms": timed(db, page_query(user_id, args.page_size, compact, after=tuple(anchor)), args.repeat),
+            }
+        return {"trades": args.trades, "page_size": args.page_size, "deep_position": deep_offset,
+                "seed_seconds": seed_seconds, "results": results}
+    finally:
+        if user_id is not None and not args.keep:
+            db.rollback()
+            db.execute(delete(Trade).where(Trade.user_id == user_id))
+            db.execute(delete(User).where(User.id == user_id))
+            db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    print(json.dumps(main(parse_args()), indent=2))
@@ -0,0 +1,115 @@
+# backend/scripts/migrate.py
+"""
+THEKEY Database Migrations
+Brings the database to the alembic head, once per deploy (replaces the
+create_all / ALTER TABLE pass every worker used to run on startup):
+- empty database: create every table from the models, stamp head
+- database created before alembic (create_all on boot, database/schema.sql):
+  create missing tables, stamp the revision before 2026_10_18_startup_schema,
+  then upgrade, which adds any missing startup-managed columns, and backfill
+  the derived tables those skipped revisions would have filled (user_stats,
+  trade_note_index)
+- otherwise: alembic upgrade head
+
+Holds a Postgres advisory lock, so concurrent deploys don't race.
+
+Usage:
+    python -m scripts.migrate [--check]
+
+Railway runs it (with scripts.seed_kb) as the preDeployCommand.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import time
+
+
+MIGRATION_LOCK_ID = 7_402_118  # pg_advisory_lock key, arbitrary but fixed
+PRE_ALEMBIC_STAMP = "2026_10_18_trade_note_index"  # down_revision of 2026_10_18_startup_schema
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Upgrade the database to the alembic head")
+    parser.add_argument("--check", action="store_true", help="Only report the schema status")
+    return parser.parse_args()
+
+
+def alembic_config(connection):
+    from alembic.config import Config
+    from services.schema_version import ALEMBIC_DIR
+
+    config = Config(os.path.join(os.path.dirname(ALEMBIC_DIR), "alembic.ini"))
+    config.set_main_option("script_location", ALEMBIC_DIR)
+    config.attributes["connection"] = connection
+    return config
+
+
+def backfill_derived_tables() -> dict:
+    """
+    Fill the tables created by the stamped-over revisions from existing data;
+    each script is idempotent, so a retried deploy just re-checks.
+    """
+    from scripts import backfill_note_index, reconcile_user_stats
+
+    print("📝 [Migrate] Backfilling user_stats and trade_note_index")
+    return {
+        "user_stats": reconcile_user_stats.main(argparse.Namespace(chunk_size=500)),
+        "note_index": backfill_note_index.main(argparse.Namespace(chunk_size=1000, all=False)),
+    }
+
+
+def main(args) -> dict:
+    from alembic import command
+    from sqlalchemy import inspect, text
+    from models import Base
+    from models.base import engine
+    from services.schema_version import check_schema_version, current_revisions
+
+    if args.check:
+        return check_schema_version()
+
+    start = time.time()
+    with engine.connect() as connection:
+        connection.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        connection.commit()
+        try:
+            before = current_revisions(connection)
+            connection.commit()  # Alembic must start its own transactions (autocommit_block)
+            config = alembic_config(connection)
+            backfills = None
+            if before is None:
+                legacy = inspect(connection).has_table("users")
+                Base.metadata.create_all(bind=connection)
+                connection.commit()
+                if legacy:
+                    print(f"📝 [Migrate] Pre-alembic database: stamping {PRE_ALEMBIC_STAMP}")
+                    command.stamp(config, PRE_ALEMBIC_STAMP)
+                    command.upgrade(config, "head")
+                    backfills = backfill_derived_tables()
+                else:
+                    print("📝 [Migrate] Empty database: created tables from models")
+                    command.stamp(config, "head")
+            else:
+                command.upgrade(config, "head")
+            after = current_revisions(connection)
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+            connection.commit()
+
+    result = {
+        "before": list(before) if before is not None else None,
+        "after": list(after or ()),
+        "duration_seconds": round(time.time() - start, 2),
+    }
+    if backfills is not None:
+        result["backfills"] = backfills
+    print(f"✅ [Migrate] Database at {result['after']}")
+    return result
+
+
+if __name__ == "__main__":
+    print(json.dumps(main(parse_args()), indent=2))
@@ -0,0 +1,62 @@
+# backend/scripts/nightly_batch.py
+"""
+THEKEY Nightly AI Batch
+Precomputes weekly reports, weekly goals, archetypes and learning insights for
+active users into `ai_result_cache` (see services/ai/nightly_batch.py).
+
+Usage:
+    python -m scripts.nightly_batch [--jobs weekly_report,weekly_goals,archetype,learning_insights]
+        [--rpm 30] [--concurrency 2] [--active-days 14] [--chunk-size 200] [--dry-run]
+
+Schedule off-peak, e.g. cron (server time UTC, ~03:00 Vietnam time):
+    0 20 * * * cd /app/backend && python -m scripts.nightly_batch
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import json
+
+from services.ai.nightly_batch import JOBS, NightlyBatchRunner
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Precompute per-user AI results off-peak")
+    parser.add_argument("--jobs", default=",".join(JOBS), help="Comma-separated subset of: " + ", ".join(JOBS))
+    parser.add_argument("--rpm", type=float, default=30, help="Job starts per minute (backs off on failures)")
+    parser.add_argument("--concurrency", type=int, default=2, help="Users processed in parallel")
+    parser.add_argument("--active-days", type=int, default=14, help="Users with a trade or check-in in this window")
+    parser.add_argument("--chunk-size", type=int, default=200, help="Users per bulk context load")
+    parser.add_argument("--dry-run", action="store_true", help="Walk users and report what would be computed")
+    return parser.parse_args()
+
+
+async def main(args) -> dict:
+    from services.ai.call_log_writer import call_log_writer
+
+    jobs = [job.strip() for job in args.jobs.split(",") if job.strip()]
+    unknown = set(jobs) - set(JOBS)
+    if unknown:
+        raise SystemExit(f"Unknown jobs: {', '.join(sorted(unknown))}")
+
+    runner = NightlyBatchRunner(
+        jobs=jobs,
+        requests_per_minute=args.rpm,
+        concurrency=args.concurrency,
+        active_days=args.active_days,
+        chunk_size=args.chunk_size,
+        dry_run=args.dry_run,
+    )
+    print(f"🌙 [NightlyBatch] Starting: jobs={jobs} rpm={args.rpm} concurrency={args.concurrency}")
+    try:
+        return await runner.run()
+    finally:
+        await call_log_writer.flush()  # Persist ai_call_logs rows before exiting
+
+
+if __name__ == "__main__":
+    report = asyncio.run(main(parse_args()))
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,53 @@
+# backend/scripts/reconcile_user_stats.py
+"""
+THEKEY User Stats Reconciliation
+Recomputes `user_stats` from trades and check-ins, repairs drifted or missing
+rows and refreshes the persisted `users.survival_score`
+(see services/user_stats.py).
+
+Usage:
+    python -m scripts.reconcile_user_stats [--chunk-size 500]
+
+Schedule daily, e.g. cron (server time UTC) before the nightly AI batch:
+    30 19 * * * cd /app/backend && python -m scripts.reconcile_user_stats
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Repair drift in the user_stats counters")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Users per transaction")
+    return parser.parse_args()
+
+
+def main(args) -> dict:
+    from models.base import SessionLocal
+    from services.user_stats import iter_user_id_chunks, reconcile_chunk
+
+    totals = {"checked": 0, "created": 0, "repaired": 0, "scores_updated": 0}
+    start = time.time()
+    reader, db = SessionLocal(), SessionLocal()
+    try:
+        for chunk in iter_user_id_chunks(reader, args.chunk_size):
+            result = reconcile_chunk(db, chunk)
+            db.commit()  # One short transaction per chunk: row locks are held briefly
+            for key, value in result.items():
+                totals[key] += value
+    finally:
+        reader.close()
+        db.close()
+
+    totals["duration_seconds"] = round(time.time() - start, 2)
+    print(f"✅ [UserStats] Reconciled {totals['checked']} users ({totals['repaired']} repaired, {totals['created']} created)")
+    return totals
+
+
+if __name__ == "__main__":
+    print(json.dumps(main(parse_args()), indent=2))
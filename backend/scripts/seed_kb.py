@@ -8,6 +8,9 @@ Usage:
     
 Or from project root:
     cd backend && python -m scripts.seed_kb
+
+One-shot, after `python -m scripts.migrate` (Railway preDeployCommand);
+a no-op once the KB is seeded. The API no longer seeds on startup.
 """
 
 import sys
@@ -15,11 +18,10 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from sqlalchemy.orm import Session
-from models import get_db, engine
-from models.kb_document import KBDocument, Base
+from models import get_db
+from models.kb_document import KBDocument
 
-# Create tables if not exists
-Base.metadata.create_all(bind=engine)
+# Tables come from the migrations (python -m scripts.migrate), run first
 
 
 # 30 Core Trading Policies & Playbooks
@@ -0,0 +1,159 @@
+# backend/scripts/train_trade_classifier.py
+"""
+THEKEY Trade Classifier Training Script
+Distills past Gemini gray-zone decisions (ai_predictions, rule='AI_EVALUATION')
+into the local classifier served by `services.protection.trade_classifier`.
+
+Writes the model artifact plus an offline report (accuracy, confusion matrix,
+coverage/accuracy at the serving confidence threshold, predict latency).
+
+Usage:
+    python -m scripts.train_trade_classifier [--output PATH] [--report PATH]
+        [--holdout 0.2] [--min-confidence 0.85] [--min-samples 200]
+
+Or from project root:
+    cd backend && python -m scripts.train_trade_classifier
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Tuple
+
+from models import get_db
+from models.ai_prediction import AIPrediction
+from services.protection.trade_classifier import (
+    CLASSES,
+    DEFAULT_MODEL_PATH,
+    TradeDecisionClassifier,
+    vectorize,
+)
+
+
+def load_samples(db) -> Tuple[List[List[float]], List[str], int]:
+    """Load (features, label) pairs. Rows logged before feature capture are skipped."""
+    X, y, skipped = [], [], 0
+    rows = (
+        db.query(AIPrediction.decision, AIPrediction.trade_intent)
+        .filter(AIPrediction.rule == "AI_EVALUATION")
+        .yield_per(1000)
+    )
+    for decision, trade_intent in rows:
+        features = (trade_intent or {}).get("_features")
+        if not features or decision not in CLASSES:
+            skipped += 1
+            continue
+        X.append(vectorize(features))
+        y.append(decision)
+    return X, y, skipped
+
+
+def evaluate(
+    model: TradeDecisionClassifier,
+    X: List[List[float]],
+    y: List[str],
+    min_confidence: float,
+) -> Dict[str, Any]:
+    """Offline accuracy + latency report on a holdout set."""
+    confusion = {actual: {pred: 0 for pred in CLASSES} for actual in CLASSES}
+    latencies_us = []
+    correct = confident = confident_correct = 0
+
+    for features, actual in zip(X, y):
+        start = time.perf_counter()
+        predicted, confidence = model.predict(features)
+        latencies_us.append((time.perf_counter() - start) * 1_000_000)
+
+        confusion[actual][predicted] += 1
+        correct += predicted == actual
+        if confidence >= min_confidence:
+            confident += 1
+            confident_correct += predicted == actual
+
+    latencies_us.sort()
+    n = len(y)
+
+    def percentile(p: float) -> float:
+        return round(latencies_us[min(int(p * n), n - 1)], 1) if n else 0.0
+
+    return {
+        "samples": n,
+        "accuracy": round(correct / n, 4) if n else 0.0,
+        "confusion_matrix": confusion,  # actual -> predicted -> count
+        "min_confidence": min_confidence,
+        "local_coverage": round(confident / n, 4) if n else 0.0,
+        "local_accuracy": round(confident_correct / confident, 4) if confident else 0.0,
+        "predict_latency_us": {"p50": percentile(0.50), "p99": percentile(0.99)},
+    }
+
+
+def train(db, output: str, report_path: str, holdout: float, min_confidence: float, min_samples: int) -> Dict[str, Any]:
+    X, y, skipped = load_samples(db)
+    print(f"📊 Loaded {len(X)} samples ({skipped} skipped without features)")
+    if len(X) < min_samples:
+        raise ValueError(f"Need at least {min_samples} samples to train, found {len(X)}")
+
+    order = list(range(len(X)))
+    random.Random(42).shuffle(order)
+    split = int(len(order) * (1 - holdout))
+    train_idx, test_idx = order[:split], order[split:]
+
+    start = time.perf_counter()
+    model = TradeDecisionClassifier().fit([X[i] for i in train_idx], [y[i] for i in train_idx])
+    train_seconds = time.perf_counter() - start
+
+    report = evaluate(model, [X[i] for i in test_idx], [y[i] for i in test_idx], min_confidence)
+    report["train_samples"] = len(train_idx)
+    report["train_seconds"] = round(train_seconds, 2)
+    report["label_distribution"] = {label: y.count(label) for label in CLASSES}
+
+    model.metadata = {
+        "trained_at": datetime.now(timezone.utc).isoformat(),
+        "holdout_accuracy": report["accuracy"],
+        "local_coverage": report["local_coverage"],
+        "local_accuracy": report["local_accuracy"],
+    }
+    model.save(output)
+
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the local trade decision classifier")
+    parser.add_argument("--output", default=os.getenv("TRADE_CLASSIFIER_PATH", DEFAULT_MODEL_PATH))
+    parser.add_argument("--report", default=None, help="Report path (default: <output>.report.json)")
+    parser.add_argument("--holdout", type=float, default=0.2)
+    parser.add_argument("--min-confidence", type=float, default=float(os.getenv("TRADE_CLASSIFIER_MIN_CONFIDENCE", "0.85")))
+    parser.add_argument("--min-samples", type=int, default=200)
+    args = parser.parse_args()
+
+    report_path = args.report or os.path.splitext(args.output)[0] + ".report.json"
+
+    print("=" * 50)
+    print("THEKEY Trade Classifier Training")
+    print("=" * 50)
+
+    db = next(get_db())
+
+    try:
+        report = train(db, args.output, report_path, args.holdout, args.min_confidence, args.min_samples)
+        print(f"\n✅ Holdout accuracy: {report['accuracy']:.1%}")
+        print(f"   Local coverage @ {args.min_confidence}: {report['local_coverage']:.1%} "
+              f"(accuracy {report['local_accuracy']:.1%})")
+        print(f"   Predict latency p50/p99: {report['predict_latency_us']['p50']}/{report['predict_latency_us']['p99']} µs")
+        print(f"   Model: {args.output}")
+        print(f"   Report: {report_path}")
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        raise
+    finally:
+        db.close()
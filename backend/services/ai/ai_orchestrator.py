@@ -550,7 +550,8 @@ class AIOrchestrator:
             )
         
         elif request_type == "market_analysis":
-            return await self.gemini_client.generate_market_analysis()
+            from .market_snapshot import market_snapshot
+            return market_snapshot.get() or await self.gemini_client.generate_market_analysis()
         
         elif request_type == "weekly_goals":
             return await self.gemini_client.generate_weekly_goals(
@@ -0,0 +1,336 @@
+# backend/services/ai/backends.py
+"""
+THEKEY Gemini Backends
+
+Pluggable transport behind GeminiClient._generate:
+- live:     real Gemini API (default)
+- record:   live calls, saving prompt-hash -> response + latency to a cassette
+- replay:   serve recorded responses only; unknown prompts fail
+- simulate: serve recorded responses, synthesize a response for unknown prompts
+
+Replay/simulate need no network or API key and support configurable
+latency distributions, 429 injection and timeouts, so orchestrator caching,
+breakers and fallbacks can be benchmarked deterministically.
+
+Environment:
+    GEMINI_BACKEND            live | record | replay | simulate
+    GEMINI_CASSETTE_PATH      JSONL cassette file
+    GEMINI_SIM_LATENCY        recorded | fixed:<ms> | uniform:<min_ms>:<max_ms>
+                              | lognormal:<median_ms>:<sigma>
+    GEMINI_SIM_ERROR_RATE     Probability of an injected 429 (0.0-1.0)
+    GEMINI_SIM_TIMEOUT_RATE   Probability of an injected timeout (0.0-1.0)
+    GEMINI_SIM_TIMEOUT_SECONDS  How long an injected timeout hangs
+    GEMINI_SIM_SEED           RNG seed for reproducible runs
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+
+DEFAULT_CASSETTE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "data", "gemini_cassette.jsonl"
+)
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class UsageMetadata:
+    """Mirrors the token fields of google-genai's usage_metadata."""
+    prompt_token_count: int = 0
+    candidates_token_count: int = 0
+    total_token_count: int = 0
+
+
+@dataclass
+class BackendResponse:
+    """Minimal stand-in for a google-genai response (`.text` + `.usage_metadata`)."""
+    text: str
+    model: str = ""
+    latency_ms: float = 0.0
+    source: str = "replay"
+    usage_metadata: Optional[UsageMetadata] = None
+
+
+def estimate_usage(prompt: str, text: str) -> UsageMetadata:
+    """Rough ~4 chars/token estimate for synthesized responses."""
+    prompt_tokens, output_tokens = len(prompt) // 4, len(text) // 4
+    return UsageMetadata(prompt_tokens, output_tokens, prompt_tokens + output_tokens)
+
+
+class CassetteMiss(Exception):
+    """Raised in replay mode when a prompt was never recorded."""
+
+
+class SimulatedTimeout(asyncio.TimeoutError):
+    pass
+
+
+# ============================================
+# Cassette
+# ============================================
+
+class Cassette:
+    """
+    Append-only JSONL store of recorded interactions.
+
+    Entry: {"hash", "model", "text", "latency_ms", "usage", "recorded_at"}
+    Several entries per hash are kept and served round-robin.
+    """
+
+    def __init__(self, path: str = DEFAULT_CASSETTE_PATH):
+        self.path = path
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursor: Dict[str, int] = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self._entries.setdefault(entry["hash"], []).append(entry)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def lookup(self, prompt: str) -> Optional[Dict[str, Any]]:
+        key = prompt_hash(prompt)
+        entries = self._entries.get(key)
+        if not entries:
+            return None
+        index = self._cursor.get(key, 0)
+        self._cursor[key] = index + 1
+        return entries[index % len(entries)]
+
+    def latencies_ms(self) -> List[float]:
+        return [e["latency_ms"] for entries in self._entries.values() for e in entries]
+
+    def record(self, prompt: str, model: str, text: str, latency_ms: float, usage: Optional[Dict[str, int]] = None):
+        entry = {
+            "hash": prompt_hash(prompt),
+            "model": model,
+            "text": text,
+            "latency_ms": round(latency_ms, 1),
+            "usage": usage or {},
+            "recorded_at": time.time(),
+        }
+        self._entries.setdefault(entry["hash"], []).append(entry)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+# ============================================
+# Latency Distributions
+# ============================================
+
+class LatencyModel:
+    """
+    Samples simulated latency in milliseconds.
+
+    Spec formats: recorded | fixed:<ms> | uniform:<min>:<max> | lognormal:<median>:<sigma>
+    """
+
+    def __init__(self, spec: str = "recorded", rng: Optional[random.Random] = None):
+        self.spec = spec
+        self.rng = rng or random.Random()
+        parts = spec.split(":")
+        self.kind = parts[0]
+        self.params = [float(p) for p in parts[1:]]
+        if self.kind not in ("recorded", "fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency spec: {spec}")
+
+    def sample(self, recorded_ms: Optional[float] = None) -> float:
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return self.rng.uniform(self.params[0], self.params[1])
+        if self.kind == "lognormal":
+            median, sigma = self.params
+            return self.rng.lognormvariate(math.log(median), sigma)
+        return recorded_ms or 0.0
+
+
+# ============================================
+# Backends
+# ============================================
+
+class LiveBackend:
+    """Real Gemini API via google-genai."""
+
+    name = "live"
+
+    def __init__(self, api_key: str):
+        from google import genai
+        self.client = genai.Client(api_key=api_key)
+
+    async def generate(self, model: str, prompt: str):
+        return await self.client.aio.models.generate_content(model=model, contents=prompt)
+
+
+class RecordingBackend:
+    """Delegates to another backend and records every successful response."""
+
+    name = "record"
+
+    def __init__(self, inner, cassette: Cassette):
+        self.inner = inner
+        self.cassette = cassette
+        self.recorded = 0
+
+    async def generate(self, model: str, prompt: str):
+        start = time.perf_counter()
+        response = await self.inner.generate(model, prompt)
+        latency_ms = (time.perf_counter() - start) * 1000
+        if response is not None and getattr(response, "text", None):
+            usage = getattr(response, "usage_metadata", None)
+            self.cassette.record(prompt, model, response.text, latency_ms, usage={
+                "prompt_token_count": getattr(usage, "prompt_token_count", 0) or 0,
+                "candidates_token_count": getattr(usage, "candidates_token_count", 0) or 0,
+                "total_token_count": getattr(usage, "total_token_count", 0) or 0,
+            })
+            self.recorded += 1
+        return response
+
+
+class ReplayBackend:
+    """
+    Serves cassette responses locally with simulated latency and faults.
+
+    Injected 429s carry "429" in the message so GeminiClient's existing
+    retry/model-fallback logic is exercised exactly as in production.
+    """
+
+    name = "replay"
+
+    def __init__(
+        self,
+        cassette: Cassette,
+        latency: str = "recorded",
+        error_rate: float = 0.0,
+        timeout_rate: float = 0.0,
+        timeout_seconds: float = 30.0,
+        seed: Optional[int] = None,
+        synthesize_misses: bool = False,
+        default_response: str = "{\"simulated\": true}",
+    ):
+        self.cassette = cassette
+        self.rng = random.Random(seed)
+        self.latency = LatencyModel(latency, self.rng)
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.timeout_seconds = timeout_seconds
+        self.synthesize_misses = synthesize_misses
+        self.default_response = default_response
+        if synthesize_misses:
+            self.name = "simulate"
+
+        # When replaying with recorded latency, unknown prompts borrow a
+        # recorded latency so misses still look realistic
+        self._recorded_latencies = cassette.latencies_ms()
+
+        # Metrics
+        self.calls = 0
+        self.hits = 0
+        self.misses = 0
+        self.injected_errors = 0
+        self.injected_timeouts = 0
+
+    async def generate(self, model: str, prompt: str):
+        self.calls += 1
+
+        roll = self.rng.random()
+        if roll < self.timeout_rate:
+            self.injected_timeouts += 1
+            await asyncio.sleep(self.timeout_seconds)
+            raise SimulatedTimeout(f"Simulated timeout after {self.timeout_seconds}s ({model})")
+        if roll < self.timeout_rate + self.error_rate:
+            self.injected_errors += 1
+            await asyncio.sleep(self.latency.sample(self._borrowed_latency()) / 1000 * 0.1)
+            raise Exception(f"429 RESOURCE_EXHAUSTED (simulated) for {model}")
+
+        entry = self.cassette.lookup(prompt)
+        if entry is None:
+            self.misses += 1
+            if not self.synthesize_misses:
+                raise CassetteMiss(f"No recorded response for prompt {prompt_hash(prompt)[:12]}")
+            text, recorded_ms = self.default_response, self._borrowed_latency()
+            usage = estimate_usage(prompt, text)
+        else:
+            self.hits += 1
+            text, recorded_ms = entry["text"], entry.get("latency_ms")
+            usage = UsageMetadata(**entry["usage"]) if entry.get("usage") else estimate_usage(prompt, text)
+
+        latency_ms = self.latency.sample(recorded_ms)
+        await asyncio.sleep(latency_ms / 1000)
+        return BackendResponse(text=text, model=model, latency_ms=latency_ms, source=self.name, usage_metadata=usage)
+
+    def _borrowed_latency(self) -> float:
+        if not self._recorded_latencies:
+            return 0.0
+        return self.rng.choice(self._recorded_latencies)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.name,
+            "cassette_entries": len(self.cassette),
+            "calls": self.calls,
+            "hits": self.hits,
+            "misses": self.misses,
+            "injected_errors": self.injected_errors,
+            "injected_timeouts": self.injected_timeouts,
+        }
+
+
+# ============================================
+# Factory
+# ============================================
+
+def create_backend(mode: Optional[str] = None, api_key: Optional[str] = None):
+    """Build the backend selected by GEMINI_BACKEND (default: live)."""
+    mode = (mode or os.getenv("GEMINI_BACKEND", "live")).lower()
+    cassette_path = os.getenv("GEMINI_CASSETTE_PATH", DEFAULT_CASSETTE_PATH)
+
+    if mode in ("live", "record"):
+        api_key = api_key or os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY environment variable not set")
+        live = LiveBackend(api_key)
+        if mode == "live":
+            return live
+        print(f"📼 [Gemini] Recording responses to {cassette_path}")
+        return RecordingBackend(live, Cassette(cassette_path))
+
+    if mode in ("replay", "simulate"):
+        seed = os.getenv("GEMINI_SIM_SEED")
+        backend = ReplayBackend(
+            Cassette(cassette_path),
+            latency=os.getenv("GEMINI_SIM_LATENCY", "recorded"),
+            error_rate=float(os.getenv("GEMINI_SIM_ERROR_RATE", "0")),
+            timeout_rate=float(os.getenv("GEMINI_SIM_TIMEOUT_RATE", "0")),
+            timeout_seconds=float(os.getenv("GEMINI_SIM_TIMEOUT_SECONDS", "30")),
+            seed=int(seed) if seed else None,
+            synthesize_misses=(mode == "simulate"),
+        )
+        print(f"📼 [Gemini] {mode.capitalize()} mode ({len(backend.cassette)} recorded responses)")
+        return backend
+
+    raise ValueError(f"Unknown GEMINI_BACKEND: {mode}")
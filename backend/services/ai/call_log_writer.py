@@ -0,0 +1,207 @@
+# backend/services/ai/call_log_writer.py
+"""
+THEKEY AI Call Log Writer
+
+Every Gemini generate call produces one `ai_call_logs` row (tokens, model,
+retries, latency, call type). Rows are buffered in memory and flushed in
+batches by a background task, so the AI path never waits on the database.
+
+Request attribution (user, endpoint) travels through ContextVars set by
+`get_current_user`, so deep AI helpers don't need extra parameters.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Deque, Dict, Optional
+
+
+# Request-scoped attribution
+current_user_id: ContextVar[Optional[str]] = ContextVar("ai_current_user_id", default=None)
+current_endpoint: ContextVar[Optional[str]] = ContextVar("ai_current_endpoint", default=None)
+
+
+def extract_usage(response: Any) -> Dict[str, int]:
+    """Token counts from a google-genai (or replay) response's usage_metadata."""
+    usage = getattr(response, "usage_metadata", None)
+    input_tokens = int(getattr(usage, "prompt_token_count", 0) or 0)
+    output_tokens = int(getattr(usage, "candidates_token_count", 0) or 0)
+    total_tokens = int(getattr(usage, "total_token_count", 0) or 0) or input_tokens + output_tokens
+    return {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": total_tokens}
+
+
+class AICallLogWriter:
+    """
+    Batched, non-blocking writer for AICallLog rows.
+
+    `log()` only appends to a bounded buffer; when the buffer is full the
+    oldest rows are dropped (and counted) rather than applying backpressure
+    to AI requests. A batch that fails to insert goes back to the front of
+    the buffer and is retried with exponential backoff: these rows are what
+    the cost ledger resyncs from, so they are only lost on overflow.
+    """
+
+    def __init__(self, batch_size: int = 100, flush_interval_seconds: float = 2.0, max_buffer: int = 10_000,
+                 max_backoff_seconds: float = 60.0):
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._buffer: Deque[Dict[str, Any]] = deque(maxlen=max_buffer)
+        self._consecutive_failures = 0
+        self._retry_at = 0.0  # monotonic time before which the writer doesn't retry
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.logged = 0
+        self.written = 0
+        self.dropped = 0
+        self.flush_failures = 0
+        self.last_flush_ms = 0.0
+
+    def log(
+        self,
+        call_type: str,
+        model: str,
+        latency_ms: float,
+        success: str = "true",
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        total_tokens: int = 0,
+        error_message: Optional[str] = None,
+        retries: int = 0,
+        extra: Optional[Dict[str, Any]] = None,
+    ):
+        from models.ai_call_log import AICallLog
+
+        model_name = (model or "unknown").replace("models/", "")
+        user_id = current_user_id.get()
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+
+        self._buffer.append({
+            "id": uuid.uuid4(),
+            "user_id": uuid.UUID(str(user_id)) if user_id else None,
+            "call_type": call_type or "unknown",
+            "model": model_name,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": total_tokens,
+            "cost_usd": AICallLog.calculate_cost(model_name, input_tokens, output_tokens),
+            "latency_ms": int(latency_ms),
+            "success": success,
+            "error_message": (error_message or "")[:500] or None,
+            "endpoint": current_endpoint.get(),
+            "response_type": "JSON" if success == "true" else None,
+            "extra_data": {"retries": retries, **(extra or {})},
+            "created_at": datetime.utcnow(),
+        })
+        self.logged += 1
+
+        if self._wakeup and len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    # ------------------------------------------
+    # Flushing
+    # ------------------------------------------
+
+    def _insert(self, rows):
+        from sqlalchemy import insert
+        from models.base import SessionLocal
+        from models.ai_call_log import AICallLog
+
+        db = SessionLocal()
+        try:
+            db.execute(insert(AICallLog), rows)
+            db.commit()
+        finally:
+            db.close()
+
+    async def flush(self) -> int:
+        """Write everything buffered so far, in batches."""
+        written = 0
+        while self._buffer:
+            rows = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            start = time.perf_counter()
+            try:
+                await asyncio.to_thread(self._insert, rows)
+            except Exception as e:
+                self._requeue(rows)
+                self.flush_failures += 1
+                self._consecutive_failures += 1
+                delay = min(self.flush_interval_seconds * 2 ** self._consecutive_failures, self.max_backoff_seconds)
+                self._retry_at = time.monotonic() + delay
+                print(f"⚠️ [AICallLog] Flush failed, retrying {len(self._buffer)} rows in {delay:.0f}s: {e}")
+                break
+            self._consecutive_failures = 0
+            self.last_flush_ms = (time.perf_counter() - start) * 1000
+            written += len(rows)
+        self.written += written
+        return written
+
+    def _requeue(self, rows):
+        """Put a failed batch back in front of newer rows, dropping its oldest rows only if they no longer fit."""
+        room = self._buffer.maxlen - len(self._buffer)
+        if len(rows) > room:
+            self.dropped += len(rows) - room
+            rows = rows[len(rows) - room:]
+        self._buffer.extendleft(reversed(rows))
+
+    def start(self):
+        if self._task and not self._task.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        print("📝 [AICallLog] Batched writer started")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()  # Don't lose the tail on shutdown
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            backoff = self._retry_at - time.monotonic()
+            if backoff > 0:
+                await asyncio.sleep(backoff)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ [AICallLog] Writer error: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "buffered": len(self._buffer),
+            "logged": self.logged,
+            "written": self.written,
+            "dropped": self.dropped,
+            "flush_failures": self.flush_failures,
+            "consecutive_failures": self._consecutive_failures,
+            "last_flush_ms": round(self.last_flush_ms, 1),
+        }
+
+
+# ============================================
+# Singleton Instance
+# ============================================
+
+call_log_writer = AICallLogWriter(
+    batch_size=int(os.getenv("AI_CALL_LOG_BATCH_SIZE", "100")),
+    flush_interval_seconds=float(os.getenv("AI_CALL_LOG_FLUSH_SECONDS", "2")),
+)
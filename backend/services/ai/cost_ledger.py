@@ -0,0 +1,223 @@
+# backend/services/ai/cost_ledger.py
+"""
+THEKEY AI Cost Ledger
+
+Enforces `User.monthly_ai_budget_usd` per user and calendar month.
+
+- Hydrated lazily from the user's budget + SUM(ai_call_logs.cost_usd)
+  for the month, and periodically resynced so several workers converge
+- Before a call: reserve an estimate (prompt chars/4 tokens + expected
+  output) priced with AICallLog.calculate_cost
+- After a call: settle with the actual usage_metadata cost; the settled
+  spend is persisted asynchronously through the ai_call_logs writer
+- Near the budget the call is downgraded to the cheapest model; past it
+  the call is denied and the caller falls back to the rule engine
+"""
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+
+class AIBudgetExceeded(Exception):
+    """Raised when a user's monthly AI budget cannot cover another call."""
+
+
+# Ledger decisions
+ALLOW = "ALLOW"
+DOWNGRADE = "DOWNGRADE"
+DENY = "DENY"
+
+
+def current_month() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m")
+
+
+def model_cost(model: str, input_tokens: int, output_tokens: int) -> float:
+    """AICallLog price table, accepting 'models/...' ids as used by GeminiClient."""
+    from models.ai_call_log import AICallLog
+    return AICallLog.calculate_cost(model.replace("models/", ""), input_tokens, output_tokens)
+
+
+def estimate_cost(model: str, prompt: str, expected_output_tokens: int = 600) -> float:
+    """Pre-call estimate: ~4 chars per prompt token plus a typical response."""
+    return model_cost(model, len(prompt) // 4, expected_output_tokens)
+
+
+@dataclass
+class LedgerEntry:
+    month: str
+    budget_usd: float
+    spent_usd: float = 0.0
+    reserved_usd: float = 0.0
+    synced_at: float = 0.0
+
+    @property
+    def committed_usd(self) -> float:
+        return self.spent_usd + self.reserved_usd
+
+    @property
+    def remaining_usd(self) -> float:
+        return self.budget_usd - self.committed_usd
+
+
+@dataclass
+class Reservation:
+    user_id: str
+    month: str
+    amount_usd: float
+    decision: str
+
+
+class AICostLedger:
+    """In-memory per-user, per-month spend with reserve/settle accounting."""
+
+    def __init__(self, downgrade_threshold: float = 0.8, resync_seconds: int = 300, default_budget_usd: float = 5.0):
+        self.downgrade_threshold = downgrade_threshold  # Fraction of budget after which we downgrade
+        self.resync_seconds = resync_seconds
+        self.default_budget_usd = default_budget_usd
+        self._entries: Dict[str, LedgerEntry] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+        # Metrics
+        self.reservations = 0
+        self.downgrades = 0
+        self.denials = 0
+        self.hydrations = 0
+        self.hydration_failures = 0
+
+    # ------------------------------------------
+    # Hydration
+    # ------------------------------------------
+
+    def _load_from_db(self, user_id: str, month: str) -> Tuple[Optional[float], float]:
+        """(budget, spent this month) from users + ai_call_logs."""
+        from sqlalchemy import func
+        from models.base import SessionLocal
+        from models.user import User
+        from models.ai_call_log import AICallLog
+
+        month_start = datetime.strptime(month, "%Y-%m")
+        db = SessionLocal()
+        try:
+            budget = db.query(User.monthly_ai_budget_usd).filter(User.id == user_id).scalar()
+            spent = db.query(func.coalesce(func.sum(AICallLog.cost_usd), 0.0)).filter(
+                AICallLog.user_id == user_id,
+                AICallLog.created_at >= month_start,
+            ).scalar()
+            return (float(budget) if budget is not None else None), float(spent or 0.0)
+        finally:
+            db.close()
+
+    async def ensure_loaded(self, user_id: str) -> LedgerEntry:
+        user_id = str(user_id)
+        month = current_month()
+        entry = self._entries.get(user_id)
+        if entry and entry.month == month and time.time() - entry.synced_at < self.resync_seconds:
+            return entry
+
+        lock = self._locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(user_id)
+            if entry and entry.month == month and time.time() - entry.synced_at < self.resync_seconds:
+                return entry
+            if entry is None or entry.month != month:
+                entry = LedgerEntry(month=month, budget_usd=self.default_budget_usd)
+                self._entries[user_id] = entry
+            try:
+                budget, spent = await asyncio.to_thread(self._load_from_db, user_id, month)
+                if budget is not None:
+                    entry.budget_usd = budget
+                # DB lags our own unflushed log rows; other workers' spend only shows up there
+                entry.spent_usd = max(entry.spent_usd, spent)
+                self.hydrations += 1
+            except Exception as e:
+                self.hydration_failures += 1
+                print(f"⚠️ [CostLedger] Could not hydrate {user_id}: {e}")
+            entry.synced_at = time.time()
+            return entry
+
+    # ------------------------------------------
+    # Reserve / settle
+    # ------------------------------------------
+
+    def decide(self, entry: LedgerEntry, estimate_usd: float) -> str:
+        if entry.committed_usd + estimate_usd > entry.budget_usd:
+            return DENY
+        if entry.committed_usd + estimate_usd > entry.budget_usd * self.downgrade_threshold:
+            return DOWNGRADE
+        return ALLOW
+
+    async def reserve(self, user_id: str, estimate_usd: float) -> Reservation:
+        """Reserve an estimated cost, or raise AIBudgetExceeded."""
+        entry = await self.ensure_loaded(user_id)
+        decision = self.decide(entry, estimate_usd)
+        if decision == DENY:
+            self.denials += 1
+            raise AIBudgetExceeded(
+                f"Monthly AI budget exhausted (${entry.committed_usd:.4f}/${entry.budget_usd:.2f})"
+            )
+        if decision == DOWNGRADE:
+            self.downgrades += 1
+        entry.reserved_usd += estimate_usd
+        self.reservations += 1
+        return Reservation(user_id=str(user_id), month=entry.month, amount_usd=estimate_usd, decision=decision)
+
+    def settle(self, reservation: Reservation, actual_usd: float = 0.0):
+        """Replace the reservation with the actual cost (0 when the call failed)."""
+        entry = self._entries.get(reservation.user_id)
+        if not entry or entry.month != reservation.month:
+            return
+        entry.reserved_usd = max(entry.reserved_usd - reservation.amount_usd, 0.0)
+        entry.spent_usd += actual_usd
+
+    async def has_headroom(self, user_id: str) -> bool:
+        """Cheap pre-check for callers that can skip AI entirely (e.g. check_trade)."""
+        entry = await self.ensure_loaded(user_id)
+        return entry.remaining_usd > 0
+
+    async def allows_speculative(self, user_id: str, estimate_usd: float) -> bool:
+        """Precomputed/optional work only runs while the user is below the downgrade threshold."""
+        entry = await self.ensure_loaded(user_id)
+        return self.decide(entry, estimate_usd) == ALLOW
+
+    def models_for(self, decision: str, candidates: List[str]) -> List[str]:
+        """Downgraded calls go to the cheapest model first."""
+        if decision != DOWNGRADE:
+            return candidates
+        return sorted(candidates, key=lambda m: model_cost(m, 1000, 1000))
+
+    def get_usage(self, user_id: str) -> Optional[Dict]:
+        entry = self._entries.get(str(user_id))
+        if not entry:
+            return None
+        return {
+            "month": entry.month,
+            "budget_usd": round(entry.budget_usd, 4),
+            "spent_usd": round(entry.spent_usd, 6),
+            "reserved_usd": round(entry.reserved_usd, 6),
+            "remaining_usd": round(entry.remaining_usd, 6),
+        }
+
+    def get_stats(self) -> Dict:
+        return {
+            "users_tracked": len(self._entries),
+            "reservations": self.reservations,
+            "downgrades": self.downgrades,
+            "denials": self.denials,
+            "hydrations": self.hydrations,
+            "hydration_failures": self.hydration_failures,
+        }
+
+
+# ============================================
+# Singleton Instance
+# ============================================
+
+cost_ledger = AICostLedger(
+    downgrade_threshold=float(os.getenv("AI_BUDGET_DOWNGRADE_THRESHOLD", "0.8")),
+    resync_seconds=int(os.getenv("AI_BUDGET_RESYNC_SECONDS", "300")),
+)
@@ -2,9 +2,99 @@ import os
 import json
 import re
 import asyncio
+import time
 from typing import Dict, List, Any, Optional
-from google import genai
 from pydantic import BaseModel
+from .backends import create_backend
+from .call_log_writer import call_log_writer, current_user_id, extract_usage
+from .cost_ledger import cost_ledger, estimate_cost, model_cost
+from .prompts.coaching_prompts import format_chat_history
+from .scheduler import ai_scheduler
+
+
+# Random trading tips for engaging market-analysis fallback
+MARKET_TRADING_TIPS = [
+    {"headline": "Kỷ luật là vũ khí mạnh nhất của trader.", "tip": "Đặt stop loss trước khi vào lệnh."},
+    {"headline": "Không có phân tích thị trường? Không vào lệnh.", "tip": "Chờ dữ liệu ổn định trước khi giao dịch."},
+    {"headline": "Một ngày không trade cũng là chiến thắng.", "tip": "Đứng ngoài khi không chắc chắn."},
+    {"headline": "Bảo vệ vốn quan trọng hơn lợi nhuận.", "tip": "Giảm 50% khối lượng khi thị trường mờ mịt."},
+    {"headline": "Trader giỏi biết khi nào KHÔNG vào lệnh.", "tip": "Kiên nhẫn chờ cơ hội rõ ràng."},
+    {"headline": "Revenge trade = Tự hủy tài khoản.", "tip": "Nghỉ 30 phút sau mỗi lệnh thua."},
+    {"headline": "Trend is your friend, cho đến khi nó kết thúc.", "tip": "Luôn xác định xu hướng trước khi trade."},
+    {"headline": "Volume nhỏ, rủi ro nhỏ, sống lâu hơn.", "tip": "Max 2% rủi ro mỗi lệnh."},
+]
+
+
+def get_market_fallback() -> Dict:
+    """Engaging CAUTION fallback used when no market analysis is available."""
+    import random
+    tip = random.choice(MARKET_TRADING_TIPS)
+    return {
+        "danger_level": "CAUTION",
+        "danger_score": 50,
+        "color_code": "🟡",
+        "headline": tip["headline"],
+        "risk_factors": [
+            {"factor": "AI Không khả dụng", "severity": "MEDIUM", "description": "Hệ thống phân tích AI tạm ngưng. Giao dịch thận trọng.", "impact": "MEDIUM"},
+            {"factor": "Không có dữ liệu realtime", "severity": "MEDIUM", "description": "Thiếu thông tin thị trường thực. Giảm khối lượng 50%.", "impact": "MEDIUM"},
+            {"factor": "Cảnh báo kỷ luật", "severity": "HIGH", "description": tip["tip"], "impact": "HIGH"},
+        ],
+        "factors": {"volatility": 50, "liquidity": 50, "leverage": 50, "sentiment": 50, "events": 50},
+        "recommendation": {
+            "action": "WAIT",
+            "position_adjustment": "Giảm 50% hoặc đứng ngoài.",
+            "stop_adjustment": "Nới rộng stop loss nếu đã có lệnh.",
+            "rationale": tip["tip"]
+        }
+    }
+
+
+# Static check-in questions served when no AI-generated set is available
+FALLBACK_CHECKIN_QUESTIONS = [
+    {"id": 1, "text": "Năng lượng sáng nay của bạn thế nào?", "type": "multiple-choice", "multiple_choice": {"options": ["Rất tốt", "Hơi mệt", "Đang ức chế"]}},
+    {"id": 2, "text": "Bạn có thấy thị trường đang dụ dỗ mình không?", "type": "multiple-choice", "multiple_choice": {"options": ["Không, tôi có kế hoạch", "Hơi FOMO", "Đang rất muốn vào lệnh"]}},
+    {"id": 3, "text": "Mục tiêu quan trọng nhất hôm nay?", "type": "multiple-choice", "multiple_choice": {"options": ["Tuân thủ stoploss", "Chỉ vào đúng setup", "Dừng sớm nếu lỗ"]}}
+]
+
+
+# Per-section trade fields for the fan-out reports (frontend and API spellings).
+# Each section sees only the fields it reasons about instead of the whole trade.
+OUTCOME_FIELDS = ("symbol", "asset", "side", "direction", "status", "pnl", "ai_decision", "decision", "entry_time", "timestamp")
+RISK_FIELDS = OUTCOME_FIELDS + ("quantity", "positionSize", "entry_price", "entryPrice", "exit_price", "exitPrice",
+                                "stop_loss", "stopLoss", "take_profit", "takeProfit")
+PROCESS_FIELDS = OUTCOME_FIELDS + ("process_score", "processScore", "reasoning", "notes", "emotion")
+REPORT_MAX_TRADES = int(os.getenv("AI_REPORT_MAX_TRADES", "30"))
+
+# Report endpoints keep only the most recent trades of a posted history (newest
+# first); totals come from /api/progress/summary. Older clients posted everything.
+REPORT_HISTORY_LIMIT = int(os.getenv("AI_REPORT_HISTORY_LIMIT", "50"))
+
+
+def _trade_slice(history: List[Dict], fields: tuple, limit: int = REPORT_MAX_TRADES) -> List[Dict]:
+    """Project trades onto `fields` and keep at most `limit` of them (history is newest first)."""
+    return [
+        {key: trade[key] for key in fields if trade.get(key) not in (None, "")}
+        for trade in history[:limit]
+    ]
+
+
+def _history_summary(history: List[Dict]) -> Dict[str, Any]:
+    """Aggregates computed once in Python, so sections don't need the raw history for totals."""
+    pnls = [trade.get("pnl") or 0 for trade in history]
+    wins = sum(1 for pnl in pnls if pnl > 0)
+    decisions = [trade.get("ai_decision") or trade.get("decision") for trade in history]
+    scores = [s for s in (trade.get("process_score", trade.get("processScore")) for trade in history) if s is not None]
+    return {
+        "total_trades": len(history),
+        "wins": wins,
+        "losses": sum(1 for pnl in pnls if pnl < 0),
+        "win_rate": round(wins / len(history) * 100, 1) if history else 0,
+        "total_pnl": round(sum(pnls), 2),
+        "blocked": decisions.count("BLOCK"),
+        "warned": decisions.count("WARN"),
+        "avg_process_score": round(sum(scores) / len(scores), 1) if scores else None,
+    }
+
 
 class GeminiClient:
     """
@@ -50,68 +140,105 @@ Hãy tập trung vào quy trình của bạn thay vì dự đoán giá."
 """
 
     
-    def __init__(self):
-        api_key = os.getenv('GEMINI_API_KEY')
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY environment variable not set")
-        self.client = genai.Client(api_key=api_key)
+    def __init__(self, backend=None):
+        # Transport: live Gemini by default, or record/replay/simulate (see backends.py)
+        self.backend = backend or create_backend()
         # Simple memory cache for repeated expensive calls
         self._market_cache = None
         self._market_cache_time = 0
-        self._checkin_cache = {} # Keyed by user context
-        self._checkin_cache_time = 0
+        self._checkin_cache = {} # Keyed by user context -> (questions, timestamp)
         self._lock = asyncio.Lock()
-        self._semaphore = asyncio.Semaphore(2) # Allow max 2 concurrent AI calls
+        # Split long reports into concurrent sections (see _generate_sections)
+        self.report_fan_out = os.getenv("AI_REPORT_FAN_OUT", "true").lower() == "true"
     
-    async def _generate(self, prompt: str, skip_safety_rails: bool = False) -> str:
+    async def _generate(self, prompt: str, skip_safety_rails: bool = False, call_type: str = "general") -> str:
         """Helper to generate content with multiple model fallback and concurrency control.
         
         Args:
             prompt: The prompt to send to the AI
             skip_safety_rails: If True, don't prepend SAFETY_RAILS (for non-chat prompts like market analysis)
+            call_type: Feature label recorded in ai_call_logs (pre_trade, coach, weekly_report, ...)
+
+        Raises:
+            AIBudgetExceeded: the current user's monthly AI budget is used up
         """
-        async with self._semaphore:
-            max_retries_per_model = 2
-            last_exception = None
-            
-            # Prepend safety rails to every prompt (unless skipped)
-            safe_prompt = prompt if skip_safety_rails else (self.SAFETY_RAILS + prompt)
+        # Prepend safety rails to every prompt (unless skipped)
+        safe_prompt = prompt if skip_safety_rails else (self.SAFETY_RAILS + prompt)
+
+        # Reserve against the user's monthly budget (background jobs have no user)
+        models = self.MODELS
+        reservation = None
+        user_id = current_user_id.get()
+        if user_id:
+            reservation = await cost_ledger.reserve(user_id, estimate_cost(self.MODELS[0], safe_prompt))
+            models = cost_ledger.models_for(reservation.decision, self.MODELS)
+
+        # Settled exactly once, also on cancellation (client disconnect, fan-out
+        # cancel, shutdown): a leaked reservation would count against the budget
+        actual_cost = 0.0
+        try:
+            async with ai_scheduler.slot():  # Priority-aware concurrency limit (see scheduler.py)
+                max_retries_per_model = 2
+                last_exception = None
+                attempts = 0
+                model_id = models[0]
+                start = time.perf_counter()
             
-            for model_id in self.MODELS:
-                delay = 1
-                for i in range(max_retries_per_model):
-                    try:
-                        response = await self.client.aio.models.generate_content(
-                            model=model_id,
-                            contents=safe_prompt
-                        )
-                        if not response or not response.text:
-                            raise ValueError(f"Empty response from Gemini {model_id}")
-                        return response.text
-                    except Exception as e:
-                        last_exception = e
-                        error_msg = str(e).lower()
+                for model_id in models:
+                    delay = 1
+                    for i in range(max_retries_per_model):
+                        attempts += 1
+                        try:
+                            response = await self.backend.generate(model_id, safe_prompt)
+                            if not response or not response.text:
+                                raise ValueError(f"Empty response from Gemini {model_id}")
+                            usage = extract_usage(response)
+                            actual_cost = model_cost(model_id, usage["input_tokens"], usage["output_tokens"])
+                            call_log_writer.log(
+                                call_type=call_type,
+                                model=model_id,
+                                latency_ms=(time.perf_counter() - start) * 1000,
+                                retries=attempts - 1,
+                                extra={"prompt_chars": len(safe_prompt), "budget_decision": reservation.decision if reservation else None},
+                                **usage,
+                            )
+                            return response.text
+                        except Exception as e:
+                            last_exception = e
+                            error_msg = str(e).lower()
                         
-                        # If its a quota error (429) or not found (404), maybe try next model
-                        if "429" in error_msg:
-                            if "limit: 0" in error_msg:
-                                print(f"⚠️ Model {model_id} has 0 limit. Trying next model...")
-                                break # Move to next model
+                            # If its a quota error (429) or not found (404), maybe try next model
+                            if "429" in error_msg:
+                                if "limit: 0" in error_msg:
+                                    print(f"⚠️ Model {model_id} has 0 limit. Trying next model...")
+                                    break # Move to next model
                             
-                            print(f"ℹ️ Quota hit for {model_id}. Retry {i+1}/{max_retries_per_model}...")
-                            await asyncio.sleep(delay)
-                            delay *= 2
-                        elif "404" in error_msg or "not found" in error_msg:
-                            print(f"⚠️ Model {model_id} not found. Trying next model...")
-                            break # Move to next model
-                        else:
-                            print(f"❌ Gemini Error ({model_id}): {e}")
-                            # For other errors, wait a bit then try one more retry or next model
-                            await asyncio.sleep(0.5)
+                                print(f"ℹ️ Quota hit for {model_id}. Retry {i+1}/{max_retries_per_model}...")
+                                await asyncio.sleep(delay)
+                                delay *= 2
+                            elif "404" in error_msg or "not found" in error_msg:
+                                print(f"⚠️ Model {model_id} not found. Trying next model...")
+                                break # Move to next model
+                            else:
+                                print(f"❌ Gemini Error ({model_id}): {e}")
+                                # For other errors, wait a bit then try one more retry or next model
+                                await asyncio.sleep(0.5)
             
-            if last_exception:
-                raise last_exception
-            return ""
+                call_log_writer.log(
+                    call_type=call_type,
+                    model=model_id,
+                    latency_ms=(time.perf_counter() - start) * 1000,
+                    success="timeout" if isinstance(last_exception, asyncio.TimeoutError) else "false",
+                    error_message=str(last_exception) if last_exception else "No response",
+                    retries=max(attempts - 1, 0),
+                    extra={"prompt_chars": len(safe_prompt)},
+                )
+                if last_exception:
+                    raise last_exception
+                return ""
+        finally:
+            if reservation:
+                cost_ledger.settle(reservation, actual_cost)
 
     def _clean_and_parse_json(self, text: str) -> Dict:
         """Parse JSON from Gemini response, cleaning markdown if present."""
@@ -135,20 +262,47 @@ Hãy tập trung vào quy trình của bạn thay vì dự đoán giá."
                     pass
             raise ValueError(f"Failed to parse JSON response: {text[:100]}...") from e
 
-    async def generate_checkin_questions(self, context: Dict) -> List[Dict]:
-        """Generate personalized check-in questions with caching."""
-        import time
-        now = time.time()
-        
-        # Cache key based on recent trades count
-        cache_key = f"q_{context.get('recent_trades_count', 0)}"
-        if cache_key in self._checkin_cache and (now - self._checkin_cache_time < 3600):
-            return self._checkin_cache[cache_key]
-    async def generate_json_response(self, prompt: str, system_prompt: str) -> Dict[str, Any]:
+    async def _generate_sections(self, sections: Dict[str, tuple], call_type: str) -> Dict[str, Any]:
+        """Fan-out for long reports: run independent section prompts concurrently.
+
+        Args:
+            sections: name -> (prompt, fallback). The fallback's keys define which
+                fields the section owns; a failed or incomplete section keeps them.
+            call_type: Feature label for ai_call_logs
+
+        Wall time is roughly the slowest section instead of one long generation.
+        """
+        names = list(sections)
+        results = await asyncio.gather(
+            *(self._generate(sections[name][0], call_type=call_type) for name in names),
+            return_exceptions=True
+        )
+
+        merged: Dict[str, Any] = {}
+        degraded = False
+        for name, result in zip(names, results):
+            fallback = sections[name][1]
+            section = dict(fallback)
+            if isinstance(result, BaseException):
+                degraded = True
+                print(f"⚠️ [{call_type}] Section '{name}' failed, using fallback: {result}")
+            else:
+                try:
+                    parsed = self._clean_and_parse_json(result)
+                    section.update({key: parsed[key] for key in fallback if parsed.get(key) not in (None, "", [])})
+                except Exception as e:
+                    degraded = True
+                    print(f"⚠️ [{call_type}] Section '{name}' unparseable, using fallback: {e}")
+            merged.update(section)
+        if degraded:
+            merged["is_fallback"] = True  # Keeps partial answers out of the result cache
+        return merged
+
+    async def generate_json_response(self, prompt: str, system_prompt: str, call_type: str = "general") -> Dict[str, Any]:
         """Generic helper to get JSON from Gemini."""
         full_prompt = f"{system_prompt}\n\nInput Context:\n{prompt}\n\nReturn ONLY valid JSON."
         try:
-            response_text = await self._generate(full_prompt)
+            response_text = await self._generate(full_prompt, call_type=call_type)
             return self._clean_and_parse_json(response_text)
         except Exception as e:
             print(f"❌ Gemini JSON Error: {e}")
@@ -185,7 +339,7 @@ Hãy tập trung vào quy trình của bạn thay vì dự đoán giá."
         NGUYÊN TẮC: Luôn tìm kiếm TIẾN BỘ, dùng ngôn ngữ tích cực, hướng về tương lai."""
         
         try:
-            return await self.generate_json_response(json.dumps({"answers": answers, "context": context}, ensure_ascii=False), system_prompt)
+            return await self.generate_json_response(json.dumps({"answers": answers, "context": context}, ensure_ascii=False), system_prompt, call_type="checkin_analysis")
         except Exception:
             return {
                 "emotional_state": "CALM",
@@ -195,16 +349,11 @@ Hãy tập trung vào quy trình của bạn thay vì dự đoán giá."
                 "encouragement": "Chúc bạn một ngày giao dịch tỉnh táo!",
                 "progress_marker": {"milestone": "Duy trì kỷ luật", "visual_metaphor": "Hạt mầm kỷ luật đang nảy mầm"}
             }
-    async def generate_checkin_questions(self, context: Dict) -> List[Dict]:
-        """Generate personalized check-in questions with 'Mind Scan' themes."""
-        import time
-        now = time.time()
-        
-        # Cache key based on recent trades count
-        cache_key = f"q_{context.get('recent_trades_count', 0)}"
-        if cache_key in self._checkin_cache and (now - self._checkin_cache_time < 3600):
-            return self._checkin_cache[cache_key]
+    async def fetch_checkin_questions(self, context: Dict) -> Optional[List[Dict]]:
+        """Generate one fresh set of 'Mind Scan' check-in questions (no cache, no fallback).
 
+        Returns None if the model fails, so pool refills can simply retry later.
+        """
         system_prompt = """
         Bạn là Kaito - Huấn luyện viên kỷ luật trading. 
         Sinh 3 câu hỏi trắc nghiệm cho check-in sáng nay (Mind Scan), TUÂN THỦ:
@@ -236,24 +385,33 @@ Hãy tập trung vào quy trình của bạn thay vì dự đoán giá."
         prompt = f"Context: {json.dumps(context, ensure_ascii=False)}"
         
         try:
-            result = await self.generate_json_response(prompt, system_prompt)
+            result = await self.generate_json_response(prompt, system_prompt, call_type="checkin_questions")
             questions = result.get("questions", [])
             for q in questions:
                 # Ensure structure for frontend
                 q['type'] = 'multiple-choice'
                 q['multiple_choice'] = {"options": [opt['text'] for opt in q.get('options', [])]}
-            
-            if questions:
-                self._checkin_cache = {cache_key: questions}
-                self._checkin_cache_time = now
-            return questions
+            return questions or None
         except Exception as e:
             print(f"❌ Gemini Error (generate_checkin_questions): {e}")
-            return [
-                {"id": 1, "text": "Năng lượng sáng nay của bạn thế nào?", "type": "multiple-choice", "multiple_choice": {"options": ["Rất tốt", "Hơi mệt", "Đang ức chế"]}},
-                {"id": 2, "text": "Bạn có thấy thị trường đang dụ dỗ mình không?", "type": "multiple-choice", "multiple_choice": {"options": ["Không, tôi có kế hoạch", "Hơi FOMO", "Đang rất muốn vào lệnh"]}},
-                {"id": 3, "text": "Mục tiêu quan trọng nhất hôm nay?", "type": "multiple-choice", "multiple_choice": {"options": ["Tuân thủ stoploss", "Chỉ vào đúng setup", "Dừng sớm nếu lỗ"]}}
-            ]
+            return None
+
+    async def generate_checkin_questions(self, context: Dict) -> List[Dict]:
+        """Generate personalized check-in questions with 'Mind Scan' themes (1h cache per context)."""
+        import time
+        now = time.time()
+        
+        # Cache key based on recent trades count; each key keeps its own timestamp
+        cache_key = f"q_{context.get('recent_trades_count', 0)}"
+        cached = self._checkin_cache.get(cache_key)
+        if cached and (now - cached[1] < 3600):
+            return cached[0]
+
+        questions = await self.fetch_checkin_questions(context)
+        if questions:
+            self._checkin_cache[cache_key] = (questions, now)
+            return questions
+        return [dict(q) for q in FALLBACK_CHECKIN_QUESTIONS]
 
     async def get_trade_evaluation(self, context: Dict) -> Dict:
         """Đánh giá lệnh yêu cầu như một 'Nghi thức trước giao dịch' (Kaito)."""
@@ -279,7 +437,7 @@ Hãy tập trung vào quy trình của bạn thay vì dự đoán giá."
         GIỌNG ĐIỆU: Đồng cảm nhưng kiên định. Nếu user đang hưng phấn, hãy nhắc về risk. Nếu tilted, hãy đồng cảm và khuyên dừng."""
         
         try:
-            return await self.generate_json_response(json.dumps(context, ensure_ascii=False), system_prompt)
+            return await self.generate_json_response(json.dumps(context, ensure_ascii=False), system_prompt, call_type="pre_trade")
         except Exception:
             return {
                 "decision": "WARN",
@@ -316,14 +474,15 @@ Hãy tập trung vào quy trình của bạn thay vì dự đoán giá."
         NGUYÊN TẮC: Luôn tìm kiếm ĐIỂM SÁNG (ví dụ: TUÂN THỦ STOPLOSS là thành công lớn)."""
         
         try:
-            return await self.generate_json_response(json.dumps({"trade": trade_data, "stats": user_stats}, ensure_ascii=False), system_prompt)
+            return await self.generate_json_response(json.dumps({"trade": trade_data, "stats": user_stats}, ensure_ascii=False), system_prompt, call_type="post_trade")
         except Exception:
             return {
                 "trade_summary": "Lệnh giao dịch đã hoàn tất.",
                 "behavioral_pattern": {"identified": False, "pattern_name": None, "description": None, "frequency": None},
                 "growth_observation": {"improvement": "Sự hiện diện", "area_to_work": "Kỷ luật", "suggestion": "Hãy duy trì quy trình"},
                 "coaching_question": "Bạn học được gì từ lệnh này?",
-                "wisdom_nugget": "Mỗi lệnh là một bài học."
+                "wisdom_nugget": "Mỗi lệnh là một bài học.",
+                "is_fallback": True
             }
 
         """Đánh giá quy trình trading dưới dạng 'Kata Assessment' (Kaito)."""
@@ -354,7 +513,7 @@ Hãy tập trung vào quy trình của bạn thay vì dự đoán giá."
         TIÊU CHÍ: Tập trung vào TIẾN BỘ, tạo cảm giác "đang trên hành trình master kỹ năng"."""
         
         try:
-            return await self.generate_json_response(json.dumps({"trades": trade_history, "checkins": checkin_history}, ensure_ascii=False), system_prompt)
+            return await self.generate_json_response(json.dumps({"trades": trade_history, "checkins": checkin_history}, ensure_ascii=False), system_prompt, call_type="process_evaluation")
         except Exception:
             return {
                 "kata_score": 70,
@@ -363,50 +522,12 @@ Hãy tập trung vào quy trình của bạn thay vì dự đoán giá."
                 "transformation_story": {"before": "Dễ bị lôi cuốn", "after": "Đã biết quan sát", "next_step": "Tối ưu hóa Entry"}
             }
 
-    async def generate_market_analysis(self) -> Dict:
-        """Analyze market danger level with real-time web search, 8s timeout, and 10-minute caching."""
-        import time
-        import asyncio
-        import random
-        now = time.time()
-        
-        # Random trading tips for engaging fallback
-        TRADING_TIPS = [
-            {"headline": "Kỷ luật là vũ khí mạnh nhất của trader.", "tip": "Đặt stop loss trước khi vào lệnh."},
-            {"headline": "Không có phân tích thị trường? Không vào lệnh.", "tip": "Chờ dữ liệu ổn định trước khi giao dịch."},
-            {"headline": "Một ngày không trade cũng là chiến thắng.", "tip": "Đứng ngoài khi không chắc chắn."},
-            {"headline": "Bảo vệ vốn quan trọng hơn lợi nhuận.", "tip": "Giảm 50% khối lượng khi thị trường mờ mịt."},
-            {"headline": "Trader giỏi biết khi nào KHÔNG vào lệnh.", "tip": "Kiên nhẫn chờ cơ hội rõ ràng."},
-            {"headline": "Revenge trade = Tự hủy tài khoản.", "tip": "Nghỉ 30 phút sau mỗi lệnh thua."},
-            {"headline": "Trend is your friend, cho đến khi nó kết thúc.", "tip": "Luôn xác định xu hướng trước khi trade."},
-            {"headline": "Volume nhỏ, rủi ro nhỏ, sống lâu hơn.", "tip": "Max 2% rủi ro mỗi lệnh."},
-        ]
-        
-        def get_random_fallback():
-            tip = random.choice(TRADING_TIPS)
-            return {
-                "danger_level": "CAUTION",
-                "danger_score": 50,
-                "color_code": "🟡",
-                "headline": tip["headline"],
-                "risk_factors": [
-                    {"factor": "AI Không khả dụng", "severity": "MEDIUM", "description": "Hệ thống phân tích AI tạm ngưng. Giao dịch thận trọng.", "impact": "MEDIUM"},
-                    {"factor": "Không có dữ liệu realtime", "severity": "MEDIUM", "description": "Thiếu thông tin thị trường thực. Giảm khối lượng 50%.", "impact": "MEDIUM"},
-                    {"factor": "Cảnh báo kỷ luật", "severity": "HIGH", "description": tip["tip"], "impact": "HIGH"},
-                ],
-                "factors": {"volatility": 50, "liquidity": 50, "leverage": 50, "sentiment": 50, "events": 50},
-                "recommendation": {
-                    "action": "WAIT",
-                    "position_adjustment": "Giảm 50% hoặc đứng ngoài.",
-                    "stop_adjustment": "Nới rộng stop loss nếu đã có lệnh.",
-                    "rationale": tip["tip"]
-                }
-            }
-        
-        # Return cache if less than 10 minutes old (600 seconds)
-        if self._market_cache and (now - self._market_cache_time < 600):
-            return self._market_cache
+    async def fetch_market_analysis(self) -> Optional[Dict]:
+        """Generate a fresh market danger analysis (15s timeout, no cache, no fallback).
 
+        Returns None when the model times out, errors or returns an invalid structure,
+        so callers can decide whether to keep serving their previous snapshot.
+        """
         prompt = f"""
         Bạn là chuyên gia phân tích thị trường crypto với nhiều năm kinh nghiệm.
         
@@ -442,47 +563,57 @@ Hãy tập trung vào quy trình của bạn thay vì dự đoán giá."
             print("[MarketAnalysis] Starting AI generation...")
             # Use standard generation (same as chat) - more reliable
             async with asyncio.timeout(15):
-                response_text = await self._generate(prompt, skip_safety_rails=True)
+                response_text = await self._generate(prompt, skip_safety_rails=True, call_type="market_analysis")
 
             print(f"[MarketAnalysis] Got response, length: {len(response_text) if response_text else 0}")
 
             if not response_text:
                 print("⚠️ Market analysis: Empty response")
-                if self._market_cache:
-                    return self._market_cache
-                return get_random_fallback()
+                return None
 
             result = self._clean_and_parse_json(response_text)
             print(f"[MarketAnalysis] Parsed JSON, has danger_level: {'danger_level' in result if result else False}")
             
             if result and "danger_level" in result:
-                # Update cache on success
-                self._market_cache = result
-                self._market_cache_time = now
                 print(f"[MarketAnalysis] SUCCESS - danger_level: {result.get('danger_level')}")
                 return result
-            else:
-                print(f"⚠️ Market analysis: Invalid JSON structure - {result}")
-                if self._market_cache:
-                    return self._market_cache
-                return get_random_fallback()
+
+            print(f"⚠️ Market analysis: Invalid JSON structure - {result}")
+            return None
                 
         except asyncio.TimeoutError:
-            print("⏱️ Market analysis timeout (15s) - returning cached or fallback")
-            if self._market_cache:
-                return self._market_cache
-            return get_random_fallback()
+            print("⏱️ Market analysis timeout (15s)")
+            return None
         except Exception as e:
             print(f"❌ Gemini Error (generate_market_analysis): {type(e).__name__}: {e}")
-            
-            # If AI fails, still return previous cache if available, even if old
-            if self._market_cache:
-                return self._market_cache
-            
-            return get_random_fallback()
+            return None
+
+    async def generate_market_analysis(self) -> Dict:
+        """Analyze market danger level with 15s timeout and 10-minute caching."""
+        import time
+        now = time.time()
+        
+        # Return cache if less than 10 minutes old (600 seconds)
+        if self._market_cache and (now - self._market_cache_time < 600):
+            return self._market_cache
+
+        result = await self.fetch_market_analysis()
+        if result:
+            # Update cache on success
+            self._market_cache = result
+            self._market_cache_time = now
+            return result
 
-    async def generate_chat_response(self, message: str, history: List[Dict], mode: str = "COACH") -> Dict:
-        """Generate a response for the AI Coach/Protector chat using Kaito persona."""
+        # If AI fails, still return previous cache if available, even if old
+        if self._market_cache:
+            return self._market_cache
+        return get_market_fallback()
+
+    async def generate_chat_response(self, message: str, history: List[Dict], mode: str = "COACH", summary: str = "") -> Dict:
+        """Generate a response for the AI Coach/Protector chat using Kaito persona.
+
+        `history` is the recent turns verbatim; `summary` condenses older ones.
+        """
         system_prompt = """
         Bạn là Kaito - Huấn luyện viên trading chuyên về tâm lý và kỷ luật.
         
@@ -501,8 +632,10 @@ Hãy tập trung vào quy trình của bạn thay vì dự đoán giá."
         """
         
         prompt = f"""
+        Conversation Summary: {summary or "(none)"}
+        Recent Conversation:
+        {format_chat_history(history[-10:])}
         User Message: {message}
-        Chat History: {json.dumps(history[-10:])}
         
         Return JSON ONLY:
         {{
@@ -511,11 +644,32 @@ Hãy tập trung vào quy trình của bạn thay vì dự đoán giá."
         }}
         """
         try:
-            return await self.generate_json_response(prompt, system_prompt)
+            return await self.generate_json_response(prompt, system_prompt, call_type="coach")
         except Exception as e:
             print(f"❌ Gemini Error (generate_chat_response): {e}")
             return {"display_text": "Tôi luôn ở đây để lắng nghe bạn. Hãy cùng hít thở sâu một chút nhé.", "internal_reasoning": str(e)}
 
+    async def summarize_conversation(self, previous_summary: str, turns: List[Dict]) -> Optional[str]:
+        """Fold older chat turns into the rolling conversation summary. None on failure."""
+        prompt = f"""
+        Bạn đang duy trì bản tóm tắt cuộc trò chuyện giữa trader và Coach Kaito.
+        Cập nhật bản tóm tắt cũ bằng các lượt hội thoại mới bên dưới.
+        Giữ lại: trạng thái cảm xúc, cam kết/mục tiêu của trader, bài học, sự kiện giao dịch quan trọng.
+        Tối đa 120 từ, tiếng Việt, không thêm lời khuyên.
+
+        Tóm tắt cũ: {previous_summary or "(chưa có)"}
+        Lượt hội thoại mới:
+        {format_chat_history(turns)}
+
+        Chỉ trả về đoạn tóm tắt mới (plain text).
+        """
+        try:
+            text = await self._generate(prompt, skip_safety_rails=True, call_type="chat_summary")
+            return text.strip() or None
+        except Exception as e:
+            print(f"❌ Gemini Error (summarize_conversation): {e}")
+            return None
+
     async def detect_emotional_tilt(self, stats: Dict, history: List[Dict]) -> Dict:
         """Detect if the trader is on 'tilt' and needs intervention."""
         prompt = f"""
@@ -532,7 +686,7 @@ Hãy tập trung vào quy trình của bạn thay vì dự đoán giá."
         Return ONLY valid JSON.
         """
         try:
-            response_text = await self._generate(prompt)
+            response_text = await self._generate(prompt, call_type="tilt_detection")
             data = self._clean_and_parse_json(response_text)
             if not data.get("tilt_detected", False):
                 return {"tilt_detected": False}
@@ -569,23 +723,53 @@ Hãy tập trung vào quy trình của bạn thay vì dự đoán giá."
 
     async def generate_weekly_goals(self, history: List[Dict], stats: Dict, checkin_history: List[Dict]) -> Dict:
         """Generate 2 personalized goals for the upcoming week."""
+        if self.report_fan_out:
+            return await self._generate_weekly_goals_sections(history, stats)
+
         prompt = f"""
         Generate 2 trading discipline goals for the next week.
         Stats: {json.dumps(stats)}
-        History: {json.dumps(history[-20:])}
+        History: {json.dumps(history[:20])}
         
         Return a JSON with 'primary_goal', 'secondary_goal' objects including title, description, metric, target.
         LANGUAGE: Vietnamese.
         """
         try:
-            response_text = await self._generate(prompt)
+            response_text = await self._generate(prompt, call_type="weekly_goals")
             return self._clean_and_parse_json(response_text)
         except Exception as e:
             print(f"❌ Gemini Error (generate_weekly_goals): {e}")
-            return {"primary_goal": {"title": "Kỷ luật thép", "description": "Tuân thủ tuyệt đối Stop Loss."}, "secondary_goal": {"title": "Nhật ký đầy đủ", "description": "Ghi chép lại tất cả các lệnh."}}
+            return {"primary_goal": {"title": "Kỷ luật thép", "description": "Tuân thủ tuyệt đối Stop Loss."}, "secondary_goal": {"title": "Nhật ký đầy đủ", "description": "Ghi chép lại tất cả các lệnh."}, "is_fallback": True}
+
+    async def _generate_weekly_goals_sections(self, history: List[Dict], stats: Dict) -> Dict:
+        """Fan-out variant: each goal is generated independently, with distinct focus areas.
+
+        Each goal sees the stats plus only the trade fields of its focus area.
+        """
+        recent = history[:20]  # Callers send newest first
+
+        def goal_prompt(key: str, focus: str, fields: tuple) -> str:
+            return f"""
+        Generate ONE trading discipline goal for the next week, focused on {focus}.
+        Stats: {json.dumps(stats)}
+        History: {json.dumps(_trade_slice(recent, fields))}
+
+        Return JSON: {{"{key}": {{"title": "...", "description": "...", "metric": "...", "target": "..."}}}}
+        LANGUAGE: Vietnamese. Return ONLY valid JSON.
+        """
+
+        return await self._generate_sections({
+            "primary": (goal_prompt("primary_goal", "risk management (stop loss, position size, daily loss limit)", RISK_FIELDS),
+                        {"primary_goal": {"title": "Kỷ luật thép", "description": "Tuân thủ tuyệt đối Stop Loss."}}),
+            "secondary": (goal_prompt("secondary_goal", "process and psychology (journaling, check-ins, cooldown after losses)", PROCESS_FIELDS),
+                          {"secondary_goal": {"title": "Nhật ký đầy đủ", "description": "Ghi chép lại tất cả các lệnh."}}),
+        }, call_type="weekly_goals")
 
     async def generate_weekly_report(self, history: List[Dict]) -> Dict:
         """Generate a weekly summary report."""
+        if self.report_fan_out:
+            return await self._generate_weekly_report_sections(history)
+
         prompt = f"""
         Summarize the past week for this trader.
         History: {json.dumps(history)}
@@ -598,14 +782,52 @@ Hãy tập trung vào quy trình của bạn thay vì dự đoán giá."
         Return ONLY valid JSON.
         """
         try:
-            response_text = await self._generate(prompt)
+            response_text = await self._generate(prompt, call_type="weekly_report")
             return self._clean_and_parse_json(response_text)
         except Exception as e:
             print(f"❌ Gemini Error (generate_weekly_report): {e}")
-            return {"survival_score": 85, "key_achievements": ["Duy trì kỷ luật."], "areas_to_improve": ["Kiểm soát tâm lý."]}
+            return {"survival_score": 85, "key_achievements": ["Duy trì kỷ luật."], "areas_to_improve": ["Kiểm soát tâm lý."], "is_fallback": True}
+
+    async def _generate_weekly_report_sections(self, history: List[Dict]) -> Dict:
+        """Fan-out variant: score, achievements and improvements as concurrent sections.
+
+        The grade works from aggregates; achievements see the trades that went to
+        plan and improvements the losing or flagged ones, capped at REPORT_MAX_TRADES.
+        """
+        summary = json.dumps(_history_summary(history))
+        on_plan, flagged = [], []
+        for trade in history:
+            is_flagged = (trade.get("pnl") or 0) < 0 or (trade.get("ai_decision") or trade.get("decision")) in ("WARN", "BLOCK")
+            (flagged if is_flagged else on_plan).append(trade)
+
+        def section_prompt(task: str, schema: str, trades: Optional[List[Dict]] = None) -> str:
+            data = f"Summary: {summary}"
+            if trades is not None:
+                data += f"\n        Trades: {json.dumps(_trade_slice(trades, PROCESS_FIELDS))}"
+            return f"""
+        Review the past week for this trader. {task}
+        {data}
+
+        Return JSON: {schema}
+        LANGUAGE: Vietnamese. Return ONLY valid JSON.
+        """
+
+        return await self._generate_sections({
+            "grade": (section_prompt("Grade the week's PROCESS discipline (not P&L) as a survival score.",
+                                     '{"survival_score": 0-100}'),
+                      {"survival_score": 85}),
+            "achievements": (section_prompt("List up to 3 concrete behavioral achievements.",
+                                            '{"key_achievements": ["..."]}', on_plan),
+                             {"key_achievements": ["Duy trì kỷ luật."]}),
+            "improvements": (section_prompt("List up to 3 concrete areas to improve (patterns to break).",
+                                            '{"areas_to_improve": ["..."]}', flagged),
+                             {"areas_to_improve": ["Kiểm soát tâm lý."]}),
+        }, call_type="weekly_report")
 
     async def analyze_trader_archetype(self, history: List[Dict], checkin_history: List[Dict]) -> Dict:
         """Analyze the trader's behavioral archetype with detailed insights."""
+        if self.report_fan_out:
+            return await self._analyze_trader_archetype_sections(history, checkin_history)
         
         # Calculate some stats from history
         total_trades = len(history)
@@ -641,7 +863,7 @@ Hãy tập trung vào quy trình của bạn thay vì dự đoán giá."
         Return ONLY valid JSON.
         """
         try:
-            response_text = await self._generate(prompt)
+            response_text = await self._generate(prompt, call_type="archetype")
             return self._clean_and_parse_json(response_text)
         except Exception as e:
             print(f"❌ Gemini Error (analyze_trader_archetype): {e}")
@@ -655,7 +877,91 @@ Hãy tập trung vào quy trình của bạn thay vì dự đoán giá."
                 "micro_habit": "Ghi chép lý do vào/ra lệnh",
                 "weekly_focus": "Tuân thủ quy trình 100%",
                 "winning_pattern": "Đang thu thập data",
-                "losing_pattern": "Đang thu thập data"
+                "losing_pattern": "Đang thu thập data",
+                "is_fallback": True
             }
 
+    async def _analyze_trader_archetype_sections(self, history: List[Dict], checkin_history: List[Dict]) -> Dict:
+        """Fan-out variant: identity, strengths/weaknesses and actions as concurrent sections.
+
+        Identity and actions work from aggregates and check-ins; only the patterns
+        section reads the individual trades.
+        """
+        summary = json.dumps(_history_summary(history), ensure_ascii=False)
+        checkins = json.dumps(checkin_history[:5], ensure_ascii=False)
+        trades = json.dumps(_trade_slice(history, RISK_FIELDS + PROCESS_FIELDS, limit=10), ensure_ascii=False)
+
+        def section_prompt(task: str, schema: str, data: str) -> str:
+            return f"""
+        Phân tích phong cách trading của trader dựa trên dữ liệu thực tế. {task}
+        DỮ LIỆU:
+        {data}
+        TRẢ VỀ JSON: {schema}
+        QUAN TRỌNG: Dựa trên DỮ LIỆU THỰC, không nhận xét chung chung. Return ONLY valid JSON.
+        """
+
+        return await self._generate_sections({
+            "identity": (section_prompt(
+                "Xác định archetype.",
+                '{"archetype": "ANALYTICAL_TRADER" | "SYSTEMATIC_TRADER" | "EMOTIONAL_TRADER" | "IMPULSIVE_TRADER", '
+                '"archetype_name_vi": "...", "description": "1-2 câu"}',
+                f"- Tổng quan: {summary}\n        - Checkin tâm lý: {checkins}"
+            ), {
+                "archetype": "SYSTEMATIC_TRADER",
+                "archetype_name_vi": "Trader Hệ Thống",
+                "description": "Đang trong quá trình xây dựng phong cách trading.",
+            }),
+            "patterns": (section_prompt(
+                "Tìm điểm mạnh/yếu và pattern thắng/thua CỤ THỂ.",
+                '{"primary_strength": "...", "primary_weakness": "...", "winning_pattern": "...", "losing_pattern": "..."}',
+                f"- Tổng quan: {summary}\n        - Lịch sử trade: {trades}"
+            ), {
+                "primary_strength": "Kiên nhẫn học hỏi",
+                "primary_weakness": "Cần thêm dữ liệu để phân tích",
+                "winning_pattern": "Đang thu thập data",
+                "losing_pattern": "Đang thu thập data",
+            }),
+            "actions": (section_prompt(
+                "Đề xuất hành động CỤ THỂ.",
+                '{"action_recommendation": "...", "micro_habit": "...", "weekly_focus": "..."}',
+                f"- Tổng quan: {summary}\n        - Checkin tâm lý: {checkins}"
+            ), {
+                "action_recommendation": "Hoàn thành Dojo sau mỗi lệnh",
+                "micro_habit": "Ghi chép lý do vào/ra lệnh",
+                "weekly_focus": "Tuân thủ quy trình 100%",
+            }),
+        }, call_type="archetype")
+
+    async def generate_learning_insights(self, trade_data: List[Dict], checkin_data: List[Dict]) -> List[Dict]:
+        """Self-Learning Engine: 2-3 insights linking check-in psychology to results ([] on failure)."""
+        prompt = f"""
+        Bạn là Hệ thống Tự Học (Self-Learning Engine) của THEKEY AI. 
+        Dựa trên 15 lệnh gần nhất và 5 lần check-in của trader này, hãy tìm ra 2-3 'Insight' (Sự thấu thị) sâu sắc về hành vi và kết quả của họ.
+        
+        DỮ LIỆU:
+        - Trades: {json.dumps(trade_data, ensure_ascii=False)}
+        - Check-ins: {json.dumps(checkin_data, ensure_ascii=False)}
+        
+        YÊU CẦU:
+        Trả về JSON list các đối tượng:
+        {{
+          "id": "chuỗi ngẫu nhiên",
+          "insight_type": "CORRELATION" | "PATTERN" | "ANOMALY" | "TREND",
+          "confidence": 0.0-1.0,
+          "description": "Mô tả ngắn gọn, sắc bén bằng tiếng Việt",
+          "is_actionable": true,
+          "recommendation": "Lời khuyên hành động cụ thể"
+        }}
+        
+        Tập trung vào mối liên hệ giữa tâm lý (check-in) và kết quả (PnL/Score).
+        """
+        try:
+            insights = await self.generate_json_response(
+                prompt, system_prompt="Bạn là chuyên gia phân tích dữ liệu trading.", call_type="learning_insights"
+            )
+            return insights if isinstance(insights, list) else []
+        except Exception as e:
+            print(f"[Learning] Dynamic insight generation failed: {e}")
+            return []
+
 gemini_client = GeminiClient()
@@ -0,0 +1,185 @@
+# backend/services/ai/insight_cards.py
+"""
+THEKEY Insight Card Precomputer
+
+Generates the post-trade "Behavioral Insight Card" as soon as a trade is
+closed, instead of when the user opens the analysis view:
+- `close_trade` calls `enqueue()`, which schedules a BACKGROUND-priority task
+- the card is stored on `Trade.behavioral_insight_card`
+- users near their monthly AI budget are skipped; the card is then generated
+  on demand (and only if they actually open it)
+
+`/api/protection/analyze-trade` reads the stored card, or joins the pending
+job for that trade rather than starting a second Gemini call. A finished card
+is also pushed to `/api/stream/me` as an `ai_augmentation` event.
+"""
+
+import asyncio
+from typing import Dict, Optional
+
+
+CARD_INPUT_TOKENS = 1000  # Safety rails + card prompt + one trade, roughly
+
+
+def card_inputs(trade, survival_score) -> tuple:
+    """(trade_data, user_stats) for `gemini_client.analyze_trade`, from a Trade row."""
+    trade_data = {
+        "id": str(trade.id),
+        "symbol": trade.symbol,
+        "side": trade.side,
+        "entry_price": float(trade.entry_price) if trade.entry_price is not None else 0,
+        "exit_price": float(trade.exit_price) if trade.exit_price is not None else 0,
+        "quantity": float(trade.quantity) if trade.quantity is not None else 0,
+        "pnl": float(trade.pnl) if trade.pnl is not None else 0,
+        "pnl_pct": float(trade.pnl_pct) if trade.pnl_pct is not None else 0,
+        "ai_decision": trade.ai_decision,
+        "tags": trade.tags or [],
+    }
+    user_stats = {
+        "survival_days": survival_score,  # Same proxies as the on-demand route
+        "discipline_score": survival_score,
+    }
+    return trade_data, user_stats
+
+
+class InsightCardPrecomputer:
+    """Fire-and-forget insight card generation, one task per closed trade."""
+
+    def __init__(self, max_pending: int = 200):
+        self.max_pending = max_pending
+        self._pending: Dict[str, asyncio.Task] = {}
+
+        # Metrics
+        self.enqueued = 0
+        self.generated = 0
+        self.skipped_budget = 0
+        self.skipped_backlog = 0
+        self.fallbacks = 0
+        self.failures = 0
+
+    @property
+    def gemini_client(self):
+        from services.ai.gemini_client import gemini_client
+        return gemini_client
+
+    @property
+    def cost_ledger(self):
+        from services.ai.cost_ledger import cost_ledger
+        return cost_ledger
+
+    # ------------------------------------------
+    # Persistence
+    # ------------------------------------------
+
+    def _load(self, trade_id: str) -> Optional[tuple]:
+        from models.base import SessionLocal
+        from models.trade import Trade
+        from models.user import User
+
+        db = SessionLocal()
+        try:
+            row = db.query(Trade, User.survival_score).join(User, User.id == Trade.user_id)\
+                .filter(Trade.id == trade_id).first()
+            if not row:
+                return None
+            trade, survival_score = row
+            if trade.behavioral_insight_card:
+                return None  # Already generated (e.g. opened on demand first)
+            return card_inputs(trade, survival_score)
+        finally:
+            db.close()
+
+    def _save(self, trade_id: str, card: Dict):
+        from models.base import SessionLocal
+        from models.trade import Trade
+
+        db = SessionLocal()
+        try:
+            db.query(Trade).filter(Trade.id == trade_id).update(
+                {Trade.behavioral_insight_card: card}, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    async def store(self, trade_id, card: Dict, user_id=None) -> bool:
+        """Persist a generated card; fallback cards are not worth keeping."""
+        if not card or card.get("is_fallback"):
+            self.fallbacks += 1
+            return False
+        await asyncio.to_thread(self._save, str(trade_id), card)
+        if user_id is not None:
+            # Precomputed in the background: push it to the user's open dashboards
+            from services.user_events import user_events
+            user_events.publish(user_id, "ai_augmentation", {
+                "kind": "insight_card", "trade_id": str(trade_id), "card": card,
+            })
+        return True
+
+    # ------------------------------------------
+    # Scheduling
+    # ------------------------------------------
+
+    def enqueue(self, trade_id, user_id) -> bool:
+        """Schedule card generation for a just-closed trade. Never blocks the request."""
+        key = str(trade_id)
+        if key in self._pending:
+            return False
+        if len(self._pending) >= self.max_pending:
+            self.skipped_backlog += 1
+            return False
+        self.enqueued += 1
+        task = asyncio.create_task(self._run(key, str(user_id)))
+        self._pending[key] = task
+        task.add_done_callback(lambda _t, k=key: self._pending.pop(k, None))
+        return True
+
+    def pending(self, trade_id) -> Optional[asyncio.Task]:
+        return self._pending.get(str(trade_id))
+
+    async def _run(self, trade_id: str, user_id: str) -> Optional[Dict]:
+        from services.ai.scheduler import current_priority, BACKGROUND
+        from services.ai.call_log_writer import current_user_id, current_endpoint
+        from services.ai.cost_ledger import model_cost
+
+        # Own task: these only affect this job's context
+        current_priority.set(BACKGROUND)
+        current_user_id.set(user_id)
+        current_endpoint.set("insight_card_precompute")
+
+        try:
+            # Speculative work: only spend budget while the user is comfortably within it
+            estimate = model_cost(self.gemini_client.MODELS[0], CARD_INPUT_TOKENS, 600)
+            if not await self.cost_ledger.allows_speculative(user_id, estimate):
+                self.skipped_budget += 1
+                return None
+
+            inputs = await asyncio.to_thread(self._load, trade_id)
+            if inputs is None:
+                return None
+            card = await self.gemini_client.analyze_trade(*inputs)
+            if await self.store(trade_id, card, user_id=user_id):
+                self.generated += 1
+            return card
+        except Exception as e:
+            self.failures += 1
+            print(f"⚠️ [InsightCard] Precompute failed for trade {trade_id}: {e}")
+            return None
+
+    def get_stats(self) -> Dict:
+        return {
+            "pending": len(self._pending),
+            "enqueued": self.enqueued,
+            "generated": self.generated,
+            "skipped_budget": self.skipped_budget,
+            "skipped_backlog": self.skipped_backlog,
+            "fallbacks": self.fallbacks,
+            "failures": self.failures,
+        }
+
+
+# ============================================
+# Singleton Instance
+# ============================================
+
+insight_cards = InsightCardPrecomputer()
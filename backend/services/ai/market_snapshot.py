@@ -0,0 +1,259 @@
+# backend/services/ai/market_snapshot.py
+"""
+THEKEY Market Snapshot Refresher
+
+Stale-while-revalidate market analysis:
+- A background task per worker keeps an in-memory snapshot warm
+- The snapshot is renewed BEFORE it expires, so requests never wait on Gemini
+- A DB lease on the `ai_snapshots` row elects a single regenerating worker;
+  the other workers simply adopt the shared row on their next poll
+
+`/api/protection/market-context` becomes a pure memory read.
+"""
+
+import asyncio
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, Optional
+
+
+SNAPSHOT_KEY = "market_analysis"
+
+
+class MarketSnapshotRefresher:
+    """
+    Keeps the market analysis snapshot fresh in the background.
+
+    Timeline (defaults):
+    - TTL 600s: a snapshot older than this is considered expired
+    - REFRESH_AFTER 480s: the leader regenerates once the snapshot is this old
+    - POLL_INTERVAL 30s: how often every worker syncs with the shared row
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = 600,
+        refresh_after_seconds: int = 480,
+        poll_interval_seconds: int = 30,
+        lease_seconds: int = 60,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.refresh_after_seconds = refresh_after_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self.lease_seconds = lease_seconds
+
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._generated_at: Optional[float] = None  # epoch seconds (shared wall clock)
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.refresh_count = 0
+        self.refresh_failures = 0
+        self.adopted_count = 0
+        self.last_refresh_ms = 0
+
+    @property
+    def gemini_client(self):
+        from .gemini_client import gemini_client
+        return gemini_client
+
+    # ------------------------------------------
+    # Read path (request handlers)
+    # ------------------------------------------
+
+    def get(self) -> Optional[Dict[str, Any]]:
+        """Return the current snapshot with its staleness age, or None if not warmed up yet."""
+        if self._snapshot is None or self._generated_at is None:
+            return None
+
+        age = max(0, int(time.time() - self._generated_at))
+        return {
+            **self._snapshot,
+            "generated_at": datetime.fromtimestamp(self._generated_at, tz=timezone.utc).isoformat(),
+            "staleness_seconds": age,
+            "is_stale": age >= self.ttl_seconds,
+        }
+
+    # ------------------------------------------
+    # Lifecycle
+    # ------------------------------------------
+
+    def start(self):
+        """Start the background refresher on the running event loop."""
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run())
+        print(f"🔄 [MarketSnapshot] Refresher started ({self.worker_id})")
+
+    async def stop(self):
+        """Cancel the background refresher."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        from .scheduler import current_priority, BACKGROUND
+        current_priority.set(BACKGROUND)  # Task-local: never competes with user requests
+        while True:
+            try:
+                await self.refresh_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ [MarketSnapshot] Refresh loop error: {e}")
+            await asyncio.sleep(self.poll_interval_seconds)
+
+    # ------------------------------------------
+    # Refresh logic
+    # ------------------------------------------
+
+    def _age(self) -> float:
+        if self._generated_at is None:
+            return float("inf")
+        return time.time() - self._generated_at
+
+    async def refresh_once(self):
+        """Sync with the shared snapshot and regenerate it if this worker wins the lease."""
+        shared_available = True
+        try:
+            await asyncio.to_thread(self._load_shared)
+        except Exception as e:
+            shared_available = False
+            print(f"⚠️ [MarketSnapshot] Shared snapshot unavailable: {e}")
+
+        if self._age() < self.refresh_after_seconds:
+            return
+
+        if shared_available:
+            try:
+                acquired = await asyncio.to_thread(self._try_acquire_lease)
+            except Exception as e:
+                print(f"⚠️ [MarketSnapshot] Lease error, regenerating locally: {e}")
+                acquired, shared_available = True, False
+            if not acquired:
+                return  # Another worker is regenerating; adopt its row on next poll
+
+        start = time.time()
+        result = await self.gemini_client.fetch_market_analysis()
+        self.last_refresh_ms = int((time.time() - start) * 1000)
+
+        if not result:
+            self.refresh_failures += 1
+            if shared_available:
+                await asyncio.to_thread(self._release_lease)
+            return
+
+        self._snapshot = result
+        self._generated_at = time.time()
+        self.refresh_count += 1
+
+        if shared_available:
+            try:
+                await asyncio.to_thread(self._store_shared, result)
+            except Exception as e:
+                print(f"⚠️ [MarketSnapshot] Could not persist snapshot: {e}")
+
+    def _load_shared(self):
+        from models import AISnapshot
+        from models.base import SessionLocal
+
+        db = SessionLocal()
+        try:
+            row = db.query(AISnapshot).filter(AISnapshot.key == SNAPSHOT_KEY).first()
+            if row and row.payload and row.generated_at:
+                generated_at = row.generated_at
+                if generated_at.tzinfo is None:
+                    generated_at = generated_at.replace(tzinfo=timezone.utc)
+                ts = generated_at.timestamp()
+                if self._generated_at is None or ts > self._generated_at:
+                    self._snapshot = row.payload
+                    self._generated_at = ts
+                    self.adopted_count += 1
+        finally:
+            db.close()
+
+    def _try_acquire_lease(self) -> bool:
+        """Atomically take the regeneration lease if it is free or expired."""
+        from sqlalchemy import text
+        from models.base import engine
+
+        now = datetime.now(timezone.utc)
+        with engine.begin() as conn:
+            conn.execute(text("""
+                INSERT INTO ai_snapshots (key) VALUES (:key)
+                ON CONFLICT (key) DO NOTHING
+            """), {"key": SNAPSHOT_KEY})
+            result = conn.execute(text("""
+                UPDATE ai_snapshots
+                SET lease_owner = :owner, lease_until = :until
+                WHERE key = :key
+                  AND (lease_until IS NULL OR lease_until < :now OR lease_owner = :owner)
+                RETURNING key
+            """), {
+                "key": SNAPSHOT_KEY,
+                "owner": self.worker_id,
+                "until": now + timedelta(seconds=self.lease_seconds),
+                "now": now,
+            })
+            return result.first() is not None
+
+    def _release_lease(self):
+        from sqlalchemy import text
+        from models.base import engine
+
+        with engine.begin() as conn:
+            conn.execute(text("""
+                UPDATE ai_snapshots SET lease_owner = NULL, lease_until = NULL
+                WHERE key = :key AND lease_owner = :owner
+            """), {"key": SNAPSHOT_KEY, "owner": self.worker_id})
+
+    def _store_shared(self, payload: Dict[str, Any]):
+        from models import AISnapshot
+        from models.base import SessionLocal
+
+        db = SessionLocal()
+        try:
+            row = db.query(AISnapshot).filter(AISnapshot.key == SNAPSHOT_KEY).first()
+            if not row:
+                row = AISnapshot(key=SNAPSHOT_KEY)
+                db.add(row)
+            row.payload = payload
+            row.generated_at = datetime.fromtimestamp(self._generated_at, tz=timezone.utc)
+            if row.lease_owner == self.worker_id:
+                row.lease_owner = None
+                row.lease_until = None
+            db.commit()
+        finally:
+            db.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        age = self._age()
+        return {
+            "worker_id": self.worker_id,
+            "has_snapshot": self._snapshot is not None,
+            "staleness_seconds": None if age == float("inf") else int(age),
+            "refresh_count": self.refresh_count,
+            "refresh_failures": self.refresh_failures,
+            "adopted_count": self.adopted_count,
+            "last_refresh_ms": self.last_refresh_ms,
+        }
+
+
+# ============================================
+# Singleton Instance
+# ============================================
+
+market_snapshot = MarketSnapshotRefresher(
+    ttl_seconds=int(os.getenv("MARKET_SNAPSHOT_TTL_SECONDS", "600")),
+    refresh_after_seconds=int(os.getenv("MARKET_SNAPSHOT_REFRESH_AFTER_SECONDS", "480")),
+    poll_interval_seconds=int(os.getenv("MARKET_SNAPSHOT_POLL_SECONDS", "30")),
+)
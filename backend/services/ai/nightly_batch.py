@@ -0,0 +1,340 @@
+# backend/services/ai/nightly_batch.py
+"""
+THEKEY Nightly AI Batch
+
+Precomputes per-user AI work off-peak so the morning dashboard is served from
+`ai_result_cache` without model calls:
+- weekly report, weekly goals and archetype (stored as source='nightly')
+- dynamic learning insights (same inputs as GET /api/learning/insights)
+
+Active users are walked with a server-side cursor; each chunk's trades and
+check-ins are loaded with one windowed query per table, not one per user.
+Calls run at BACKGROUND priority, paced to a requests-per-minute budget that
+backs off while the provider is failing. Users who would leave their
+comfortable AI budget range are skipped.
+
+Run via `python -m scripts.nightly_batch`.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+
+JOBS = ("weekly_report", "weekly_goals", "archetype", "learning_insights")
+
+JOB_INPUT_TOKENS = 2000  # Typical prompt size of one report section, for the budget check
+
+# Model calls per job when the report fan-out is on (see GeminiClient._generate_sections)
+FAN_OUT_SECTIONS = {"weekly_report": 3, "weekly_goals": 2, "archetype": 3}
+
+
+def _num(value) -> float:
+    return float(value) if value is not None else 0.0
+
+
+def _iso(value) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def trade_context(trade) -> Dict[str, Any]:
+    """Trade row as report-prompt history entry."""
+    return {
+        "id": str(trade.id),
+        "symbol": trade.symbol,
+        "side": trade.side,
+        "entry_price": _num(trade.entry_price),
+        "exit_price": _num(trade.exit_price),
+        "quantity": _num(trade.quantity),
+        "pnl": _num(trade.pnl),
+        "pnl_pct": _num(trade.pnl_pct),
+        "status": trade.status,
+        "entry_time": _iso(trade.entry_time),
+        "exit_time": _iso(trade.exit_time),
+        "ai_decision": trade.ai_decision,
+        "process_score": float(trade.process_score) if trade.process_score is not None else None,
+    }
+
+
+def checkin_context(checkin) -> Dict[str, Any]:
+    return {
+        "date": _iso(checkin.date),
+        "emotional_state": checkin.emotional_state,
+        "risk_level": checkin.risk_level,
+        "insights": checkin.insights,
+    }
+
+
+def trade_stats(history: List[Dict]) -> Dict[str, Any]:
+    closed = [t for t in history if t.get("status") == "CLOSED"]
+    wins = sum(1 for t in closed if t.get("pnl", 0) > 0)
+    return {
+        "total_trades": len(history),
+        "closed_trades": len(closed),
+        "win_rate": round(wins / len(closed) * 100, 1) if closed else 0.0,
+        "total_pnl": round(sum(t.get("pnl", 0) for t in closed), 2),
+    }
+
+
+def learning_insight_inputs(trades: Sequence, checkins: Sequence) -> tuple:
+    """(trade_data, checkin_data) for learning insights: 15 latest trades, 5 latest check-ins."""
+    trade_data = [
+        {
+            "symbol": t.symbol,
+            "side": t.side,
+            "pnl": _num(t.pnl),
+            "score": float(t.process_score) if t.process_score is not None else None,
+            "eval": t.user_process_evaluation,
+        }
+        for t in trades[:15]
+    ]
+    checkin_data = [
+        {"emotional_state": c.emotional_state, "insights": c.insights}
+        for c in checkins[:5]
+    ]
+    return trade_data, checkin_data
+
+
+@dataclass
+class UserContext:
+    user_id: str
+    trades: List[Any] = field(default_factory=list)    # Trade rows, newest entry first
+    checkins: List[Any] = field(default_factory=list)  # Checkin rows, newest first
+
+
+class RatePacer:
+    """Spaces out model calls; the interval doubles on failures and recovers on success."""
+
+    def __init__(self, requests_per_minute: float, max_backoff: float = 8.0):
+        self.base_interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self.max_backoff = max_backoff
+        self.backoff = 1.0
+        self._next_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self, calls: int = 1):
+        """Wait for a turn that reserves `calls` request slots of the per-minute budget."""
+        async with self._lock:
+            now = time.monotonic()
+            if self._next_at > now:
+                await asyncio.sleep(self._next_at - now)
+            self._next_at = max(now, self._next_at) + self.base_interval * self.backoff * calls
+
+    def penalize(self):
+        self.backoff = min(self.backoff * 2, self.max_backoff)
+
+    def reward(self):
+        self.backoff = max(self.backoff * 0.9, 1.0)
+
+
+class NightlyBatchRunner:
+    """Walks active users and stores their precomputed AI results."""
+
+    def __init__(
+        self,
+        jobs: Sequence[str] = JOBS,
+        requests_per_minute: float = 30,
+        concurrency: int = 2,
+        active_days: int = 14,
+        chunk_size: int = 200,
+        trade_limit: int = 50,
+        checkin_limit: int = 10,
+        dry_run: bool = False,
+    ):
+        self.jobs = tuple(jobs)
+        self.concurrency = concurrency
+        self.active_days = active_days
+        self.chunk_size = chunk_size
+        self.trade_limit = trade_limit
+        self.checkin_limit = checkin_limit
+        self.dry_run = dry_run
+        self.pacer = RatePacer(requests_per_minute)
+
+        # Report
+        self.users = 0
+        self.computed = 0
+        self.stored = 0
+        self.already_cached = 0
+        self.fallbacks = 0
+        self.skipped_budget = 0
+        self.skipped_no_data = 0
+        self.failures = 0
+
+    @property
+    def gemini_client(self):
+        from services.ai.gemini_client import gemini_client
+        return gemini_client
+
+    @property
+    def result_cache(self):
+        from services.ai.result_cache import result_cache
+        return result_cache
+
+    @property
+    def cost_ledger(self):
+        from services.ai.cost_ledger import cost_ledger
+        return cost_ledger
+
+    # ------------------------------------------
+    # Bulk context loading
+    # ------------------------------------------
+
+    def _recent_rows(self, db, model, order_column, user_ids: List, limit: int) -> List:
+        """Latest `limit` rows per user for a whole chunk of users in one query."""
+        from sqlalchemy import func
+
+        rank = func.row_number().over(partition_by=model.user_id, order_by=order_column.desc()).label("rank")
+        ranked = db.query(model.id.label("id"), rank).filter(model.user_id.in_(user_ids)).subquery()
+        return db.query(model).join(ranked, model.id == ranked.c.id)\
+            .filter(ranked.c.rank <= limit)\
+            .order_by(model.user_id, order_column.desc()).all()
+
+    def load_contexts(self, db, user_ids: List) -> List[UserContext]:
+        from models.trade import Trade
+        from models.checkin import Checkin
+
+        contexts = {str(uid): UserContext(user_id=str(uid)) for uid in user_ids}
+        for trade in self._recent_rows(db, Trade, Trade.entry_time, user_ids, self.trade_limit):
+            contexts[str(trade.user_id)].trades.append(trade)
+        for checkin in self._recent_rows(db, Checkin, Checkin.created_at, user_ids, self.checkin_limit):
+            contexts[str(checkin.user_id)].checkins.append(checkin)
+        return list(contexts.values())
+
+    def iter_context_chunks(self) -> Iterator[List[UserContext]]:
+        """Stream active user ids (server-side cursor) and load their contexts per chunk."""
+        from sqlalchemy import select, union
+        from models.base import SessionLocal
+        from models.user import User
+        from models.trade import Trade
+        from models.checkin import Checkin
+
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.active_days)
+        recent = union(
+            select(Trade.user_id).where(Trade.entry_time >= cutoff.replace(tzinfo=None)),
+            select(Checkin.user_id).where(Checkin.created_at >= cutoff),
+        ).subquery()
+        stmt = select(User.id).where(User.is_active == True, User.id.in_(select(recent.c.user_id)))\
+            .order_by(User.id).execution_options(yield_per=self.chunk_size)
+
+        cursor_db, context_db = SessionLocal(), SessionLocal()
+        try:
+            for user_ids in cursor_db.execute(stmt).scalars().partitions(self.chunk_size):
+                yield self.load_contexts(context_db, list(user_ids))
+                context_db.expunge_all()
+        finally:
+            context_db.close()
+            cursor_db.close()
+
+    # ------------------------------------------
+    # Jobs
+    # ------------------------------------------
+
+    def job_spec(self, job: str, ctx: UserContext) -> Optional[tuple]:
+        """(inputs, compute, fan_out) for a job, or None when there's too little data."""
+        client = self.gemini_client
+        if job == "learning_insights":
+            if len(ctx.trades) < 3:
+                return None
+            trade_data, checkin_data = learning_insight_inputs(ctx.trades, ctx.checkins)
+            return (trade_data, checkin_data), lambda: client.generate_learning_insights(trade_data, checkin_data), False
+
+        if not ctx.trades:
+            return None
+        history = [trade_context(t) for t in ctx.trades]
+        checkins = [checkin_context(c) for c in ctx.checkins]
+        if job == "weekly_report":
+            return (history,), lambda: client.generate_weekly_report(history), client.report_fan_out
+        if job == "weekly_goals":
+            stats = trade_stats(history)
+            return (history, stats, checkins), lambda: client.generate_weekly_goals(history, stats, checkins), client.report_fan_out
+        if job == "archetype":
+            return (history, checkins), lambda: client.analyze_trader_archetype(history, checkins), client.report_fan_out
+        raise ValueError(f"Unknown nightly job: {job}")
+
+    async def run_job(self, ctx: UserContext, job: str):
+        from services.ai.cost_ledger import model_cost
+
+        spec = self.job_spec(job, ctx)
+        if spec is None:
+            self.skipped_no_data += 1
+            return
+        inputs, compute, fan_out = spec
+        calls = FAN_OUT_SECTIONS.get(job, 1) if fan_out else 1
+
+        cache = self.result_cache
+        if await cache.contains(ctx.user_id, job, inputs, fan_out=fan_out):
+            self.already_cached += 1
+            return
+        estimate = model_cost(self.gemini_client.MODELS[0], JOB_INPUT_TOKENS * calls, 600 * calls)
+        if not await self.cost_ledger.allows_speculative(ctx.user_id, estimate):
+            self.skipped_budget += 1
+            return
+        if self.dry_run:
+            return
+
+        await self.pacer.wait(calls)  # The sections run concurrently, so reserve all their slots up front
+        result = await compute()
+        self.computed += 1
+        if not result or (isinstance(result, dict) and result.get("is_fallback")):
+            self.fallbacks += 1
+            self.pacer.penalize()  # Usually quota/outage: slow down instead of burning retries
+            return
+        self.pacer.reward()
+        if await cache.put(ctx.user_id, job, inputs, result, fan_out=fan_out, source="nightly"):
+            self.stored += 1
+
+    async def process_user(self, ctx: UserContext):
+        from services.ai.scheduler import current_priority, BACKGROUND
+        from services.ai.call_log_writer import current_user_id, current_endpoint
+
+        # Runs in its own task: attribute cost/logs to the user, never compete with live traffic
+        current_priority.set(BACKGROUND)
+        current_user_id.set(ctx.user_id)
+        current_endpoint.set("nightly_batch")
+
+        self.users += 1
+        for job in self.jobs:
+            try:
+                await self.run_job(ctx, job)
+            except Exception as e:
+                self.failures += 1
+                self.pacer.penalize()
+                print(f"⚠️ [NightlyBatch] {job} failed for {ctx.user_id}: {e}")
+
+    async def run(self) -> Dict[str, Any]:
+        start = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(ctx: UserContext):
+            async with semaphore:
+                await self.process_user(ctx)
+
+        chunks = self.iter_context_chunks()
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    break
+                # One chunk in flight at a time keeps memory bounded
+                await asyncio.gather(*(asyncio.create_task(bounded(ctx)) for ctx in chunk))
+        finally:
+            chunks.close()
+
+        return {**self.get_stats(), "elapsed_seconds": round(time.perf_counter() - start, 1)}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "jobs": list(self.jobs),
+            "dry_run": self.dry_run,
+            "users": self.users,
+            "computed": self.computed,
+            "stored": self.stored,
+            "already_cached": self.already_cached,
+            "fallbacks": self.fallbacks,
+            "skipped_budget": self.skipped_budget,
+            "skipped_no_data": self.skipped_no_data,
+            "failures": self.failures,
+            "pacer_backoff": self.pacer.backoff,
+        }
@@ -323,8 +323,22 @@ LANGUAGE: Vietnamese. Balanced honesty with encouragement.
 """
 
 
-def get_chat_prompt(message: str, history: list, context: dict) -> str:
-    """Build complete chat prompt with context."""
+def format_chat_history(turns: list) -> str:
+    """Render stored/client chat turns as 'User: ...' / 'Kaito: ...' lines."""
+    history_str = ""
+    for msg in turns:
+        sender = "User" if msg.get("sender") == "user" else "Kaito"
+        text = msg.get("text", msg.get("display_text", ""))
+        history_str += f"{sender}: {text}\n"
+    return history_str
+
+
+def get_chat_prompt(message: str, history: list, context: dict, summary: str = "") -> str:
+    """Build complete chat prompt with context.
+
+    `history` holds the recent turns verbatim; `summary` is the rolling
+    summary of everything older (see ConversationStore).
+    """
     user_context = {
         "survival_days": context.get("survival_days", 0),
         "discipline_score": context.get("discipline_score", 0),
@@ -334,16 +348,12 @@ def get_chat_prompt(message: str, history: list, context: dict) -> str:
         "trade_summary": context.get("trade_summary", "")
     }
     
-    # Format recent history
-    history_str = ""
-    for msg in history[-10:]:
-        sender = "User" if msg.get("sender") == "user" else "Kaito"
-        text = msg.get("text", msg.get("display_text", ""))
-        history_str += f"{sender}: {text}\n"
-    
     task_prompt = f"""
-CONVERSATION HISTORY:
-{history_str}
+CONVERSATION SUMMARY (older turns):
+{summary or "(none)"}
+
+RECENT CONVERSATION:
+{format_chat_history(history[-10:])}
 
 CURRENT MESSAGE FROM USER:
 {message}
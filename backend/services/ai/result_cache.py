@@ -0,0 +1,258 @@
+# backend/services/ai/result_cache.py
+"""
+THEKEY AI Result Cache
+
+Content-addressed cache for the slow report endpoints. A result is keyed by
+(user, endpoint, fingerprint) where the fingerprint is a sha256 over the
+normalized inputs (trade history, stats, check-ins) and the prompt version:
+
+- repeat loads with unchanged data are a single DB read, no Gemini call
+- any change in the inputs yields a new fingerprint, i.e. a natural miss
+- closing a trade or submitting a check-in drops the user's rows outright
+- fallback results (`is_fallback`) are never stored
+
+The nightly batch (scripts/nightly_batch.py) stores results computed from
+server-side data with source='nightly'. Client-sent history never hashes the
+same, so endpoints may opt into `accept_snapshot`: on a fingerprint miss, a
+nightly row is still valid because any new closed trade or check-in would
+have deleted it.
+
+Bump the endpoint's entry in PROMPT_VERSIONS whenever its prompt in
+gemini_client changes, so stale wording is not served from the cache.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+PROMPT_VERSIONS = {
+    "weekly_goals": "2026-10-18",
+    "weekly_report": "2026-10-18",
+    "archetype": "2026-10-18",
+    "learning_insights": "2026-10-18",
+}
+
+
+def _normalize(value: Any) -> Any:
+    """Drop empty and client-private (`_`-prefixed) fields so cosmetic differences don't miss."""
+    if isinstance(value, dict):
+        return {
+            str(k): _normalize(v) for k, v in value.items()
+            if v is not None and not str(k).startswith("_")
+        }
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def prompt_version(endpoint: str, fan_out: bool = False) -> str:
+    # Fan-out and single-prompt variants produce differently shaped answers
+    return PROMPT_VERSIONS[endpoint] + (".fo" if fan_out else "")
+
+
+def fingerprint(endpoint: str, version: str, *inputs: Any) -> str:
+    canonical = json.dumps(
+        [endpoint, version, [_normalize(i) for i in inputs]],
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class AIResultCache:
+    """DB-backed result cache with per-key in-flight deduplication."""
+
+    def __init__(self):
+        self._in_flight: Dict[Tuple[str, str, str], asyncio.Future] = {}
+
+        # Metrics
+        self.hits = 0
+        self.snapshot_hits = 0
+        self.misses = 0
+        self.deduplicated = 0
+        self.stores = 0
+        self.skipped_fallbacks = 0
+        self.invalidations = 0
+        self.errors = 0
+        self.total_hit_ms = 0.0
+
+    # ------------------------------------------
+    # Persistence
+    # ------------------------------------------
+
+    def _load(self, user_id: str, endpoint: str, key: str) -> Optional[Dict]:
+        from models.base import SessionLocal
+        from models.ai_result_cache import AIResultCache as Row
+
+        db = SessionLocal()
+        try:
+            row = db.query(Row.payload).filter(
+                Row.user_id == user_id, Row.endpoint == endpoint, Row.fingerprint == key
+            ).first()
+            return row[0] if row else None
+        finally:
+            db.close()
+
+    def _load_snapshot(self, user_id: str, endpoint: str, version: str) -> Optional[Dict]:
+        from models.base import SessionLocal
+        from models.ai_result_cache import AIResultCache as Row
+
+        db = SessionLocal()
+        try:
+            row = db.query(Row.payload).filter(
+                Row.user_id == user_id, Row.endpoint == endpoint,
+                Row.prompt_version == version, Row.source == "nightly",
+            ).order_by(Row.created_at.desc()).first()
+            return row[0] if row else None
+        finally:
+            db.close()
+
+    def _save(self, user_id: str, endpoint: str, key: str, version: str, payload: Any, source: str = "request"):
+        from sqlalchemy.dialects.postgresql import insert
+        from models.base import SessionLocal
+        from models.ai_result_cache import AIResultCache as Row
+
+        db = SessionLocal()
+        try:
+            # Only the latest inputs matter; older fingerprints can never hit again
+            db.query(Row).filter(
+                Row.user_id == user_id, Row.endpoint == endpoint, Row.fingerprint != key
+            ).delete(synchronize_session=False)
+            stmt = insert(Row).values(
+                user_id=user_id, endpoint=endpoint, fingerprint=key, prompt_version=version,
+                payload=payload, source=source, created_at=datetime.now(timezone.utc),
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Row.user_id, Row.endpoint, Row.fingerprint],
+                set_={"payload": payload, "prompt_version": version, "source": source,
+                      "created_at": datetime.now(timezone.utc)},
+            )
+            db.execute(stmt)
+            db.commit()
+        finally:
+            db.close()
+
+    # ------------------------------------------
+    # Read-through
+    # ------------------------------------------
+
+    async def get_or_compute(
+        self,
+        user_id,
+        endpoint: str,
+        inputs: tuple,
+        compute: Callable[[], Awaitable[Any]],
+        fan_out: bool = False,
+        accept_snapshot: bool = False,
+    ) -> Any:
+        """Return the cached result for these inputs, or compute and store it."""
+        user_key = str(user_id)
+        version = prompt_version(endpoint, fan_out)
+        key = fingerprint(endpoint, version, *inputs)
+
+        start = time.perf_counter()
+        try:
+            cached = await asyncio.to_thread(self._load, user_key, endpoint, key)
+            if cached is None and accept_snapshot:
+                cached = await asyncio.to_thread(self._load_snapshot, user_key, endpoint, version)
+                if cached is not None:
+                    self.snapshot_hits += 1
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️ [ResultCache] Load failed for {endpoint}: {e}")
+            cached = None
+        if cached is not None:
+            self.hits += 1
+            self.total_hit_ms += (time.perf_counter() - start) * 1000
+            return cached
+
+        # Concurrent loads of the same inputs (double-clicks, two tabs) share one call
+        flight_key = (user_key, endpoint, key)
+        pending = self._in_flight.get(flight_key)
+        if pending is not None:
+            self.deduplicated += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[flight_key] = future
+        try:
+            result = await compute()
+            future.set_result(result)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else was waiting
+            raise
+        finally:
+            self._in_flight.pop(flight_key, None)
+
+        await self._store(user_key, endpoint, key, version, result)
+        return result
+
+    async def contains(self, user_id, endpoint: str, inputs: tuple, fan_out: bool = False) -> bool:
+        version = prompt_version(endpoint, fan_out)
+        key = fingerprint(endpoint, version, *inputs)
+        return await asyncio.to_thread(self._load, str(user_id), endpoint, key) is not None
+
+    async def put(self, user_id, endpoint: str, inputs: tuple, result: Any,
+                  fan_out: bool = False, source: str = "request") -> bool:
+        """Store a result computed elsewhere (e.g. the nightly batch)."""
+        version = prompt_version(endpoint, fan_out)
+        return await self._store(str(user_id), endpoint, fingerprint(endpoint, version, *inputs), version, result, source)
+
+    async def _store(self, user_key: str, endpoint: str, key: str, version: str, result: Any,
+                     source: str = "request") -> bool:
+        # Empty answers and fallbacks are what we serve on failure; retry those next time
+        if not result or (isinstance(result, dict) and result.get("is_fallback")):
+            self.skipped_fallbacks += 1
+            return False
+        try:
+            await asyncio.to_thread(self._save, user_key, endpoint, key, version, result, source)
+            self.stores += 1
+            return True
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️ [ResultCache] Store failed for {endpoint}: {e}")
+            return False
+
+    # ------------------------------------------
+    # Invalidation
+    # ------------------------------------------
+
+    def invalidate_user(self, db, user_id) -> int:
+        """Delete every cached result for the user inside the caller's transaction."""
+        from models.ai_result_cache import AIResultCache as Row
+
+        deleted = db.query(Row).filter(Row.user_id == user_id).delete(synchronize_session=False)
+        self.invalidations += 1
+        return deleted
+
+    def get_stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "prompt_versions": dict(PROMPT_VERSIONS),
+            "hits": self.hits,
+            "misses": self.misses,
+            "snapshot_hits": self.snapshot_hits,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "avg_hit_ms": round(self.total_hit_ms / self.hits, 2) if self.hits else 0.0,
+            "deduplicated": self.deduplicated,
+            "in_flight": len(self._in_flight),
+            "stores": self.stores,
+            "skipped_fallbacks": self.skipped_fallbacks,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+        }
+
+
+# ============================================
+# Singleton Instance
+# ============================================
+
+result_cache = AIResultCache()
@@ -0,0 +1,116 @@
+# backend/services/ai/scheduler.py
+"""
+THEKEY AI Scheduler
+
+Priority-aware concurrency limit for Gemini calls (replaces the flat
+Semaphore(2) in GeminiClient). When all slots are busy, waiting calls are
+admitted by priority, then FIFO:
+
+    INTERACTIVE  user is waiting on this exact response (chat, pre-trade)
+    NORMAL       default for request-path calls
+    BACKGROUND   refreshers, summaries, batch jobs
+
+Priority travels through a ContextVar so deep helpers need no parameter:
+
+    with ai_priority(BACKGROUND):
+        await gemini_client.fetch_market_analysis()
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Tuple
+
+
+INTERACTIVE = 0
+NORMAL = 1
+BACKGROUND = 2
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", NORMAL: "normal", BACKGROUND: "background"}
+
+current_priority: ContextVar[int] = ContextVar("ai_priority", default=NORMAL)
+
+
+@contextmanager
+def ai_priority(priority: int):
+    """Run the enclosed AI calls at the given priority."""
+    token = current_priority.set(priority)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+class AIScheduler:
+    """Priority semaphore: at most `max_concurrency` Gemini calls in flight."""
+
+    def __init__(self, max_concurrency: int = 2):
+        self.max_concurrency = max_concurrency
+        self._in_flight = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+        # Metrics
+        self.admitted: Dict[str, int] = {name: 0 for name in PRIORITY_NAMES.values()}
+        self.total_wait_ms: Dict[str, float] = {name: 0.0 for name in PRIORITY_NAMES.values()}
+
+    async def acquire(self, priority: int):
+        start = time.perf_counter()
+        if self._in_flight < self.max_concurrency and not self._waiters:
+            self._in_flight += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (priority, next(self._seq), future))
+            try:
+                await future  # Slot is handed over by release()
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    self.release()  # We were granted a slot but gave up on it
+                else:
+                    self._waiters = [w for w in self._waiters if w[2] is not future]
+                    heapq.heapify(self._waiters)
+                raise
+
+        name = PRIORITY_NAMES.get(priority, "normal")
+        self.admitted[name] += 1
+        self.total_wait_ms[name] += (time.perf_counter() - start) * 1000
+
+    def release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)  # Slot transfers directly; in_flight unchanged
+                return
+        self._in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: int = None):
+        priority = current_priority.get() if priority is None else priority
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def get_stats(self) -> Dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self._in_flight,
+            "waiting": len(self._waiters),
+            "admitted": dict(self.admitted),
+            "avg_wait_ms": {
+                name: round(self.total_wait_ms[name] / count, 1) if count else 0.0
+                for name, count in self.admitted.items()
+            },
+        }
+
+
+# ============================================
+# Singleton Instance
+# ============================================
+
+ai_scheduler = AIScheduler(max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", "2")))
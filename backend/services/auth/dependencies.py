@@ -1,11 +1,16 @@
 # backend/services/auth/dependencies.py
 from fastapi import Request, HTTPException, Depends
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import jwt
 from typing import Optional
 import os
+import uuid
 
-from models import get_db, User
+from models import get_db, get_async_db, User
+from models.base import AsyncSessionLocal
+from services.ai.call_log_writer import current_user_id, current_endpoint
+from services.auth.principal_cache import INACTIVE, MISSING, attach_cached_user, parse_user_id, principal_cache
 
 # CRITICAL: This logic MUST match auth.py to prevent sign/verify mismatch
 _jwt_secret_env = os.getenv("JWT_SECRET", "")
@@ -17,33 +22,117 @@ else:
 
 JWT_ALGORITHM = "HS256"
 
-async def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
-    """Standard dependency to get the current authenticated user."""
+def _token_user_id(request: Request) -> str:
+    """User id (`sub`) from the request's Bearer token."""
     auth_header = request.headers.get("Authorization")
     if not auth_header or not auth_header.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Not authenticated")
-    
+
     token = auth_header.split(" ")[1]
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        user_id = payload.get("sub")
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token")
-            
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-            
-        if not user.is_active:
-            raise HTTPException(status_code=400, detail="Inactive user")
-            
-        return user
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    user_id = payload.get("sub")
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return user_id
+
+def _checked_user(request: Request, user: Optional[User]) -> User:
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+
+    # Attribute any AI calls made while serving this request
+    current_user_id.set(str(user.id))
+    current_endpoint.set(request.url.path)
+    return user
+
+def _cached_user(request: Request, user_id: uuid.UUID, db) -> Optional[User]:
+    """User from the principal cache, attached to `db`; None on a miss."""
+    cached = principal_cache.lookup(user_id)
+    if cached is None:
+        return None
+    if cached == MISSING:
+        raise HTTPException(status_code=404, detail="User not found")
+    if cached == INACTIVE:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    user = attach_cached_user(cached)
+    db.add(user)
+    return _checked_user(request, user)
+
+def _principal_id(request: Request) -> uuid.UUID:
+    try:
+        return parse_user_id(_token_user_id(request))
+    except ValueError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+async def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
+    """Standard dependency to get the current authenticated user."""
+    user_id = _principal_id(request)
+    user = _cached_user(request, user_id, db)
+    if user is not None:
+        return user
+    version = principal_cache.version(user_id)
+    try:
+        user = db.get(User, user_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    principal_cache.store(user_id, user, version)
+    return _checked_user(request, user)
+
+async def get_current_user_async(request: Request, db: AsyncSession = Depends(get_async_db)) -> User:
+    """
+    Same as get_current_user, loaded through the AsyncSession.
+    Routes using it must use `get_async_db` too, so the user is attached
+    to the session they commit.
+    """
+    user_id = _principal_id(request)
+    user = _cached_user(request, user_id, db)
+    if user is not None:
+        return user
+    version = principal_cache.version(user_id)
+    try:
+        user = await db.get(User, user_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    principal_cache.store(user_id, user, version)
+    return _checked_user(request, user)
+
+async def _load_user(user_id: uuid.UUID) -> Optional[User]:
+    """One primary-key read in its own short session: id-only routes include
+    long-lived SSE streams, which must not hold a connection."""
+    async with AsyncSessionLocal() as db:
+        return await db.get(User, user_id)
+
+async def get_current_user_id(request: Request) -> uuid.UUID:
+    """
+    For routes that only need the caller's id. Cache hits (including the
+    negative ones for deactivated / deleted users) answer without the DB;
+    a miss loads the user once and caches it, so `is_active` is still
+    enforced for every caller.
+    """
+    user_id = _principal_id(request)
+    cached = principal_cache.lookup(user_id)
+    if cached is None:
+        version = principal_cache.version(user_id)
+        try:
+            user = await _load_user(user_id)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        principal_cache.store(user_id, user, version)
+        return _checked_user(request, user).id
+    if cached == MISSING:
+        raise HTTPException(status_code=404, detail="User not found")
+    if cached == INACTIVE:
+        raise HTTPException(status_code=400, detail="Inactive user")
+
+    current_user_id.set(str(user_id))
+    current_endpoint.set(request.url.path)
+    return user_id
 
 async def get_pro_user(user: User = Depends(get_current_user)) -> User:
     """Dependency to ensure the user has a Pro subscription."""
@@ -0,0 +1,169 @@
+# backend/services/auth/principal_cache.py
+"""
+THEKEY Principal Cache
+
+Per-process TTL cache of the user row behind a JWT, so `get_current_user`
+doesn't `SELECT * FROM users` on every authenticated request:
+- entries hold the user's column values; a hit is re-attached to the
+  request's session as a detached instance (no query), so routes can still
+  modify and commit it as before
+- every user has a version that invalidation bumps; a load that started
+  before an invalidation is not stored, so a racing reload can't put the old
+  settings back
+- any ORM flush that modifies or deletes a User (settings, username, shadow
+  score, AI call counters, ...) invalidates it once the transaction commits;
+  raw-SQL updates call `invalidate()` themselves
+- deactivated and unknown users are cached negatively, so a revoked account
+  with a still-valid token is rejected without a query
+
+Other workers only see a change once their entry expires (AUTH_PRINCIPAL_TTL_SECONDS).
+"""
+
+import copy
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from models import User
+
+
+INACTIVE = "inactive"
+MISSING = "missing"
+
+_COLUMNS = [column.key for column in User.__mapper__.column_attrs]
+
+
+class PrincipalCache:
+    """LRU + TTL cache of user column values, with per-user versions."""
+
+    def __init__(self, ttl_seconds: float = 60, negative_ttl_seconds: float = 300, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_entries = max_entries
+
+        # user_id -> (expires_at, version, values | INACTIVE | MISSING)
+        self._entries: "OrderedDict[str, Tuple[float, int, object]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()  # Flush events may fire from threadpool routes
+
+        # Metrics
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.stale_loads = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def version(self, user_id) -> int:
+        return self._versions.get(str(user_id), 0)
+
+    def lookup(self, user_id) -> Optional[object]:
+        """Cached column values, INACTIVE / MISSING, or None on a miss."""
+        key = str(user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic() or entry[1] != self._versions.get(key, 0):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if isinstance(entry[2], str):
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return entry[2]
+
+    def store(self, user_id, user: Optional[User], version: int):
+        """Cache a freshly loaded user (or its absence) if nothing changed since `version`."""
+        key = str(user_id)
+        if user is None:
+            value, ttl = MISSING, self.negative_ttl_seconds
+        elif not user.is_active:
+            value, ttl = INACTIVE, self.negative_ttl_seconds
+        else:
+            value, ttl = {column: getattr(user, column) for column in _COLUMNS}, self.ttl_seconds
+        with self._lock:
+            if self._versions.get(key, 0) != version:
+                self.stale_loads += 1
+                return
+            self._entries[key] = (time.monotonic() + ttl, version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id):
+        key = str(user_id)
+        with self._lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            self._entries.pop(key, None)
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+    def get_stats(self) -> Dict:
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.negative_hits) / lookups, 3) if lookups else 0.0,
+            "stale_loads": self.stale_loads,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+def attach_cached_user(values: dict) -> User:
+    """Detached User built from cached values; `session.add()` attaches it without a query."""
+    user = User(**copy.deepcopy(values))  # JSON columns must not share state with the cache
+    make_transient_to_detached(user)
+    return user
+
+
+def parse_user_id(user_id) -> uuid.UUID:
+    return user_id if isinstance(user_id, uuid.UUID) else uuid.UUID(str(user_id))
+
+
+# ============================================
+# Invalidation on ORM writes
+# ============================================
+
+@event.listens_for(Session, "after_flush")
+def _collect_modified_users(session, flush_context):
+    modified = session.info.setdefault("modified_user_ids", set())
+    for instance in list(session.dirty) + list(session.deleted):
+        if isinstance(instance, User) and instance.id is not None:
+            modified.add(str(instance.id))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_modified_users(session):
+    for user_id in session.info.pop("modified_user_ids", ()):
+        principal_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_modified_users(session):
+    session.info.pop("modified_user_ids", None)
+
+
+# ============================================
+# Singleton Instance
+# ============================================
+
+principal_cache = PrincipalCache(
+    ttl_seconds=float(os.getenv("AUTH_PRINCIPAL_TTL_SECONDS", "60")),
+    negative_ttl_seconds=float(os.getenv("AUTH_PRINCIPAL_NEGATIVE_TTL_SECONDS", "300")),
+    max_entries=int(os.getenv("AUTH_PRINCIPAL_CACHE_SIZE", "10000")),
+)
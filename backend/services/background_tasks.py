@@ -2,193 +2,253 @@
 """
 THEKEY Background Tasks Service
 Handles async operations with progress tracking via SSE.
-Uses FastAPI BackgroundTasks (no Redis required for MVP).
+Work runs on the durable work queue (services/work_queue.py), so it survives
+restarts, is retried with backoff and is capped by the queue's worker pool.
 """
 
 import asyncio
-from typing import Callable, Any, Dict
-from datetime import datetime
-import traceback
+import json
+from typing import Optional
 
 # Import job management functions
 from routes.stream import create_job, update_job, get_job
+from services.work_queue import work_queue
+
+
+POST_TRADE_SYSTEM_PROMPT = """Bạn là THEKEY Post-Trade Analyst. Phân tích đánh giá 7 bước Dojo của trader.
+
+Trả về JSON với cấu trúc:
+{
+  "summary": "Tóm tắt ngắn về lệnh này",
+  "root_cause": "Nguyên nhân gốc rễ của kết quả (tốt hoặc xấu)",
+  "rule_violations": ["Danh sách các quy tắc đã vi phạm nếu có"],
+  "lessons": ["2-4 bài học rút ra"],
+  "next_time_checklist": ["3 điều cần làm lần sau"],
+  "micro_habit": "Một thói quen nhỏ để cải thiện",
+  "process_score": 0-100
+}
+
+KHÔNG đưa ra tín hiệu giao dịch. Chỉ tập trung vào quy trình và tâm lý."""
+
+POST_TRADE_FALLBACK = {
+    "summary": "Không thể phân tích chi tiết do lỗi AI",
+    "root_cause": "Cần xem lại sau",
+    "rule_violations": [],
+    "lessons": [
+        "Luôn tuân thủ stop-loss",
+        "Ghi chép lại quy trình"
+    ],
+    "next_time_checklist": [
+        "Kiểm tra R:R trước khi vào",
+        "Không dời SL",
+        "Đợi nến đóng"
+    ],
+    "micro_habit": "Journaling 3 câu sau mỗi lệnh",
+    "process_score": 50
+}
 
 
 class AsyncTaskRunner:
     """
-    Runs async tasks with progress tracking.
-    Designed to work with FastAPI BackgroundTasks.
+    Work queue handlers with progress tracking.
+    Handlers are idempotent: a retried or re-delivered item finishes the job
+    from what is already saved instead of calling Gemini again.
     """
-    
+
+    @property
+    def gemini_client(self):
+        from services.ai.gemini_client import gemini_client
+        return gemini_client
+
+    def register(self, queue):
+        queue.register("post_trade_analysis", self._tracked(self.run_post_trade_analysis), max_attempts=3)
+        queue.register("mindset_analysis", self._tracked(self.run_mindset_analysis), max_attempts=3)
+
     @staticmethod
-    async def run_post_trade_analysis(
-        job_id: str,
-        trade_id: str,
-        user_id: str,
-        user_process_evaluation: dict,
-        gemini_client,
-        db_session
-    ) -> dict:
+    def _tracked(handler):
+        """Fail the SSE job once the queue gives up on the item."""
+        async def run(payload: dict, attempt: int, final_attempt: bool):
+            try:
+                return await handler(payload, attempt, final_attempt)
+            except Exception as e:
+                if final_attempt:
+                    await update_job(payload["job_id"], error=f"Lỗi: {str(e)}")
+                raise
+        return run
+
+    # ------------------------------------------
+    # Post-trade analysis
+    # ------------------------------------------
+
+    def enqueue_post_trade_analysis(self, job_id: str, trade_id: str, user_id: str,
+                                    user_eval: dict, trade_data: dict) -> str:
+        return work_queue.enqueue("post_trade_analysis", {
+            "job_id": job_id,
+            "trade_id": trade_id,
+            "user_id": user_id,
+            "user_eval": user_eval,
+            "trade_data": trade_data,
+        }, key=job_id)
+
+    def _load_saved_analysis(self, trade_id: str, job_id: str) -> Optional[dict]:
+        from models.base import SessionLocal
+        from models.trade import Trade
+
+        db = SessionLocal()
+        try:
+            db_trade = db.query(Trade).filter(Trade.id == trade_id).first()
+            saved = db_trade.process_evaluation if db_trade else None
+            return saved if isinstance(saved, dict) and saved.get("job_id") == job_id else None
+        finally:
+            db.close()
+
+    def _save_analysis(self, trade_id: str, analysis: dict):
+        from models.base import SessionLocal
+        from models.trade import Trade
+
+        db = SessionLocal()
+        try:
+            db_trade = db.query(Trade).filter(Trade.id == trade_id).first()
+            if db_trade:
+                db_trade.process_evaluation = analysis
+                db_trade.process_score = analysis.get("process_score", 50)
+                db.commit()
+        finally:
+            db.close()
+
+    async def run_post_trade_analysis(self, payload: dict, attempt: int, final_attempt: bool) -> dict:
         """
-        Run post-trade analysis asynchronously with progress updates.
-        
-        Phases:
-        1. Load trade data (0-20%)
-        2. Prepare context (20-40%)
-        3. Call Gemini AI (40-80%)
-        4. Save results (80-100%)
+        Post-trade AI analysis of the user's Dojo 7-step evaluation.
+        Gemini errors are retried by the queue; the last attempt falls back
+        to a basic analysis so the job always completes.
         """
+        from services.ai.call_log_writer import current_user_id, current_endpoint
+
+        job_id, trade_id = payload["job_id"], payload["trade_id"]
+        current_user_id.set(payload["user_id"])
+        current_endpoint.set("post_trade_analysis")
+
+        job = await get_job(job_id)
+        if job and job["status"] == "completed":
+            return job["result"]
+        saved = await asyncio.to_thread(self._load_saved_analysis, trade_id, job_id)
+        if saved:
+            await update_job(job_id, progress=100, status="completed", message="Hoàn thành!", result=saved)
+            return saved
+
+        # Progress: 10% - Started
+        await update_job(job_id, progress=10, status="running",
+                        message="Đang phân tích dữ liệu giao dịch..." if attempt == 1 else "Đang thử lại phân tích...")
+
+        # Progress: 30% - Preparing context
+        await update_job(job_id, progress=30,
+                        message="Đang chuẩn bị ngữ cảnh cho AI...")
+
+        context = {
+            "trade": payload["trade_data"],
+            "user_evaluation": payload["user_eval"]
+        }
+
+        # Progress: 50% - Calling AI
+        await update_job(job_id, progress=50,
+                        message="Đang gọi AI phân tích...")
+
         try:
-            # Phase 1: Load trade data
-            update_job(job_id, progress=5, status="running", 
-                      message="Đang tải dữ liệu giao dịch...")
-            
-            from models import Trade
-            trade = db_session.query(Trade).filter(
-                Trade.id == trade_id,
-                Trade.user_id == user_id
-            ).first()
-            
-            if not trade:
-                update_job(job_id, error="Không tìm thấy giao dịch")
-                return {"error": "Trade not found"}
-            
-            update_job(job_id, progress=20, 
-                      message="Đã tải dữ liệu giao dịch")
-            
-            # Phase 2: Prepare context
-            update_job(job_id, progress=30, 
-                      message="Đang chuẩn bị ngữ cảnh phân tích...")
-            
-            # Get recent trades for context
-            recent_trades = db_session.query(Trade).filter(
-                Trade.user_id == user_id,
-                Trade.status == "CLOSED"
-            ).order_by(Trade.exit_time.desc()).limit(5).all()
-            
-            context = {
-                "trade": {
-                    "symbol": trade.symbol,
-                    "side": trade.side,
-                    "entry_price": float(trade.entry_price) if trade.entry_price else 0,
-                    "exit_price": float(trade.exit_price) if trade.exit_price else 0,
-                    "pnl": float(trade.pnl) if trade.pnl else 0,
-                    "pnl_pct": float(trade.pnl_pct) if trade.pnl_pct else 0,
-                },
-                "user_process_evaluation": user_process_evaluation,
-                "recent_trades": [
-                    {
-                        "symbol": t.symbol,
-                        "pnl": float(t.pnl) if t.pnl else 0,
-                        "pnl_pct": float(t.pnl_pct) if t.pnl_pct else 0,
-                    }
-                    for t in recent_trades[:3]
-                ]
-            }
-            
-            update_job(job_id, progress=40, 
-                      message="Đang gọi AI phân tích...")
-            
-            # Phase 3: Call Gemini AI
-            try:
-                analysis = await gemini_client.analyze_post_trade(context)
-                update_job(job_id, progress=80, 
-                          message="AI đã hoàn thành phân tích")
-            except Exception as ai_error:
-                print(f"[BackgroundTask] AI error: {ai_error}")
-                # Fallback analysis
-                analysis = {
-                    "summary": "Không thể phân tích chi tiết do lỗi AI.",
-                    "scores": user_process_evaluation,
-                    "recommendations": ["Tiếp tục theo dõi quy trình giao dịch"],
-                    "weakest_area": "UNKNOWN"
-                }
-                update_job(job_id, progress=80, 
-                          message="Sử dụng phân tích cơ bản (AI không khả dụng)")
-            
-            # Phase 4: Save results
-            update_job(job_id, progress=90, 
-                      message="Đang lưu kết quả...")
-            
-            import json
-            trade.process_evaluation = json.dumps(analysis, ensure_ascii=False)
-            trade.user_process_evaluation = json.dumps(user_process_evaluation, ensure_ascii=False)
-            db_session.commit()
-            
-            # Complete
-            update_job(job_id, progress=100, status="completed",
-                      message="Hoàn thành!", result=analysis)
-            
-            return analysis
-            
-        except Exception as e:
-            error_msg = f"Lỗi: {str(e)}"
-            print(f"[BackgroundTask] Error: {traceback.format_exc()}")
-            update_job(job_id, error=error_msg)
-            return {"error": error_msg}
-    
-    @staticmethod
-    async def run_mindset_analysis(
-        job_id: str,
-        user_id: str,
-        trade_history: list,
-        checkin_history: list,
-        gemini_client
-    ) -> dict:
+            analysis = await self.gemini_client.generate_json_response(
+                prompt=f"Phân tích lệnh sau:\n{json.dumps(context, ensure_ascii=False)}",
+                system_prompt=POST_TRADE_SYSTEM_PROMPT
+            )
+        except Exception as ai_error:
+            print(f"[PostTradeAI] Gemini error (attempt {attempt}): {ai_error}")
+            if not final_attempt:
+                await update_job(job_id, message="AI đang bận, sẽ thử lại...")
+                raise
+            analysis = dict(POST_TRADE_FALLBACK)
+
+        # Progress: 80% - Saving to DB (tagged with the job so a re-delivery finds it)
+        await update_job(job_id, progress=80,
+                        message="Đang lưu kết quả...")
+        analysis = {**analysis, "job_id": job_id}
+        await asyncio.to_thread(self._save_analysis, trade_id, analysis)
+
+        # Progress: 100% - Complete
+        await update_job(job_id, progress=100, status="completed",
+                        message="Hoàn thành!", result=analysis)
+        return analysis
+
+    # ------------------------------------------
+    # Mindset analysis
+    # ------------------------------------------
+
+    def enqueue_mindset_analysis(self, job_id: str, user_id: str,
+                                 trade_history: list, checkin_history: list) -> str:
+        return work_queue.enqueue("mindset_analysis", {
+            "job_id": job_id,
+            "user_id": user_id,
+            "trade_history": trade_history,
+            "checkin_history": checkin_history,
+        }, key=job_id)
+
+    async def run_mindset_analysis(self, payload: dict, attempt: int, final_attempt: bool) -> dict:
         """
         Run mindset/archetype analysis asynchronously.
-        
+
         Phases:
         1. Prepare behavioral data (0-30%)
         2. Call Gemini AI (30-80%)
         3. Process results (80-100%)
         """
+        from services.ai.call_log_writer import current_user_id, current_endpoint
+
+        job_id = payload["job_id"]
+        current_user_id.set(payload["user_id"])
+        current_endpoint.set("mindset_analysis")
+
+        job = await get_job(job_id)
+        if job and job["status"] == "completed":
+            return job["result"]
+
+        await update_job(job_id, progress=10, status="running",
+                        message="Đang quét dữ liệu hành vi...")
+
+        await update_job(job_id, progress=30,
+                        message="Đang phân tích mẫu hành vi...")
+
+        # Call AI
         try:
-            update_job(job_id, progress=10, status="running",
-                      message="Đang quét dữ liệu hành vi...")
-            
-            await asyncio.sleep(0.5)  # Simulate processing
-            
-            update_job(job_id, progress=30,
-                      message="Đang phân tích mẫu hành vi...")
-            
-            # Call AI
-            try:
-                analysis = await gemini_client.get_trader_archetype(
-                    trade_history, checkin_history
-                )
-                update_job(job_id, progress=80,
-                          message="Đã xác định hình mẫu trader")
-            except Exception as ai_error:
-                print(f"[BackgroundTask] AI error: {ai_error}")
-                analysis = {
-                    "archetype": "UNDEFINED",
-                    "confidence": 0.5,
-                    "description": "Chưa đủ dữ liệu để xác định hình mẫu",
-                    "traits": []
-                }
-            
-            update_job(job_id, progress=100, status="completed",
-                      message="Hoàn thành!", result=analysis)
-            
-            return analysis
-            
-        except Exception as e:
-            error_msg = f"Lỗi: {str(e)}"
-            update_job(job_id, error=error_msg)
-            return {"error": error_msg}
+            analysis = await self.gemini_client.analyze_trader_archetype(
+                payload["trade_history"], payload["checkin_history"]
+            )
+            await update_job(job_id, progress=80,
+                            message="Đã xác định hình mẫu trader")
+        except Exception as ai_error:
+            print(f"[BackgroundTask] AI error: {ai_error}")
+            if not final_attempt:
+                raise
+            analysis = {
+                "archetype": "UNDEFINED",
+                "confidence": 0.5,
+                "description": "Chưa đủ dữ liệu để xác định hình mẫu",
+                "traits": []
+            }
+
+        await update_job(job_id, progress=100, status="completed",
+                        message="Hoàn thành!", result=analysis)
+
+        return analysis
 
 
 # Convenience functions
-def start_post_trade_job(user_id: str, trade_id: str) -> str:
+async def start_post_trade_job(user_id: str, trade_id: str) -> str:
     """Create a job for post-trade analysis."""
-    return create_job(user_id, "post_trade_analysis", {"trade_id": trade_id})
+    return await create_job(user_id, "post_trade_analysis", {"trade_id": trade_id})
 
 
-def start_mindset_job(user_id: str) -> str:
+async def start_mindset_job(user_id: str) -> str:
     """Create a job for mindset analysis."""
-    return create_job(user_id, "mindset_analysis")
+    return await create_job(user_id, "mindset_analysis")
 
 
 # Export
 async_task_runner = AsyncTaskRunner()
+async_task_runner.register(work_queue)
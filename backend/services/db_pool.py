@@ -0,0 +1,203 @@
+# backend/services/db_pool.py
+"""
+THEKEY Database Connection Pool
+
+Shared psycopg_pool pools for raw-SQL access (the learning engine routes),
+instead of a fresh TCP + TLS handshake per request:
+- a sync pool for threads/scripts and an async pool for route handlers,
+  each created on first use
+- bounded size (min idle connections, max total) with an acquire timeout,
+  so a burst queues here instead of exhausting the upstream pooler
+- connections are health-checked when handed out and recycled after
+  max_idle / max_lifetime
+- every connection gets a statement_timeout, so one slow query can't hold
+  a pooled connection indefinitely
+
+Prepared statements stay disabled (prepare_threshold=None) for pgbouncer /
+Supabase pooler compatibility, like the SQLAlchemy engines in models/base.py.
+"""
+
+import asyncio
+import os
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Optional
+
+from psycopg_pool import AsyncConnectionPool, ConnectionPool
+
+
+def summarize_pool_stats(raw: Dict[str, int], min_size: int) -> Dict:
+    """Pool metrics from psycopg_pool's counters (see ConnectionPool.get_stats)."""
+    size = raw.get("pool_size", 0)
+    requests = raw.get("requests_num", 0)
+    wait_ms = raw.get("requests_wait_ms", 0)
+    return {
+        "size": size,
+        "max_size": raw.get("pool_max", 0),
+        "in_use": size - raw.get("pool_available", 0),
+        "overflow": max(0, size - min_size),  # Connections opened above the idle minimum
+        "waiting": raw.get("requests_waiting", 0),
+        "requests": requests,
+        "queued": raw.get("requests_queued", 0),
+        "timeouts": raw.get("requests_errors", 0),
+        "avg_wait_ms": round(wait_ms / requests, 2) if requests else 0.0,
+        "total_wait_ms": wait_ms,
+        "connections_opened": raw.get("connections_num", 0),
+        "connections_lost": raw.get("connections_lost", 0),
+        "connection_errors": raw.get("connections_errors", 0),
+    }
+
+
+class DatabasePool:
+    """Lazily opened sync and async psycopg pools over the same database."""
+
+    def __init__(
+        self,
+        conninfo: Optional[str] = None,
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout_seconds: float = 10.0,
+        statement_timeout_ms: int = 15000,
+        max_idle_seconds: float = 300.0,
+        max_lifetime_seconds: float = 1800.0,
+    ):
+        self._conninfo = conninfo
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout_seconds = timeout_seconds
+        self.statement_timeout_ms = statement_timeout_ms
+        self.max_idle_seconds = max_idle_seconds
+        self.max_lifetime_seconds = max_lifetime_seconds
+
+        self._pool: Optional[ConnectionPool] = None
+        self._async_pool: Optional[AsyncConnectionPool] = None
+        self._lock = threading.Lock()
+        self._async_lock = asyncio.Lock()
+
+    @property
+    def conninfo(self) -> str:
+        if self._conninfo is None:
+            from models.base import psycopg_url
+            self._conninfo = psycopg_url()
+        return self._conninfo
+
+    def _settings(self, name: str) -> Dict:
+        return {
+            "conninfo": self.conninfo,
+            "kwargs": {"prepare_threshold": None},
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "timeout": self.timeout_seconds,
+            "max_idle": self.max_idle_seconds,
+            "max_lifetime": self.max_lifetime_seconds,
+            "name": name,
+            "open": False,
+        }
+
+    def _statement_timeout_sql(self) -> str:
+        return f"SET statement_timeout = {int(self.statement_timeout_ms)}"
+
+    def _configure(self, conn):
+        conn.execute(self._statement_timeout_sql())
+        conn.commit()  # Hand the connection back to the pool idle
+
+    async def _configure_async(self, conn):
+        await conn.execute(self._statement_timeout_sql())
+        await conn.commit()
+
+    # ------------------------------------------
+    # Sync pool
+    # ------------------------------------------
+
+    def _sync_pool(self) -> ConnectionPool:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    pool = ConnectionPool(
+                        configure=self._configure,
+                        check=ConnectionPool.check_connection,
+                        **self._settings("thekey-sync"),
+                    )
+                    pool.open(wait=False)
+                    self._pool = pool
+                    print(f"🔌 [DBPool] Sync pool opened (max {self.max_size})")
+        return self._pool
+
+    @contextmanager
+    def connection(self):
+        """Pooled sync connection; committed on exit, rolled back on error."""
+        with self._sync_pool().connection() as conn:
+            yield conn
+
+    # ------------------------------------------
+    # Async pool
+    # ------------------------------------------
+
+    async def _pool_async(self) -> AsyncConnectionPool:
+        if self._async_pool is None:
+            async with self._async_lock:
+                if self._async_pool is None:
+                    pool = AsyncConnectionPool(
+                        configure=self._configure_async,
+                        check=AsyncConnectionPool.check_connection,
+                        **self._settings("thekey-async"),
+                    )
+                    await pool.open(wait=False)
+                    self._async_pool = pool
+                    print(f"🔌 [DBPool] Async pool opened (max {self.max_size})")
+        return self._async_pool
+
+    @asynccontextmanager
+    async def async_connection(self):
+        """Pooled async connection; committed on exit, rolled back on error."""
+        pool = await self._pool_async()
+        async with pool.connection() as conn:
+            yield conn
+
+    # ------------------------------------------
+    # Lifecycle & metrics
+    # ------------------------------------------
+
+    async def close(self):
+        if self._async_pool is not None:
+            await self._async_pool.close()
+            self._async_pool = None
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            await asyncio.to_thread(pool.close)
+
+    def get_stats(self) -> Dict:
+        stats = {
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "timeout_seconds": self.timeout_seconds,
+            "statement_timeout_ms": self.statement_timeout_ms,
+        }
+        for key, pool in (("sync", self._pool), ("async", self._async_pool)):
+            stats[key] = summarize_pool_stats(pool.get_stats(), self.min_size) if pool is not None else None
+        return stats
+
+
+def create_db_pool() -> DatabasePool:
+    return DatabasePool(
+        min_size=int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+        max_size=int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+        timeout_seconds=float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "10")),
+        statement_timeout_ms=int(os.getenv("DB_POOL_STATEMENT_TIMEOUT_MS", "15000")),
+        max_idle_seconds=float(os.getenv("DB_POOL_MAX_IDLE_SECONDS", "300")),
+        max_lifetime_seconds=float(os.getenv("DB_POOL_MAX_LIFETIME_SECONDS", "1800")),
+    )
+
+
+# ============================================
+# Singleton Instance & Dependencies
+# ============================================
+
+db_pool = create_db_pool()
+
+
+async def get_pool_connection():
+    """FastAPI dependency: a pooled async connection for the request."""
+    async with db_pool.async_connection() as conn:
+        yield conn
+
@@ -0,0 +1,116 @@
+# backend/services/job_broadcaster.py
+"""
+THEKEY Job Broadcaster
+
+Push-based fan-out of job state to SSE connections (replaces the 500 ms
+polling loop in routes/stream.py):
+- `update_job` publishes the new job snapshot once
+- each subscriber holds only the LATEST snapshot plus a wake-up future, so a
+  slow client never queues a backlog and a burst of updates coalesces
+- idle connections sleep until an update or their heartbeat is due
+"""
+
+import asyncio
+from typing import Dict, Optional, Set
+
+
+class JobSubscription:
+    """One SSE connection waiting on one job."""
+
+    __slots__ = ("job_id", "latest", "_pending", "_waiter", "_loop")
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.latest: Optional[dict] = None
+        self._pending = False  # `latest` not yet handed to the stream
+        self._waiter: Optional[asyncio.Future] = None
+        self._loop = asyncio.get_running_loop()
+
+    def _deliver(self, snapshot: dict):
+        self.latest = snapshot
+        self._pending = True
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(True)
+
+    def deliver(self, snapshot: dict):
+        try:
+            same_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            same_loop = False
+        if same_loop:
+            self._deliver(snapshot)
+        else:
+            # Published from a worker thread: hand over to the subscriber's loop
+            self._loop.call_soon_threadsafe(self._deliver, snapshot)
+
+    async def next(self, timeout: float) -> Optional[dict]:
+        """Latest snapshot since the last call, or None if `timeout` passed quietly."""
+        if not self._pending:
+            # Bare future + timer handle: much cheaper than wait_for() at thousands of streams
+            self._waiter = self._loop.create_future()
+            timer = self._loop.call_later(timeout, self._time_out, self._waiter)
+            try:
+                await self._waiter
+            finally:
+                timer.cancel()
+                self._waiter = None
+            if not self._pending:
+                return None
+        self._pending = False
+        return self.latest
+
+    @staticmethod
+    def _time_out(waiter: asyncio.Future):
+        if not waiter.done():
+            waiter.set_result(False)
+
+
+class JobBroadcaster:
+    """Single publisher, N subscribers per job."""
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[JobSubscription]] = {}
+
+        # Metrics
+        self.published = 0
+        self.deliveries = 0
+        self.subscriptions = 0
+
+    def subscribe(self, job_id: str) -> JobSubscription:
+        subscription = JobSubscription(job_id)
+        self._subscribers.setdefault(job_id, set()).add(subscription)
+        self.subscriptions += 1
+        return subscription
+
+    def unsubscribe(self, subscription: JobSubscription):
+        subscribers = self._subscribers.get(subscription.job_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.job_id]
+
+    def publish(self, job_id: str, snapshot: dict):
+        subscribers = self._subscribers.get(job_id)
+        self.published += 1
+        if not subscribers:
+            return
+        for subscription in tuple(subscribers):
+            subscription.deliver(snapshot)
+        self.deliveries += len(subscribers)
+
+    def get_stats(self) -> Dict:
+        return {
+            "jobs_watched": len(self._subscribers),
+            "subscribers": sum(len(s) for s in self._subscribers.values()),
+            "subscriptions_total": self.subscriptions,
+            "published": self.published,
+            "deliveries": self.deliveries,
+        }
+
+
+# ============================================
+# Singleton Instance
+# ============================================
+
+job_broadcaster = JobBroadcaster()
@@ -0,0 +1,214 @@
+# backend/services/job_registry.py
+"""
+THEKEY Job Registry
+
+In-memory store behind the SSE job endpoints (routes/stream.py):
+- jobs kept in creation order, so age-based reaping pops from the front
+- active jobs indexed by (user_id, type, trade_id): O(1) dedupe on create
+- timestamps are `time.monotonic()` floats, never re-parsed strings
+- bounded: `max_count` is enforced on every create, and a background reaper
+  drops jobs older than `max_age_seconds`
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+ACTIVE_STATUSES = ("pending", "running")
+
+JOB_TIMEOUT_SECONDS = 120  # 2 min max per job
+
+
+class JobRegistry:
+    """Bounded, indexed job storage with a periodic reaper (single-process job store)."""
+
+    name = "memory"
+    clock = staticmethod(time.monotonic)
+    blocking = False  # Plain dict operations: safe to call on the event loop
+
+    def __init__(self, max_age_seconds: float = 3600, max_count: int = 10_000, reap_interval_seconds: float = 60):
+        self.max_age_seconds = max_age_seconds
+        self.max_count = max_count
+        self.reap_interval_seconds = reap_interval_seconds
+        self._jobs: "OrderedDict[str, dict]" = OrderedDict()
+        self._active: Dict[Tuple[str, str, str], str] = {}
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.created = 0
+        self.deduplicated = 0
+        self.reaped_age = 0
+        self.evicted_count = 0
+
+    @staticmethod
+    def _dedupe_key(user_id: str, job_type: str, metadata: Optional[dict]) -> Optional[Tuple[str, str, str]]:
+        if metadata and "trade_id" in metadata:
+            return (user_id, job_type, str(metadata["trade_id"]))
+        return None
+
+    # ------------------------------------------
+    # CRUD
+    # ------------------------------------------
+
+    def create(self, user_id: str, job_type: str, metadata: dict = None) -> str:
+        """New job id, or the id of an active job for the same (user, type, trade)."""
+        key = self._dedupe_key(user_id, job_type, metadata)
+        if key is not None:
+            existing_id = self._active.get(key)
+            if existing_id is not None and existing_id in self._jobs:
+                self.deduplicated += 1
+                print(f"ℹ️ Returning existing job {existing_id} for trade {key[2]}")
+                return existing_id
+
+        job_id = str(uuid.uuid4())
+        now = time.monotonic()
+        self._jobs[job_id] = {
+            "id": job_id,
+            "user_id": user_id,
+            "type": job_type,
+            "status": "pending",
+            "progress": 0,
+            "message": "Đang khởi tạo...",
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+            "timeout_at": now + JOB_TIMEOUT_SECONDS,
+            "metadata": metadata or {},
+        }
+        if key is not None:
+            self._active[key] = job_id
+        self.created += 1
+
+        while len(self._jobs) > self.max_count:
+            self._pop_oldest()
+            self.evicted_count += 1
+        return job_id
+
+    def listen(self, callback):
+        """Updates from other processes: none, everything lives in this one."""
+
+    def listen_events(self, callback):
+        """User events from other processes: none, see listen()."""
+
+    def publish_event(self, user_id: str, event_type: str, data: dict):
+        """Nothing to relay: the local hub has already delivered the event."""
+
+    def get(self, job_id: str) -> Optional[dict]:
+        return self._jobs.get(job_id)
+
+    def update(self, job_id: str, progress: int = None, status: str = None,
+               message: str = None, result: dict = None, error: str = None) -> Optional[dict]:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        if progress is not None:
+            job["progress"] = min(max(progress, 0), 100)
+        if status is not None:
+            job["status"] = status
+        if message is not None:
+            job["message"] = message
+        if result is not None:
+            job["result"] = result
+        if error is not None:
+            job["error"] = error
+            job["status"] = "failed"
+        job["updated_at"] = time.monotonic()
+
+        if job["status"] not in ACTIVE_STATUSES:
+            self._unindex(job)
+        return job
+
+    def _unindex(self, job: dict):
+        key = self._dedupe_key(job["user_id"], job["type"], job["metadata"])
+        if key is not None and self._active.get(key) == job["id"]:
+            del self._active[key]
+
+    def _pop_oldest(self):
+        _, job = self._jobs.popitem(last=False)
+        self._unindex(job)
+
+    def clear(self):
+        self._jobs.clear()
+        self._active.clear()
+
+    # ------------------------------------------
+    # Reaping
+    # ------------------------------------------
+
+    def reap(self, max_age_seconds: float = None) -> int:
+        """Drop jobs older than max_age (oldest first, stops at the first young one)."""
+        max_age = self.max_age_seconds if max_age_seconds is None else max_age_seconds
+        cutoff = time.monotonic() - max_age
+        removed = 0
+        while self._jobs:
+            oldest = next(iter(self._jobs.values()))
+            if oldest["created_at"] > cutoff:
+                break
+            self._pop_oldest()
+            removed += 1
+        self.reaped_age += removed
+        return removed
+
+    def start(self):
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run())
+        print("🧹 [JobRegistry] Reaper started")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.reap_interval_seconds)
+            try:
+                removed = self.reap()
+                if removed:
+                    print(f"🧹 [JobRegistry] Reaped {removed} old jobs ({len(self._jobs)} left)")
+            except Exception as e:
+                print(f"⚠️ [JobRegistry] Reaper error: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        by_status: Dict[str, int] = {}
+        approx_bytes = 0
+        for job in self._jobs.values():
+            by_status[job["status"]] = by_status.get(job["status"], 0) + 1
+            approx_bytes += len(json.dumps(job, ensure_ascii=False, default=str))
+        oldest = next(iter(self._jobs.values()), None)
+        return {
+            "backend": self.name,
+            "jobs": len(self._jobs),
+            "active_index": len(self._active),
+            "by_status": by_status,
+            "approx_bytes": approx_bytes,
+            "oldest_age_seconds": round(time.monotonic() - oldest["created_at"], 1) if oldest else 0,
+            "max_count": self.max_count,
+            "max_age_seconds": self.max_age_seconds,
+            "created": self.created,
+            "deduplicated": self.deduplicated,
+            "reaped_age": self.reaped_age,
+            "evicted_count": self.evicted_count,
+        }
+
+
+# ============================================
+# Singleton Instance
+# ============================================
+
+job_registry = JobRegistry(
+    max_age_seconds=float(os.getenv("JOB_MAX_AGE_SECONDS", "3600")),
+    max_count=int(os.getenv("JOB_MAX_COUNT", "10000")),
+    reap_interval_seconds=float(os.getenv("JOB_REAP_INTERVAL_SECONDS", "60")),
+)
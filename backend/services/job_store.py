@@ -0,0 +1,481 @@
+# backend/services/job_store.py
+"""
+THEKEY Job Store
+
+Pluggable storage for SSE jobs, so the POST that creates a job and the SSE GET
+that follows it may land on different uvicorn workers:
+
+    JOB_STORE=memory    JobRegistry, single process only
+    JOB_STORE=sqlite    one WAL-mode file shared by workers on the same host;
+                        each worker polls for other workers' updates
+    JOB_STORE=postgres  `stream_jobs` table; updates are pushed to every worker
+                        with LISTEN/NOTIFY
+
+The default follows WORK_QUEUE (sqlite unless set): queue items are claimed
+by any worker, so the job they update must be visible to every worker.
+
+Every store calls the `listen()` callback with jobs updated by OTHER
+processes; routes/stream.py forwards those to the local JobBroadcaster.
+The same channel relays per-user push events (`publish_event()` /
+`listen_events()`), so an achievement or cooldown raised on one worker
+reaches `/api/stream/me` connections held by another: SQLite workers poll a
+`stream_events` table, Postgres carries the event in the NOTIFY payload.
+Shared stores use wall-clock timestamps (`clock = time.time`), since
+monotonic clocks are not comparable across processes.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from services.job_registry import JOB_TIMEOUT_SECONDS, job_registry
+
+
+JobCallback = Callable[[dict], None]
+EventCallback = Callable[[str, str, dict], None]  # (user_id, event_type, data)
+
+NOTIFY_CHANNEL = "stream_jobs"
+NOTIFY_MAX_BYTES = 7900  # Postgres rejects NOTIFY payloads of 8000 bytes or more
+
+COLUMNS = ("id", "user_id", "type", "trade_id", "status", "progress", "message", "result",
+           "error", "metadata", "created_at", "updated_at", "timeout_at", "seq", "writer")
+
+
+class SQLJobStore:
+    """Shared logic for the SQLite and Postgres stores (SQL written with `?` params)."""
+
+    name = "sql"
+    clock = staticmethod(time.time)
+    blocking = True  # Every call is a database round trip; async callers use a thread
+
+    def __init__(self, max_age_seconds: float = 3600, max_count: int = 10_000, reap_interval_seconds: float = 60):
+        self.max_age_seconds = max_age_seconds
+        self.max_count = max_count
+        self.reap_interval_seconds = reap_interval_seconds
+        self.instance_id = uuid.uuid4().hex[:12]  # Tells our own writes apart from other workers'
+        self._callback: Optional[JobCallback] = None
+        self._event_callback: Optional[EventCallback] = None
+        self._tasks: List[asyncio.Task] = []
+
+        # Metrics
+        self.created = 0
+        self.deduplicated = 0
+        self.reaped = 0
+        self.remote_updates = 0
+        self.relayed_events = 0
+        self.remote_events = 0
+        self.errors = 0
+
+    # Backend hooks
+    def _execute(self, sql: str, params: tuple = (), fetch: bool = False) -> List[dict]:
+        raise NotImplementedError
+
+    def _trim_sql(self) -> str:
+        raise NotImplementedError
+
+    def _next_seq_sql(self) -> str:
+        return "0"
+
+    # ------------------------------------------
+    # Row mapping
+    # ------------------------------------------
+
+    @staticmethod
+    def _to_job(row: dict) -> dict:
+        return {
+            "id": row["id"],
+            "user_id": row["user_id"],
+            "type": row["type"],
+            "status": row["status"],
+            "progress": row["progress"],
+            "message": row["message"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+            "timeout_at": row["timeout_at"],
+            "metadata": json.loads(row["metadata"]) if row["metadata"] else {},
+        }
+
+    # ------------------------------------------
+    # CRUD
+    # ------------------------------------------
+
+    def listen(self, callback: JobCallback):
+        self._callback = callback
+
+    def create(self, user_id: str, job_type: str, metadata: dict = None) -> str:
+        metadata = metadata or {}
+        trade_id = str(metadata["trade_id"]) if "trade_id" in metadata else None
+        job_id = str(uuid.uuid4())
+        now = self.clock()
+        # The partial unique index on active (user, type, trade) jobs does the dedupe
+        rows = self._execute(
+            "INSERT INTO stream_jobs (id, user_id, type, trade_id, status, progress, message, metadata, "
+            "created_at, updated_at, timeout_at, seq, writer) "
+            f"VALUES (?, ?, ?, ?, 'pending', 0, ?, ?, ?, ?, ?, {self._next_seq_sql()}, ?) "
+            "ON CONFLICT DO NOTHING RETURNING id",
+            (job_id, user_id, job_type, trade_id, "Đang khởi tạo...", json.dumps(metadata, ensure_ascii=False),
+             now, now, now + JOB_TIMEOUT_SECONDS, self.instance_id),
+            fetch=True,
+        )
+        if rows:
+            self.created += 1
+            return job_id
+
+        existing = self._execute(
+            "SELECT id FROM stream_jobs WHERE user_id = ? AND type = ? AND trade_id = ? "
+            "AND status IN ('pending', 'running')",
+            (user_id, job_type, trade_id), fetch=True,
+        )
+        if existing:
+            self.deduplicated += 1
+            print(f"ℹ️ Returning existing job {existing[0]['id']} for trade {trade_id}")
+            return existing[0]["id"]
+        return self.create(user_id, job_type, metadata)  # Finished between INSERT and SELECT
+
+    def get(self, job_id: str) -> Optional[dict]:
+        rows = self._execute("SELECT * FROM stream_jobs WHERE id = ?", (job_id,), fetch=True)
+        return self._to_job(rows[0]) if rows else None
+
+    def update(self, job_id: str, progress: int = None, status: str = None,
+               message: str = None, result: dict = None, error: str = None) -> Optional[dict]:
+        if error is not None:
+            status = "failed"
+        rows = self._execute(
+            "UPDATE stream_jobs SET "
+            "progress = COALESCE(?, progress), status = COALESCE(?, status), message = COALESCE(?, message), "
+            "result = COALESCE(?, result), error = COALESCE(?, error), "
+            f"updated_at = ?, seq = {self._next_seq_sql()}, writer = ? "
+            "WHERE id = ? RETURNING *",
+            (
+                min(max(progress, 0), 100) if progress is not None else None,
+                status,
+                message,
+                json.dumps(result, ensure_ascii=False) if result is not None else None,
+                error,
+                self.clock(),
+                self.instance_id,
+                job_id,
+            ),
+            fetch=True,
+        )
+        return self._to_job(rows[0]) if rows else None
+
+    def clear(self):
+        self._execute("DELETE FROM stream_jobs")
+
+    def _publish_remote(self, job: dict):
+        self.remote_updates += 1
+        if self._callback:
+            self._callback(job)
+
+    # ------------------------------------------
+    # User events
+    # ------------------------------------------
+
+    def listen_events(self, callback: EventCallback):
+        self._event_callback = callback
+
+    def publish_event(self, user_id: str, event_type: str, data: dict):
+        """Hand a user event to the other workers (this one has already delivered it)."""
+        raise NotImplementedError
+
+    def _deliver_remote_event(self, user_id: str, event_type: str, data: dict):
+        self.remote_events += 1
+        if self._event_callback:
+            self._event_callback(user_id, event_type, data)
+
+    # ------------------------------------------
+    # Reaping
+    # ------------------------------------------
+
+    def reap(self, max_age_seconds: float = None) -> int:
+        max_age = self.max_age_seconds if max_age_seconds is None else max_age_seconds
+        aged = self._execute("DELETE FROM stream_jobs WHERE created_at < ? RETURNING id",
+                             (self.clock() - max_age,), fetch=True)
+        trimmed = self._execute(self._trim_sql(), (self.max_count,), fetch=True)
+        removed = len(aged) + len(trimmed)
+        self.reaped += removed
+        return removed
+
+    async def _reap_loop(self):
+        while True:
+            await asyncio.sleep(self.reap_interval_seconds)
+            try:
+                removed = await asyncio.to_thread(self.reap)
+                if removed:
+                    print(f"🧹 [JobStore] Reaped {removed} old jobs")
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️ [JobStore] Reaper error: {e}")
+
+    def _background(self) -> List:
+        return [self._reap_loop()]
+
+    def start(self):
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(coro) for coro in self._background()]
+        print(f"🗂️ [JobStore] {self.name} store started (instance {self.instance_id})")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = {
+            "backend": self.name,
+            "instance_id": self.instance_id,
+            "created": self.created,
+            "deduplicated": self.deduplicated,
+            "reaped": self.reaped,
+            "remote_updates": self.remote_updates,
+            "relayed_events": self.relayed_events,
+            "remote_events": self.remote_events,
+            "errors": self.errors,
+        }
+        try:
+            rows = self._execute(
+                "SELECT status, COUNT(*) AS jobs, "
+                "SUM(LENGTH(COALESCE(result, '')) + LENGTH(COALESCE(metadata, ''))) AS payload_bytes "
+                "FROM stream_jobs GROUP BY status",
+                fetch=True,
+            )
+            stats["by_status"] = {r["status"]: r["jobs"] for r in rows}
+            stats["jobs"] = sum(r["jobs"] for r in rows)
+            stats["approx_bytes"] = sum(int(r["payload_bytes"] or 0) for r in rows)
+        except Exception as e:
+            stats["stats_error"] = str(e)
+        return stats
+
+
+class SQLiteJobStore(SQLJobStore):
+    """Workers on one host share a WAL-mode SQLite file; updates are picked up by polling."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str, poll_interval_seconds: float = 0.2, event_max_age_seconds: float = 60, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.poll_interval_seconds = poll_interval_seconds
+        self.event_max_age_seconds = event_max_age_seconds  # Only needs to outlive one poll of every worker
+        self._lock = threading.Lock()
+        self._last_seq = 0
+        self._last_event_seq = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")  # Readers never block the writer
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS stream_jobs (
+                id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                type TEXT NOT NULL,
+                trade_id TEXT,
+                status TEXT NOT NULL,
+                progress INTEGER NOT NULL DEFAULT 0,
+                message TEXT,
+                result TEXT,
+                error TEXT,
+                metadata TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                timeout_at REAL NOT NULL,
+                seq INTEGER NOT NULL DEFAULT 0,
+                writer TEXT
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_stream_jobs_active
+                ON stream_jobs (user_id, type, trade_id)
+                WHERE status IN ('pending', 'running') AND trade_id IS NOT NULL;
+            CREATE INDEX IF NOT EXISTS idx_stream_jobs_seq ON stream_jobs (seq);
+            CREATE INDEX IF NOT EXISTS idx_stream_jobs_created ON stream_jobs (created_at);
+            CREATE TABLE IF NOT EXISTS stream_events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                type TEXT NOT NULL,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                writer TEXT NOT NULL
+            );
+        """)
+        self._last_seq = self._execute("SELECT COALESCE(MAX(seq), 0) AS seq FROM stream_jobs", fetch=True)[0]["seq"]
+        self._last_event_seq = self._execute("SELECT COALESCE(MAX(seq), 0) AS seq FROM stream_events",
+                                             fetch=True)[0]["seq"]
+
+    def _execute(self, sql: str, params: tuple = (), fetch: bool = False) -> List[dict]:
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            return [dict(row) for row in cursor.fetchall()] if fetch else []
+
+    def _next_seq_sql(self) -> str:
+        # Evaluated inside the single-writer statement, so sequence numbers are unique
+        return "(SELECT COALESCE(MAX(seq), 0) + 1 FROM stream_jobs)"
+
+    def _trim_sql(self) -> str:
+        return ("DELETE FROM stream_jobs WHERE id IN "
+                "(SELECT id FROM stream_jobs ORDER BY created_at DESC LIMIT -1 OFFSET ?) RETURNING id")
+
+    def publish_event(self, user_id: str, event_type: str, data: dict):
+        self._execute(
+            "INSERT INTO stream_events (user_id, type, data, created_at, writer) VALUES (?, ?, ?, ?, ?)",
+            (str(user_id), event_type, json.dumps(data, ensure_ascii=False), self.clock(), self.instance_id),
+        )
+        self.relayed_events += 1
+
+    def reap(self, max_age_seconds: float = None) -> int:
+        self._execute("DELETE FROM stream_events WHERE created_at < ?", (self.clock() - self.event_max_age_seconds,))
+        return super().reap(max_age_seconds)
+
+    def poll_remote(self) -> int:
+        """Publish rows and user events other workers wrote since the last poll."""
+        rows = self._execute("SELECT * FROM stream_jobs WHERE seq > ? ORDER BY seq", (self._last_seq,), fetch=True)
+        published = 0
+        for row in rows:
+            self._last_seq = max(self._last_seq, row["seq"])
+            if row["writer"] != self.instance_id:
+                self._publish_remote(self._to_job(row))
+                published += 1
+
+        events = self._execute("SELECT * FROM stream_events WHERE seq > ? AND writer != ? ORDER BY seq",
+                               (self._last_event_seq, self.instance_id), fetch=True)
+        for event in events:
+            self._last_event_seq = event["seq"]
+            self._deliver_remote_event(event["user_id"], event["type"], json.loads(event["data"]))
+            published += 1
+        return published
+
+    async def _poll_loop(self):
+        while True:
+            await asyncio.sleep(self.poll_interval_seconds)
+            try:
+                self.poll_remote()  # One indexed range query per worker, not per SSE client
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️ [JobStore] SQLite poll error: {e}")
+
+    def _background(self) -> List:
+        return super()._background() + [self._poll_loop()]
+
+
+class PostgresJobStore(SQLJobStore):
+    """`stream_jobs` in Postgres; writes NOTIFY every worker, which LISTENs on one connection."""
+
+    name = "postgres"
+
+    def _execute(self, sql: str, params: tuple = (), fetch: bool = False) -> List[dict]:
+        from models.base import engine
+
+        conn = engine.raw_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(sql.replace("?", "%s"), params)
+            rows = []
+            if fetch and cursor.description:
+                names = [col[0] for col in cursor.description]
+                rows = [dict(zip(names, values)) for values in cursor.fetchall()]
+            if sql.lstrip().upper().startswith(("INSERT", "UPDATE")) and rows and "id" in rows[0]:
+                for row in rows:
+                    cursor.execute("SELECT pg_notify(%s, %s)", (
+                        NOTIFY_CHANNEL, json.dumps({"id": row["id"], "writer": self.instance_id}),
+                    ))
+            conn.commit()  # NOTIFY is delivered on commit, together with the row
+            return rows
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _trim_sql(self) -> str:
+        return ("DELETE FROM stream_jobs WHERE id IN "
+                "(SELECT id FROM stream_jobs ORDER BY created_at DESC OFFSET ?) RETURNING id")
+
+    def publish_event(self, user_id: str, event_type: str, data: dict):
+        """The event rides in the NOTIFY payload; nothing is stored."""
+        event = {"user_id": str(user_id), "type": event_type, "data": data}
+        payload = json.dumps({"event": event, "writer": self.instance_id}, ensure_ascii=False)
+        if len(payload.encode()) > NOTIFY_MAX_BYTES:
+            # Too large to notify: other workers' clients refetch over REST instead
+            event = {"user_id": str(user_id), "type": "resync", "data": {"reason": "missed_events"}}
+            payload = json.dumps({"event": event, "writer": self.instance_id})
+        self._execute("SELECT pg_notify(?, ?)", (NOTIFY_CHANNEL, payload))
+        self.relayed_events += 1
+
+    async def _listen_loop(self):
+        import psycopg
+        from models.base import DATABASE_URL
+
+        url = DATABASE_URL.replace("+psycopg", "")
+        delay = 1
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(url, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                    delay = 1
+                    async for notify in conn.notifies():
+                        payload = json.loads(notify.payload)
+                        if payload.get("writer") == self.instance_id:
+                            continue
+                        if "event" in payload:
+                            event = payload["event"]
+                            self._deliver_remote_event(event["user_id"], event["type"], event["data"])
+                            continue
+                        job = await asyncio.to_thread(self.get, payload["id"])
+                        if job:
+                            self._publish_remote(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️ [JobStore] LISTEN connection lost: {e}. Reconnecting in {delay}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+
+    def _background(self) -> List:
+        return super()._background() + [self._listen_loop()]
+
+
+def create_job_store(backend: Optional[str] = None):
+    """Store selected by JOB_STORE (memory | sqlite | postgres), defaulting to the WORK_QUEUE backend."""
+    backend = (backend or os.getenv("JOB_STORE") or os.getenv("WORK_QUEUE", "sqlite")).lower()
+    limits = {
+        "max_age_seconds": float(os.getenv("JOB_MAX_AGE_SECONDS", "3600")),
+        "max_count": int(os.getenv("JOB_MAX_COUNT", "10000")),
+        "reap_interval_seconds": float(os.getenv("JOB_REAP_INTERVAL_SECONDS", "60")),
+    }
+    if backend == "memory":
+        if int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+            # Another worker would claim the queue item and update a job this one never sees
+            raise ValueError("JOB_STORE=memory with WEB_CONCURRENCY > 1: use JOB_STORE=sqlite or postgres")
+        return job_registry
+    if backend == "sqlite":
+        default_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "jobs.sqlite3")
+        return SQLiteJobStore(
+            os.getenv("JOB_STORE_SQLITE_PATH", default_path),
+            poll_interval_seconds=float(os.getenv("JOB_STORE_POLL_SECONDS", "0.2")),
+            **limits,
+        )
+    if backend == "postgres":
+        return PostgresJobStore(**limits)
+    raise ValueError(f"Unknown JOB_STORE: {backend}")
+
+
+# ============================================
+# Singleton Instance
+# ============================================
+
+job_store = create_job_store()
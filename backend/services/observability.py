@@ -500,6 +500,8 @@ async def check_gemini():
     import os
     if os.getenv("GEMINI_API_KEY"):
         return {"status": "healthy"}
+    if os.getenv("GEMINI_BACKEND", "live").lower() in ("replay", "simulate"):
+        return {"status": "healthy", "message": "Offline replay backend"}
     return {"status": "degraded", "message": "API key not set"}
 
 
@@ -0,0 +1,300 @@
+# backend/services/protection/trade_classifier.py
+"""
+THEKEY Local Trade Decision Classifier
+
+A small CPU model distilled from past Gemini gray-zone decisions
+(`ai_predictions` rows with rule='AI_EVALUATION').
+
+- Multinomial logistic regression over rule hits + stats features
+- Pure Python (no numpy/sklearn dependency), ~20 features, 3 classes
+- Served in-process: confident cases are decided locally in microseconds,
+  low-confidence cases still escalate to Gemini
+
+Training: `python -m scripts.train_trade_classifier`
+"""
+
+import json
+import math
+import os
+import random
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+
+CLASSES = ["ALLOW", "WARN", "BLOCK"]
+
+RULE_IDS = [
+    "R01_CONSECUTIVE_LOSSES",
+    "R02_POSITION_SIZE",
+    "R03_DAILY_LIMIT",
+    "R04_COOLDOWN",
+    "R05_STOP_LOSS",
+    "R06_RISK_PCT",
+    "R07_TAKE_PROFIT",
+    "R08_RR_RATIO",
+    "R09_OVERCONFIDENCE",
+    "R10_MARKET_HOURS",
+]
+
+MARKET_DANGER_LEVELS = {"SAFE": 0, "CAUTION": 1, "DANGER": 2, "EXTREME": 3}
+
+FEATURE_NAMES = [f"rule_{rule_id}" for rule_id in RULE_IDS] + [
+    "consecutive_losses",
+    "consecutive_wins",
+    "position_pct",
+    "position_vs_max",
+    "has_stop_loss",
+    "has_take_profit",
+    "history_len",
+    "last_trade_loss",
+    "market_danger",
+    "has_active_pattern",
+]
+
+DEFAULT_MODEL_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "data", "trade_classifier.json"
+)
+
+
+# ============================================
+# Feature Extraction
+# ============================================
+
+def extract_features(
+    trade: Dict[str, Any],
+    stats: Dict[str, Any],
+    trade_history: List[Dict[str, Any]],
+    user_settings: Dict[str, Any],
+    triggered_rules: List[str],
+    market_danger: Optional[str] = None,
+    active_pattern: Any = None,
+) -> Dict[str, float]:
+    """Build the numeric feature vector used by both training and serving."""
+    balance = float(user_settings.get("account_balance") or 1000) or 1000.0
+    max_size = float(user_settings.get("max_position_size_usd") or balance * 0.1) or 1.0
+    position_size = float(trade.get("positionSize") or 0)
+    last_trade = trade_history[0] if trade_history else {}
+
+    triggered = set(triggered_rules or [])
+    features = {f"rule_{rule_id}": 1.0 if rule_id in triggered else 0.0 for rule_id in RULE_IDS}
+    features.update({
+        "consecutive_losses": float(min(stats.get("consecutiveLosses", 0) or 0, 10)),
+        "consecutive_wins": float(min(stats.get("consecutiveWins", 0) or 0, 10)),
+        "position_pct": min(position_size / balance * 100, 100.0),
+        "position_vs_max": min(position_size / max_size, 5.0),
+        "has_stop_loss": 1.0 if (trade.get("stopLoss") or trade.get("stop_loss")) else 0.0,
+        "has_take_profit": 1.0 if (trade.get("takeProfit") or trade.get("take_profit")) else 0.0,
+        "history_len": float(min(len(trade_history or []), 50)),
+        "last_trade_loss": 1.0 if (last_trade.get("pnl") or 0) < 0 else 0.0,
+        "market_danger": float(MARKET_DANGER_LEVELS.get(str(market_danger).upper(), 1)),
+        "has_active_pattern": 1.0 if active_pattern else 0.0,
+    })
+    return features
+
+
+def vectorize(features: Dict[str, float]) -> List[float]:
+    return [float(features.get(name, 0.0)) for name in FEATURE_NAMES]
+
+
+# ============================================
+# Model
+# ============================================
+
+class TradeDecisionClassifier:
+    """
+    Multinomial logistic regression (softmax) with L2 regularization.
+    Features are standardized with means/stds learned at fit time.
+    """
+
+    def __init__(self):
+        self.weights: List[List[float]] = [[0.0] * len(FEATURE_NAMES) for _ in CLASSES]
+        self.bias: List[float] = [0.0] * len(CLASSES)
+        self.means: List[float] = [0.0] * len(FEATURE_NAMES)
+        self.stds: List[float] = [1.0] * len(FEATURE_NAMES)
+        self.metadata: Dict[str, Any] = {}
+
+    def _standardize(self, x: List[float]) -> List[float]:
+        return [(v - m) / s for v, m, s in zip(x, self.means, self.stds)]
+
+    @staticmethod
+    def _softmax(logits: List[float]) -> List[float]:
+        peak = max(logits)
+        exps = [math.exp(l - peak) for l in logits]
+        total = sum(exps)
+        return [e / total for e in exps]
+
+    def _logits(self, z: List[float]) -> List[float]:
+        return [
+            b + sum(w_i * z_i for w_i, z_i in zip(w, z))
+            for w, b in zip(self.weights, self.bias)
+        ]
+
+    def fit(
+        self,
+        X: List[List[float]],
+        y: List[str],
+        epochs: int = 40,
+        learning_rate: float = 0.1,
+        l2: float = 0.001,
+        batch_size: int = 64,
+        seed: int = 42,
+    ):
+        """Train with mini-batch gradient descent."""
+        n_features = len(FEATURE_NAMES)
+        n = len(X)
+        if n == 0:
+            raise ValueError("No training samples")
+
+        self.means = [sum(row[j] for row in X) / n for j in range(n_features)]
+        self.stds = []
+        for j in range(n_features):
+            var = sum((row[j] - self.means[j]) ** 2 for row in X) / n
+            self.stds.append(math.sqrt(var) or 1.0)
+
+        Z = [self._standardize(row) for row in X]
+        labels = [CLASSES.index(label) for label in y]
+        order = list(range(n))
+        rng = random.Random(seed)
+
+        for _ in range(epochs):
+            rng.shuffle(order)
+            for start in range(0, n, batch_size):
+                batch = order[start:start + batch_size]
+                grad_w = [[0.0] * n_features for _ in CLASSES]
+                grad_b = [0.0] * len(CLASSES)
+                for idx in batch:
+                    z = Z[idx]
+                    probs = self._softmax(self._logits(z))
+                    for k in range(len(CLASSES)):
+                        err = probs[k] - (1.0 if labels[idx] == k else 0.0)
+                        grad_b[k] += err
+                        row = grad_w[k]
+                        for j in range(n_features):
+                            row[j] += err * z[j]
+                scale = learning_rate / len(batch)
+                for k in range(len(CLASSES)):
+                    self.bias[k] -= scale * grad_b[k]
+                    w = self.weights[k]
+                    for j in range(n_features):
+                        w[j] -= scale * grad_w[k][j] + learning_rate * l2 * w[j]
+        return self
+
+    def predict_proba(self, x: List[float]) -> Dict[str, float]:
+        probs = self._softmax(self._logits(self._standardize(x)))
+        return dict(zip(CLASSES, probs))
+
+    def predict(self, x: List[float]) -> Tuple[str, float]:
+        probs = self.predict_proba(x)
+        decision = max(probs, key=probs.get)
+        return decision, probs[decision]
+
+    # ------------------------------------------
+    # Persistence
+    # ------------------------------------------
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "classes": CLASSES,
+            "feature_names": FEATURE_NAMES,
+            "weights": self.weights,
+            "bias": self.bias,
+            "means": self.means,
+            "stds": self.stds,
+            "metadata": self.metadata,
+        }
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "TradeDecisionClassifier":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("feature_names") != FEATURE_NAMES or data.get("classes") != CLASSES:
+            raise ValueError("Model artifact does not match current feature schema")
+        model = cls()
+        model.weights = data["weights"]
+        model.bias = data["bias"]
+        model.means = data["means"]
+        model.stds = data["stds"]
+        model.metadata = data.get("metadata", {})
+        return model
+
+
+# ============================================
+# In-process Serving
+# ============================================
+
+class LocalTradeClassifier:
+    """
+    Serves the distilled model for gray-zone trades.
+
+    `decide` returns (decision, confidence) only when the model is confident
+    enough; otherwise None, and the caller escalates to Gemini.
+    """
+
+    def __init__(self, model_path: str = DEFAULT_MODEL_PATH, min_confidence: float = 0.85):
+        self.model_path = model_path
+        self.min_confidence = min_confidence
+        self._model: Optional[TradeDecisionClassifier] = None
+        self._load_attempted = False
+
+        # Metrics
+        self.local_decisions = 0
+        self.escalations = 0
+        self.total_predict_us = 0.0
+
+    @property
+    def model(self) -> Optional[TradeDecisionClassifier]:
+        if not self._load_attempted:
+            self._load_attempted = True
+            if os.path.exists(self.model_path):
+                try:
+                    self._model = TradeDecisionClassifier.load(self.model_path)
+                    print(f"✅ [TradeClassifier] Loaded model ({self._model.metadata.get('trained_at', 'unknown')})")
+                except Exception as e:
+                    print(f"⚠️ [TradeClassifier] Could not load model: {e}")
+        return self._model
+
+    def reload(self):
+        self._model = None
+        self._load_attempted = False
+
+    def decide(self, features: Dict[str, float]) -> Optional[Tuple[str, float]]:
+        model = self.model
+        if model is None:
+            return None
+
+        start = time.perf_counter()
+        decision, confidence = model.predict(vectorize(features))
+        self.total_predict_us += (time.perf_counter() - start) * 1_000_000
+
+        if confidence >= self.min_confidence:
+            self.local_decisions += 1
+            return decision, confidence
+        self.escalations += 1
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.local_decisions + self.escalations
+        return {
+            "model_loaded": self._model is not None,
+            "min_confidence": self.min_confidence,
+            "local_decisions": self.local_decisions,
+            "escalations": self.escalations,
+            "local_rate": self.local_decisions / total if total > 0 else 0.0,
+            "avg_predict_us": round(self.total_predict_us / total, 1) if total > 0 else 0.0,
+        }
+
+
+# ============================================
+# Singleton Instance
+# ============================================
+
+trade_classifier = LocalTradeClassifier(
+    model_path=os.getenv("TRADE_CLASSIFIER_PATH", DEFAULT_MODEL_PATH),
+    min_confidence=float(os.getenv("TRADE_CLASSIFIER_MIN_CONFIDENCE", "0.85")),
+)
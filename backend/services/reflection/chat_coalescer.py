@@ -0,0 +1,124 @@
+# backend/services/reflection/chat_coalescer.py
+"""
+THEKEY Chat Coalescer
+
+Tilted users often fire 3-5 short messages within seconds. Instead of one
+Gemini call per message, messages from the same user arriving within a
+debounce window are merged into a single `generate_chat_response` call and
+every waiting request receives the combined answer.
+
+- The window restarts with each new message, capped by `max_wait_seconds`
+- A window of 0 disables coalescing
+"""
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+ChatGenerator = Callable[[str, List[Dict], str], Awaitable[Dict]]
+
+
+@dataclass
+class _Window:
+    mode: str
+    history: List[Dict]
+    messages: List[str] = field(default_factory=list)
+    opened_at: float = field(default_factory=time.monotonic)
+    last_message_at: float = field(default_factory=time.monotonic)
+    result: Optional[asyncio.Future] = None
+    task: Optional[asyncio.Task] = None
+
+
+class ChatCoalescer:
+    """Per-user debounce window in front of the chat model call."""
+
+    def __init__(self, window_seconds: float = 1.5, max_wait_seconds: float = 4.0):
+        self.window_seconds = window_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self._windows: Dict[str, _Window] = {}
+
+        # Metrics
+        self.messages_received = 0
+        self.model_calls = 0
+        self.messages_merged = 0  # Messages that rode along on another message's call
+
+    @staticmethod
+    def combine(messages: List[str]) -> str:
+        if len(messages) == 1:
+            return messages[0]
+        return "\n".join(messages)
+
+    async def submit(self, user_id: str, message: str, history: List[Dict], mode: str, generate: ChatGenerator) -> Dict:
+        """Queue a message; resolves with the (possibly combined) model answer."""
+        self.messages_received += 1
+
+        if self.window_seconds <= 0:
+            self.model_calls += 1
+            return await generate(message, history, mode)
+
+        key = str(user_id)
+        window = self._windows.get(key)
+        if window and window.mode == mode and not window.result.done():
+            window.messages.append(message)
+            window.last_message_at = time.monotonic()
+            self.messages_merged += 1
+        else:
+            window = _Window(mode=mode, history=history, messages=[message])
+            window.result = asyncio.get_running_loop().create_future()
+            self._windows[key] = window
+            # Own task so a disconnecting first caller doesn't cancel everyone's answer
+            window.task = asyncio.create_task(self._flush_when_quiet(key, window, generate))
+
+        return await asyncio.shield(window.result)
+
+    async def _flush_when_quiet(self, key: str, window: _Window, generate: ChatGenerator):
+        try:
+            try:
+                while True:
+                    now = time.monotonic()
+                    quiet_at = window.last_message_at + self.window_seconds
+                    deadline = window.opened_at + self.max_wait_seconds
+                    wake_at = min(quiet_at, deadline)
+                    if now >= wake_at:
+                        break
+                    await asyncio.sleep(wake_at - now)
+            finally:
+                # Close the window before calling the model; later messages open a new one
+                if self._windows.get(key) is window:
+                    del self._windows[key]
+
+            self.model_calls += 1
+            result = await generate(self.combine(window.messages), window.history, window.mode)
+            if len(window.messages) > 1:
+                result = {**result, "merged_messages": len(window.messages)}
+            window.result.set_result(result)
+        except asyncio.CancelledError:
+            # Shutdown / reload: fail the waiting requests instead of leaving them hanging
+            if not window.result.done():
+                window.result.set_exception(RuntimeError("Chat request cancelled before the reply was generated"))
+            raise
+        except Exception as e:
+            window.result.set_exception(e)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "window_seconds": self.window_seconds,
+            "open_windows": len(self._windows),
+            "messages_received": self.messages_received,
+            "model_calls": self.model_calls,
+            "messages_merged": self.messages_merged,
+            "calls_saved_rate": self.messages_merged / self.messages_received if self.messages_received else 0.0,
+        }
+
+
+# ============================================
+# Singleton Instance
+# ============================================
+
+chat_coalescer = ChatCoalescer(
+    window_seconds=float(os.getenv("CHAT_COALESCE_WINDOW_SECONDS", "1.5")),
+    max_wait_seconds=float(os.getenv("CHAT_COALESCE_MAX_WAIT_SECONDS", "4")),
+)
@@ -0,0 +1,370 @@
+# backend/services/reflection/checkin_pool.py
+"""
+THEKEY Check-in Question Pool
+
+Pre-generated 'Mind Scan' question sets, bucketed by cohort:
+- trade-count bucket (NEW / BEGINNER / ACTIVE / VETERAN)
+- most recent emotional state from check-ins
+
+A background job keeps several sets per cohort warm, rotating through them
+and expiring old sets. `/checkin/questions` serves from the pool and never
+waits on Gemini; an empty cohort falls back to static questions and is
+refilled first on the next cycle.
+
+The pool is shared through the `checkin_pool` row of `ai_snapshots`: the
+worker holding that row's lease generates, every other worker adopts the
+stored sets on its next cycle (same scheme as services/ai/market_snapshot.py).
+"""
+
+import asyncio
+import os
+import socket
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Deque, Dict, List, Optional, Tuple
+
+
+TRADE_BUCKETS = [
+    ("NEW", 0),        # 0 trades
+    ("BEGINNER", 1),   # 1-9 trades
+    ("ACTIVE", 10),    # 10-49 trades
+    ("VETERAN", 50),   # 50+ trades
+]
+
+EMOTIONAL_STATES = ["UNKNOWN", "CALM", "FOCUSED", "CONFIDENT", "ANXIOUS", "TILTED", "EXHAUSTED"]
+
+Cohort = Tuple[str, str]
+
+SNAPSHOT_KEY = "checkin_pool"
+
+
+def trade_bucket(trade_count: int) -> str:
+    """Map a trade count to its cohort bucket."""
+    bucket = TRADE_BUCKETS[0][0]
+    for name, lower_bound in TRADE_BUCKETS:
+        if (trade_count or 0) >= lower_bound:
+            bucket = name
+    return bucket
+
+
+def cohort_for(trade_count: int, emotional_state: Optional[str]) -> Cohort:
+    state = (emotional_state or "UNKNOWN").upper()
+    if state not in EMOTIONAL_STATES:
+        state = "UNKNOWN"
+    return trade_bucket(trade_count), state
+
+
+@dataclass
+class QuestionSet:
+    questions: List[Dict]
+    created_at: float = field(default_factory=time.time)
+    served: int = 0
+
+
+class CheckinQuestionPool:
+    """
+    Rotating, expiring pool of check-in question sets per cohort.
+
+    Serving is O(1) and never touches the model: the next set of the cohort
+    is returned and moved to the back of the rotation.
+    """
+
+    def __init__(
+        self,
+        sets_per_cohort: int = 3,
+        ttl_seconds: int = 12 * 3600,
+        refill_interval_seconds: int = 300,
+        generation_pause_seconds: float = 2.0,
+        lease_seconds: int = 300,
+    ):
+        self.sets_per_cohort = sets_per_cohort
+        self.ttl_seconds = ttl_seconds
+        self.refill_interval_seconds = refill_interval_seconds
+        self.generation_pause_seconds = generation_pause_seconds
+        self.lease_seconds = lease_seconds  # Renewed after every cohort the leader fills
+
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+        self._pool: Dict[Cohort, Deque[QuestionSet]] = {}
+        self._shared_generated_at: Optional[float] = None  # epoch seconds of the adopted row
+        self._demanded: Dict[Cohort, float] = {}  # cohorts that missed, by last miss time
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.generation_failures = 0
+        self.expired = 0
+        self.adopted_count = 0
+
+    @property
+    def gemini_client(self):
+        from services.ai.gemini_client import gemini_client
+        return gemini_client
+
+    # ------------------------------------------
+    # Read path
+    # ------------------------------------------
+
+    def get(self, trade_count: int, emotional_state: Optional[str] = None) -> Optional[List[Dict]]:
+        """Serve the next question set for the cohort, or None if the cohort is cold."""
+        cohort = cohort_for(trade_count, emotional_state)
+        self._evict_expired(cohort)
+        sets = self._pool.get(cohort)
+
+        if not sets:
+            self.misses += 1
+            self._demanded[cohort] = time.time()
+            return None
+
+        # Rotate: serve the front set and move it to the back
+        question_set = sets.popleft()
+        question_set.served += 1
+        sets.append(question_set)
+        self.hits += 1
+        return [dict(q) for q in question_set.questions]
+
+    def add(self, cohort: Cohort, questions: List[Dict]):
+        sets = self._pool.setdefault(cohort, deque())
+        sets.append(QuestionSet(questions=questions))
+        while len(sets) > self.sets_per_cohort:
+            sets.popleft()
+
+    def _evict_expired(self, cohort: Cohort):
+        sets = self._pool.get(cohort)
+        if not sets:
+            return
+        now = time.time()
+        live = deque(s for s in sets if now - s.created_at < self.ttl_seconds)
+        self.expired += len(sets) - len(live)
+        self._pool[cohort] = live
+
+    # ------------------------------------------
+    # Background refill
+    # ------------------------------------------
+
+    def _cohorts_needing_refill(self) -> List[Cohort]:
+        """All cohorts below target, cohorts that recently missed first."""
+        needing = []
+        for bucket, _ in TRADE_BUCKETS:
+            for state in EMOTIONAL_STATES:
+                cohort = (bucket, state)
+                self._evict_expired(cohort)
+                if len(self._pool.get(cohort, ())) < self.sets_per_cohort:
+                    needing.append(cohort)
+        needing.sort(key=lambda c: -self._demanded.get(c, 0))
+        return needing
+
+    async def refill_once(self) -> int:
+        """
+        Adopt the shared pool, then generate missing sets if this worker wins
+        the lease. Paced so refills never stampede Gemini.
+        """
+        shared_available = True
+        try:
+            await asyncio.to_thread(self._load_shared)
+        except Exception as e:
+            shared_available = False
+            print(f"⚠️ [CheckinPool] Shared pool unavailable: {e}")
+
+        needing = self._cohorts_needing_refill()
+        if not needing:
+            return 0
+
+        if shared_available:
+            try:
+                acquired = await asyncio.to_thread(self._try_acquire_lease)
+            except Exception as e:
+                print(f"⚠️ [CheckinPool] Lease error, refilling locally: {e}")
+                acquired, shared_available = True, False
+            if not acquired:
+                return 0  # Another worker is generating; adopt its sets on the next cycle
+
+        try:
+            return await self._generate(needing, shared_available)
+        finally:
+            if shared_available:
+                try:
+                    await asyncio.to_thread(self._release_lease)
+                except Exception as e:
+                    print(f"⚠️ [CheckinPool] Could not release lease: {e}")
+
+    async def _generate(self, needing: List[Cohort], shared_available: bool) -> int:
+        created = 0
+        for cohort in needing:
+            bucket, state = cohort
+            missing = self.sets_per_cohort - len(self._pool.get(cohort, ()))
+            for variant in range(missing):
+                questions = await self.gemini_client.fetch_checkin_questions({
+                    "trade_bucket": bucket,
+                    "recent_emotional_state": state,
+                    "variant": variant,
+                })
+                if questions:
+                    self.add(cohort, questions)
+                    self.generated += 1
+                    created += 1
+                else:
+                    self.generation_failures += 1
+                    break  # Model is struggling; move on and retry next cycle
+                await asyncio.sleep(self.generation_pause_seconds)
+            self._demanded.pop(cohort, None)
+
+            if shared_available and created:
+                try:
+                    # Publish as we go, and keep the lease while cohorts remain
+                    await asyncio.to_thread(self._store_shared)
+                    if not await asyncio.to_thread(self._try_acquire_lease):
+                        break
+                except Exception as e:
+                    print(f"⚠️ [CheckinPool] Could not persist pool: {e}")
+        return created
+
+    # ------------------------------------------
+    # Shared pool (ai_snapshots row + lease)
+    # ------------------------------------------
+
+    def _to_payload(self) -> Dict:
+        return {
+            f"{bucket}|{state}": [{"questions": s.questions, "created_at": s.created_at} for s in sets]
+            for (bucket, state), sets in self._pool.items() if sets
+        }
+
+    def _adopt(self, payload: Dict, generated_at: float):
+        pool: Dict[Cohort, Deque[QuestionSet]] = {}
+        for key, sets in (payload or {}).items():
+            bucket, _, state = key.partition("|")
+            pool[(bucket, state)] = deque(
+                QuestionSet(questions=s["questions"], created_at=s["created_at"]) for s in sets
+            )
+        self._pool = pool
+        self._shared_generated_at = generated_at
+        self.adopted_count += 1
+
+    def _load_shared(self):
+        from models import AISnapshot
+        from models.base import SessionLocal
+
+        db = SessionLocal()
+        try:
+            row = db.query(AISnapshot).filter(AISnapshot.key == SNAPSHOT_KEY).first()
+            if row and row.payload and row.generated_at:
+                generated_at = row.generated_at
+                if generated_at.tzinfo is None:
+                    generated_at = generated_at.replace(tzinfo=timezone.utc)
+                ts = generated_at.timestamp()
+                if self._shared_generated_at is None or ts > self._shared_generated_at:
+                    self._adopt(row.payload, ts)
+        finally:
+            db.close()
+
+    def _try_acquire_lease(self) -> bool:
+        """Atomically take (or renew) the generation lease if it is free or expired."""
+        from sqlalchemy import text
+        from models.base import engine
+
+        now = datetime.now(timezone.utc)
+        with engine.begin() as conn:
+            conn.execute(text("""
+                INSERT INTO ai_snapshots (key) VALUES (:key)
+                ON CONFLICT (key) DO NOTHING
+            """), {"key": SNAPSHOT_KEY})
+            result = conn.execute(text("""
+                UPDATE ai_snapshots
+                SET lease_owner = :owner, lease_until = :until
+                WHERE key = :key
+                  AND (lease_until IS NULL OR lease_until < :now OR lease_owner = :owner)
+                RETURNING key
+            """), {
+                "key": SNAPSHOT_KEY,
+                "owner": self.worker_id,
+                "until": now + timedelta(seconds=self.lease_seconds),
+                "now": now,
+            })
+            return result.first() is not None
+
+    def _release_lease(self):
+        from sqlalchemy import text
+        from models.base import engine
+
+        with engine.begin() as conn:
+            conn.execute(text("""
+                UPDATE ai_snapshots SET lease_owner = NULL, lease_until = NULL
+                WHERE key = :key AND lease_owner = :owner
+            """), {"key": SNAPSHOT_KEY, "owner": self.worker_id})
+
+    def _store_shared(self):
+        from models import AISnapshot
+        from models.base import SessionLocal
+
+        generated_at = time.time()
+        db = SessionLocal()
+        try:
+            row = db.query(AISnapshot).filter(AISnapshot.key == SNAPSHOT_KEY).first()
+            if not row:
+                row = AISnapshot(key=SNAPSHOT_KEY)
+                db.add(row)
+            row.payload = self._to_payload()
+            row.generated_at = datetime.fromtimestamp(generated_at, tz=timezone.utc)
+            db.commit()
+            self._shared_generated_at = generated_at  # Our own write: nothing to adopt
+        finally:
+            db.close()
+
+    def start(self):
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run())
+        print(f"🔄 [CheckinPool] Refill job started ({self.worker_id})")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        from services.ai.scheduler import current_priority, BACKGROUND
+        current_priority.set(BACKGROUND)  # Task-local: never competes with user requests
+        while True:
+            try:
+                created = await self.refill_once()
+                if created:
+                    print(f"✅ [CheckinPool] Generated {created} question sets")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ [CheckinPool] Refill error: {e}")
+            await asyncio.sleep(self.refill_interval_seconds)
+
+    def get_stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "cohorts_warm": sum(1 for sets in self._pool.values() if sets),
+            "sets_total": sum(len(sets) for sets in self._pool.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total > 0 else 0.0,
+            "generated": self.generated,
+            "generation_failures": self.generation_failures,
+            "expired": self.expired,
+            "adopted_count": self.adopted_count,
+        }
+
+
+# ============================================
+# Singleton Instance
+# ============================================
+
+checkin_pool = CheckinQuestionPool(
+    sets_per_cohort=int(os.getenv("CHECKIN_POOL_SETS_PER_COHORT", "3")),
+    ttl_seconds=int(os.getenv("CHECKIN_POOL_TTL_SECONDS", str(12 * 3600))),
+    refill_interval_seconds=int(os.getenv("CHECKIN_POOL_REFILL_SECONDS", "300")),
+)
@@ -0,0 +1,303 @@
+# backend/services/reflection/conversation_store.py
+"""
+THEKEY Conversation Store
+
+Server-side memory for the coach chat, so clients no longer resend history:
+- the last `keep_recent` turns are kept verbatim
+- older turns are folded into a rolling summary by a background Gemini call
+  after each reply (never on the request path)
+- state lives in `chat_conversations`, shared by every worker: turns are
+  appended in SQL and a summary is only applied if the turns it covers are
+  still at the head of the row, so concurrent writers never drop each other's
+  turns. The in-process copy only answers while the database is unreachable.
+"""
+
+import asyncio
+import os
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+
+@dataclass
+class Conversation:
+    summary: str = ""
+    summarized_turns: int = 0
+    turns: List[Dict] = field(default_factory=list)  # [{"sender": "user" | "coach", "text": ...}]
+
+    def to_dict(self) -> Dict:
+        return {"summary": self.summary, "summarized_turns": self.summarized_turns, "recent_turns": list(self.turns)}
+
+
+def normalize_client_history(history: List[Dict]) -> List[Dict]:
+    """Map frontend chat messages onto stored turns."""
+    turns = []
+    for msg in history or []:
+        text = msg.get("text") or msg.get("display_text") or ""
+        if text:
+            turns.append({"sender": "user" if msg.get("sender") == "user" else "coach", "text": text})
+    return turns
+
+
+class ConversationStore:
+    """Per-user conversation memory with asynchronous rolling summarization."""
+
+    def __init__(self, keep_recent: int = 8, summarize_batch: int = 6, max_cached_users: int = 5000):
+        self.keep_recent = keep_recent
+        self.summarize_batch = summarize_batch  # Summarize once this many turns overflow the window
+        self.max_cached_users = max_cached_users
+        self._cache: "OrderedDict[str, Conversation]" = OrderedDict()
+        self._summarizing: Dict[str, asyncio.Task] = {}
+
+        # Metrics
+        self.summaries = 0
+        self.summary_failures = 0
+        self.stale_summaries = 0
+        self.turns_summarized = 0
+        self.persist_failures = 0
+
+    @property
+    def gemini_client(self):
+        from services.ai.gemini_client import gemini_client
+        return gemini_client
+
+    @property
+    def max_turns(self) -> int:
+        # Hard cap in case summarization keeps failing
+        return self.keep_recent + 4 * self.summarize_batch
+
+    # ------------------------------------------
+    # Persistence
+    # ------------------------------------------
+
+    def _load(self, user_id: str) -> Optional[Conversation]:
+        from models.base import SessionLocal
+        from models.chat_conversation import ChatConversation
+
+        db = SessionLocal()
+        try:
+            row = db.query(ChatConversation).filter(ChatConversation.user_id == user_id).first()
+            if not row:
+                return None
+            return Conversation(
+                summary=row.summary or "",
+                summarized_turns=row.summarized_turns or 0,
+                turns=list(row.recent_turns or []),
+            )
+        finally:
+            db.close()
+
+    def _write(self, stmt):
+        from models.base import SessionLocal
+
+        db = SessionLocal()
+        try:
+            result = db.execute(stmt)
+            value = result.scalar() if result.returns_rows else result.rowcount
+            db.commit()
+            return value
+        finally:
+            db.close()
+
+    def _upsert(self, user_id: str, turns: List[Dict], set_builder, where=None):
+        from sqlalchemy.dialects.postgresql import insert
+        from models.chat_conversation import ChatConversation
+
+        stmt = insert(ChatConversation).values(
+            user_id=user_id, summary="", summarized_turns=0, recent_turns=turns,
+            updated_at=datetime.now(timezone.utc),
+        )
+        return stmt.on_conflict_do_update(
+            index_elements=[ChatConversation.user_id], set_=set_builder(stmt.excluded), where=where,
+        )
+
+    def _seed(self, user_id: str, turns: List[Dict]):
+        """Store `turns` unless the user already has a non-empty conversation."""
+        from sqlalchemy import func
+        from models.chat_conversation import ChatConversation
+
+        empty = (func.coalesce(func.jsonb_array_length(ChatConversation.recent_turns), 0) == 0) \
+            & (func.coalesce(ChatConversation.summary, "") == "")
+        self._write(self._upsert(
+            user_id, turns,
+            lambda excluded: {"recent_turns": excluded.recent_turns, "updated_at": excluded.updated_at},
+            where=empty,
+        ))
+
+    def _append(self, user_id: str, turns: List[Dict]) -> int:
+        """Append `turns` in one statement; returns the new number of recent turns."""
+        from sqlalchemy import cast, func, type_coerce, update
+        from sqlalchemy.dialects.postgresql import JSONB, JSONPATH
+        from models.chat_conversation import ChatConversation
+
+        current = func.coalesce(ChatConversation.recent_turns, type_coerce([], JSONB))
+        stmt = self._upsert(
+            user_id, turns,
+            lambda excluded: {"recent_turns": current.op("||")(excluded.recent_turns), "updated_at": excluded.updated_at},
+        ).returning(func.jsonb_array_length(ChatConversation.recent_turns))
+        length = self._write(stmt)
+
+        if length > self.max_turns:
+            self._write(
+                update(ChatConversation)
+                .where(ChatConversation.user_id == user_id,
+                       func.jsonb_array_length(ChatConversation.recent_turns) > self.max_turns)
+                .values(recent_turns=func.jsonb_path_query_array(
+                    ChatConversation.recent_turns, cast(f"$[last - {self.max_turns - 1} to last]", JSONPATH)))
+            )
+            length = self.max_turns
+        return length
+
+    def _fold(self, user_id: str, folded: List[Dict], summary: str, summarized_before: int) -> bool:
+        """
+        Replace the first len(folded) turns with `summary`. Only applies while
+        those turns are still the head of the row and no other summary landed
+        meanwhile; returns False if another writer got there first.
+        """
+        from sqlalchemy import cast, func, type_coerce, update
+        from sqlalchemy.dialects.postgresql import JSONB, JSONPATH
+        from models.chat_conversation import ChatConversation
+
+        count = len(folded)
+
+        def window(path: str):
+            return func.jsonb_path_query_array(ChatConversation.recent_turns, cast(path, JSONPATH))
+
+        stmt = (
+            update(ChatConversation)
+            .where(
+                ChatConversation.user_id == user_id,
+                func.coalesce(ChatConversation.summarized_turns, 0) == summarized_before,
+                window(f"$[0 to {count - 1}]") == type_coerce(folded, JSONB),
+            )
+            .values(
+                summary=summary,
+                summarized_turns=func.coalesce(ChatConversation.summarized_turns, 0) + count,
+                recent_turns=window(f"$[{count} to last]"),
+                updated_at=datetime.now(timezone.utc),
+            )
+        )
+        return bool(self._write(stmt))
+
+    def _clear(self, user_id: str):
+        self._write(self._upsert(
+            user_id, [],
+            lambda excluded: {
+                "summary": excluded.summary,
+                "summarized_turns": excluded.summarized_turns,
+                "recent_turns": excluded.recent_turns,
+                "updated_at": excluded.updated_at,
+            },
+        ))
+
+    # ------------------------------------------
+    # Read / write
+    # ------------------------------------------
+
+    async def get(self, user_id, client_history: Optional[List[Dict]] = None) -> Conversation:
+        """
+        Load the user's conversation. An empty store is seeded once from the
+        history an older client still sends.
+        """
+        key = str(user_id)
+        try:
+            conversation = await asyncio.to_thread(self._load, key)
+            if not (conversation and (conversation.turns or conversation.summary)) and client_history:
+                seed = normalize_client_history(client_history)[-self.keep_recent:]
+                if seed:
+                    await asyncio.to_thread(self._seed, key, seed)
+                    conversation = await asyncio.to_thread(self._load, key)
+        except Exception as e:
+            print(f"⚠️ [Conversation] Load failed for {key}: {e}")
+            conversation = self._cache.get(key)
+            return Conversation() if conversation is None else conversation
+
+        conversation = conversation or Conversation()
+        self._remember(key, conversation)
+        return conversation
+
+    def _remember(self, key: str, conversation: Conversation):
+        self._cache[key] = conversation
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_cached_users:
+            self._cache.popitem(last=False)
+
+    async def append_exchange(self, user_id, user_text: str, coach_text: str):
+        """Record one user message + reply, then maybe summarize in the background."""
+        key = str(user_id)
+        turns = [{"sender": "user", "text": user_text}]
+        if coach_text:
+            turns.append({"sender": "coach", "text": coach_text})
+
+        try:
+            length = await asyncio.to_thread(self._append, key, turns)
+        except Exception as e:
+            self.persist_failures += 1
+            print(f"⚠️ [Conversation] Persist failed for {key}: {e}")
+            return
+
+        if length >= self.keep_recent + self.summarize_batch and key not in self._summarizing:
+            self._summarizing[key] = asyncio.create_task(self._summarize(key))
+
+    async def reset(self, user_id):
+        key = str(user_id)
+        self._remember(key, Conversation())
+        try:
+            await asyncio.to_thread(self._clear, key)
+        except Exception as e:
+            self.persist_failures += 1
+            print(f"⚠️ [Conversation] Persist failed for {key}: {e}")
+
+    # ------------------------------------------
+    # Rolling summary
+    # ------------------------------------------
+
+    async def _summarize(self, key: str):
+        """Fold the turns that overflow the recent window into the summary."""
+        from services.ai.scheduler import current_priority, BACKGROUND
+        current_priority.set(BACKGROUND)  # Runs in its own task, after the reply was sent
+        try:
+            conversation = await asyncio.to_thread(self._load, key)
+            if conversation is None:
+                return
+            overflow = len(conversation.turns) - self.keep_recent
+            if overflow <= 0:
+                return
+            old_turns = conversation.turns[:overflow]
+            summary = await self.gemini_client.summarize_conversation(conversation.summary, old_turns)
+            if not summary:
+                self.summary_failures += 1
+                return
+            # New turns may have arrived meanwhile; only drop the ones we summarized
+            if not await asyncio.to_thread(self._fold, key, old_turns, summary, conversation.summarized_turns):
+                self.stale_summaries += 1  # Another worker summarized, trimmed or reset first
+                return
+            self.summaries += 1
+            self.turns_summarized += overflow
+        except Exception as e:
+            self.summary_failures += 1
+            print(f"⚠️ [Conversation] Summary failed for {key}: {e}")
+        finally:
+            self._summarizing.pop(key, None)
+
+    def get_stats(self) -> Dict:
+        return {
+            "cached_users": len(self._cache),
+            "summaries_in_flight": len(self._summarizing),
+            "summaries": self.summaries,
+            "summary_failures": self.summary_failures,
+            "stale_summaries": self.stale_summaries,
+            "turns_summarized": self.turns_summarized,
+            "persist_failures": self.persist_failures,
+        }
+
+
+# ============================================
+# Singleton Instance
+# ============================================
+
+conversation_store = ConversationStore(
+    keep_recent=int(os.getenv("CHAT_KEEP_RECENT_TURNS", "8")),
+    summarize_batch=int(os.getenv("CHAT_SUMMARIZE_BATCH", "6")),
+)
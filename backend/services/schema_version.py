@@ -0,0 +1,80 @@
+# backend/services/schema_version.py
+"""
+THEKEY Schema Version Check
+
+Schema changes are applied once per deploy by `python -m scripts.migrate`
+(alembic chain in backend/alembic), not by every worker on boot. At startup
+each worker only compares the database's alembic revision with the head of
+the migration scripts it ships with:
+- current: database is at the head revision
+- behind: database is at an older known revision (migrate wasn't run)
+- unknown_revision: database is at a revision this code doesn't know,
+  e.g. after rolling back a deploy
+- unversioned: no alembic_version table (run migrate once to bootstrap)
+- error: the check itself failed (database unreachable, ...)
+
+SCHEMA_CHECK_MODE: "warn" (default) logs anything but current and keeps
+serving, "strict" refuses to start, "off" skips the check.
+"""
+
+import os
+import time
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import inspect, text
+
+
+ALEMBIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic")
+SCHEMA_CHECK_MODE = os.getenv("SCHEMA_CHECK_MODE", "warn").lower()
+
+
+@lru_cache(maxsize=1)
+def _script_directory():
+    from alembic.script import ScriptDirectory
+    return ScriptDirectory(ALEMBIC_DIR)
+
+
+def expected_heads() -> Tuple[str, ...]:
+    """Head revision(s) of the migration scripts shipped with this code."""
+    return tuple(sorted(_script_directory().get_heads()))
+
+
+def current_revisions(connection) -> Optional[Tuple[str, ...]]:
+    """The database's alembic revision(s), or None if it isn't under alembic."""
+    if not inspect(connection).has_table("alembic_version"):
+        return None
+    return tuple(sorted(row[0] for row in connection.execute(text("SELECT version_num FROM alembic_version"))))
+
+
+def _is_known(revision: str) -> bool:
+    try:
+        return _script_directory().get_revision(revision) is not None
+    except Exception:
+        return False
+
+
+def check_schema_version(engine=None) -> Dict:
+    """Compare the database revision with the code's head (two catalog queries)."""
+    start = time.perf_counter()
+    result = {"status": "error", "database": None, "expected": None}
+    try:
+        if engine is None:
+            from models.base import engine
+        result["expected"] = list(expected_heads())
+        with engine.connect() as connection:
+            current = current_revisions(connection)
+        if current is None:
+            result["status"] = "unversioned"
+        else:
+            result["database"] = list(current)
+            if list(current) == result["expected"]:
+                result["status"] = "current"
+            elif all(_is_known(revision) for revision in current):
+                result["status"] = "behind"
+            else:
+                result["status"] = "unknown_revision"
+    except Exception as e:
+        result["error"] = str(e)
+    result["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return result
@@ -0,0 +1,247 @@
+# backend/services/user_events.py
+"""
+THEKEY User Event Hub
+
+One push channel per user behind `/api/stream/me` (routes/stream.py):
+- typed events: job progress, AI augmentation results, cooldown start/expiry,
+  achievements
+- each user keeps a small replay buffer; event ids are `<boot>:<seq>`, so a
+  reconnect with `Last-Event-ID` resumes exactly where the client left off,
+  and an id from a previous process (or one that fell out of the buffer)
+  gets a `resync` event telling the client to refetch its state
+- subscribers hold only a cursor into the shared buffer, no per-connection
+  queue; a slow client simply catches up from the buffer
+
+Replay buffers live in this process. Events published here are handed to
+the `relay()` callback, which routes/stream.py points at the job store's
+shared channel (`job_store.publish_event()`); events other workers publish
+come back through `job_store.listen_events()` and job updates through
+`job_store.listen()`, so a subscriber sees every event of its user no matter
+which worker raised it.
+
+Only the REST API consumes `/api/stream/me` for now: the web app does not
+subscribe (see services/streamService.ts).
+"""
+
+import asyncio
+import time
+import uuid
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+
+
+class UserChannel:
+    """Replay buffer and subscribers of one user."""
+
+    __slots__ = ("events", "floor", "subscribers", "last_active", "timers")
+
+    def __init__(self, replay_size: int, floor: int):
+        self.events: Deque[dict] = deque(maxlen=replay_size)
+        self.floor = floor  # Events up to this seq are unknown here (before creation, or dropped)
+        self.subscribers: Set["UserEventSubscription"] = set()
+        self.last_active = time.monotonic()
+        self.timers: Dict[str, asyncio.TimerHandle] = {}
+
+    def append(self, event: dict):
+        if len(self.events) == self.events.maxlen:
+            self.floor = self.events[0]["seq"]
+        self.events.append(event)
+
+    def after(self, seq: int) -> Tuple[List[dict], bool]:
+        """Buffered events newer than `seq`, and whether some were already dropped."""
+        return [event for event in self.events if event["seq"] > seq], seq < self.floor
+
+
+class UserEventSubscription:
+    """One `/api/stream/me` connection: a cursor plus a wake-up future."""
+
+    __slots__ = ("user_id", "channel", "cursor", "_waiter", "_loop")
+
+    def __init__(self, user_id: str, channel: UserChannel, cursor: int):
+        self.user_id = user_id
+        self.channel = channel
+        self.cursor = cursor
+        self._waiter: Optional[asyncio.Future] = None
+        self._loop = asyncio.get_running_loop()
+
+    def _wake(self):
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(True)
+
+    def wake(self):
+        try:
+            same_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            same_loop = False
+        if same_loop:
+            self._wake()
+        else:
+            self._loop.call_soon_threadsafe(self._wake)
+
+    def pending(self) -> Tuple[List[dict], bool]:
+        """Events past the cursor (advancing it), and whether a gap forces a resync."""
+        events, gap = self.channel.after(self.cursor)
+        if events:
+            self.cursor = events[-1]["seq"]
+        return events, gap
+
+    async def next(self, timeout: float) -> Tuple[List[dict], bool]:
+        """Wait up to `timeout` for new events; ([], False) if nothing happened."""
+        events, gap = self.pending()
+        if events or gap:
+            return events, gap
+        self._waiter = self._loop.create_future()
+        timer = self._loop.call_later(timeout, self._wake)
+        try:
+            await self._waiter
+        finally:
+            timer.cancel()
+            self._waiter = None
+        return self.pending()
+
+
+class UserEventHub:
+    """Per-user typed events with a bounded replay buffer."""
+
+    def __init__(self, replay_size: int = 50, idle_channel_seconds: float = 600):
+        self.replay_size = replay_size
+        self.idle_channel_seconds = idle_channel_seconds
+        self.boot_id = uuid.uuid4().hex[:8]  # Ids from before a restart can't be resumed
+        self._seq = 0  # Shared by all channels: an id is never reused, even after a sweep
+        self._channels: Dict[str, UserChannel] = {}
+        self._relay: Optional[Callable[[str, str, dict], None]] = None
+
+        # Metrics
+        self.published: Dict[str, int] = {}
+        self.replayed = 0
+        self.resyncs = 0
+        self.subscriptions = 0
+        self.relay_errors = 0
+
+    def _channel(self, user_id: str) -> UserChannel:
+        channel = self._channels.get(user_id)
+        if channel is None:
+            channel = self._channels[user_id] = UserChannel(self.replay_size, floor=self._seq)
+        channel.last_active = time.monotonic()
+        return channel
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.boot_id}:{seq}"
+
+    def parse_event_id(self, event_id: Optional[str]) -> Optional[int]:
+        """Sequence number of a Last-Event-ID from this process, else None."""
+        if not event_id or ":" not in event_id:
+            return None
+        boot_id, _, seq = event_id.partition(":")
+        if boot_id != self.boot_id or not seq.isdigit():
+            return None
+        return int(seq)
+
+    # ------------------------------------------
+    # Publishing
+    # ------------------------------------------
+
+    def relay(self, callback: Callable[[str, str, dict], None]):
+        """Forward events published here to the other workers."""
+        self._relay = callback
+
+    def publish(self, user_id, event_type: str, data: dict, relay: bool = True) -> str:
+        """
+        Buffer and push an event to this process's subscribers; with `relay`,
+        also hand it to the other workers. Events that arrived from another
+        worker (or are replicated another way, like job updates) pass False.
+        """
+        user_id = str(user_id)
+        channel = self._channel(user_id)
+        self._seq += 1
+        seq = self._seq
+        channel.append({"seq": seq, "id": self.event_id(seq), "type": event_type, "data": data})
+        self.published[event_type] = self.published.get(event_type, 0) + 1
+        for subscription in tuple(channel.subscribers):
+            subscription.wake()
+        if seq % 256 == 0:
+            self.sweep()
+        if relay and self._relay is not None:
+            try:
+                self._relay(user_id, event_type, data)
+            except Exception as e:
+                self.relay_errors += 1
+                print(f"⚠️ [UserEvents] Relay failed for {event_type}: {e}")
+        return self.event_id(seq)
+
+    def schedule(self, user_id, event_type: str, data: dict, delay_seconds: float, key: str = None) -> bool:
+        """
+        Publish later (e.g. cooldown expiry); a new schedule with the same key
+        replaces the old one. True if nothing was scheduled under `key` yet.
+        """
+        user_id = str(user_id)
+        channel = self._channel(user_id)
+        key = key or event_type
+        previous = channel.timers.pop(key, None)
+        if previous:
+            previous.cancel()
+
+        def fire():
+            channel.timers.pop(key, None)
+            self.publish(user_id, event_type, data)
+
+        channel.timers[key] = asyncio.get_running_loop().call_later(max(delay_seconds, 0), fire)
+        return previous is None
+
+    def sweep(self) -> int:
+        """Drop channels nobody listens to and nothing happened on for a while."""
+        cutoff = time.monotonic() - self.idle_channel_seconds
+        idle = [user_id for user_id, channel in self._channels.items()
+                if not channel.subscribers and not channel.timers and channel.last_active < cutoff]
+        for user_id in idle:
+            del self._channels[user_id]
+        return len(idle)
+
+    # ------------------------------------------
+    # Subscribing
+    # ------------------------------------------
+
+    def subscribe(self, user_id, last_event_id: Optional[str] = None) -> Tuple[UserEventSubscription, bool]:
+        """
+        Subscription positioned after `last_event_id` (replaying what it missed),
+        or at the live edge. The flag is True when the id can't be resumed.
+        """
+        user_id = str(user_id)
+        channel = self._channel(user_id)
+        live_edge = self._seq
+        seq = self.parse_event_id(last_event_id)
+        resync = bool(last_event_id) and (seq is None or seq > live_edge or channel.after(seq)[1])
+        cursor = live_edge if seq is None or resync else seq
+        if resync:
+            self.resyncs += 1
+        else:
+            self.replayed += len(channel.after(cursor)[0])
+
+        subscription = UserEventSubscription(user_id, channel, cursor)
+        channel.subscribers.add(subscription)
+        self.subscriptions += 1
+        return subscription, resync
+
+    def unsubscribe(self, subscription: UserEventSubscription):
+        subscription.channel.subscribers.discard(subscription)
+        subscription.channel.last_active = time.monotonic()
+
+    def get_stats(self) -> Dict:
+        return {
+            "channels": len(self._channels),
+            "subscribers": sum(len(c.subscribers) for c in self._channels.values()),
+            "buffered_events": sum(len(c.events) for c in self._channels.values()),
+            "scheduled": sum(len(c.timers) for c in self._channels.values()),
+            "published": dict(self.published),
+            "replayed": self.replayed,
+            "resyncs": self.resyncs,
+            "subscriptions_total": self.subscriptions,
+            "relay_errors": self.relay_errors,
+        }
+
+
+# ============================================
+# Singleton Instance
+# ============================================
+
+user_events = UserEventHub()
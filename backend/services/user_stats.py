@@ -0,0 +1,285 @@
+# backend/services/user_stats.py
+"""
+THEKEY User Stats
+
+Counters behind /api/progress/summary, kept in `user_stats` instead of being
+counted on every load:
+- trade created: total (+ blocked if taken against an AI BLOCK, + win if pnl > 0)
+- trade closed: win count follows the pnl change
+- check-in submitted: last check-in time and a short list of recent ones
+  (the 7-day consistency window is evaluated at read time)
+
+Updates are atomic increments in the caller's transaction, so the counters
+commit or roll back together with the trade / check-in. A user's first write
+seeds the row from the source tables rather than from zero. The reconciliation
+job (scripts/reconcile_user_stats.py) recomputes from the source tables,
+repairs drift and refreshes the persisted `users.survival_score`.
+
+Helpers take a sync Session; async routes call them through `db.run_sync`.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import func, inspect, select, update
+from sqlalchemy.orm import Session
+
+from models import Checkin, Trade, User, UserStats
+
+
+RECENT_CHECKINS_KEPT = 14
+CONSISTENCY_WINDOW_DAYS = 7
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _insert(session: Session):
+    if session.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert(UserStats)
+
+
+def _seed_missing(session: Session, user_id) -> bool:
+    """
+    Create the user's row from the source tables if it doesn't exist yet, so
+    counters never start from zero for users with history (rows created by
+    create_all deployments, users the backfill missed). True if this call
+    inserted it: the seed then already counts everything flushed so far.
+    """
+    if session.execute(select(UserStats.user_id).where(UserStats.user_id == user_id)).first() is not None:
+        return False
+    truth = compute_stats(session, [user_id])[str(user_id)]
+    now = datetime.now(timezone.utc)
+    inserted = session.execute(
+        _insert(session).values(
+            user_id=user_id,
+            total_trades=truth["total_trades"],
+            blocked_trades=truth["blocked_trades"],
+            winning_trades=truth["winning_trades"],
+            last_checkin_at=truth["last_checkin_at"],
+            recent_checkins=truth["recent_checkins"][-RECENT_CHECKINS_KEPT:],
+            updated_at=now,
+            reconciled_at=now,
+        ).on_conflict_do_nothing(index_elements=[UserStats.user_id])
+    ).rowcount
+    return bool(inserted)
+
+
+def _bump(session: Session, user_id, **deltas: int):
+    """Add `deltas` to the user's counters (the row must exist, see `_seed_missing`)."""
+    session.execute(
+        update(UserStats).where(UserStats.user_id == user_id).values(
+            updated_at=datetime.now(timezone.utc),
+            **{name: getattr(UserStats, name) + delta for name, delta in deltas.items()},
+        )
+    )
+
+
+# ============================================
+# Write path
+# ============================================
+
+def record_trade_created(session: Session, trade: Trade):
+    if _seed_missing(session, trade.user_id) and inspect(trade).has_identity:
+        return  # Already flushed, so the seed counted it
+    _bump(
+        session, trade.user_id,
+        total_trades=1,
+        blocked_trades=int(trade.ai_decision == "BLOCK"),
+        winning_trades=int((trade.pnl or 0) > 0),
+    )
+
+
+def record_trade_closed(session: Session, trade: Trade, previous_pnl):
+    seeded = _seed_missing(session, trade.user_id)
+    if seeded and not inspect(trade).attrs.pnl.history.has_changes():
+        return  # New pnl already flushed, so the seed counted it
+    delta = int((trade.pnl or 0) > 0) - int((previous_pnl or 0) > 0)
+    if delta:
+        _bump(session, trade.user_id, winning_trades=delta)
+
+
+def record_checkin(session: Session, user_id, at: Optional[datetime] = None):
+    """Call after the check-in row is flushed."""
+    if _seed_missing(session, user_id):
+        return  # The seed includes the flushed check-in
+    at = _as_utc(at or datetime.now(timezone.utc))
+    stats = session.execute(
+        select(UserStats).where(UserStats.user_id == user_id).with_for_update()
+    ).scalar_one()
+    recent = list(stats.recent_checkins or []) + [at.isoformat()]
+    stats.recent_checkins = recent[-RECENT_CHECKINS_KEPT:]
+    if stats.last_checkin_at is None or _as_utc(stats.last_checkin_at) < at:
+        stats.last_checkin_at = at
+    stats.updated_at = datetime.now(timezone.utc)
+
+
+# ============================================
+# Read path
+# ============================================
+
+def progress_summary(stats: Dict, shadow_score, now: Optional[datetime] = None) -> Dict:
+    """
+    Survival score and progress figures from the counters (`stats` as
+    returned by `stats_dict`). Pure: trust decay for missed check-ins is
+    applied to the result, never written back.
+    """
+    now = now or datetime.now(timezone.utc)
+    total_trades = stats["total_trades"]
+
+    # 1. Trade Discipline Score: penalize trades taken against an AI BLOCK
+    discipline_score = max(0, 100 - (stats["blocked_trades"] * 15)) if total_trades > 0 else 100
+
+    # 2. Consistency Score (check-ins in the last 7 days)
+    window_start = now - timedelta(days=CONSISTENCY_WINDOW_DAYS)
+    checkin_count = sum(1 for at in stats["recent_checkins"] if _as_utc(datetime.fromisoformat(at)) >= window_start)
+    consistency_score = (checkin_count / 7) * 100
+
+    # 3. Behavioral Integrity (Shadow Score) with Trust Decay for missed check-ins
+    shadow_data = shadow_score if isinstance(shadow_score, dict) else {}
+    trust_score = shadow_data.get("trust_score", 100)
+    if stats["last_checkin_at"]:
+        days_since_checkin = (now - _as_utc(stats["last_checkin_at"])).days
+        if days_since_checkin > 1:
+            decay_penalty = min(30, (days_since_checkin - 1) * 5)  # 5 points per missed day after the first
+            trust_score = max(20, trust_score - decay_penalty)
+
+    # 4. Overall Survival Score, dampened when trust is low
+    base_score = (discipline_score * 0.55) + (consistency_score * 0.25) + (trust_score * 0.20)
+    trust_factor = 0.5 + (trust_score / 200)
+    survival_score = int(base_score * trust_factor)
+
+    win_rate = (stats["winning_trades"] / total_trades * 100) if total_trades > 0 else 0
+    return {
+        "survival_score": survival_score,
+        "total_trades": total_trades,
+        "win_rate": round(win_rate, 2),
+        "status": "SURVIVAL" if survival_score < 40 else ("DISCIPLINE" if survival_score < 80 else "MASTER"),
+        "discipline_score": discipline_score,
+        "consistency_score": int(consistency_score),
+        "trust_score": trust_score,
+    }
+
+
+def stats_dict(row: Optional[UserStats]) -> Dict:
+    return {
+        "total_trades": row.total_trades if row else 0,
+        "blocked_trades": row.blocked_trades if row else 0,
+        "winning_trades": row.winning_trades if row else 0,
+        "last_checkin_at": row.last_checkin_at if row else None,
+        "recent_checkins": list(row.recent_checkins or []) if row else [],
+    }
+
+
+# ============================================
+# Reconciliation
+# ============================================
+
+def compute_stats(session: Session, user_ids: Sequence) -> Dict[str, Dict]:
+    """Ground truth for a chunk of users: one grouped query per source table."""
+    since = datetime.now(timezone.utc) - timedelta(days=RECENT_CHECKINS_KEPT)
+    computed = {str(user_id): stats_dict(None) for user_id in user_ids}
+
+    for user_id, total, blocked, wins in session.execute(
+        select(
+            Trade.user_id,
+            func.count(Trade.id),
+            func.count(Trade.id).filter(Trade.ai_decision == "BLOCK"),
+            func.count(Trade.id).filter(Trade.pnl > 0),
+        ).where(Trade.user_id.in_(user_ids)).group_by(Trade.user_id)
+    ):
+        computed[str(user_id)].update(total_trades=total, blocked_trades=blocked, winning_trades=wins)
+
+    for user_id, last in session.execute(
+        select(Checkin.user_id, func.max(Checkin.created_at))
+        .where(Checkin.user_id.in_(user_ids)).group_by(Checkin.user_id)
+    ):
+        computed[str(user_id)]["last_checkin_at"] = last
+
+    for user_id, created_at in session.execute(
+        select(Checkin.user_id, Checkin.created_at)
+        .where(Checkin.user_id.in_(user_ids), Checkin.created_at >= since)
+        .order_by(Checkin.created_at)
+    ):
+        computed[str(user_id)]["recent_checkins"].append(_as_utc(created_at).isoformat())
+
+    return computed
+
+
+def _differs(stored: Dict, computed: Dict, since: datetime) -> bool:
+    def instant(value):
+        return _as_utc(value) if isinstance(value, datetime) else value
+
+    def window(values):
+        return sorted(at for at in (_as_utc(datetime.fromisoformat(v)) for v in values) if at >= since)
+
+    return (
+        any(stored[key] != computed[key] for key in ("total_trades", "blocked_trades", "winning_trades"))
+        or instant(stored["last_checkin_at"]) != instant(computed["last_checkin_at"])
+        or window(stored["recent_checkins"])[-RECENT_CHECKINS_KEPT:] != window(computed["recent_checkins"])[-RECENT_CHECKINS_KEPT:]
+    )
+
+
+def reconcile_chunk(session: Session, user_ids: Sequence) -> Dict[str, int]:
+    """Repair drifted or missing rows and refresh users.survival_score. Caller commits."""
+    now = datetime.now(timezone.utc)
+    since = now - timedelta(days=CONSISTENCY_WINDOW_DAYS)
+
+    # Create missing rows, then lock the chunk *before* counting: a concurrent
+    # write either committed already (and is counted) or waits for us
+    existing = {str(user_id) for user_id in session.execute(
+        select(UserStats.user_id).where(UserStats.user_id.in_(user_ids))
+    ).scalars()}
+    missing = [user_id for user_id in user_ids if str(user_id) not in existing]
+    if missing:
+        session.execute(
+            _insert(session).values([{"user_id": user_id, "updated_at": now} for user_id in missing])
+            .on_conflict_do_nothing(index_elements=[UserStats.user_id])
+        )
+    rows = {str(row.user_id): row for row in session.execute(
+        select(UserStats).where(UserStats.user_id.in_(user_ids)).with_for_update()
+    ).scalars()}
+    computed = compute_stats(session, user_ids)
+    shadow_scores = dict(session.execute(
+        select(User.id, User.shadow_score).where(User.id.in_(user_ids))
+    ).all())
+
+    result = {"checked": len(user_ids), "created": len(missing), "repaired": 0, "scores_updated": 0}
+    for user_id in user_ids:
+        truth = computed[str(user_id)]
+        row = rows[str(user_id)]
+        if str(user_id) in existing and _differs(stats_dict(row), truth, since):
+            print(f"🔧 [UserStats] Drift for {user_id}: {stats_dict(row)} -> {truth}")
+            result["repaired"] += 1
+        row.total_trades = truth["total_trades"]
+        row.blocked_trades = truth["blocked_trades"]
+        row.winning_trades = truth["winning_trades"]
+        row.last_checkin_at = truth["last_checkin_at"]
+        row.recent_checkins = truth["recent_checkins"][-RECENT_CHECKINS_KEPT:]
+        row.reconciled_at = now
+
+        survival_score = progress_summary(truth, shadow_scores.get(user_id), now)["survival_score"]
+        updated = session.execute(
+            update(User).where(User.id == user_id, User.survival_score.is_distinct_from(survival_score))
+            .values(survival_score=survival_score)
+        ).rowcount
+        result["scores_updated"] += updated or 0
+    return result
+
+
+def iter_user_id_chunks(session: Session, chunk_size: int) -> Iterable[List]:
+    """All user ids in primary-key order, `chunk_size` at a time (keyset, no OFFSET)."""
+    last_id = None
+    while True:
+        stmt = select(User.id).order_by(User.id).limit(chunk_size)
+        if last_id is not None:
+            stmt = stmt.where(User.id > last_id)
+        chunk = list(session.execute(stmt).scalars())
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1]
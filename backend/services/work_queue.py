@@ -0,0 +1,367 @@
+# backend/services/work_queue.py
+"""
+THEKEY Work Queue
+
+Durable background work, replacing FastAPI BackgroundTasks for AI jobs:
+- items are rows in `work_items`, so queued work survives a restart
+- a fixed pool of async workers per process claims ready items
+  (Postgres: FOR UPDATE SKIP LOCKED; SQLite: one writer at a time)
+- failed items are retried with exponential backoff, then marked `dead`
+- an item whose worker died is re-queued once its lease expires
+- `(queue, key)` is unique: enqueueing the same key twice is a no-op
+
+    WORK_QUEUE=sqlite    WAL-mode file shared by workers on one host (default)
+    WORK_QUEUE=postgres  `work_items` table, workers on any host
+
+Handlers are `async def handler(payload, attempt, final_attempt)` and must be
+idempotent: an item can run again after a crash between the work and `complete`.
+"""
+
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+Handler = Callable[[dict, int, bool], Awaitable[Any]]
+
+
+class SQLWorkQueue:
+    """Queue logic shared by the SQLite and Postgres backends (SQL written with `?` params)."""
+
+    name = "sql"
+    lock_clause = ""
+
+    def __init__(self, concurrency: int = 4, poll_interval_seconds: float = 1.0, lease_seconds: float = 300,
+                 max_attempts: int = 5, backoff_base_seconds: float = 2, backoff_max_seconds: float = 300,
+                 retention_seconds: float = 86400):
+        self.concurrency = concurrency
+        self.poll_interval_seconds = poll_interval_seconds
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.retention_seconds = retention_seconds
+        self.worker_id = uuid.uuid4().hex[:12]
+        self._handlers: Dict[str, Handler] = {}
+        self._max_attempts: Dict[str, int] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wake: Optional[asyncio.Event] = None
+
+        # Metrics, per queue
+        self.counters: Dict[str, Dict[str, float]] = {}
+        self.worker_errors = 0
+
+    # Backend hook
+    def _execute(self, sql: str, params: tuple = (), fetch: bool = False) -> List[dict]:
+        raise NotImplementedError
+
+    def _count(self, queue: str, name: str, amount: float = 1):
+        counters = self.counters.setdefault(queue, {
+            "enqueued": 0, "deduplicated": 0, "completed": 0, "retried": 0, "dead": 0,
+            "total_wait_ms": 0.0, "total_run_ms": 0.0,
+        })
+        counters[name] += amount
+
+    # ------------------------------------------
+    # Producer side
+    # ------------------------------------------
+
+    def register(self, queue: str, handler: Handler, max_attempts: int = None):
+        self._handlers[queue] = handler
+        if max_attempts is not None:
+            self._max_attempts[queue] = max_attempts
+
+    def enqueue(self, queue: str, payload: dict, key: str = None, delay_seconds: float = 0) -> str:
+        """Persist a work item and return its id (the existing item's id for a repeated key)."""
+        item_id = str(uuid.uuid4())
+        now = time.time()
+        rows = self._execute(
+            "INSERT INTO work_items (id, queue, idempotency_key, payload, status, attempts, max_attempts, "
+            "run_at, created_at) VALUES (?, ?, ?, ?, 'queued', 0, ?, ?, ?) "
+            "ON CONFLICT DO NOTHING RETURNING id",
+            (item_id, queue, key, json.dumps(payload, ensure_ascii=False, default=str),
+             self._max_attempts.get(queue, self.max_attempts), now + delay_seconds, now),
+            fetch=True,
+        )
+        if not rows:
+            self._count(queue, "deduplicated")
+            existing = self._execute("SELECT id FROM work_items WHERE queue = ? AND idempotency_key = ?",
+                                     (queue, key), fetch=True)
+            return existing[0]["id"] if existing else item_id
+
+        self._count(queue, "enqueued")
+        if self._wake is not None:
+            self._wake.set()  # Local workers pick it up now instead of at the next poll
+        return item_id
+
+    def get(self, item_id: str) -> Optional[dict]:
+        rows = self._execute("SELECT * FROM work_items WHERE id = ?", (item_id,), fetch=True)
+        return rows[0] if rows else None
+
+    # ------------------------------------------
+    # Worker side
+    # ------------------------------------------
+
+    def claim(self, queues: List[str]) -> Optional[dict]:
+        """Lease the oldest ready item from `queues`, or None."""
+        if not queues:
+            return None
+        now = time.time()
+        placeholders = ", ".join("?" for _ in queues)
+        rows = self._execute(
+            "UPDATE work_items SET status = 'running', attempts = attempts + 1, locked_by = ?, locked_at = ? "
+            "WHERE id = (SELECT id FROM work_items "
+            f"WHERE status = 'queued' AND run_at <= ? AND queue IN ({placeholders}) "
+            f"ORDER BY run_at LIMIT 1{self.lock_clause}) "
+            "RETURNING *",
+            (self.worker_id, now, now, *queues),
+            fetch=True,
+        )
+        if not rows:
+            return None
+        item = rows[0]
+        item["payload"] = json.loads(item["payload"])
+        self._count(item["queue"], "total_wait_ms", (now - item["run_at"]) * 1000)
+        return item
+
+    def complete(self, item: dict):
+        self._execute("UPDATE work_items SET status = 'done', finished_at = ?, last_error = NULL WHERE id = ?",
+                      (time.time(), item["id"]))
+        self._count(item["queue"], "completed")
+
+    def backoff_seconds(self, attempts: int) -> float:
+        delay = min(self.backoff_base_seconds * (2 ** (attempts - 1)), self.backoff_max_seconds)
+        return delay * random.uniform(0.5, 1.0)  # Jitter: retries of a burst don't land together
+
+    def fail(self, item: dict, error: str) -> str:
+        """Schedule a retry, or mark the item dead once it is out of attempts."""
+        if item["attempts"] >= item["max_attempts"]:
+            self._execute("UPDATE work_items SET status = 'dead', finished_at = ?, last_error = ? WHERE id = ?",
+                          (time.time(), error, item["id"]))
+            self._count(item["queue"], "dead")
+            return "dead"
+        self._execute("UPDATE work_items SET status = 'queued', run_at = ?, last_error = ?, locked_by = NULL "
+                      "WHERE id = ?", (time.time() + self.backoff_seconds(item["attempts"]), error, item["id"]))
+        self._count(item["queue"], "retried")
+        return "queued"
+
+    def release(self, item: dict):
+        """Hand an interrupted item back without spending an attempt (shutdown)."""
+        self._execute("UPDATE work_items SET status = 'queued', attempts = attempts - 1, locked_by = NULL "
+                      "WHERE id = ? AND status = 'running'", (item["id"],))
+
+    def requeue_expired(self) -> int:
+        """Items whose worker died mid-run go back to the queue after `lease_seconds`."""
+        rows = self._execute(
+            "UPDATE work_items SET status = 'queued', locked_by = NULL "
+            "WHERE status = 'running' AND locked_at < ? RETURNING id",
+            (time.time() - self.lease_seconds,), fetch=True,
+        )
+        return len(rows)
+
+    def purge(self) -> int:
+        rows = self._execute("DELETE FROM work_items WHERE status = 'done' AND finished_at < ? RETURNING id",
+                             (time.time() - self.retention_seconds,), fetch=True)
+        return len(rows)
+
+    async def run_item(self, item: dict) -> str:
+        handler = self._handlers[item["queue"]]
+        started = time.perf_counter()
+        try:
+            # Own task: ContextVars a handler sets (user, priority) don't leak into the next item
+            await asyncio.create_task(handler(item["payload"], item["attempts"], item["attempts"] >= item["max_attempts"]))
+        except asyncio.CancelledError:
+            await asyncio.to_thread(self.release, item)
+            raise
+        except Exception as e:
+            print(f"⚠️ [WorkQueue] {item['queue']} item {item['id']} attempt {item['attempts']} failed: {e}")
+            print(traceback.format_exc())
+            return await asyncio.to_thread(self.fail, item, str(e)[:1000])
+        finally:
+            self._count(item["queue"], "total_run_ms", (time.perf_counter() - started) * 1000)
+        await asyncio.to_thread(self.complete, item)
+        return "done"
+
+    async def _worker(self):
+        while True:
+            self._wake.clear()  # Before claiming, so an enqueue during the claim still wakes us
+            try:
+                item = await asyncio.to_thread(self.claim, list(self._handlers))
+            except Exception as e:
+                print(f"⚠️ [WorkQueue] Claim error: {e}")
+                item = None
+            if item is None:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self.run_item(item)
+            except Exception as e:
+                # complete()/fail() couldn't record the outcome (DB down, SQLite lock): the
+                # item stays `running` and is re-queued when its lease expires. Keep the worker.
+                self.worker_errors += 1
+                print(f"⚠️ [WorkQueue] Could not record {item['queue']} item {item['id']}: {e}")
+
+    async def _maintenance(self):
+        while True:
+            await asyncio.sleep(max(self.lease_seconds / 4, 1))
+            try:
+                requeued = await asyncio.to_thread(self.requeue_expired)
+                purged = await asyncio.to_thread(self.purge)
+                if requeued or purged:
+                    print(f"🧹 [WorkQueue] Re-queued {requeued} expired, purged {purged} finished items")
+            except Exception as e:
+                print(f"⚠️ [WorkQueue] Maintenance error: {e}")
+
+    def start(self):
+        if self._tasks:
+            return
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._maintenance()))
+        print(f"🛠️ [WorkQueue] {self.name} queue started: {self.concurrency} workers for {sorted(self._handlers)}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        self._wake = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        queues: Dict[str, Dict[str, Any]] = {}
+        for queue, c in self.counters.items():
+            runs = c["completed"] + c["retried"] + c["dead"]
+            queues[queue] = {
+                "enqueued": int(c["enqueued"]),
+                "deduplicated": int(c["deduplicated"]),
+                "completed": int(c["completed"]),
+                "retried": int(c["retried"]),
+                "dead": int(c["dead"]),
+                "avg_wait_ms": round(c["total_wait_ms"] / runs, 1) if runs else 0.0,
+                "avg_run_ms": round(c["total_run_ms"] / runs, 1) if runs else 0.0,
+            }
+        stats = {"backend": self.name, "worker_id": self.worker_id, "workers": self.concurrency,
+                 "worker_errors": self.worker_errors, "queues": queues}
+        try:
+            rows = self._execute(
+                "SELECT queue, status, COUNT(*) AS items, MIN(run_at) AS oldest_run_at "
+                "FROM work_items GROUP BY queue, status",
+                fetch=True,
+            )
+            now = time.time()
+            for row in rows:
+                queue = queues.setdefault(row["queue"], {})
+                queue.setdefault("by_status", {})[row["status"]] = row["items"]
+                if row["status"] == "queued":
+                    queue["depth"] = row["items"]
+                    queue["oldest_ready_age_seconds"] = round(max(now - row["oldest_run_at"], 0), 1)
+        except Exception as e:
+            stats["stats_error"] = str(e)
+        return stats
+
+
+class SQLiteWorkQueue(SQLWorkQueue):
+    """Stand-in for a single host: every worker process shares one WAL-mode file."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS work_items (
+                id TEXT PRIMARY KEY,
+                queue TEXT NOT NULL,
+                idempotency_key TEXT,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                run_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                locked_by TEXT,
+                locked_at REAL,
+                finished_at REAL,
+                last_error TEXT
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_work_items_key ON work_items (queue, idempotency_key);
+            CREATE INDEX IF NOT EXISTS idx_work_items_ready ON work_items (status, run_at);
+        """)
+
+    def _execute(self, sql: str, params: tuple = (), fetch: bool = False) -> List[dict]:
+        # UPDATE ... WHERE id = (SELECT ...) runs under SQLite's write lock, so a claim is atomic
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            return [dict(row) for row in cursor.fetchall()] if fetch else []
+
+
+class PostgresWorkQueue(SQLWorkQueue):
+    """`work_items` in Postgres; concurrent claimers skip each other's locked rows."""
+
+    name = "postgres"
+    lock_clause = " FOR UPDATE SKIP LOCKED"
+
+    def _execute(self, sql: str, params: tuple = (), fetch: bool = False) -> List[dict]:
+        from models.base import engine
+
+        conn = engine.raw_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(sql.replace("?", "%s"), params)
+            rows = []
+            if fetch and cursor.description:
+                names = [col[0] for col in cursor.description]
+                rows = [dict(zip(names, values)) for values in cursor.fetchall()]
+            conn.commit()
+            return rows
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+
+def create_work_queue(backend: Optional[str] = None):
+    """Queue selected by WORK_QUEUE (sqlite | postgres)."""
+    backend = (backend or os.getenv("WORK_QUEUE", "sqlite")).lower()
+    settings = {
+        "concurrency": int(os.getenv("WORK_QUEUE_CONCURRENCY", "4")),
+        "poll_interval_seconds": float(os.getenv("WORK_QUEUE_POLL_SECONDS", "1.0")),
+        "lease_seconds": float(os.getenv("WORK_QUEUE_LEASE_SECONDS", "300")),
+        "max_attempts": int(os.getenv("WORK_QUEUE_MAX_ATTEMPTS", "5")),
+        "backoff_base_seconds": float(os.getenv("WORK_QUEUE_BACKOFF_SECONDS", "2")),
+    }
+    if backend == "sqlite":
+        default_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "work_queue.sqlite3")
+        return SQLiteWorkQueue(os.getenv("WORK_QUEUE_SQLITE_PATH", default_path), **settings)
+    if backend == "postgres":
+        return PostgresWorkQueue(**settings)
+    raise ValueError(f"Unknown WORK_QUEUE: {backend}")
+
+
+# ============================================
+# Singleton Instance
+# ============================================
+
+work_queue = create_work_queue()
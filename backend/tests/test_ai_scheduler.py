@@ -0,0 +1,115 @@
+# tests/test_ai_scheduler.py
+"""
+Tests for the priority AI scheduler and report fan-out
+"""
+
+import asyncio
+import json
+import sys
+import time
+
+from services.ai.backends import BackendResponse
+from services.ai.scheduler import AIScheduler, BACKGROUND, INTERACTIVE, NORMAL
+
+
+class TestAIScheduler:
+    def test_waiters_admitted_by_priority(self):
+        scheduler = AIScheduler(max_concurrency=1)
+        order = []
+
+        async def job(name, priority):
+            async with scheduler.slot(priority):
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+        async def run():
+            first = asyncio.create_task(job("first", NORMAL))
+            await asyncio.sleep(0)  # 'first' holds the only slot
+            await asyncio.gather(
+                first,
+                job("background", BACKGROUND),
+                job("normal", NORMAL),
+                job("interactive", INTERACTIVE),
+            )
+
+        asyncio.run(run())
+        assert order == ["first", "interactive", "normal", "background"]
+        assert scheduler.get_stats()["in_flight"] == 0
+
+    def test_cancelled_waiter_does_not_leak_slot(self):
+        scheduler = AIScheduler(max_concurrency=1)
+
+        async def run():
+            await scheduler.acquire(NORMAL)
+            waiter = asyncio.create_task(scheduler.acquire(BACKGROUND))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+            scheduler.release()
+            async with scheduler.slot():
+                pass
+
+        asyncio.run(run())
+        assert scheduler.get_stats()["in_flight"] == 0
+
+
+class SectionBackend:
+    """Answers each section after a delay; fails the 'improvements' section"""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+
+    async def generate(self, model, prompt):
+        await asyncio.sleep(self.delay)
+        if "areas to improve" in prompt:
+            raise Exception("404 model not found")
+        if "survival score" in prompt:
+            return BackendResponse(text=json.dumps({"survival_score": 72}))
+        return BackendResponse(text=json.dumps({"key_achievements": ["Giữ SL 100%"]}))
+
+
+class TestReportFanOut:
+    def test_sections_run_concurrently_with_fallback(self, monkeypatch):
+        gemini_module = sys.modules["services.ai.gemini_client"]
+        # One slot per section, independent of the GEMINI_MAX_CONCURRENCY default
+        monkeypatch.setattr(gemini_module, "ai_scheduler", AIScheduler(max_concurrency=3))
+        client = gemini_module.GeminiClient(backend=SectionBackend())
+        client.report_fan_out = True
+
+        async def run():
+            start = time.perf_counter()
+            report = await client.generate_weekly_report([{"pnl": 5}])
+            return report, time.perf_counter() - start
+
+        report, elapsed = asyncio.run(run())
+        assert report["survival_score"] == 72
+        assert report["key_achievements"] == ["Giữ SL 100%"]
+        assert report["areas_to_improve"] == ["Kiểm soát tâm lý."]  # fallback for failed section
+        # Serial would be >= 5 backend calls x 50ms (3 sections + 2 extra fallback-model attempts)
+        assert elapsed < 0.2
+
+    def test_sections_get_only_their_slice_of_the_history(self):
+        gemini_module = sys.modules["services.ai.gemini_client"]
+        prompts = []
+
+        class RecordingBackend:
+            async def generate(self, model, prompt):
+                prompts.append(prompt)
+                return BackendResponse(text="{}")
+
+        client = gemini_module.GeminiClient(backend=RecordingBackend())
+        client.report_fan_out = True
+        history = [
+            {"symbol": f"T{i}", "pnl": -1 if i % 2 else 1, "reasoning": "x" * 200, "screenshot": "y" * 5000}
+            for i in range(200)
+        ]
+        asyncio.run(client.generate_weekly_report(history))
+
+        grade = next(p for p in prompts if "survival score" in p)
+        achievements = next(p for p in prompts if "achievements" in p)
+        improvements = next(p for p in prompts if "areas to improve" in p)
+        assert '"total_trades": 200' in grade and "T0" not in grade  # aggregates only
+        assert "screenshot" not in achievements + improvements
+        assert '"symbol": "T0"' in achievements and '"symbol": "T1"' not in achievements
+        assert '"symbol": "T1"' in improvements and '"symbol": "T0"' not in improvements
+        assert improvements.count('"symbol"') == gemini_module.REPORT_MAX_TRADES
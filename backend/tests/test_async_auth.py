@@ -0,0 +1,74 @@
+# tests/test_async_auth.py
+"""
+Tests for the AsyncSession-based current-user dependency
+"""
+
+import asyncio
+import uuid
+
+import jwt
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from models import User
+from services.auth.dependencies import JWT_ALGORITHM, JWT_SECRET, get_current_user_async
+from services.auth.principal_cache import principal_cache
+from services.ai.call_log_writer import current_user_id
+
+
+class FakeAsyncSession:
+    def __init__(self, users):
+        self.users = users
+        self.lookups = []
+        self.added = []
+
+    def add(self, instance):
+        self.added.append(instance)
+
+    async def get(self, model, key):
+        self.lookups.append(key)
+        return self.users.get(key)
+
+
+def make_request(sub=None, path="/api/trades/"):
+    headers = []
+    if sub is not None:
+        token = jwt.encode({"sub": sub}, JWT_SECRET, algorithm=JWT_ALGORITHM)
+        headers.append((b"authorization", f"Bearer {token}".encode()))
+    return Request({"type": "http", "method": "GET", "path": path, "headers": headers})
+
+
+def status_of(request, db):
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(get_current_user_async(request, db))
+    return exc.value.status_code
+
+
+class TestGetCurrentUserAsync:
+    def setup_method(self):
+        principal_cache.clear()
+
+    def test_loads_user_by_primary_key(self):
+        user_id = uuid.uuid4()
+        user = User(id=user_id, email="a@example.com", is_active=True)
+        db = FakeAsyncSession({user_id: user})
+
+        async def run():
+            loaded = await get_current_user_async(make_request(str(user_id)), db)
+            return loaded, current_user_id.get()
+
+        assert asyncio.run(run()) == (user, str(user_id))
+        assert db.lookups == [user_id]
+
+    def test_rejects_missing_or_malformed_token(self):
+        db = FakeAsyncSession({})
+        assert status_of(make_request(), db) == 401
+        assert status_of(make_request("not-a-uuid"), db) == 401
+        assert db.lookups == []
+
+    def test_unknown_and_inactive_users(self):
+        inactive_id = uuid.uuid4()
+        db = FakeAsyncSession({inactive_id: User(id=inactive_id, email="b@example.com", is_active=False)})
+        assert status_of(make_request(str(uuid.uuid4())), db) == 404
+        assert status_of(make_request(str(inactive_id)), db) == 400
@@ -0,0 +1,118 @@
+# tests/test_call_log_writer.py
+"""
+Tests for AI call instrumentation and the batched AICallLog writer
+"""
+
+import asyncio
+
+from services.ai.backends import BackendResponse, UsageMetadata
+from services.ai.call_log_writer import AICallLogWriter, current_user_id, extract_usage
+
+
+class InMemoryWriter(AICallLogWriter):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.batches = []
+
+    def _insert(self, rows):
+        self.batches.append(rows)
+
+
+class FlakyBackend:
+    """Fails with a 404 on the first model, answers on the next"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def generate(self, model, prompt):
+        self.calls.append(model)
+        if len(self.calls) == 1:
+            raise Exception(f"404 model {model} not found")
+        return BackendResponse(text='{"ok": true}', model=model, usage_metadata=UsageMetadata(120, 30, 150))
+
+
+class TestExtractUsage:
+    def test_reads_usage_metadata(self):
+        response = BackendResponse(text="x", usage_metadata=UsageMetadata(10, 5, 15))
+        assert extract_usage(response) == {"input_tokens": 10, "output_tokens": 5, "total_tokens": 15}
+
+    def test_missing_usage_is_zero(self):
+        assert extract_usage(object())["total_tokens"] == 0
+
+
+class TestAICallLogWriter:
+    def test_flush_writes_in_batches(self):
+        writer = InMemoryWriter(batch_size=2)
+        for _ in range(5):
+            writer.log(call_type="coach", model="models/gemini-2.5-flash", latency_ms=10)
+        written = asyncio.run(writer.flush())
+
+        assert written == 5
+        assert [len(b) for b in writer.batches] == [2, 2, 1]
+        assert writer.batches[0][0]["model"] == "gemini-2.5-flash"
+
+    def test_failed_batch_is_kept_and_retried_in_order(self):
+        writer = InMemoryWriter(batch_size=2)
+        failures = [ConnectionError("db restarting")]
+        insert = writer._insert
+
+        def flaky_insert(rows):
+            if failures:
+                raise failures.pop()
+            insert(rows)
+
+        writer._insert = flaky_insert
+        for i in range(3):
+            writer.log(call_type=f"call-{i}", model="gemini-2.5-flash", latency_ms=10)
+
+        assert asyncio.run(writer.flush()) == 0
+        assert writer.get_stats()["buffered"] == 3 and writer.dropped == 0
+        assert asyncio.run(writer.flush()) == 3
+        assert [row["call_type"] for batch in writer.batches for row in batch] == ["call-0", "call-1", "call-2"]
+
+    def test_requeue_drops_only_what_overflows(self):
+        writer = InMemoryWriter(batch_size=3, max_buffer=4)
+
+        def failing_insert(rows):
+            raise ConnectionError("down")
+
+        writer._insert = failing_insert
+        for i in range(4):
+            writer.log(call_type=f"call-{i}", model="gemini-2.5-flash", latency_ms=10)
+
+        async def run():
+            flush = asyncio.create_task(writer.flush())
+            await asyncio.sleep(0)  # Batch taken, insert running in a thread
+            for i in range(4, 6):
+                writer.log(call_type=f"call-{i}", model="gemini-2.5-flash", latency_ms=10)
+            await flush
+
+        asyncio.run(run())
+        assert [row["call_type"] for row in writer._buffer] == ["call-2", "call-3", "call-4", "call-5"]
+        assert writer.dropped == 2
+
+    def test_generate_is_instrumented(self):
+        import sys
+        from services.ai import call_log_writer as writer_module
+        GeminiClient = sys.modules["services.ai.gemini_client"].GeminiClient
+
+        writer = InMemoryWriter()
+        original = writer_module.call_log_writer
+        sys.modules["services.ai.gemini_client"].call_log_writer = writer
+        try:
+            client = GeminiClient(backend=FlakyBackend())
+            token = current_user_id.set("8a6e0804-2bd0-4672-b79d-d97027f9071f")
+            try:
+                text = asyncio.run(client._generate("hi", call_type="coach"))
+            finally:
+                current_user_id.reset(token)
+        finally:
+            sys.modules["services.ai.gemini_client"].call_log_writer = original
+
+        assert text == '{"ok": true}'
+        row = writer._buffer[0]
+        assert row["call_type"] == "coach"
+        assert row["model"] == GeminiClient.MODELS[1].replace("models/", "")
+        assert row["total_tokens"] == 150
+        assert row["extra_data"]["retries"] == 1
+        assert str(row["user_id"]) == "8a6e0804-2bd0-4672-b79d-d97027f9071f"
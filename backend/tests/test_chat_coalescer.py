@@ -0,0 +1,73 @@
+# tests/test_chat_coalescer.py
+"""
+Tests for per-user chat message coalescing
+"""
+
+import asyncio
+
+import pytest
+
+from services.reflection.chat_coalescer import ChatCoalescer
+
+
+class FakeChat:
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, message, history, mode):
+        self.calls.append(message)
+        return {"display_text": f"re: {message}"}
+
+
+async def burst(coalescer, fake, user_id, messages, gap=0.01):
+    tasks = []
+    for message in messages:
+        tasks.append(asyncio.create_task(coalescer.submit(user_id, message, [], "COACH", fake)))
+        await asyncio.sleep(gap)
+    return await asyncio.gather(*tasks)
+
+
+class TestChatCoalescer:
+    def test_burst_is_merged_into_one_call(self):
+        coalescer, fake = ChatCoalescer(window_seconds=0.05), FakeChat()
+        results = asyncio.run(burst(coalescer, fake, "u1", ["tôi thua", "lại thua", "chán quá"]))
+
+        assert fake.calls == ["tôi thua\nlại thua\nchán quá"]
+        assert all(r == results[0] for r in results)
+        assert results[0]["merged_messages"] == 3
+        assert coalescer.messages_merged == 2
+
+    def test_users_are_not_merged(self):
+        coalescer, fake = ChatCoalescer(window_seconds=0.05), FakeChat()
+
+        async def run():
+            return await asyncio.gather(
+                burst(coalescer, fake, "u1", ["a"]),
+                burst(coalescer, fake, "u2", ["b"]),
+            )
+
+        asyncio.run(run())
+        assert sorted(fake.calls) == ["a", "b"]
+
+    def test_max_wait_caps_the_window(self):
+        coalescer, fake = ChatCoalescer(window_seconds=0.05, max_wait_seconds=0.08), FakeChat()
+        asyncio.run(burst(coalescer, fake, "u1", [str(i) for i in range(6)], gap=0.03))
+        assert len(fake.calls) >= 2
+
+    def test_zero_window_disables_coalescing(self):
+        coalescer, fake = ChatCoalescer(window_seconds=0), FakeChat()
+        asyncio.run(burst(coalescer, fake, "u1", ["a", "b"]))
+        assert fake.calls == ["a", "b"]
+
+    def test_cancelled_window_fails_waiting_requests(self):
+        coalescer, fake = ChatCoalescer(window_seconds=10), FakeChat()
+
+        async def run():
+            request = asyncio.create_task(coalescer.submit("u1", "a", [], "COACH", fake))
+            await asyncio.sleep(0.01)
+            coalescer._windows["u1"].task.cancel()  # e.g. shutdown while the window is open
+            with pytest.raises(RuntimeError):
+                await asyncio.wait_for(request, timeout=1)
+
+        asyncio.run(run())
+        assert fake.calls == [] and coalescer.get_stats()["open_windows"] == 0
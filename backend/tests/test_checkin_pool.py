@@ -0,0 +1,135 @@
+# tests/test_checkin_pool.py
+"""
+Tests for the pre-generated check-in question pool
+"""
+
+import asyncio
+import time
+
+from services.reflection.checkin_pool import EMOTIONAL_STATES, TRADE_BUCKETS, CheckinQuestionPool, cohort_for, trade_bucket
+
+
+class FakeGemini:
+    def __init__(self):
+        self.calls = []
+
+    async def fetch_checkin_questions(self, context):
+        self.calls.append(context)
+        return [{"id": 1, "text": f"{context['trade_bucket']}-{context['variant']}"}]
+
+
+class SharedRow:
+    """Stands in for the `checkin_pool` row of ai_snapshots"""
+
+    def __init__(self):
+        self.payload = None
+        self.generated_at = None
+        self.lease_owner = None
+
+
+class OfflinePool(CheckinQuestionPool):
+    def __init__(self, fake, shared=None, **kwargs):
+        super().__init__(generation_pause_seconds=0, **kwargs)
+        self.fake = fake
+        self.shared = shared  # None: database down, the pool refills locally
+
+    @property
+    def gemini_client(self):
+        return self.fake
+
+    def _load_shared(self):
+        if self.shared is None:
+            raise ConnectionError("db down")
+        if self.shared.payload and (self._shared_generated_at is None
+                                    or self.shared.generated_at > self._shared_generated_at):
+            self._adopt(self.shared.payload, self.shared.generated_at)
+
+    def _try_acquire_lease(self):
+        if self.shared.lease_owner in (None, self.worker_id):
+            self.shared.lease_owner = self.worker_id
+            return True
+        return False
+
+    def _release_lease(self):
+        if self.shared.lease_owner == self.worker_id:
+            self.shared.lease_owner = None
+
+    def _store_shared(self):
+        self.shared.payload = self._to_payload()
+        self.shared.generated_at = self._shared_generated_at = time.time()
+
+
+class TestCohorts:
+    """Tests for cohort bucketing"""
+
+    def test_trade_buckets(self):
+        assert trade_bucket(0) == "NEW"
+        assert trade_bucket(3) == "BEGINNER"
+        assert trade_bucket(10) == "ACTIVE"
+        assert trade_bucket(500) == "VETERAN"
+
+    def test_unknown_state_normalized(self):
+        assert cohort_for(5, None) == ("BEGINNER", "UNKNOWN")
+        assert cohort_for(5, "tilted") == ("BEGINNER", "TILTED")
+        assert cohort_for(5, "SLEEPY") == ("BEGINNER", "UNKNOWN")
+
+    def test_every_analyzed_state_has_a_cohort(self):
+        # analyze_checkin may return EXHAUSTED; it must not collapse into UNKNOWN
+        assert cohort_for(5, "EXHAUSTED") == ("BEGINNER", "EXHAUSTED")
+
+
+class TestCheckinQuestionPool:
+    """Tests for CheckinQuestionPool"""
+
+    def test_cold_cohort_misses_without_calling_model(self):
+        fake = FakeGemini()
+        pool = OfflinePool(fake)
+        assert pool.get(3, "CALM") is None
+        assert fake.calls == []
+        assert pool.misses == 1
+
+    def test_rotation_across_sets(self):
+        pool = OfflinePool(FakeGemini(), sets_per_cohort=2)
+        pool.add(("BEGINNER", "CALM"), [{"text": "a"}])
+        pool.add(("BEGINNER", "CALM"), [{"text": "b"}])
+
+        served = [pool.get(3, "CALM")[0]["text"] for _ in range(4)]
+        assert served == ["a", "b", "a", "b"]
+
+    def test_expired_sets_are_evicted(self):
+        pool = OfflinePool(FakeGemini(), ttl_seconds=60)
+        pool.add(("NEW", "UNKNOWN"), [{"text": "old"}])
+        pool._pool[("NEW", "UNKNOWN")][0].created_at = time.time() - 120
+        assert pool.get(0) is None
+        assert pool.expired == 1
+
+    def test_refill_prioritizes_demanded_cohort(self):
+        fake = FakeGemini()
+        pool = OfflinePool(fake, sets_per_cohort=1)
+        pool.get(100, "TILTED")  # miss -> demanded
+        asyncio.run(pool.refill_once())
+
+        assert fake.calls[0]["trade_bucket"] == "VETERAN"
+        assert fake.calls[0]["recent_emotional_state"] == "TILTED"
+        assert pool.get(100, "TILTED") is not None
+        assert pool.get_stats()["cohorts_warm"] == len(TRADE_BUCKETS) * len(EMOTIONAL_STATES)
+
+    def test_only_the_lease_holder_generates(self):
+        shared = SharedRow()
+        leader_gemini, follower_gemini = FakeGemini(), FakeGemini()
+        leader = OfflinePool(leader_gemini, shared, sets_per_cohort=1)
+        follower = OfflinePool(follower_gemini, shared, sets_per_cohort=1)
+        shared.lease_owner = leader.worker_id  # Leader is mid-refill
+
+        asyncio.run(follower.refill_once())
+        assert follower_gemini.calls == []
+
+        shared.lease_owner = None
+        asyncio.run(leader.refill_once())
+        asyncio.run(follower.refill_once())  # Adopts the stored sets instead of generating
+
+        cohorts = len(TRADE_BUCKETS) * len(EMOTIONAL_STATES)
+        assert len(leader_gemini.calls) == cohorts and follower_gemini.calls == []
+        assert follower.get(100, "TILTED") == leader.get(100, "TILTED")
+        assert follower.get_stats()["cohorts_warm"] == cohorts
+        assert shared.lease_owner is None
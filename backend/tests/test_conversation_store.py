@@ -0,0 +1,155 @@
+# tests/test_conversation_store.py
+"""
+Tests for server-side chat memory with rolling summarization
+"""
+
+import asyncio
+
+from services.reflection.conversation_store import Conversation, ConversationStore
+
+
+class FakeGemini:
+    def __init__(self):
+        self.calls = []
+        self.release = None  # Set to an asyncio.Event to hold summaries in flight
+
+    async def summarize_conversation(self, previous_summary, turns):
+        self.calls.append((previous_summary, [t["text"] for t in turns]))
+        if self.release is not None:
+            await self.release.wait()
+        return f"summary of {len(turns)} turns"
+
+
+class OfflineStore(ConversationStore):
+    """
+    `rows` stands in for the chat_conversations table; stores sharing one
+    dict behave like workers sharing the database.
+    """
+
+    def __init__(self, fake, rows=None, **kwargs):
+        super().__init__(**kwargs)
+        self.fake = fake
+        self.rows = {} if rows is None else rows
+
+    @property
+    def gemini_client(self):
+        return self.fake
+
+    def _row(self, user_id):
+        return self.rows.setdefault(user_id, {"summary": "", "summarized_turns": 0, "recent_turns": []})
+
+    def _load(self, user_id):
+        row = self.rows.get(user_id)
+        if row is None:
+            return None
+        return Conversation(row["summary"], row["summarized_turns"], list(row["recent_turns"]))
+
+    def _seed(self, user_id, turns):
+        row = self._row(user_id)
+        if not row["recent_turns"] and not row["summary"]:
+            row["recent_turns"] = list(turns)
+
+    def _append(self, user_id, turns):
+        row = self._row(user_id)
+        row["recent_turns"] = (row["recent_turns"] + turns)[-self.max_turns:]
+        return len(row["recent_turns"])
+
+    def _fold(self, user_id, folded, summary, summarized_before):
+        row = self._row(user_id)
+        if row["summarized_turns"] != summarized_before or row["recent_turns"][:len(folded)] != folded:
+            return False
+        row.update(summary=summary, summarized_turns=summarized_before + len(folded),
+                   recent_turns=row["recent_turns"][len(folded):])
+        return True
+
+    def _clear(self, user_id):
+        self.rows[user_id] = {"summary": "", "summarized_turns": 0, "recent_turns": []}
+
+
+async def chat(store, exchanges):
+    for i in range(exchanges):
+        await store.append_exchange("u1", f"q{i}", f"a{i}")
+        await asyncio.sleep(0)
+    await asyncio.sleep(0.01)  # Let background summary tasks finish
+
+
+def texts(conversation):
+    return [t["text"] for t in conversation.turns]
+
+
+class TestConversationStore:
+    def test_seeds_from_client_history_once(self):
+        store = OfflineStore(FakeGemini())
+
+        async def run():
+            conv = await store.get("u1", client_history=[{"sender": "user", "text": "hi"}, {"sender": "ai", "text": "chào"}])
+            assert [t["sender"] for t in conv.turns] == ["user", "coach"]
+            conv = await store.get("u1", client_history=[{"sender": "user", "text": "ignored"}])
+            assert len(conv.turns) == 2
+
+        asyncio.run(run())
+
+    def test_older_turns_fold_into_summary(self):
+        fake = FakeGemini()
+        store = OfflineStore(fake, keep_recent=4, summarize_batch=2)
+        asyncio.run(chat(store, 3))  # 6 turns -> 2 overflow the recent window
+
+        conversation = asyncio.run(store.get("u1"))
+        assert fake.calls == [("", ["q0", "a0"])]
+        assert conversation.summary == "summary of 2 turns"
+        assert texts(conversation) == ["q1", "a1", "q2", "a2"]
+        assert conversation.summarized_turns == 2
+        assert store.rows["u1"]["summary"] == "summary of 2 turns"
+
+    def test_no_summary_below_threshold(self):
+        fake = FakeGemini()
+        store = OfflineStore(fake, keep_recent=8, summarize_batch=6)
+        asyncio.run(chat(store, 3))
+        assert fake.calls == []
+
+    def test_workers_keep_each_others_turns(self):
+        rows = {}
+        first, second = OfflineStore(FakeGemini(), rows), OfflineStore(FakeGemini(), rows)
+
+        async def run():
+            await first.get("u1")  # Both workers have seen the conversation
+            await second.get("u1")
+            await first.append_exchange("u1", "q0", "a0")
+            await second.append_exchange("u1", "q1", "a1")
+            return await first.get("u1")
+
+        assert texts(asyncio.run(run())) == ["q0", "a0", "q1", "a1"]
+
+    def test_turns_appended_during_summary_survive(self):
+        fake = FakeGemini()
+        rows = {}
+        first = OfflineStore(fake, rows, keep_recent=4, summarize_batch=2)
+        second = OfflineStore(FakeGemini(), rows, keep_recent=4, summarize_batch=2)
+
+        async def run():
+            fake.release = asyncio.Event()
+            await chat(first, 3)  # Summary of q0/a0 now waiting on the model
+            await second.append_exchange("u1", "q3", "a3")
+            fake.release.set()
+            await asyncio.sleep(0.01)
+            return await second.get("u1")
+
+        conversation = asyncio.run(run())
+        assert conversation.summary == "summary of 2 turns"
+        assert texts(conversation) == ["q1", "a1", "q2", "a2", "q3", "a3"]
+
+    def test_summary_of_reset_conversation_is_dropped(self):
+        fake = FakeGemini()
+        store = OfflineStore(fake, keep_recent=4, summarize_batch=2)
+
+        async def run():
+            fake.release = asyncio.Event()
+            await chat(store, 3)
+            await store.reset("u1")
+            fake.release.set()
+            await asyncio.sleep(0.01)
+            return await store.get("u1")
+
+        conversation = asyncio.run(run())
+        assert conversation.summary == "" and conversation.turns == []
+        assert store.stale_summaries == 1
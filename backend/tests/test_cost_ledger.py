@@ -0,0 +1,88 @@
+# tests/test_cost_ledger.py
+"""
+Tests for the per-user monthly AI cost ledger
+"""
+
+import asyncio
+
+import pytest
+
+from services.ai.cost_ledger import AICostLedger, AIBudgetExceeded, ALLOW, DOWNGRADE
+
+MODELS = ['models/gemini-2.5-flash', 'models/gemini-2.0-flash-exp', 'models/gemini-1.5-flash']
+
+
+class OfflineLedger(AICostLedger):
+    """Ledger hydrated from fixed values instead of the database"""
+
+    def __init__(self, budget, spent=0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.budget = budget
+        self.spent = spent
+
+    def _load_from_db(self, user_id, month):
+        return self.budget, self.spent
+
+
+class TestAICostLedger:
+    def test_reserve_and_settle(self):
+        ledger = OfflineLedger(budget=1.0)
+        reservation = asyncio.run(ledger.reserve("u1", 0.1))
+        assert reservation.decision == ALLOW
+        assert ledger.get_usage("u1")["reserved_usd"] == 0.1
+
+        ledger.settle(reservation, 0.03)
+        usage = ledger.get_usage("u1")
+        assert usage["reserved_usd"] == 0
+        assert usage["spent_usd"] == 0.03
+
+    def test_downgrades_near_budget(self):
+        ledger = OfflineLedger(budget=1.0, spent=0.85)
+        reservation = asyncio.run(ledger.reserve("u1", 0.05))
+        assert reservation.decision == DOWNGRADE
+        assert ledger.models_for(DOWNGRADE, MODELS)[0] == 'models/gemini-1.5-flash'
+        assert ledger.models_for(ALLOW, MODELS) == MODELS
+
+    def test_denies_over_budget(self):
+        ledger = OfflineLedger(budget=1.0, spent=0.99)
+        with pytest.raises(AIBudgetExceeded):
+            asyncio.run(ledger.reserve("u1", 0.05))
+        assert ledger.denials == 1
+
+    def test_outstanding_reservations_count_against_budget(self):
+        ledger = OfflineLedger(budget=1.0)
+        asyncio.run(ledger.reserve("u1", 0.6))
+        with pytest.raises(AIBudgetExceeded):
+            asyncio.run(ledger.reserve("u1", 0.6))
+
+    def test_failed_call_releases_reservation(self):
+        ledger = OfflineLedger(budget=1.0, spent=0.9)
+        reservation = asyncio.run(ledger.reserve("u1", 0.05))
+        ledger.settle(reservation, 0.0)
+        assert asyncio.run(ledger.has_headroom("u1")) is True
+
+    def test_cancelled_call_releases_reservation(self, monkeypatch):
+        import importlib
+        gemini_module = importlib.import_module("services.ai.gemini_client")  # The package re-exports an instance under this name
+        from services.ai.call_log_writer import current_user_id
+
+        ledger = OfflineLedger(budget=1.0)
+        monkeypatch.setattr(gemini_module, "cost_ledger", ledger)
+
+        class HangingBackend:
+            async def generate(self, model, prompt):
+                await asyncio.Event().wait()  # Never answers: the caller goes away first
+
+        async def run():
+            current_user_id.set("u1")
+            client = gemini_module.GeminiClient(backend=HangingBackend())
+            task = asyncio.create_task(client._generate("hi", call_type="coach"))
+            await asyncio.sleep(0.05)
+            assert ledger.get_usage("u1")["reserved_usd"] > 0
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(run())
+        usage = ledger.get_usage("u1")
+        assert usage["reserved_usd"] == 0 and usage["spent_usd"] == 0
@@ -0,0 +1,50 @@
+# tests/test_db_pool.py
+"""
+Tests for the shared psycopg connection pool
+"""
+
+import asyncio
+
+from services.db_pool import DatabasePool, summarize_pool_stats
+
+
+class FakeConnection:
+    def __init__(self):
+        self.executed = []
+        self.commits = 0
+
+    async def execute(self, sql):
+        self.executed.append(sql)
+
+    async def commit(self):
+        self.commits += 1
+
+
+class TestDatabasePool:
+    def test_summarizes_pool_counters(self):
+        stats = summarize_pool_stats({
+            "pool_min": 2, "pool_max": 10, "pool_size": 6, "pool_available": 1,
+            "requests_waiting": 3, "requests_num": 40, "requests_queued": 8,
+            "requests_wait_ms": 200, "requests_errors": 1, "connections_num": 6,
+        }, min_size=2)
+
+        assert stats["in_use"] == 5
+        assert stats["overflow"] == 4
+        assert stats["waiting"] == 3
+        assert stats["avg_wait_ms"] == 5.0
+        assert stats["timeouts"] == 1
+
+    def test_new_connections_get_statement_timeout(self):
+        pool = DatabasePool(conninfo="postgresql://unused", statement_timeout_ms=2500)
+        conn = FakeConnection()
+        asyncio.run(pool._configure_async(conn))
+
+        assert conn.executed == ["SET statement_timeout = 2500"]
+        assert conn.commits == 1  # Returned to the pool idle, not in a transaction
+
+    def test_pools_open_lazily(self):
+        pool = DatabasePool(conninfo="postgresql://unused", min_size=1, max_size=4)
+        stats = pool.get_stats()
+
+        assert stats["sync"] is None and stats["async"] is None
+        assert stats["max_size"] == 4
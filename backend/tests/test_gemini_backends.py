@@ -0,0 +1,68 @@
+# tests/test_gemini_backends.py
+"""
+Tests for the record/replay Gemini backends
+"""
+
+import asyncio
+
+import pytest
+
+from services.ai.backends import (
+    BackendResponse,
+    Cassette,
+    CassetteMiss,
+    LatencyModel,
+    RecordingBackend,
+    ReplayBackend,
+    SimulatedTimeout,
+)
+
+
+class FakeLive:
+    name = "live"
+
+    async def generate(self, model, prompt):
+        return BackendResponse(text=f"echo:{prompt}", model=model)
+
+
+class TestCassette:
+    def test_record_then_replay_from_disk(self, tmp_path):
+        path = str(tmp_path / "cassette.jsonl")
+        recorder = RecordingBackend(FakeLive(), Cassette(path))
+        asyncio.run(recorder.generate("models/gemini-2.5-flash", "hello"))
+
+        replay = ReplayBackend(Cassette(path), latency="fixed:0")
+        response = asyncio.run(replay.generate("models/gemini-2.5-flash", "hello"))
+        assert response.text == "echo:hello"
+        assert replay.hits == 1
+
+    def test_replay_miss_raises(self, tmp_path):
+        replay = ReplayBackend(Cassette(str(tmp_path / "empty.jsonl")), latency="fixed:0")
+        with pytest.raises(CassetteMiss):
+            asyncio.run(replay.generate("m", "unknown"))
+
+    def test_simulate_synthesizes_misses(self, tmp_path):
+        sim = ReplayBackend(Cassette(str(tmp_path / "empty.jsonl")), latency="fixed:0", synthesize_misses=True)
+        response = asyncio.run(sim.generate("m", "unknown"))
+        assert response.text == sim.default_response
+        assert sim.get_stats()["mode"] == "simulate"
+
+
+class TestFaultInjection:
+    def test_injected_429_is_retryable_by_client(self, tmp_path):
+        sim = ReplayBackend(Cassette(str(tmp_path / "c.jsonl")), latency="fixed:0", error_rate=1.0, synthesize_misses=True)
+        with pytest.raises(Exception) as exc:
+            asyncio.run(sim.generate("m", "p"))
+        assert "429" in str(exc.value)
+        assert sim.injected_errors == 1
+
+    def test_injected_timeout(self, tmp_path):
+        sim = ReplayBackend(Cassette(str(tmp_path / "c.jsonl")), timeout_rate=1.0, timeout_seconds=0, synthesize_misses=True)
+        with pytest.raises(SimulatedTimeout):
+            asyncio.run(sim.generate("m", "p"))
+
+    def test_latency_is_reproducible_with_seed(self):
+        import random
+        a = LatencyModel("lognormal:800:0.5", random.Random(1))
+        b = LatencyModel("lognormal:800:0.5", random.Random(1))
+        assert [a.sample() for _ in range(5)] == [b.sample() for _ in range(5)]
@@ -0,0 +1,83 @@
+# tests/test_insight_cards.py
+"""
+Tests for insight card precomputation on trade close
+"""
+
+import asyncio
+
+from services.ai.cost_ledger import AICostLedger
+from services.ai.insight_cards import InsightCardPrecomputer
+from services.ai.scheduler import current_priority, BACKGROUND
+
+
+class FixedLedger(AICostLedger):
+    def __init__(self, budget, spent=0.0):
+        super().__init__()
+        self.budget, self.spent = budget, spent
+
+    def _load_from_db(self, user_id, month):
+        return self.budget, self.spent
+
+
+class FakeGemini:
+    MODELS = ['models/gemini-2.5-flash']
+
+    def __init__(self, card=None):
+        self.card = card or {"trade_summary": "Giữ đúng SL."}
+        self.priorities = []
+
+    async def analyze_trade(self, trade_data, user_stats):
+        self.priorities.append(current_priority.get())
+        await asyncio.sleep(0.01)
+        return self.card
+
+
+class OfflinePrecomputer(InsightCardPrecomputer):
+    def __init__(self, gemini, ledger):
+        super().__init__()
+        self._gemini, self._ledger = gemini, ledger
+        self.saved = {}
+
+    @property
+    def gemini_client(self):
+        return self._gemini
+
+    @property
+    def cost_ledger(self):
+        return self._ledger
+
+    def _load(self, trade_id):
+        return {"id": trade_id, "pnl": -5.0}, {"survival_days": 40}
+
+    def _save(self, trade_id, card):
+        self.saved[trade_id] = card
+
+
+async def run_job(precomputer, trade_id="t1"):
+    precomputer.enqueue(trade_id, "u1")
+    task = precomputer.pending(trade_id)
+    return await task
+
+
+class TestInsightCardPrecomputer:
+    def test_card_is_stored_at_background_priority(self):
+        gemini = FakeGemini()
+        precomputer = OfflinePrecomputer(gemini, FixedLedger(budget=1.0))
+        card = asyncio.run(run_job(precomputer))
+
+        assert precomputer.saved == {"t1": card}
+        assert gemini.priorities == [BACKGROUND]
+        assert precomputer.pending("t1") is None
+
+    def test_skipped_near_budget(self):
+        gemini = FakeGemini()
+        precomputer = OfflinePrecomputer(gemini, FixedLedger(budget=1.0, spent=0.9))
+        asyncio.run(run_job(precomputer))
+
+        assert gemini.priorities == []
+        assert precomputer.skipped_budget == 1
+
+    def test_fallback_card_is_not_stored(self):
+        precomputer = OfflinePrecomputer(FakeGemini({"trade_summary": "x", "is_fallback": True}), FixedLedger(budget=1.0))
+        asyncio.run(run_job(precomputer))
+        assert precomputer.saved == {}
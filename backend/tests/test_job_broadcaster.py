@@ -0,0 +1,61 @@
+# tests/test_job_broadcaster.py
+"""
+Tests for push-based SSE job progress
+"""
+
+import asyncio
+
+from routes.stream import create_job, update_job, job_event_stream
+from services.job_broadcaster import JobBroadcaster
+
+
+async def collect(stream):
+    return [chunk async for chunk in stream]
+
+
+class TestJobBroadcaster:
+    def test_burst_coalesces_to_latest(self):
+        async def run():
+            broadcaster = JobBroadcaster()
+            subscription = broadcaster.subscribe("j1")
+            for progress in (10, 20, 30):
+                broadcaster.publish("j1", {"progress": progress})
+            first = await subscription.next(timeout=1)
+            quiet = await subscription.next(timeout=0.01)
+            return first, quiet
+
+        first, quiet = asyncio.run(run())
+        assert first == {"progress": 30}
+        assert quiet is None
+
+    def test_fan_out_to_all_subscribers(self):
+        async def run():
+            broadcaster = JobBroadcaster()
+            subscriptions = [broadcaster.subscribe("j1") for _ in range(3)]
+            broadcaster.publish("j1", {"progress": 50})
+            results = await asyncio.gather(*(s.next(timeout=1) for s in subscriptions))
+            for s in subscriptions:
+                broadcaster.unsubscribe(s)
+            return results, broadcaster.get_stats()
+
+        results, stats = asyncio.run(run())
+        assert results == [{"progress": 50}] * 3
+        assert stats["subscribers"] == 0 and stats["deliveries"] == 3
+
+
+class TestJobEventStream:
+    def test_stream_pushes_updates_and_heartbeats(self):
+        async def run():
+            job_id = await create_job("u1", "test")
+            task = asyncio.create_task(collect(job_event_stream(job_id, heartbeat_seconds=0.05)))
+            await asyncio.sleep(0.12)  # Idle long enough for heartbeats
+            await update_job(job_id, progress=60, status="running")
+            await asyncio.sleep(0.01)
+            await update_job(job_id, progress=100, status="completed", result={"ok": True})
+            return await asyncio.wait_for(task, timeout=1)
+
+        chunks = asyncio.run(run())
+        assert chunks[0].startswith("event: progress")
+        assert ": heartbeat\n\n" in chunks
+        assert any('"progress": 60' in c for c in chunks)
+        assert chunks[-1].startswith("event: complete")
@@ -0,0 +1,41 @@
+# tests/test_job_registry.py
+"""
+Tests for the indexed, bounded job registry
+"""
+
+import time
+
+from services.job_registry import JobRegistry
+
+
+class TestJobRegistry:
+    def test_dedupes_active_job_per_trade(self):
+        registry = JobRegistry()
+        first = registry.create("u1", "post_trade_analysis", {"trade_id": "t1"})
+        assert registry.create("u1", "post_trade_analysis", {"trade_id": "t1"}) == first
+        assert registry.create("u2", "post_trade_analysis", {"trade_id": "t1"}) != first
+
+        registry.update(first, status="completed", result={"ok": True})
+        assert registry.create("u1", "post_trade_analysis", {"trade_id": "t1"}) != first
+
+    def test_timestamps_are_monotonic_numbers(self):
+        registry = JobRegistry()
+        job = registry.get(registry.create("u1", "test"))
+        assert isinstance(job["created_at"], float)
+        assert job["timeout_at"] - job["created_at"] == 120
+
+    def test_max_count_evicts_oldest(self):
+        registry = JobRegistry(max_count=3)
+        ids = [registry.create("u1", "test") for _ in range(5)]
+        assert registry.get(ids[0]) is None and registry.get(ids[-1]) is not None
+        assert registry.get_stats()["jobs"] == 3
+
+    def test_reap_drops_old_jobs_and_index(self):
+        registry = JobRegistry()
+        old = registry.create("u1", "post_trade_analysis", {"trade_id": "t1"})
+        registry.get(old)["created_at"] = time.monotonic() - 7200
+        fresh = registry.create("u1", "test")
+
+        assert registry.reap(max_age_seconds=3600) == 1
+        assert registry.get(old) is None and registry.get(fresh) is not None
+        assert registry.get_stats()["active_index"] == 0
@@ -0,0 +1,88 @@
+# tests/test_job_store.py
+"""
+Tests for the shared (multi-worker) SQLite job store
+"""
+
+import asyncio
+
+import pytest
+
+from services.job_registry import job_registry
+from services.job_store import SQLiteJobStore, create_job_store
+
+
+class TestSQLiteJobStore:
+    def test_job_created_by_one_worker_is_visible_to_another(self, tmp_path):
+        path = str(tmp_path / "jobs.sqlite3")
+        worker_a, worker_b = SQLiteJobStore(path), SQLiteJobStore(path)
+
+        job_id = worker_a.create("u1", "post_trade_analysis", {"trade_id": "t1"})
+        job = worker_b.get(job_id)
+        assert job["status"] == "pending" and job["metadata"] == {"trade_id": "t1"}
+        assert worker_b.create("u1", "post_trade_analysis", {"trade_id": "t1"}) == job_id
+
+        worker_b.update(job_id, status="completed", result={"ok": True})
+        assert worker_a.get(job_id)["result"] == {"ok": True}
+        assert worker_a.create("u1", "post_trade_analysis", {"trade_id": "t1"}) != job_id
+
+    def test_remote_updates_reach_listener(self, tmp_path):
+        path = str(tmp_path / "jobs.sqlite3")
+        worker_a = SQLiteJobStore(path, poll_interval_seconds=0.01)
+        worker_b = SQLiteJobStore(path)
+        received = []
+        worker_a.listen(received.append)
+
+        async def run():
+            worker_a.start()
+            job_id = worker_a.create("u1", "test")
+            worker_a.update(job_id, progress=10)  # Own write: not re-published
+            worker_b.update(job_id, progress=50, status="running")
+            await asyncio.sleep(0.1)
+            await worker_a.stop()
+            return job_id
+
+        job_id = asyncio.run(run())
+        assert [(job["id"], job["progress"]) for job in received] == [(job_id, 50)]
+
+    def test_reap_trims_to_max_count(self, tmp_path):
+        store = SQLiteJobStore(str(tmp_path / "jobs.sqlite3"), max_count=2)
+        ids = [store.create("u1", "test") for _ in range(4)]
+        assert store.reap() == 2
+        assert store.get(ids[0]) is None and store.get(ids[-1]) is not None
+        assert store.get_stats()["jobs"] == 2
+
+    def test_default_store_is_shared_like_the_work_queue(self, tmp_path, monkeypatch):
+        monkeypatch.delenv("JOB_STORE", raising=False)
+        monkeypatch.delenv("WORK_QUEUE", raising=False)
+        monkeypatch.setenv("JOB_STORE_SQLITE_PATH", str(tmp_path / "jobs.sqlite3"))
+        assert isinstance(create_job_store(), SQLiteJobStore)
+
+    def test_memory_store_refused_with_several_workers(self, monkeypatch):
+        monkeypatch.setenv("WEB_CONCURRENCY", "4")
+        with pytest.raises(ValueError):
+            create_job_store("memory")
+        monkeypatch.setenv("WEB_CONCURRENCY", "1")
+        assert create_job_store("memory") is job_registry
+
+    def test_route_helpers_run_sql_store_off_the_event_loop(self, tmp_path, monkeypatch):
+        import threading
+        import routes.stream as stream
+
+        store = SQLiteJobStore(str(tmp_path / "jobs.sqlite3"))
+        threads = []
+        execute = store._execute
+
+        def recording_execute(*args, **kwargs):
+            threads.append(threading.current_thread())
+            return execute(*args, **kwargs)
+
+        monkeypatch.setattr(store, "_execute", recording_execute)
+        monkeypatch.setattr(stream, "job_store", store)
+
+        async def run():
+            job_id = await stream.create_job("u1", "test")
+            await stream.update_job(job_id, progress=40, status="running")
+            return await stream.get_job(job_id)
+
+        assert asyncio.run(run())["progress"] == 40
+        assert threads and threading.main_thread() not in threads
@@ -0,0 +1,72 @@
+# tests/test_lazy_decrypt.py
+"""
+Tests for lazy EncryptedString decryption and bulk decrypt
+"""
+
+from sqlalchemy.orm.attributes import set_committed_value
+
+from models import Trade
+from models.base import prefetch_decrypted
+import utils.encryption as encryption
+from utils.encryption import decrypt_many, decryption_metrics, encrypt_data
+
+
+def loaded_trade(notes):
+    """A Trade as the ORM would load it: the stored token, nothing decrypted yet."""
+    trade = Trade(symbol="BTCUSDT", side="LONG")
+    set_committed_value(trade, "_notes", encrypt_data(notes) if notes is not None else None)
+    return trade
+
+
+class TestLazyDecrypt:
+    def test_decrypts_on_first_read_only(self):
+        trade = loaded_trade("Vào lệnh theo kế hoạch")
+        before = decryption_metrics.decrypted
+
+        assert decryption_metrics.decrypted == before  # Loading decrypts nothing
+        assert trade.notes == "Vào lệnh theo kế hoạch"
+        assert trade.notes == "Vào lệnh theo kế hoạch"
+        assert decryption_metrics.decrypted == before + 1
+
+    def test_reload_replaces_cached_plaintext(self):
+        trade = loaded_trade("old")
+        assert trade.notes == "old"
+
+        set_committed_value(trade, "_notes", encrypt_data("new"))
+        assert trade.notes == "new"
+
+    def test_assigned_plaintext_is_not_decrypted(self):
+        trade = Trade(symbol="BTCUSDT", side="LONG", notes="draft")
+        before = decryption_metrics.decrypted
+
+        assert trade.notes == "draft"
+        trade.notes = None
+        assert trade.notes is None
+        assert decryption_metrics.decrypted == before
+
+    def test_class_attribute_is_the_column(self):
+        assert Trade.notes.key == "_notes"
+        assert Trade.notes.property.columns[0].name == "notes"
+
+
+class TestBulkDecrypt:
+    def test_fans_out_and_keeps_order(self, monkeypatch):
+        monkeypatch.setattr(encryption, "BULK_DECRYPT_MIN_BATCH", 4)
+        monkeypatch.setattr(encryption, "BULK_DECRYPT_WORKERS", 3)
+        notes = [f"note {i}" for i in range(10)] + [None, ""]
+        batches = decryption_metrics.bulk_batches
+
+        tokens = [encrypt_data(n) if n is not None else None for n in notes]
+        assert decrypt_many(tokens) == notes
+        assert decryption_metrics.bulk_batches == batches + 1
+
+    def test_legacy_plaintext_passes_through(self):
+        assert decrypt_many(["written before encryption"]) == ["written before encryption"]
+
+    def test_prefetch_primes_lazy_reads(self):
+        trades = [loaded_trade(f"note {i}") for i in range(5)] + [loaded_trade(None)]
+        prefetch_decrypted(trades, "notes")
+        before = decryption_metrics.decrypted
+
+        assert [t.notes for t in trades] == [f"note {i}" for i in range(5)] + [None]
+        assert decryption_metrics.decrypted == before
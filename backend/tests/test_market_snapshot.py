@@ -0,0 +1,101 @@
+# tests/test_market_snapshot.py
+"""
+Tests for the stale-while-revalidate market snapshot refresher
+"""
+
+import asyncio
+import time
+
+from services.ai.market_snapshot import MarketSnapshotRefresher
+
+
+class FakeGemini:
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+
+    async def fetch_market_analysis(self):
+        self.calls += 1
+        return self.result
+
+
+class OfflineRefresher(MarketSnapshotRefresher):
+    """Refresher wired to a fake Gemini client and an in-test lease"""
+
+    def __init__(self, fake, shared_ok=False, lease=True):
+        super().__init__(ttl_seconds=600, refresh_after_seconds=480)
+        self.fake = fake
+        self.shared_ok = shared_ok
+        self.lease = lease
+
+    @property
+    def gemini_client(self):
+        return self.fake
+
+    def _load_shared(self):
+        if not self.shared_ok:
+            raise ConnectionError("db down")
+
+    def _try_acquire_lease(self):
+        return self.lease
+
+    def _release_lease(self):
+        pass
+
+    def _store_shared(self, payload):
+        pass
+
+
+def make_refresher(result, shared_ok=False, lease=True):
+    fake = FakeGemini(result)
+    return OfflineRefresher(fake, shared_ok=shared_ok, lease=lease), fake
+
+
+class TestMarketSnapshotRefresher:
+    """Tests for MarketSnapshotRefresher"""
+
+    def test_empty_before_first_refresh(self):
+        refresher, _ = make_refresher({"danger_level": "SAFE"})
+        assert refresher.get() is None
+
+    def test_refresh_populates_snapshot_with_staleness(self):
+        refresher, fake = make_refresher({"danger_level": "DANGER"})
+        asyncio.run(refresher.refresh_once())
+
+        snapshot = refresher.get()
+        assert snapshot["danger_level"] == "DANGER"
+        assert snapshot["staleness_seconds"] == 0
+        assert snapshot["is_stale"] is False
+        assert fake.calls == 1
+
+    def test_fresh_snapshot_is_not_regenerated(self):
+        refresher, fake = make_refresher({"danger_level": "SAFE"})
+        asyncio.run(refresher.refresh_once())
+        asyncio.run(refresher.refresh_once())
+        assert fake.calls == 1
+
+    def test_regenerates_before_expiry(self):
+        refresher, fake = make_refresher({"danger_level": "SAFE"})
+        asyncio.run(refresher.refresh_once())
+        refresher._generated_at = time.time() - 500  # past refresh_after, before TTL
+        asyncio.run(refresher.refresh_once())
+        assert fake.calls == 2
+
+    def test_follower_does_not_regenerate(self):
+        """A worker that loses the lease keeps serving and never calls Gemini"""
+        refresher, fake = make_refresher({"danger_level": "SAFE"}, shared_ok=True, lease=False)
+        asyncio.run(refresher.refresh_once())
+        assert fake.calls == 0
+        assert refresher.get() is None
+
+    def test_failed_refresh_keeps_previous_snapshot(self):
+        refresher, fake = make_refresher({"danger_level": "CAUTION"})
+        asyncio.run(refresher.refresh_once())
+        fake.result = None
+        refresher._generated_at = time.time() - 700
+        asyncio.run(refresher.refresh_once())
+
+        snapshot = refresher.get()
+        assert snapshot["danger_level"] == "CAUTION"
+        assert snapshot["is_stale"] is True
+        assert refresher.refresh_failures == 1
@@ -0,0 +1,145 @@
+# tests/test_nightly_batch.py
+"""
+Tests for the nightly AI batch runner
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+from services.ai.cost_ledger import AICostLedger
+from services.ai.nightly_batch import FAN_OUT_SECTIONS, NightlyBatchRunner, RatePacer, UserContext, learning_insight_inputs
+from services.ai.result_cache import AIResultCache
+from services.ai.scheduler import current_priority, BACKGROUND
+
+
+def make_trade(i, pnl):
+    return SimpleNamespace(
+        id=f"t{i}", symbol="BTCUSDT", side="LONG", entry_price=Decimal("100"), exit_price=Decimal("101"),
+        quantity=Decimal("1"), pnl=Decimal(str(pnl)), pnl_pct=None, status="CLOSED",
+        entry_time=datetime(2026, 10, 10, 9, i), exit_time=None, ai_decision="ALLOW",
+        process_score=Decimal("70"), user_process_evaluation={"plan": True},
+    )
+
+
+class FixedLedger(AICostLedger):
+    def __init__(self, spent_by_user):
+        super().__init__()
+        self.spent_by_user = spent_by_user
+
+    def _load_from_db(self, user_id, month):
+        return 1.0, self.spent_by_user.get(user_id, 0.0)
+
+
+class MemoryResultCache(AIResultCache):
+    def __init__(self):
+        super().__init__()
+        self.rows = {}
+
+    def _load(self, user_id, endpoint, key):
+        row = self.rows.get((user_id, endpoint, key))
+        return row[0] if row else None
+
+    def _save(self, user_id, endpoint, key, version, payload, source="request"):
+        self.rows[(user_id, endpoint, key)] = (payload, source)
+
+
+class FakeGemini:
+    MODELS = ['models/gemini-2.5-flash']
+    report_fan_out = False
+
+    def __init__(self):
+        self.calls = []
+
+    async def _call(self, name, result):
+        self.calls.append((name, current_priority.get()))
+        return result
+
+    def generate_weekly_report(self, history):
+        return self._call("weekly_report", {"survival_score": 80})
+
+    def generate_learning_insights(self, trade_data, checkin_data):
+        return self._call("learning_insights", [{"insight_type": "PATTERN"}])
+
+
+class OfflineRunner(NightlyBatchRunner):
+    def __init__(self, contexts, gemini, cache, ledger, **kwargs):
+        super().__init__(requests_per_minute=0, **kwargs)
+        self.contexts, self._gemini, self._cache, self._ledger = contexts, gemini, cache, ledger
+
+    @property
+    def gemini_client(self):
+        return self._gemini
+
+    @property
+    def result_cache(self):
+        return self._cache
+
+    @property
+    def cost_ledger(self):
+        return self._ledger
+
+    def iter_context_chunks(self):
+        yield self.contexts
+
+
+CONTEXTS = [
+    UserContext("u1", trades=[make_trade(i, 5 - i) for i in range(4)]),
+    UserContext("u2", trades=[make_trade(0, 1)]),  # Too few trades for learning insights
+]
+
+
+class TestNightlyBatchRunner:
+    def test_results_are_stored_as_nightly_at_background_priority(self):
+        gemini, cache = FakeGemini(), MemoryResultCache()
+        runner = OfflineRunner(CONTEXTS, gemini, cache, FixedLedger({}), jobs=("weekly_report", "learning_insights"))
+        report = asyncio.run(runner.run())
+
+        assert report["stored"] == 3 and report["skipped_no_data"] == 1
+        assert all(priority == BACKGROUND for _, priority in gemini.calls)
+        assert {source for _, source in cache.rows.values()} == {"nightly"}
+
+        rerun = OfflineRunner(CONTEXTS, gemini, cache, FixedLedger({}), jobs=("weekly_report", "learning_insights"))
+        assert asyncio.run(rerun.run())["already_cached"] == 3
+        assert len(gemini.calls) == 3
+
+    def test_users_near_budget_are_skipped(self):
+        gemini = FakeGemini()
+        runner = OfflineRunner(CONTEXTS, gemini, MemoryResultCache(), FixedLedger({"u1": 0.95, "u2": 0.95}),
+                               jobs=("weekly_report",))
+        assert asyncio.run(runner.run())["skipped_budget"] == 2
+        assert gemini.calls == []
+
+    def test_learning_inputs_are_json_safe(self):
+        trade_data, _ = learning_insight_inputs(CONTEXTS[0].trades, [])
+        assert trade_data[0]["score"] == 70.0 and isinstance(trade_data[0]["pnl"], float)
+
+    def test_pacer_counts_every_section_call(self):
+        class CountingPacer(RatePacer):
+            def __init__(self):
+                super().__init__(0)
+                self.reserved = 0
+
+            async def wait(self, calls=1):
+                self.reserved += calls
+                await super().wait(calls)
+
+        gemini = FakeGemini()
+        gemini.report_fan_out = True
+        runner = OfflineRunner(CONTEXTS, gemini, MemoryResultCache(), FixedLedger({}),
+                               jobs=("weekly_report", "learning_insights"))
+        runner.pacer = CountingPacer()
+        asyncio.run(runner.run())
+        # Two fanned-out weekly reports plus one single-call learning insights job
+        assert runner.pacer.reserved == 2 * FAN_OUT_SECTIONS["weekly_report"] + 1
+
+    def test_pacer_reserves_one_interval_per_call(self):
+        pacer = RatePacer(requests_per_minute=60)
+
+        async def run():
+            await pacer.wait(3)
+            return pacer._next_at - time.monotonic()
+
+        assert 2.9 < asyncio.run(run()) <= 3.0
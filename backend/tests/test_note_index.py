@@ -0,0 +1,42 @@
+# tests/test_note_index.py
+"""
+Tests for the blind-token index over encrypted trade notes
+"""
+
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from models import Trade, TradeNoteIndex
+from utils.blind_index import blind_tokens, fold_text, matches_phrase, note_terms
+
+
+class TestNormalization:
+    def test_folds_vietnamese_diacritics(self):
+        assert fold_text("Đặt lệnh ở vùng HỖ TRỢ") == "dat lenh o vung ho tro"
+        assert note_terms("Vào lệnh ở vùng hỗ trợ, vào lại!") == ["vao", "lenh", "vung", "ho", "tro", "lai"]
+
+    def test_accentless_query_matches_accented_note(self):
+        assert matches_phrase("Giữ kỷ luật stop-loss.", "ky luat")
+        assert not matches_phrase("kỷ cương, luật chơi", "ky luat")  # Words present, not as a phrase
+
+
+class TestBlindTokens:
+    def test_tokens_are_deterministic_and_user_scoped(self):
+        alice, bob = uuid.uuid4(), uuid.uuid4()
+        [token] = blind_tokens(alice, ["fomo"])
+
+        assert blind_tokens(alice, ["fomo"]) == [token]
+        assert blind_tokens(bob, ["fomo"]) != [token]
+        assert "fomo" not in token and len(token) == 24
+
+    def test_search_is_a_gin_containment_query(self):
+        user_id = uuid.uuid4()
+        stmt = select(Trade.id).join(TradeNoteIndex, TradeNoteIndex.trade_id == Trade.id).where(
+            TradeNoteIndex.tokens.contains(blind_tokens(user_id, note_terms("FOMO vào lệnh")))
+        )
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+
+        assert "trade_note_index.tokens @>" in sql
+        assert "trades.notes" not in sql  # Nothing to decrypt in SQL
@@ -0,0 +1,119 @@
+# tests/test_principal_cache.py
+"""
+Tests for the cached JWT principal resolution
+"""
+
+import asyncio
+import uuid
+
+import jwt
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+
+from models import User
+import services.auth.dependencies as dependencies
+from services.auth.dependencies import JWT_ALGORITHM, JWT_SECRET, get_current_user, get_current_user_id
+from services.auth.principal_cache import INACTIVE, PrincipalCache, principal_cache
+
+
+def make_request(user_id):
+    token = jwt.encode({"sub": str(user_id)}, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    return Request({"type": "http", "method": "GET", "path": "/api/users/me",
+                    "headers": [(b"authorization", f"Bearer {token}".encode())]})
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    User.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    principal_cache.clear()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def add_user(db, **fields):
+    fields.setdefault("is_active", True)
+    user_id = uuid.uuid4()
+    db.add(User(id=user_id, email=f"{user_id.hex}@example.com", **fields))
+    db.commit()
+    db.expunge_all()
+    return user_id
+
+
+@pytest.fixture
+def user_loads(db, monkeypatch):
+    """Serve the id-only dependency's user load from the sqlite session."""
+    calls = []
+
+    async def load_user(user_id):
+        calls.append(user_id)
+        return db.get(User, user_id)
+
+    monkeypatch.setattr(dependencies, "_load_user", load_user)
+    return calls
+
+
+def load(db, user_id):
+    return asyncio.run(get_current_user(make_request(user_id), db))
+
+
+class TestPrincipalCache:
+    def test_second_request_is_served_from_cache(self, db, monkeypatch):
+        user_id = add_user(db, username="first")
+        assert load(db, user_id).username == "first"
+        db.close()
+
+        queries = []
+        monkeypatch.setattr(db, "get", lambda *args: queries.append(args))
+        user = load(db, user_id)
+
+        assert user.username == "first" and queries == []
+        assert user in db  # Attached: the route can still modify and commit it
+
+    def test_committed_user_change_invalidates(self, db):
+        user_id = add_user(db, username="before")
+        user = load(db, user_id)
+        user.username = "after"
+        db.commit()
+        db.close()
+
+        assert load(db, user_id).username == "after"
+
+    def test_load_racing_an_invalidation_is_not_stored(self):
+        cache = PrincipalCache()
+        user = User(id=uuid.uuid4(), email="a@example.com", is_active=True)
+        version = cache.version(user.id)
+        cache.invalidate(user.id)  # Settings changed while the load was in flight
+        cache.store(user.id, user, version)
+
+        assert cache.lookup(user.id) is None
+        assert cache.stale_loads == 1
+
+    def test_deactivated_user_is_cached_negatively(self, db, user_loads):
+        user_id = add_user(db, is_active=False)
+        with pytest.raises(HTTPException) as exc:
+            load(db, user_id)
+        assert exc.value.status_code == 400
+        assert principal_cache.lookup(user_id) == INACTIVE
+
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(get_current_user_id(make_request(user_id)))
+        assert exc.value.status_code == 400
+        assert user_loads == []  # Answered by the negative cache
+
+    def test_id_only_dependency_loads_once_on_miss(self, db, user_loads):
+        user_id = add_user(db)
+        assert asyncio.run(get_current_user_id(make_request(user_id))) == user_id
+        assert asyncio.run(get_current_user_id(make_request(user_id))) == user_id
+        assert user_loads == [user_id]  # Second request answered from the cache
+
+    def test_id_only_dependency_rejects_uncached_inactive_user(self, db, user_loads):
+        user_id = add_user(db, is_active=False)  # Never seen by this process
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(get_current_user_id(make_request(user_id)))
+        assert exc.value.status_code == 400
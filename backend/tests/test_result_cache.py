@@ -0,0 +1,86 @@
+# tests/test_result_cache.py
+"""
+Tests for the content-addressed AI result cache
+"""
+
+import asyncio
+
+from services.ai.result_cache import AIResultCache, fingerprint
+
+
+class OfflineResultCache(AIResultCache):
+    """Result cache backed by a dict instead of the database"""
+
+    def __init__(self):
+        super().__init__()
+        self.rows = {}
+
+    def _load(self, user_id, endpoint, key):
+        return self.rows.get((user_id, endpoint, key))
+
+    def _save(self, user_id, endpoint, key, version, payload, source="request"):
+        self.rows[(user_id, endpoint, key)] = payload
+
+
+class FakeReport:
+    def __init__(self, result=None):
+        self.calls = 0
+        self.result = result or {"survival_score": 90}
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return self.result
+
+
+HISTORY = [{"id": "t1", "pnl": 10.0, "notes": None}]
+
+
+class TestFingerprint:
+    def test_ignores_key_order_and_empty_fields(self):
+        a = fingerprint("weekly_report", "v1", [{"id": "t1", "pnl": 10.0, "notes": None, "_ui": 1}])
+        b = fingerprint("weekly_report", "v1", [{"pnl": 10.0, "id": "t1"}])
+        assert a == b
+
+    def test_changes_with_data_and_version(self):
+        base = fingerprint("weekly_report", "v1", HISTORY)
+        assert fingerprint("weekly_report", "v1", HISTORY + [{"id": "t2"}]) != base
+        assert fingerprint("weekly_report", "v2", HISTORY) != base
+
+
+class TestAIResultCache:
+    def test_repeat_load_skips_gemini(self):
+        cache, report = OfflineResultCache(), FakeReport()
+
+        async def run():
+            first = await cache.get_or_compute("u1", "weekly_report", (HISTORY,), report)
+            second = await cache.get_or_compute("u1", "weekly_report", (HISTORY,), report)
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert first == second
+        assert report.calls == 1
+        assert cache.hits == 1
+
+    def test_concurrent_loads_share_one_call(self):
+        cache, report = OfflineResultCache(), FakeReport()
+
+        async def run():
+            return await asyncio.gather(*(
+                cache.get_or_compute("u1", "weekly_report", (HISTORY,), report) for _ in range(3)
+            ))
+
+        asyncio.run(run())
+        assert report.calls == 1
+        assert cache.deduplicated == 2
+
+    def test_fallback_is_not_stored(self):
+        cache, report = OfflineResultCache(), FakeReport({"survival_score": 85, "is_fallback": True})
+
+        async def run():
+            for _ in range(2):
+                await cache.get_or_compute("u1", "weekly_report", (HISTORY,), report)
+
+        asyncio.run(run())
+        assert report.calls == 2
+        assert cache.rows == {}
@@ -0,0 +1,36 @@
+# tests/test_schema_version.py
+"""
+Tests for the startup schema version check
+"""
+
+from sqlalchemy import create_engine, text
+
+from services.schema_version import check_schema_version, expected_heads
+
+
+def engine_at(revision=None):
+    engine = create_engine("sqlite://")
+    if revision is not None:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) PRIMARY KEY)"))
+            conn.execute(text("INSERT INTO alembic_version VALUES (:rev)"), {"rev": revision})
+    return engine
+
+
+class TestSchemaVersion:
+    def test_migration_chain_has_a_single_head(self):
+        assert expected_heads() == ("2026_10_18_startup_schema",)
+
+    def test_database_at_head_is_current(self):
+        result = check_schema_version(engine_at("2026_10_18_startup_schema"))
+        assert result["status"] == "current"
+        assert result["database"] == ["2026_10_18_startup_schema"]
+
+    def test_older_known_revision_is_behind(self):
+        assert check_schema_version(engine_at("2026_10_18_user_stats"))["status"] == "behind"
+
+    def test_revision_from_newer_code_is_unknown(self):
+        assert check_schema_version(engine_at("2027_01_01_future"))["status"] == "unknown_revision"
+
+    def test_database_without_alembic_is_unversioned(self):
+        assert check_schema_version(engine_at())["status"] == "unversioned"
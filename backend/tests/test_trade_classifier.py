@@ -0,0 +1,85 @@
+# tests/test_trade_classifier.py
+"""
+Tests for the local distilled trade decision classifier
+"""
+
+import random
+
+from services.protection.trade_classifier import (
+    FEATURE_NAMES,
+    LocalTradeClassifier,
+    TradeDecisionClassifier,
+    extract_features,
+    vectorize,
+)
+
+
+def synthetic_samples(n=300, seed=7):
+    """BLOCK after loss streaks, WARN without stop loss, ALLOW otherwise"""
+    rng = random.Random(seed)
+    X, y = [], []
+    for _ in range(n):
+        losses = rng.randint(0, 4)
+        has_sl = rng.random() > 0.3
+        features = extract_features(
+            trade={"positionSize": rng.uniform(10, 200), "stopLoss": 1.0 if has_sl else None},
+            stats={"consecutiveLosses": losses},
+            trade_history=[],
+            user_settings={"account_balance": 1000},
+            triggered_rules=["R01_CONSECUTIVE_LOSSES"] if losses >= 2 else [],
+        )
+        X.append(vectorize(features))
+        y.append("BLOCK" if losses >= 2 else "WARN" if not has_sl else "ALLOW")
+    return X, y
+
+
+class TestFeatures:
+    def test_feature_vector_is_complete(self):
+        features = extract_features(
+            trade={"positionSize": 100, "stopLoss": 90},
+            stats={"consecutiveLosses": 2},
+            trade_history=[{"pnl": -5}],
+            user_settings={"account_balance": 1000, "max_position_size_usd": 50},
+            triggered_rules=["R02_POSITION_SIZE"],
+            market_danger="DANGER",
+        )
+        assert set(features) == set(FEATURE_NAMES)
+        assert features["rule_R02_POSITION_SIZE"] == 1.0
+        assert features["position_pct"] == 10.0
+        assert features["position_vs_max"] == 2.0
+        assert features["last_trade_loss"] == 1.0
+        assert features["market_danger"] == 2.0
+
+
+class TestTradeDecisionClassifier:
+    def test_learns_separable_decisions(self):
+        X, y = synthetic_samples()
+        model = TradeDecisionClassifier().fit(X, y)
+        correct = sum(model.predict(x)[0] == label for x, label in zip(X, y))
+        assert correct / len(y) > 0.9
+
+    def test_save_load_roundtrip(self, tmp_path):
+        X, y = synthetic_samples(n=60)
+        model = TradeDecisionClassifier().fit(X, y, epochs=5)
+        path = str(tmp_path / "model.json")
+        model.save(path)
+        loaded = TradeDecisionClassifier.load(path)
+        assert loaded.predict_proba(X[0]) == model.predict_proba(X[0])
+
+
+class TestLocalTradeClassifier:
+    def test_missing_model_always_escalates(self, tmp_path):
+        classifier = LocalTradeClassifier(model_path=str(tmp_path / "missing.json"))
+        assert classifier.decide({}) is None
+
+    def test_low_confidence_escalates(self, tmp_path):
+        X, y = synthetic_samples()
+        path = str(tmp_path / "model.json")
+        TradeDecisionClassifier().fit(X, y).save(path)
+
+        strict = LocalTradeClassifier(model_path=path, min_confidence=1.01)
+        assert strict.decide(dict(zip(FEATURE_NAMES, X[0]))) is None
+        assert strict.escalations == 1
+
+        lenient = LocalTradeClassifier(model_path=path, min_confidence=0.0)
+        assert lenient.decide(dict(zip(FEATURE_NAMES, X[0])))[0] == y[0]
@@ -0,0 +1,34 @@
+# tests/test_trade_pagination.py
+"""
+Tests for keyset cursors and the compact trade list projection
+"""
+
+import uuid
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from routes.trades import TRADE_LIST_COLUMNS
+from utils.pagination import decode_cursor, encode_cursor
+
+
+class TestTradePagination:
+    def test_cursor_round_trip(self):
+        at, trade_id = datetime(2026, 10, 18, 9, 30, 15, 123456), uuid.uuid4()
+        cursor = encode_cursor(at, trade_id)
+
+        assert "=" not in cursor  # Safe in a query string as-is
+        assert decode_cursor(cursor) == (at, trade_id)
+
+    def test_garbage_cursor_is_a_client_error(self):
+        with pytest.raises(HTTPException) as exc:
+            decode_cursor("not-a-cursor")
+        assert exc.value.status_code == 400
+
+    def test_compact_view_skips_heavy_columns(self):
+        names = {column.key for column in TRADE_LIST_COLUMNS}
+
+        assert {"id", "entry_time", "symbol", "pnl"} <= names
+        assert not names & {"notes", "process_evaluation", "user_process_evaluation",
+                            "behavioral_insight_card", "kata_evaluation"}
@@ -0,0 +1,86 @@
+# tests/test_user_events.py
+"""
+Tests for the multiplexed per-user SSE channel
+"""
+
+import asyncio
+
+from routes.stream import create_job, update_job, user_event_stream
+from services.job_store import SQLiteJobStore
+from services.user_events import UserEventHub, user_events
+
+
+class TestUserEventHub:
+    def test_resume_replays_missed_events(self):
+        async def run():
+            hub = UserEventHub()
+            first = hub.publish("u1", "achievement", {"level": "APPRENTICE"})
+            hub.publish("u1", "cooldown", {"status": "active"})
+            hub.publish("u2", "cooldown", {"status": "active"})
+            subscription, resync = hub.subscribe("u1", last_event_id=first)
+            events, gap = await subscription.next(timeout=0.01)
+            return resync, gap, [e["type"] for e in events]
+
+        assert asyncio.run(run()) == (False, False, ["cooldown"])
+
+    def test_unknown_or_dropped_id_requests_resync(self):
+        async def run():
+            hub = UserEventHub(replay_size=2)
+            first = hub.publish("u1", "job", {"progress": 10})
+            for progress in (20, 30, 40):  # Drops 10 and 20
+                hub.publish("u1", "job", {"progress": progress})
+            _, dropped = hub.subscribe("u1", last_event_id=first)
+            _, other_process = hub.subscribe("u1", last_event_id="deadbeef:1")
+            fresh, resync = hub.subscribe("u1")
+            return dropped, other_process, resync, await fresh.next(timeout=0.01)
+
+        assert asyncio.run(run()) == (True, True, False, ([], False))
+
+    def test_scheduled_event_replaces_previous(self):
+        async def run():
+            hub = UserEventHub()
+            subscription, _ = hub.subscribe("u1")
+            assert hub.schedule("u1", "cooldown", {"status": "expired", "n": 1}, delay_seconds=0.05)
+            assert not hub.schedule("u1", "cooldown", {"status": "expired", "n": 2}, delay_seconds=0.01)
+            events, _ = await subscription.next(timeout=1)
+            await asyncio.sleep(0.1)
+            later, _ = await subscription.next(timeout=0.01)
+            return [e["data"]["n"] for e in events + later]
+
+        assert asyncio.run(run()) == [2]
+
+    def test_events_from_another_worker_reach_local_subscribers(self, tmp_path):
+        path = str(tmp_path / "jobs.sqlite3")
+        store_a, store_b = SQLiteJobStore(path), SQLiteJobStore(path)
+        hub_a, hub_b = UserEventHub(), UserEventHub()
+        for store, hub in ((store_a, hub_a), (store_b, hub_b)):
+            hub.relay(store.publish_event)
+            store.listen_events(lambda user_id, event_type, data, hub=hub: hub.publish(user_id, event_type, data, relay=False))
+
+        async def run():
+            subscription, _ = hub_b.subscribe("u1")
+            hub_a.publish("u1", "achievement", {"level": "APPRENTICE"})
+            assert store_a.poll_remote() == 0  # Own event: already delivered locally
+            assert store_b.poll_remote() == 1
+            assert store_b.poll_remote() == 0
+            return await subscription.next(timeout=0.01)
+
+        events, gap = asyncio.run(run())
+        assert not gap and [(e["type"], e["data"]) for e in events] == [("achievement", {"level": "APPRENTICE"})]
+        assert hub_b.published == {"achievement": 1} and store_a.get_stats()["relayed_events"] == 1
+
+    def test_job_progress_reaches_user_stream(self):
+        async def run():
+            job_id = await create_job("stream-user", "post_trade_analysis", {"trade_id": "t9"})
+            stream = user_event_stream("stream-user", heartbeat_seconds=0.05, max_wait=0.3)
+            chunks = [await stream.__anext__()]  # retry hint; now subscribed
+            await update_job(job_id, progress=100, status="completed", result={"ok": True})
+            chunks += [chunk async for chunk in stream]
+            return chunks
+
+        chunks = asyncio.run(run())
+        assert chunks[0].startswith("retry:")
+        job_events = [c for c in chunks if "event: job" in c]
+        assert len(job_events) == 1 and '"trade_id": "t9"' in job_events[0] and '"ok": true' in job_events[0]
+        assert job_events[0].startswith(f"id: {user_events.boot_id}:")
+        assert ": heartbeat\n\n" in chunks
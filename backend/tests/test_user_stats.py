@@ -0,0 +1,104 @@
+# tests/test_user_stats.py
+"""
+Tests for the incrementally maintained progress counters
+"""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+import services.user_stats as user_stats
+from models import Trade, User, UserStats
+from services.user_stats import (
+    progress_summary, reconcile_chunk, record_checkin, record_trade_closed,
+    record_trade_created, stats_dict,
+)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    User.__table__.create(engine)
+    UserStats.__table__.create(engine)
+    with engine.begin() as conn:
+        # Only the columns compute_stats reads (the models use Postgres ARRAY types)
+        conn.execute(text("CREATE TABLE trades (id CHAR(32) PRIMARY KEY, user_id CHAR(32), ai_decision VARCHAR, pnl NUMERIC)"))
+        conn.execute(text("CREATE TABLE checkins (id CHAR(32) PRIMARY KEY, user_id CHAR(32), created_at DATETIME)"))
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def add_user(db) -> uuid.UUID:
+    user_id = uuid.uuid4()
+    db.add(User(id=user_id, email=f"{user_id.hex}@example.com", survival_score=50))
+    db.commit()
+    return user_id
+
+
+class TestUserStats:
+    def test_trades_and_checkins_update_counters(self, db):
+        user_id = add_user(db)
+        record_trade_created(db, Trade(user_id=user_id, ai_decision="BLOCK"))
+        closing = Trade(user_id=user_id, ai_decision="ALLOW")
+        record_trade_created(db, closing)
+        closing.pnl = 12.5
+        record_trade_closed(db, closing, previous_pnl=None)
+        record_checkin(db, user_id)
+        db.commit()
+
+        stats = stats_dict(db.get(UserStats, user_id))
+        assert (stats["total_trades"], stats["blocked_trades"], stats["winning_trades"]) == (2, 1, 1)
+        assert len(stats["recent_checkins"]) == 1 and stats["last_checkin_at"] is not None
+
+    def test_first_write_seeds_counters_from_existing_trades(self, db):
+        user_id = add_user(db)  # History from before user_stats existed, and no stats row
+        for i in range(500):
+            db.execute(text("INSERT INTO trades VALUES (:id, :user_id, :decision, :pnl)"),
+                       {"id": uuid.uuid4().hex, "user_id": user_id.hex,
+                        "decision": "BLOCK" if i < 10 else "ALLOW", "pnl": 5 if i % 2 else -5})
+        db.commit()
+
+        record_trade_created(db, Trade(user_id=user_id, ai_decision="ALLOW", pnl=3))
+        db.commit()
+
+        stats = stats_dict(db.get(UserStats, user_id))
+        assert (stats["total_trades"], stats["blocked_trades"], stats["winning_trades"]) == (501, 10, 251)
+        assert db.get(UserStats, user_id).reconciled_at is not None
+
+    def test_summary_applies_trust_decay_without_compounding(self):
+        now = datetime(2026, 10, 18, tzinfo=timezone.utc)
+        last = now - timedelta(days=4)
+        stats = {"total_trades": 4, "blocked_trades": 1, "winning_trades": 2,
+                 "last_checkin_at": last, "recent_checkins": [last.isoformat()]}
+        shadow = {"trust_score": 90}
+
+        first = progress_summary(stats, shadow, now)
+        assert first == progress_summary(stats, shadow, now)  # Pure: reloading doesn't decay further
+        assert first["trust_score"] == 75
+        assert first["discipline_score"] == 85
+        assert first["consistency_score"] == 14
+        assert first["win_rate"] == 50.0
+
+    def test_reconcile_repairs_drift_and_refreshes_score(self, db, monkeypatch):
+        drifted, missing = add_user(db), add_user(db)
+        record_trade_created(db, Trade(user_id=drifted, ai_decision="ALLOW"))
+        db.commit()
+
+        truth = {"total_trades": 3, "blocked_trades": 0, "winning_trades": 3,
+                 "last_checkin_at": None, "recent_checkins": []}
+        monkeypatch.setattr(user_stats, "compute_stats",
+                            lambda session, ids: {str(i): dict(truth, recent_checkins=[]) for i in ids})
+        result = reconcile_chunk(db, [drifted, missing])
+        db.commit()
+
+        assert result["repaired"] == 1 and result["created"] == 1
+        assert db.get(UserStats, drifted).total_trades == 3
+        assert db.get(UserStats, missing).reconciled_at is not None
+        expected = progress_summary(truth, None)["survival_score"]
+        db.expire_all()
+        assert db.get(User, drifted).survival_score == expected
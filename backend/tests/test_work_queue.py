@@ -0,0 +1,107 @@
+# tests/test_work_queue.py
+"""
+Tests for the durable work queue (SQLite backend)
+"""
+
+import asyncio
+import time
+
+from services.work_queue import SQLiteWorkQueue
+
+
+def make_queue(tmp_path, **kwargs):
+    kwargs.setdefault("backoff_base_seconds", 0)
+    kwargs.setdefault("poll_interval_seconds", 0.01)
+    return SQLiteWorkQueue(str(tmp_path / "queue.sqlite3"), **kwargs)
+
+
+async def drain(queue, seconds=0.3):
+    queue.start()
+    await asyncio.sleep(seconds)
+    await queue.stop()
+
+
+class TestWorkQueue:
+    def test_retries_then_succeeds(self, tmp_path):
+        queue = make_queue(tmp_path)
+        calls = []
+
+        async def flaky(payload, attempt, final_attempt):
+            calls.append((attempt, final_attempt))
+            if attempt < 3:
+                raise RuntimeError("busy")
+
+        queue.register("analysis", flaky, max_attempts=3)
+        item_id = queue.enqueue("analysis", {"trade_id": "t1"})
+        asyncio.run(drain(queue))
+
+        assert calls == [(1, False), (2, False), (3, True)]
+        assert queue.get(item_id)["status"] == "done"
+        stats = queue.get_stats()["queues"]["analysis"]
+        assert stats["retried"] == 2 and stats["completed"] == 1
+
+    def test_dead_after_max_attempts(self, tmp_path):
+        queue = make_queue(tmp_path)
+
+        async def broken(payload, attempt, final_attempt):
+            raise RuntimeError("boom")
+
+        queue.register("analysis", broken, max_attempts=2)
+        item_id = queue.enqueue("analysis", {})
+        asyncio.run(drain(queue))
+
+        item = queue.get(item_id)
+        assert item["status"] == "dead" and item["attempts"] == 2 and item["last_error"] == "boom"
+
+    def test_same_key_is_enqueued_once(self, tmp_path):
+        queue = make_queue(tmp_path)
+        first = queue.enqueue("analysis", {"n": 1}, key="job-1")
+        assert queue.enqueue("analysis", {"n": 2}, key="job-1") == first
+        assert queue.get_stats()["queues"]["analysis"]["depth"] == 1
+
+    def test_item_survives_restart_and_expired_lease(self, tmp_path):
+        crashed = make_queue(tmp_path, lease_seconds=60)
+        item_id = crashed.enqueue("analysis", {"trade_id": "t1"})
+        crashed.claim(["analysis"])  # Worker dies while running it
+
+        restarted = make_queue(tmp_path, lease_seconds=60)
+        assert restarted.claim(["analysis"]) is None
+        restarted._execute("UPDATE work_items SET locked_at = ?", (time.time() - 120,))
+        assert restarted.requeue_expired() == 1
+
+        done = []
+
+        async def handler(payload, attempt, final_attempt):
+            done.append((payload["trade_id"], attempt))
+
+        restarted.register("analysis", handler)
+        asyncio.run(drain(restarted))
+        assert done == [("t1", 2)]
+        assert restarted.get(item_id)["status"] == "done"
+
+    def test_worker_survives_error_recording_outcome(self, tmp_path):
+        queue = make_queue(tmp_path, concurrency=1)
+        done = []
+
+        async def handler(payload, attempt, final_attempt):
+            done.append(payload["n"])
+
+        complete = queue.complete
+        failures = []
+
+        def flaky_complete(item):
+            if not failures:
+                failures.append(item["id"])
+                raise RuntimeError("database is locked")
+            complete(item)
+
+        queue.complete = flaky_complete
+        queue.register("analysis", handler)
+        first = queue.enqueue("analysis", {"n": 1})
+        second = queue.enqueue("analysis", {"n": 2})
+        asyncio.run(drain(queue))
+
+        assert done == [1, 2]  # The lone worker kept going
+        assert queue.get(first)["status"] == "running"  # Re-queued once its lease expires
+        assert queue.get(second)["status"] == "done"
+        assert queue.get_stats()["worker_errors"] == 1
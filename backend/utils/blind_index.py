@@ -0,0 +1,69 @@
+# utils/blind_index.py
+"""
+Blind index for encrypted free text (trade notes).
+
+Notes are stored as Fernet tokens, so SQL can't search them. Instead each
+note is reduced to its distinct normalized words, and each word is stored as
+a keyed HMAC ("blind token"):
+- normalization folds case and Vietnamese diacritics ("Hỗ trợ" -> "ho tro"),
+  so a search typed without accents still matches
+- tokens are scoped per user, so equal words in different users' notes
+  don't produce equal tokens
+- without the key, tokens reveal neither the words nor cross-user overlap
+
+The key is NOTES_BLIND_INDEX_KEY, or derived from ENCRYPTION_KEY. Changing
+it requires rebuilding the index (scripts/backfill_note_index.py --all).
+"""
+
+import hashlib
+import hmac
+import os
+import re
+import unicodedata
+from typing import Iterable, List
+
+from utils.encryption import ENCRYPTION_KEY
+
+
+MIN_TERM_LENGTH = 2  # Single letters match too much to be worth indexing
+MAX_TERMS_PER_NOTE = 512
+TOKEN_HEX_CHARS = 24  # 96-bit HMAC prefix
+
+_WORD = re.compile(r"[0-9a-z]+")
+
+BLIND_INDEX_KEY = (
+    os.getenv("NOTES_BLIND_INDEX_KEY", "").encode()
+    or hmac.new(ENCRYPTION_KEY.encode(), b"thekey:notes-blind-index:v1", hashlib.sha256).digest()
+)
+
+
+def fold_text(text: str) -> str:
+    """Lowercase and strip diacritics ("Đặt lệnh" -> "dat lenh")."""
+    decomposed = unicodedata.normalize("NFD", text.casefold())
+    stripped = "".join(ch for ch in decomposed if unicodedata.category(ch) != "Mn")
+    return stripped.replace("đ", "d")
+
+
+def words(text: str) -> List[str]:
+    """Folded words in order of appearance."""
+    return _WORD.findall(fold_text(text or ""))
+
+
+def note_terms(text: str) -> List[str]:
+    """Distinct indexable words of a note, in order of first appearance."""
+    terms = dict.fromkeys(word for word in words(text) if len(word) >= MIN_TERM_LENGTH)
+    return list(terms)[:MAX_TERMS_PER_NOTE]
+
+
+def blind_tokens(scope, terms: Iterable[str]) -> List[str]:
+    """Keyed tokens for `terms` within `scope` (the owning user id)."""
+    return [
+        hmac.new(BLIND_INDEX_KEY, f"{scope}:{term}".encode(), hashlib.sha256).hexdigest()[:TOKEN_HEX_CHARS]
+        for term in terms
+    ]
+
+
+def matches_phrase(text: str, query: str) -> bool:
+    """Whether the folded words of `query` appear consecutively in `text`."""
+    needle = " ".join(words(query))
+    return bool(needle) and f" {needle} " in f" {' '.join(words(text))} "
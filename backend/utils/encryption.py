@@ -1,4 +1,9 @@
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
 from cryptography.fernet import Fernet
 from dotenv import load_dotenv
 
@@ -15,18 +20,92 @@ if not ENCRYPTION_KEY:
 
 cipher_suite = Fernet(ENCRYPTION_KEY.encode())
 
+# Bulk decryption: below this many tokens the pool handoff costs more than it saves
+BULK_DECRYPT_MIN_BATCH = int(os.getenv("BULK_DECRYPT_MIN_BATCH", "256"))
+BULK_DECRYPT_WORKERS = int(os.getenv("BULK_DECRYPT_WORKERS", str(min(8, os.cpu_count() or 1))))
+
+
+class DecryptionMetrics:
+    """Counts and times Fernet decryptions (lazy attribute reads and bulk batches)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.decrypted = 0
+        self.legacy_plaintext = 0
+        self.total_seconds = 0.0
+        self.bulk_batches = 0
+        self.bulk_tokens = 0
+
+    def record(self, count: int, legacy: int, seconds: float):
+        with self._lock:
+            self.decrypted += count
+            self.legacy_plaintext += legacy
+            self.total_seconds += seconds
+
+    def record_bulk(self, count: int):
+        with self._lock:
+            self.bulk_batches += 1
+            self.bulk_tokens += count
+
+    def get_stats(self) -> Dict:
+        return {
+            "decrypted": self.decrypted,
+            "legacy_plaintext": self.legacy_plaintext,
+            "total_ms": round(self.total_seconds * 1000, 2),
+            "avg_us": round(self.total_seconds / self.decrypted * 1e6, 1) if self.decrypted else 0.0,
+            "bulk_batches": self.bulk_batches,
+            "bulk_tokens": self.bulk_tokens,
+            "bulk_workers": BULK_DECRYPT_WORKERS,
+        }
+
+
+decryption_metrics = DecryptionMetrics()
+_bulk_executor: Optional[ThreadPoolExecutor] = None
+
+
 def encrypt_data(data: str) -> str:
     """Encrypt a string using Fernet (AES-128 in CBC mode with HMAC)."""
     if not data:
         return ""
     return cipher_suite.encrypt(data.encode()).decode()
 
+def _decrypt_chunk(tokens: Sequence[Optional[str]]) -> List[Optional[str]]:
+    start = time.perf_counter()
+    plain, count, legacy = [], 0, 0
+    for token in tokens:
+        if not token:
+            plain.append(token if token is None else "")
+            continue
+        count += 1
+        try:
+            plain.append(cipher_suite.decrypt(token.encode()).decode())
+        except Exception:
+            # Graceful fallback: Assume data is not encrypted yet (Legacy support)
+            legacy += 1
+            plain.append(token)
+    decryption_metrics.record(count, legacy, time.perf_counter() - start)
+    return plain
+
 def decrypt_data(token: str) -> str:
     """Decrypt a Fernet token back to a string. Returns original string if decryption fails (legacy data support)."""
     if not token:
         return ""
-    try:
-        return cipher_suite.decrypt(token.encode()).decode()
-    except Exception:
-        # Graceful fallback: Assume data is not encrypted yet (Legacy support)
-        return token
+    return _decrypt_chunk([token])[0]
+
+def decrypt_many(tokens: Sequence[Optional[str]]) -> List[Optional[str]]:
+    """
+    Decrypt a batch of tokens (None stays None), fanned out over a shared
+    thread pool when the batch is large enough. Blocking: call it from a
+    worker thread (`asyncio.to_thread`) in async code.
+    """
+    global _bulk_executor
+    tokens = list(tokens)
+    if len(tokens) < BULK_DECRYPT_MIN_BATCH or BULK_DECRYPT_WORKERS <= 1:
+        return _decrypt_chunk(tokens)
+
+    if _bulk_executor is None:
+        _bulk_executor = ThreadPoolExecutor(max_workers=BULK_DECRYPT_WORKERS, thread_name_prefix="decrypt")
+    decryption_metrics.record_bulk(len(tokens))
+    size = -(-len(tokens) // BULK_DECRYPT_WORKERS)
+    chunks = [tokens[i:i + size] for i in range(0, len(tokens), size)]
+    return [plain for chunk in _bulk_executor.map(_decrypt_chunk, chunks) for plain in chunk]
@@ -0,0 +1,25 @@
+# backend/utils/pagination.py
+"""
+Opaque keyset cursors: the (timestamp, id) of the last row of a page,
+so the next page is an index range scan instead of an OFFSET.
+"""
+import base64
+import uuid
+from datetime import datetime
+from typing import Tuple
+
+from fastapi import HTTPException
+
+
+def encode_cursor(at: datetime, row_id) -> str:
+    raw = f"{at.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        at, _, row_id = raw.partition("|")
+        return datetime.fromisoformat(at), uuid.UUID(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -13,6 +13,10 @@ interface TradeHistoryListProps {
     analysis: TradeAnalysis | null;
     onClearAnalysis: () => void;
     mode?: 'LIST_ONLY' | 'DETAIL_ONLY' | 'FULL';
+    // The history is paged: older trades are requested when the list is scrolled to the end
+    hasMore?: boolean;
+    isLoadingMore?: boolean;
+    onLoadMore?: () => void;
 }
 
 const DecisionIcon: React.FC<{ decision: Trade['decision'] }> = ({ decision }) => {
@@ -28,7 +32,13 @@ const DecisionIcon: React.FC<{ decision: Trade['decision'] }> = ({ decision }) =
     }
 }
 
-export const TradeHistoryList: React.FC<TradeHistoryListProps> = ({ tradeHistory, onAnalyze, onCloseTrade, isAnalyzing, selectedTrade, analysis, onClearAnalysis, mode = 'FULL' }) => {
+export const TradeHistoryList: React.FC<TradeHistoryListProps> = ({ tradeHistory, onAnalyze, onCloseTrade, isAnalyzing, selectedTrade, analysis, onClearAnalysis, mode = 'FULL', hasMore = false, isLoadingMore = false, onLoadMore }) => {
+    const handleScroll = (e: React.UIEvent<HTMLDivElement>) => {
+        const el = e.currentTarget;
+        if (hasMore && !isLoadingMore && onLoadMore && el.scrollHeight - el.scrollTop - el.clientHeight < 200) {
+            onLoadMore();
+        }
+    };
 
     return (
         <div className="space-y-4 flex flex-col h-full w-full bg-black/20">
@@ -56,7 +66,7 @@ export const TradeHistoryList: React.FC<TradeHistoryListProps> = ({ tradeHistory
                 <div className="flex flex-col flex-1 overflow-hidden">
                     {/* Trade List Panel */}
                     {(mode === 'FULL' || mode === 'LIST_ONLY') && (
-                        <div className={`space-y-3 px-4 pb-6 overflow-y-auto custom-scrollbar w-full ${selectedTrade && mode === 'FULL' ? 'hidden md:block' : 'block'}`}>
+                        <div className={`space-y-3 px-4 pb-6 overflow-y-auto custom-scrollbar w-full ${selectedTrade && mode === 'FULL' ? 'hidden md:block' : 'block'}`} onScroll={handleScroll}>
                             {tradeHistory.map((trade, idx) => {
                                 const isSelected = selectedTrade?.id === trade.id;
 
@@ -91,11 +101,11 @@ export const TradeHistoryList: React.FC<TradeHistoryListProps> = ({ tradeHistory
                                             </div>
 
                                             <div className="flex-shrink-0 ml-4">
-                                                {trade.processEvaluation ? (
+                                                {trade.processEvaluation || trade.processScore != null ? (
                                                     <div className="flex items-center gap-2 group/score">
                                                         <div className="text-right">
                                                             <p className="text-[8px] font-black text-white/10 uppercase leading-tight tracking-tighter">DISCIPLINE</p>
-                                                            <p className="text-xs font-black text-accent-neon tracking-tighter">{trade.processEvaluation?.totalProcessScore || 0}%</p>
+                                                            <p className="text-xs font-black text-accent-neon tracking-tighter">{trade.processEvaluation?.totalProcessScore ?? trade.processScore ?? 0}%</p>
                                                         </div>
                                                         <div className="w-10 h-10 rounded-full border border-accent-neon/20 flex items-center justify-center bg-accent-neon/5 shadow-inner">
                                                             <BrainCircuitIcon className="w-4 h-4 text-accent-neon" />
@@ -118,6 +128,15 @@ export const TradeHistoryList: React.FC<TradeHistoryListProps> = ({ tradeHistory
                                     </motion.div>
                                 );
                             })}
+                            {hasMore && onLoadMore && (
+                                <button
+                                    onClick={onLoadMore}
+                                    disabled={isLoadingMore}
+                                    className="w-full py-3 rounded-xl border border-white/5 text-[9px] font-black text-accent-neon/40 uppercase tracking-[0.3em] hover:border-accent-neon/20 hover:text-accent-neon transition-all disabled:opacity-40"
+                                >
+                                    {isLoadingMore ? 'LOADING_RECORDS...' : 'LOAD_OLDER_RECORDS'}
+                                </button>
+                            )}
                         </div>
                     )}
 
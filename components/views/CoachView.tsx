@@ -18,6 +18,9 @@ interface CoachViewProps {
     onCloseTrade: (trade: Trade) => void;
     tradeAnalysis: TradeAnalysis | null;
     onClearAnalysis: () => void;
+    hasMoreTrades?: boolean;
+    isLoadingMoreTrades?: boolean;
+    onLoadMoreTrades?: () => void;
 }
 
 export const CoachView: React.FC<CoachViewProps> = (props) => {
@@ -62,6 +65,9 @@ export const CoachView: React.FC<CoachViewProps> = (props) => {
                         onCloseTrade={props.onCloseTrade}
                         analysis={props.tradeAnalysis}
                         onClearAnalysis={props.onClearAnalysis}
+                        hasMore={props.hasMoreTrades}
+                        isLoadingMore={props.isLoadingMoreTrades}
+                        onLoadMore={props.onLoadMoreTrades}
                         mode="LIST_ONLY"
                     />
                 </div>
@@ -96,7 +96,7 @@ const DashboardHeader: React.FC<{ stats: TraderStats, processStats: ProcessStats
 export const DashboardView: React.FC<DashboardViewProps> = (props) => {
     const { t } = useLanguage();
     const tradeCount = props.tradeHistory?.length || 0;
-    const dojoCount = props.dojoCount ?? (props.tradeHistory?.filter(t => t.processEvaluation).length || 0);
+    const dojoCount = props.dojoCount ?? (props.tradeHistory?.filter(t => t.processEvaluation || t.processScore != null).length || 0);
     const hasCheckin = props.hasCheckin ?? props.checkinHistory?.length > 0;
 
     return (
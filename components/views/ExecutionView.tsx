@@ -18,6 +18,10 @@ interface ExecutionViewProps {
     onCloseTrade: (trade: Trade) => void;
     tradeAnalysis: TradeAnalysis | null;
     onClearAnalysis: () => void;
+    // Older trades are paged in on request
+    hasMoreTrades?: boolean;
+    isLoadingMoreTrades?: boolean;
+    onLoadMoreTrades?: () => void;
     messages: ChatMessage[];
     onSendMessage: (message: ChatMessage) => Promise<void>;
     isLoadingChat: boolean;
@@ -41,6 +45,9 @@ export const ExecutionView: React.FC<ExecutionViewProps> = ({
     onCloseTrade,
     tradeAnalysis,
     onClearAnalysis,
+    hasMoreTrades,
+    isLoadingMoreTrades,
+    onLoadMoreTrades,
     messages,
     onSendMessage,
     isLoadingChat,
@@ -109,6 +116,9 @@ export const ExecutionView: React.FC<ExecutionViewProps> = ({
                                     onCloseTrade={onCloseTrade}
                                     tradeAnalysis={tradeAnalysis}
                                     onClearAnalysis={onClearAnalysis}
+                                    hasMoreTrades={hasMoreTrades}
+                                    isLoadingMoreTrades={isLoadingMoreTrades}
+                                    onLoadMoreTrades={onLoadMoreTrades}
                                     profileAccountSize={profileAccountSize}
                                     profileRiskPercent={profileRiskPercent}
                                     profileMaxPositionSize={profileMaxPositionSize}
@@ -127,6 +137,9 @@ export const ExecutionView: React.FC<ExecutionViewProps> = ({
                                     onCloseTrade={onCloseTrade}
                                     tradeAnalysis={tradeAnalysis}
                                     onClearAnalysis={onClearAnalysis}
+                                    hasMoreTrades={hasMoreTrades}
+                                    isLoadingMoreTrades={isLoadingMoreTrades}
+                                    onLoadMoreTrades={onLoadMoreTrades}
                                 />
                             )}
                         </motion.div>
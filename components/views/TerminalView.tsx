@@ -26,6 +26,9 @@ interface TerminalViewProps {
     onCloseTrade: (trade: Trade) => void;
     tradeAnalysis: TradeAnalysis | null;
     onClearAnalysis: () => void;
+    hasMoreTrades?: boolean;
+    isLoadingMoreTrades?: boolean;
+    onLoadMoreTrades?: () => void;
     // Profile settings for Terminal
     profileAccountSize: number;
     profileRiskPercent: number;
@@ -73,6 +76,9 @@ export const TerminalView: React.FC<TerminalViewProps> = (props) => {
                     onCloseTrade={props.onCloseTrade}
                     analysis={props.tradeAnalysis}
                     onClearAnalysis={props.onClearAnalysis}
+                    hasMore={props.hasMoreTrades}
+                    isLoadingMore={props.isLoadingMoreTrades}
+                    onLoadMore={props.onLoadMoreTrades}
                     mode="FULL"
                 />
             </div>
@@ -41,23 +41,16 @@ export interface TradeIntent {
  * 
  * Features:
  * - Automatic auth header injection
- * - JSON parsing
  * - Token refresh on 401 (retry once)
  * - Error handling with detailed messages
  * 
- * @template T - Expected response type
  * @param endpoint - API endpoint path (e.g., '/api/trades/')
  * @param options - Fetch request options
  * @param _isRetry - Internal flag to prevent infinite retry loops
- * @returns Promise resolving to the response data
+ * @returns Promise resolving to the successful response
  * @throws Error with detail message on failure
- * 
- * @example
- * ```ts
- * const data = await request<UserProfile>('/auth/me');
- * ```
  */
-const request = async <T = any>(endpoint: string, options: RequestInit = {}, _isRetry = false): Promise<T> => {
+const send = async (endpoint: string, options: RequestInit = {}, _isRetry = false): Promise<Response> => {
     const token = localStorage.getItem('thekey_access_token');
     const headers = {
         'Content-Type': 'application/json',
@@ -83,7 +76,7 @@ const request = async <T = any>(endpoint: string, options: RequestInit = {}, _is
                     const data = await refreshResponse.json();
                     localStorage.setItem('thekey_access_token', data.access_token);
                     console.log('[API] Token refreshed successfully, retrying request...');
-                    return request<T>(endpoint, options, true); // Retry with new token
+                    return send(endpoint, options, true); // Retry with new token
                 }
             } catch (e) {
                 console.error('[API] Token refresh failed:', e);
@@ -97,9 +90,40 @@ const request = async <T = any>(endpoint: string, options: RequestInit = {}, _is
         throw new Error(error.detail || `Request failed with status ${response.status}`);
     }
 
+    return response;
+};
+
+/**
+ * JSON body of a {@link send} request.
+ *
+ * @template T - Expected response type
+ * @example
+ * ```ts
+ * const data = await request<UserProfile>('/auth/me');
+ * ```
+ */
+const request = async <T = any>(endpoint: string, options: RequestInit = {}): Promise<T> => {
+    const response = await send(endpoint, options);
     return response.json();
 };
 
+/**
+ * One page of a cursor-paginated list endpoint.
+ * The backend returns the next page's cursor in the `X-Next-Cursor` header
+ * and omits it on the last page, so `nextCursor` is null there.
+ *
+ * @param endpoint - List endpoint including its query string
+ * @param cursor - Cursor of the page to load; omit for the first page
+ */
+const requestPage = async <T = any>(endpoint: string, cursor?: string | null): Promise<{ items: T[]; nextCursor: string | null }> => {
+    const separator = endpoint.includes('?') ? '&' : '?';
+    const response = await send(cursor ? `${endpoint}${separator}cursor=${encodeURIComponent(cursor)}` : endpoint);
+    return { items: await response.json(), nextCursor: response.headers.get('X-Next-Cursor') };
+};
+
+/** Most recent trades sent to report/coaching endpoints; totals come from /api/progress/summary */
+export const REPORT_HISTORY_LIMIT = 50;
+
 /**
  * THEKEY AI API client with all endpoint methods.
  * All methods return Promises and handle authentication automatically.
@@ -128,7 +152,7 @@ export const api = {
 
     getTraderArchetype: (data: any) => request('/api/learning/archetype', {
         method: 'POST',
-        body: JSON.stringify(data)
+        body: JSON.stringify({ ...data, trade_history: (data.trade_history || []).slice(0, REPORT_HISTORY_LIMIT) })
     }),
     // Reflection / Check-in
     getCheckinQuestions: () => request('/api/reflection/checkin/questions'),
@@ -144,7 +168,13 @@ export const api = {
         method: 'POST',
         body: JSON.stringify(trade),
     }),
-    getTradeHistory: () => request('/api/trades/'),  // No userId needed - backend uses auth token
+    /**
+     * One page of trades, newest first, in the compact list view (no notes or evaluations).
+     * Pass the previous page's `nextCursor` to load older trades.
+     */
+    getTradeHistory: (cursor?: string | null) => requestPage('/api/trades/?view=compact&limit=50', cursor),  // No userId needed - backend uses auth token
+    /** One trade with notes and evaluations */
+    getTrade: (tradeId: string) => request(`/api/trades/${tradeId}`),
     closeTrade: (tradeId: string, pnl: number, exitPrice: number) => request(`/api/trades/${tradeId}/close?pnl=${pnl}&exit_price=${exitPrice}`, {
         method: 'PUT'
     }),
@@ -177,10 +207,11 @@ export const api = {
         const data = await request('/api/reflection/initial-message');
         return data.text;
     },
-    getChatResponse: (message: string, history: any[], mode: 'COACH' | 'PROTECTOR' = 'COACH') =>
+    // Conversation history is kept server-side (summary + recent turns)
+    getChatResponse: (message: string, _history: any[], mode: 'COACH' | 'PROTECTOR' = 'COACH') =>
         request('/api/reflection/chat', {
             method: 'POST',
-            body: JSON.stringify({ message, history, mode }),
+            body: JSON.stringify({ message, mode }),
         }),
 
     getPostTradeAnalysis: (trade: any) => request('/api/protection/analyze-trade', {
@@ -190,17 +221,17 @@ export const api = {
 
     getEmotionalTiltIntervention: (stats: any, history: any[]) => request('/api/protection/emotional-tilt', {
         method: 'POST',
-        body: JSON.stringify({ stats, history }),
+        body: JSON.stringify({ stats, history: history.slice(0, REPORT_HISTORY_LIMIT) }),
     }),
 
     getWeeklyGoals: (history: any[], stats: any, checkinHistory: any[]) => request('/api/progress/weekly-goals', {
         method: 'POST',
-        body: JSON.stringify({ history, stats, checkinHistory }),
+        body: JSON.stringify({ history: history.slice(0, REPORT_HISTORY_LIMIT), stats, checkinHistory }),
     }),
 
     getWeeklyReport: (history: any[]) => request('/api/progress/weekly-report', {
         method: 'POST',
-        body: JSON.stringify({ history }),
+        body: JSON.stringify({ history: history.slice(0, REPORT_HISTORY_LIMIT) }),
     }),
 
     // User Settings
@@ -2,6 +2,11 @@
 /**
  * THEKEY SSE Streaming Service
  * Subscribes to real-time progress updates from the backend.
+ *
+ * Only per-job streams are covered here. The per-user channel
+ * (`/api/stream/me`: job, ai_augmentation, cooldown, achievement events)
+ * is backend/API-only for now: it authenticates with the Bearer header,
+ * which EventSource cannot send.
  */
 
 const API_URL = import.meta.env.VITE_API_URL || 'https://thekey-backend.onrender.com';
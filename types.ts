@@ -57,6 +57,7 @@ export interface Trade {
     };
     processEvaluation?: ProcessEvaluation;
     userProcessEvaluation?: UserProcessEvaluation;
+    processScore?: number; // From the compact history list; the evaluations load when the trade is opened
 }
 
 export type TradeDecision = {